@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# =====================================================================================
+# === CONTENT-ADDRESSED ARTIFACT CACHE WITH SIZE-BOUNDED (LRU) EVICTION ===
+# === BUFOR ARTEFAKTÓW ADRESOWANY TREŚCIĄ Z USUWANIEM LRU PO PRZEKROCZENIU ROZMIARU ===
+# =====================================================================================
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_CACHE_DIR = os.path.join(".cache", "artifacts")
+DEFAULT_MAX_MB = 256
+_INDEX_FILENAME = "index.sqlite3"
+
+# Kinds stored by earlier versions and no longer cached: user packages and WireGuard QR codes
+# hold private keys, config.pref is cheaper to render than to look up. Whatever is left of
+# them is removed when the cache is opened
+# Rodzaje zapisywane przez wcześniejsze wersje i już niebuforowane: paczki użytkowników i kody
+# QR WireGuard zawierają klucze prywatne, config.pref taniej wygenerować niż wyszukać. Ich
+# pozostałości są usuwane przy otwarciu bufora
+_RETIRED_KINDS = ("package", "qr", "pref")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key        TEXT PRIMARY KEY,
+    kind       TEXT NOT NULL,
+    size       INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_used  REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS counters (
+    kind    TEXT PRIMARY KEY,
+    hits    INTEGER NOT NULL DEFAULT 0,
+    misses  INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+
+# =====================================================================================
+# === HELPER FUNCTIONS ===
+# === FUNKCJE POMOCNICZE ===
+# =====================================================================================
+
+def artifact_key(kind, inputs):
+    """
+    Returns the key of an artifact: the SHA-256 of its kind and all its inputs.
+
+    Zwraca klucz artefaktu: SHA-256 jego rodzaju i wszystkich jego danych wejściowych.
+    """
+    payload = json.dumps({"kind": kind, "inputs": inputs}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def write_if_changed(path, data, mode=0o644):
+    """
+    Writes data to path atomically, unless the file already has exactly this content
+    (its modification time then stays the same). Returns True if the file was written.
+
+    Zapisuje dane do path atomowo, chyba że plik ma już dokładnie tę treść
+    (jego czas modyfikacji pozostaje wtedy ten sam). Zwraca True, jeśli plik został zapisany.
+    """
+    try:
+        if os.path.getsize(path) == len(data):
+            with open(path, 'rb') as f:
+                if f.read() == data:
+                    return False
+    except OSError:
+        pass
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    temp_path = f"{path}.{threading.get_ident()}.tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(data)
+    os.chmod(temp_path, mode)
+    os.replace(temp_path, path)
+    return True
+
+
+# =====================================================================================
+# === ARTIFACT CACHE CLASS ===
+# === KLASA BUFORA ARTEFAKTÓW ===
+# =====================================================================================
+
+class ArtifactCache:
+    """
+    Local store of generated artifacts (the truststore), keyed by a hash of
+    everything the artifact is made from. A stage asks for the artifact of its inputs
+    and only generates it on a miss. When the stored artifacts exceed max_bytes, the
+    least recently used ones are removed. Hits and misses are counted per kind. Nothing
+    holding a private key is stored; the files are readable by the owner only. Safe to
+    use from several threads.
+
+    Lokalny magazyn wygenerowanych artefaktów (truststore), z kluczem będącym
+    skrótem wszystkiego, z czego artefakt powstaje. Etap prosi o artefakt dla swoich danych
+    wejściowych i generuje go tylko przy chybieniu. Gdy zapisane artefakty przekroczą
+    max_bytes, usuwane są najdawniej używane. Trafienia i chybienia są liczone dla każdego
+    rodzaju. Nic, co zawiera klucz prywatny, nie jest zapisywane; pliki są czytelne tylko
+    dla właściciela. Bezpieczny w użyciu z wielu wątków.
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_MB * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = int(max_bytes)
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(os.path.join(directory, _INDEX_FILENAME), check_same_thread=False)
+        with self._connection:
+            self._connection.executescript(_SCHEMA)
+            for kind in _RETIRED_KINDS:
+                self._remove_kind(kind)
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        Returns the cache configured in 'execution.artifact_cache', or None if it is disabled.
+
+        Zwraca bufor skonfigurowany w 'execution.artifact_cache' lub None, jeśli jest wyłączony.
+        """
+        settings = (config.get('execution') or {}).get('artifact_cache') or {}
+        if not settings.get('enabled', True):
+            return None
+        return cls(settings.get('dir', DEFAULT_CACHE_DIR), float(settings.get('max_mb', DEFAULT_MAX_MB)) * 1024 * 1024)
+
+    def close(self):
+        self._connection.close()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key)
+
+    def _count(self, kind, column):
+        self._connection.execute(f"INSERT INTO counters (kind, {column}) VALUES (?, 1) "
+                                 f"ON CONFLICT(kind) DO UPDATE SET {column} = {column} + 1", (kind,))
+
+    # --- Access ---
+    # --- Dostęp ---
+
+    def get(self, kind, inputs):
+        """
+        Returns the stored artifact of these inputs, or None (counted as a miss).
+
+        Zwraca zapisany artefakt dla tych danych wejściowych lub None (liczone jako chybienie).
+        """
+        key = artifact_key(kind, inputs)
+        with self._lock, self._connection:
+            data = None
+            if self._connection.execute("SELECT 1 FROM entries WHERE key = ?", (key,)).fetchone():
+                try:
+                    with open(self._path(key), 'rb') as f:
+                        data = f.read()
+                except OSError:
+                    self._connection.execute("DELETE FROM entries WHERE key = ?", (key,))
+            if data is None:
+                self._count(kind, "misses")
+                return None
+            self._connection.execute("UPDATE entries SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._count(kind, "hits")
+            return data
+
+    def put(self, kind, inputs, data):
+        """
+        Stores the artifact of these inputs and evicts old ones above the size limit.
+
+        Zapisuje artefakt dla tych danych wejściowych i usuwa stare powyżej limitu rozmiaru.
+        """
+        if len(data) > self.max_bytes:
+            return
+        key = artifact_key(kind, inputs)
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+        now = time.time()
+        with self._lock, self._connection:
+            self._connection.execute("INSERT OR REPLACE INTO entries (key, kind, size, created_at, last_used) "
+                                     "VALUES (?, ?, ?, ?, ?)", (key, kind, len(data), now, now))
+            self._evict(keep=key)
+
+    def get_or_create(self, kind, inputs, producer):
+        """
+        Returns the stored artifact of these inputs, or calls producer() and stores its result.
+
+        Zwraca zapisany artefakt dla tych danych wejściowych albo wywołuje producer()
+        i zapisuje jego wynik.
+        """
+        data = self.get(kind, inputs)
+        if data is None:
+            data = producer()
+            self.put(kind, inputs, data)
+        return data
+
+    def _remove(self, key):
+        self._connection.execute("DELETE FROM entries WHERE key = ?", (key,))
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def _remove_kind(self, kind):
+        for (key,) in self._connection.execute("SELECT key FROM entries WHERE kind = ?", (kind,)).fetchall():
+            self._remove(key)
+
+    def _evict(self, keep=None):
+        total = self._connection.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._connection.execute("SELECT key, size FROM entries ORDER BY last_used").fetchall():
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            self._remove(key)
+            total -= size
+
+    # --- Maintenance ---
+    # --- Utrzymanie ---
+
+    def stats(self):
+        """
+        Returns {kind: {'entries', 'bytes', 'hits', 'misses', 'hit_rate'}}.
+
+        Zwraca {rodzaj: {'entries', 'bytes', 'hits', 'misses', 'hit_rate'}}.
+        """
+        with self._lock:
+            result = {}
+            for kind, hits, misses in self._connection.execute("SELECT kind, hits, misses FROM counters"):
+                result[kind] = {"entries": 0, "bytes": 0, "hits": hits, "misses": misses,
+                                "hit_rate": hits / (hits + misses) if hits + misses else 0.0}
+            for kind, entries, size in self._connection.execute(
+                    "SELECT kind, COUNT(*), SUM(size) FROM entries GROUP BY kind"):
+                result.setdefault(kind, {"hits": 0, "misses": 0, "hit_rate": 0.0})
+                result[kind].update(entries=entries, bytes=size)
+            return result
+
+    def clear(self):
+        """
+        Removes every stored artifact and resets the counters.
+
+        Usuwa wszystkie zapisane artefakty i zeruje liczniki.
+        """
+        with self._lock, self._connection:
+            for (key,) in self._connection.execute("SELECT key FROM entries").fetchall():
+                self._remove(key)
+            self._connection.execute("DELETE FROM counters")
+
+
+# =====================================================================================
+# === SCRIPT ENTRY POINT ===
+# === PUNKT WEJŚCIA DO SKRYPTU ===
+# =====================================================================================
+
+if __name__ == "__main__":
+    import argparse
+    from config_loader import load_config
+
+    parser = argparse.ArgumentParser(
+        description="Shows the hit rates of the artifact cache or empties it.",
+        epilog="Example: python3 artifact_cache.py stats"
+    )
+    parser.add_argument("action", choices=["stats", "clear"], help="Action to perform. (Akcja do wykonania)")
+    parser.add_argument("--config", default="config.yaml", help="Path to config.yaml. (Ścieżka do config.yaml)")
+    args = parser.parse_args()
+
+    config_data = load_config(args.config)
+    if not config_data:
+        exit(1)
+    cache = ArtifactCache.from_config(config_data)
+    if cache is None:
+        print("The artifact cache is disabled (execution.artifact_cache.enabled).")
+        print("Bufor artefaktów jest wyłączony (execution.artifact_cache.enabled).")
+        exit(0)
+
+    if args.action == "clear":
+        cache.clear()
+        print(f"Artifact cache '{cache.directory}' emptied.")
+        print(f"Bufor artefaktów '{cache.directory}' został opróżniony.")
+    else:
+        stats = cache.stats()
+        total_bytes = sum(row.get("bytes") or 0 for row in stats.values())
+        print(f"Artifact cache / Bufor artefaktów: {cache.directory} "
+              f"({total_bytes / 1048576:.1f} / {cache.max_bytes / 1048576:.0f} MB)")
+        print(f"{'kind / rodzaj':<14} {'entries':>8} {'MB':>8} {'hits':>7} {'misses':>7} {'hit rate':>9}")
+        for kind, row in sorted(stats.items()):
+            print(f"{kind:<14} {row['entries']:>8} {(row['bytes'] or 0) / 1048576:>8.2f} {row['hits']:>7} "
+                  f"{row['misses']:>7} {row['hit_rate']:>8.0%}")
+    cache.close()
@@ -0,0 +1,559 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# =====================================================================================
+# === END-TO-END BENCHMARK WITH LOCAL STAND-INS FOR THE TAK SERVER AND GMAIL ===
+# === TEST WYDAJNOŚCI END-TO-END Z LOKALNYMI ZAMIENNIKAMI SERWERA TAK I GMAILA ===
+# =====================================================================================
+
+import csv
+import getpass
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import yaml
+
+from metrics import print_metrics, summarize
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_SIZES = (10, 100, 1000)
+CA_PASSWORD = "atakatak"
+
+# The registration sheets shipped with the project define the column order of both schemas
+# Arkusze rejestracji dołączone do projektu określają kolejność kolumn obu schematów
+REGISTRATION_TEMPLATES = {
+    "EN": "BLOX-TAK-SERVER-IUCP_REGISTRATION.csv",
+    "PL": "BLOX-TAK-SERVER-IPPU_REJESTRACJA.csv",
+}
+
+_FIRST_NAMES = ["Anna", "Jan", "Maria", "Piotr", "Ewa", "Tomasz", "Olga", "Marek", "Zofia", "Adam"]
+_LAST_NAMES = ["Nowak", "Kowalski", "Wiśniewska", "Wójcik", "Kamińska", "Lewandowski", "Zielińska", "Szymański"]
+_VOIVODESHIPS = ["dolnośląskie", "mazowieckie", "małopolskie", "pomorskie", "śląskie", "wielkopolskie"]
+_PLACES = ["Jelenia Góra", "Warszawa", "Kraków", "Gdańsk", "Katowice", "Poznań"]
+
+# Stand-in for the TAK makeCert.sh: a real RSA 2048 key, a certificate signed by the local CA
+# (recorded in its database, so revocation works) and a .p12 like the original
+# Zamiennik makeCert.sh serwera TAK: prawdziwy klucz RSA 2048, certyfikat podpisany przez lokalne CA
+# (zapisany w jego bazie, więc odwoływanie działa) i plik .p12 jak z oryginału
+_MAKE_CERT_SH = """#!/bin/bash
+set -e
+cd "$(dirname "$0")"
+. ./cert-metadata.sh
+name="$2"
+cd files
+openssl req -new -newkey rsa:2048 -nodes -keyout "$name.key" -out "$name.csr" \\
+    -subj "/C=$COUNTRY/ST=$STATE/L=$CITY/O=$ORGANIZATION/OU=$ORGANIZATIONAL_UNIT/CN=$name" 2>/dev/null
+openssl ca -config ../config.cfg -batch -notext -extensions client -in "$name.csr" -out "$name.pem" \\
+    -keyfile ca-do-not-share.key -key "$CAPASS" -cert ca.pem 2>/dev/null
+openssl pkcs12 -export -in "$name.pem" -inkey "$name.key" -certfile ca.pem -name "$name" \\
+    -out "$name.p12" -passout "pass:$PASS"
+rm -f "$name.csr"
+"""
+
+# Stand-in for the TAK revokeCert.sh: './revokeCert.sh <client> <signing ca> <crl name>'
+# Zamiennik revokeCert.sh serwera TAK: './revokeCert.sh <klient> <ca podpisujące> <nazwa crl>'
+_REVOKE_CERT_SH = """#!/bin/bash
+set -e
+cd "$(dirname "$0")"
+. ./cert-metadata.sh
+cd files
+openssl ca -config ../config.cfg -revoke "$1.pem" -keyfile "$2.key" -key "$CAPASS" -cert "$2.pem"
+openssl ca -config ../config.cfg -gencrl -keyfile "$2.key" -key "$CAPASS" -cert "$2.pem" -out "$3.crl"
+"""
+
+_OPENSSL_CA_CONFIG = """[ ca ]
+default_ca = CA_default
+
+[ CA_default ]
+dir = .
+database = $dir/index.txt
+new_certs_dir = $dir/newcerts
+serial = $dir/serial
+crlnumber = $dir/crlnumber
+default_md = sha256
+default_days = 730
+default_crl_days = 730
+policy = policy_any
+unique_subject = no
+
+[ policy_any ]
+commonName = supplied
+
+[ client ]
+basicConstraints = CA:FALSE
+keyUsage = digitalSignature, keyEncipherment
+extendedKeyUsage = clientAuth
+"""
+
+_CERT_METADATA_SH = f"""COUNTRY=PL
+STATE=dolnoslaskie
+CITY=Karkonosze
+ORGANIZATION=BLOX
+ORGANIZATIONAL_UNIT=benchmark
+CAPASS={CA_PASSWORD}
+PASS={CA_PASSWORD}
+"""
+
+# 'sudo -A -p <variable>' of LocalSession: the password is taken from SUDO_ASKPASS like a
+# prompting sudo would, then the command runs as is
+# 'sudo -A -p <zmienna>' z LocalSession: hasło jest pobierane z SUDO_ASKPASS jak przez pytające
+# sudo, a następnie polecenie uruchamiane bez zmian
+_SUDO_SHIM = """#!/bin/bash
+prompt=""
+while [ $# -gt 0 ]; do
+    case "$1" in
+        -A) shift ;;
+        -p) prompt="$2"; shift 2 ;;
+        *) break ;;
+    esac
+done
+"$SUDO_ASKPASS" "$prompt" > /dev/null || exit 1
+exec "$@"
+"""
+
+
+# =====================================================================================
+# === LOCAL STAND-INS ===
+# === LOKALNE ZAMIENNIKI ===
+# =====================================================================================
+
+def generate_registrations(path, count, language="EN", seed=0):
+    """
+    Writes a synthetic registration sheet with 'count' users in the EN or PL schema
+    (the header of BLOX-TAK-SERVER-IUCP_REGISTRATION.csv / ..._REJESTRACJA.csv).
+    Returns the user names.
+
+    Zapisuje syntetyczny arkusz rejestracji z 'count' użytkownikami w schemacie EN lub PL
+    (nagłówek BLOX-TAK-SERVER-IUCP_REGISTRATION.csv / ..._REJESTRACJA.csv).
+    Zwraca nazwy użytkowników.
+    """
+    with open(os.path.join(SCRIPT_DIR, REGISTRATION_TEMPLATES[language]), 'r', encoding='utf-8') as f:
+        header = next(csv.reader(f))
+    generator = random.Random(seed)
+    start = time.mktime((2025, 3, 1, 8, 0, 0, 0, 0, -1))
+    names = []
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        for number in range(1, count + 1):
+            name = f"bench_{number:05d}"
+            names.append(name)
+            writer.writerow([
+                time.strftime("%Y/%m/%d %H:%M:%S", time.localtime(start + number * 37)),
+                generator.choice(_FIRST_NAMES), generator.choice(_LAST_NAMES),
+                f"{name}@example.invalid", name, f"+48 {generator.randint(500000000, 799999999)}",
+                generator.choice(_VOIVODESHIPS), f"{generator.randint(0, 99):02d}-{generator.randint(0, 999):03d}",
+                generator.choice(_PLACES),
+            ][:len(header)])
+    return names
+
+
+def _write_executable(path, content):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    os.chmod(path, 0o755)
+
+
+def setup_fake_tak(certs_dir):
+    """
+    Creates a TAK certificates directory backed by a local OpenSSL CA: makeCert.sh,
+    revokeCert.sh, cert-metadata.sh, the CA (also as root-ca-do-not-share, used by
+    revoke.py) and truststore-root.p12.
+
+    Tworzy katalog certyfikatów TAK oparty na lokalnym CA OpenSSL: makeCert.sh,
+    revokeCert.sh, cert-metadata.sh, CA (także jako root-ca-do-not-share, używane przez
+    revoke.py) i truststore-root.p12.
+    """
+    files = os.path.join(certs_dir, "files")
+    os.makedirs(os.path.join(files, "newcerts"), exist_ok=True)
+    _write_executable(os.path.join(certs_dir, "makeCert.sh"), _MAKE_CERT_SH)
+    _write_executable(os.path.join(certs_dir, "revokeCert.sh"), _REVOKE_CERT_SH)
+    with open(os.path.join(certs_dir, "cert-metadata.sh"), 'w', encoding='utf-8') as f:
+        f.write(_CERT_METADATA_SH)
+    with open(os.path.join(certs_dir, "config.cfg"), 'w', encoding='utf-8') as f:
+        f.write(_OPENSSL_CA_CONFIG)
+    for name, content in (("index.txt", ""), ("serial", "1000\n"), ("crlnumber", "1000\n")):
+        with open(os.path.join(files, name), 'w', encoding='utf-8') as f:
+            f.write(content)
+
+    def openssl(*arguments):
+        subprocess.run(["openssl"] + list(arguments), cwd=files, check=True, capture_output=True)
+
+    openssl("req", "-x509", "-newkey", "rsa:2048", "-keyout", "ca-do-not-share.key", "-out", "ca.pem",
+            "-days", "3650", "-subj", "/C=PL/O=BLOX/CN=BLOX benchmark CA", "-passout", f"pass:{CA_PASSWORD}")
+    openssl("pkcs12", "-export", "-nokeys", "-in", "ca.pem", "-out", "truststore-root.p12",
+            "-passout", f"pass:{CA_PASSWORD}")
+    shutil.copyfile(os.path.join(files, "ca.pem"), os.path.join(files, "root-ca-do-not-share.pem"))
+    shutil.copyfile(os.path.join(files, "ca-do-not-share.key"), os.path.join(files, "root-ca-do-not-share.key"))
+
+
+class _FakeServicesHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status, body=b"", headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _body(self):
+        return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+    def _sent(self, size):
+        server = self.server
+        time.sleep(server.latency)
+        with server.lock:
+            server.messages += 1
+            server.bytes += size
+        message_id = uuid.uuid4().hex[:16]
+        self._reply(200, json.dumps({"id": message_id, "threadId": message_id, "labelIds": ["SENT"]}).encode(),
+                    {"Content-Type": "application/json"})
+
+    def do_GET(self):
+        # External IP provider for ip_detect.py / Dostawca zewnętrznego IP dla ip_detect.py
+        if self.path.startswith("/ip"):
+            self._reply(200, b"127.0.0.1\n", {"Content-Type": "text/plain"})
+        else:
+            self._reply(404)
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        body = self._body()
+        if not url.path.endswith("/gmail/v1/users/me/messages/send"):
+            self._reply(404)
+            return
+        if parse_qs(url.query).get("uploadType") == ["resumable"]:
+            upload_id = uuid.uuid4().hex
+            self.server.uploads[upload_id] = 0
+            host = self.headers.get("Host")
+            self._reply(200, headers={"Location": f"http://{host}/upload/resumable/{upload_id}"})
+            return
+        self._sent(len(body))
+
+    def do_PUT(self):
+        upload_id = self.path.rsplit("/", 1)[-1]
+        body = self._body()
+        if upload_id not in self.server.uploads:
+            self._reply(404)
+            return
+        self.server.uploads[upload_id] += len(body)
+        # 'Content-Range: bytes 0-999/5000' (or 'bytes */5000' for a status query)
+        # 'Content-Range: bytes 0-999/5000' (lub 'bytes */5000' przy pytaniu o stan)
+        total = self.headers.get("Content-Range", "*/*").rsplit("/", 1)[-1]
+        received = self.server.uploads[upload_id]
+        if total != "*" and received >= int(total):
+            del self.server.uploads[upload_id]
+            self._sent(received)
+        else:
+            self._reply(308, headers={"Range": f"bytes=0-{received - 1}"} if received else {})
+
+
+class FakeServices(ThreadingHTTPServer):
+    """
+    Local HTTP server standing in for the Gmail API (simple and resumable message
+    uploads, with an optional latency per message) and for the external IP providers.
+
+    Lokalny serwer HTTP zastępujący Gmail API (zwykłe i wznawialne przesyłanie
+    wiadomości, z opcjonalnym opóźnieniem na wiadomość) oraz dostawców zewnętrznego IP.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, latency=0.0):
+        super().__init__(("127.0.0.1", 0), _FakeServicesHandler)
+        self.latency = float(latency)
+        self.lock = threading.Lock()
+        self.messages = 0
+        self.bytes = 0
+        self.uploads = {}
+        self._thread = threading.Thread(target=self.serve_forever, name="fake-services", daemon=True)
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/"
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def start_sshd(workdir):
+    """
+    Starts a local sshd on a free port for remote mode, or returns None if sshd or
+    sshpass is missing. Logging in needs the password of the current user in
+    BLOX_BENCH_SSH_PASSWORD (also used for sudo), and sshd must run as root.
+
+    Uruchamia lokalny sshd na wolnym porcie dla trybu zdalnego lub zwraca None, jeśli
+    brakuje sshd lub sshpass. Logowanie wymaga hasła bieżącego użytkownika
+    w BLOX_BENCH_SSH_PASSWORD (używanego także dla sudo), a sshd musi działać jako root.
+
+    Returns:
+        tuple: (process, port) or None. / (proces, port) lub None.
+    """
+    sshd = shutil.which("sshd") or ("/usr/sbin/sshd" if os.path.exists("/usr/sbin/sshd") else None)
+    if not sshd or not shutil.which("sshpass"):
+        return None
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    host_key = os.path.join(workdir, "ssh_host_ed25519_key")
+    subprocess.run(["ssh-keygen", "-q", "-t", "ed25519", "-N", "", "-f", host_key], check=True)
+    config_path = os.path.join(workdir, "sshd_config")
+    with open(config_path, 'w', encoding='utf-8') as f:
+        f.write(f"Port {port}\nListenAddress 127.0.0.1\nHostKey {host_key}\n"
+                f"PidFile {os.path.join(workdir, 'sshd.pid')}\nPasswordAuthentication yes\nUsePAM yes\n")
+    process = subprocess.Popen([sshd, "-D", "-e", "-f", config_path], stdout=subprocess.DEVNULL,
+                               stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+            return process, port
+        except OSError:
+            time.sleep(0.1)
+    process.terminate()
+    return None
+
+
+# =====================================================================================
+# === BENCHMARK LOGIC ===
+# === LOGIKA TESTU WYDAJNOŚCI ===
+# =====================================================================================
+
+def prepare_workdir(workdir, count, language, services, engine, ssh=None):
+    """
+    Fills workdir with everything one run needs: registration sheet, fake TAK
+    certificates directory, package template, config.yaml pointing at the stand-ins,
+    a Gmail token and the sudo stand-in. Returns (csv path, environment).
+
+    Wypełnia workdir wszystkim, czego potrzebuje jeden przebieg: arkuszem rejestracji,
+    udawanym katalogiem certyfikatów TAK, szablonem paczki, config.yaml wskazującym na
+    zamienniki, tokenem Gmail i zamiennikiem sudo. Zwraca (ścieżka csv, środowisko).
+    """
+    root = workdir.rstrip("/") + "/"
+    csv_path = os.path.join(workdir, f"registrations_{language}.csv")
+    generate_registrations(csv_path, count, language)
+    certs_dir = os.path.join(workdir, "tak-certs")
+    setup_fake_tak(certs_dir)
+    shutil.copytree(os.path.join(SCRIPT_DIR, "IUCP-IPPU_PACKAGE"), os.path.join(workdir, "IUCP-IPPU_PACKAGE"))
+    os.makedirs(os.path.join(workdir, "attachments"), exist_ok=True)
+
+    with open(os.path.join(SCRIPT_DIR, "config.example.yaml"), 'r', encoding='utf-8') as f:
+        config = yaml.safe_load(f)
+    config['security'].update(sudo_pswd=os.environ.get("BLOX_BENCH_SSH_PASSWORD", "benchmark"),
+                              api_creds_path=os.path.join(workdir, "client_secret.json"), p12_password=CA_PASSWORD)
+    config['paths'].update(attachment_output=os.path.join(workdir, "attachments") + "/",
+                           preferences_output=root + "IUCP-IPPU_PACKAGE/certs/", project_root=root,
+                           tak_certs_dir=certs_dir)
+    config['pki']['engine'] = engine
+    config['user_management']['data_sources'] = {"en": csv_path, "pl": csv_path}
+    config['user_management']['state']['user_type'] = language
+    config['email']['sender_email'] = "benchmark@example.invalid"
+    config['email']['delivery'].update(api_endpoint=services.url, max_attempts=2, base_delay=0.1)
+    config['network']['external_ip'] = "127.0.0.1"
+    config['network']['ip_detection'].update(providers=[services.url + "ip/1", services.url + "ip/2"])
+    config['execution']['mode'] = "remote" if ssh else "local"
+    if ssh:
+        config['network']['remote_server'] = {"host": "127.0.0.1", "user": getpass.getuser(), "port": ssh}
+    with open(os.path.join(workdir, "config.yaml"), 'w', encoding='utf-8') as f:
+        yaml.dump(config, f, default_flow_style=False, allow_unicode=True, sort_keys=False)
+
+    # A valid-looking token, so no OAuth flow is started (the fake Gmail accepts any)
+    # Poprawnie wyglądający token, aby nie uruchamiać OAuth (udawany Gmail przyjmuje każdy)
+    with open(os.path.join(workdir, "token.json"), 'w', encoding='utf-8') as f:
+        json.dump({"token": "benchmark", "refresh_token": "benchmark", "client_id": "benchmark",
+                   "client_secret": "benchmark", "expiry": "2099-01-01T00:00:00Z",
+                   "scopes": ["https://www.googleapis.com/auth/gmail.send"]}, f)
+
+    bin_dir = os.path.join(workdir, "bin")
+    os.makedirs(bin_dir, exist_ok=True)
+    _write_executable(os.path.join(bin_dir, "sudo"), _SUDO_SHIM)
+    environment = dict(os.environ)
+    environment.update(BLOX_HEADLESS="1", BLOX_SSH_CONTROL_PATH=os.path.join(workdir, "ssh-%C"),
+                       PYTHONDONTWRITEBYTECODE="1")
+    if not ssh:
+        environment["PATH"] = bin_dir + os.pathsep + environment.get("PATH", "")
+    return csv_path, environment
+
+
+def run_child(command, workdir, environment):
+    """
+    Runs a script and returns (seconds, peak RSS in MB of it and the processes it
+    waited for, JSON progress events, exit code, last output lines). The events are
+    written to their own file (BLOX_EVENTS), apart from the output.
+
+    Uruchamia skrypt i zwraca (sekundy, szczytowe RSS w MB jego i procesów, na które
+    czekał, zdarzenia postępu JSON, kod wyjścia, ostatnie linie wyjścia). Zdarzenia
+    są zapisywane do osobnego pliku (BLOX_EVENTS), oddzielnie od wyjścia.
+    """
+    descriptor, events_path = tempfile.mkstemp(prefix="events-", suffix=".jsonl", dir=workdir)
+    os.close(descriptor)
+    started = time.perf_counter()
+    process = subprocess.Popen(command, cwd=workdir, env=dict(environment, BLOX_EVENTS=events_path),
+                               stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    output = process.stdout.read()
+    _, status, usage = os.wait4(process.pid, 0)
+    process.returncode = os.waitstatus_to_exitcode(status)
+    seconds = time.perf_counter() - started
+    with open(events_path, 'r', encoding='utf-8') as f:
+        events = [json.loads(line) for line in f if line.strip()]
+    return seconds, usage.ru_maxrss / 1024, events, process.returncode, output.splitlines()[-5:]
+
+
+def benchmark_size(count, language="EN", engine="makecert", gmail_latency=0.0, use_sshd=False, keep=False):
+    """
+    Provisions 'count' synthetic users with start.py and revokes them with revoke.py,
+    both against the local stand-ins, and returns the measurements.
+
+    Obsługuje 'count' syntetycznych użytkowników przez start.py i odwołuje ich przez
+    revoke.py, w obu przypadkach z lokalnymi zamiennikami, i zwraca pomiary.
+    """
+    workdir = tempfile.mkdtemp(prefix=f"blox-bench-{count}-")
+    services = FakeServices(gmail_latency).start()
+    sshd = start_sshd(workdir) if use_sshd else None
+    if use_sshd and sshd is None:
+        print("WARNING: sshd or sshpass not available, running in local mode.")
+        print("OSTRZEŻENIE: Brak sshd lub sshpass, przebieg w trybie lokalnym.")
+    try:
+        csv_path, environment = prepare_workdir(workdir, count, language, services, engine,
+                                                sshd[1] if sshd else None)
+        mode = "remote" if sshd else "local"
+        start_seconds, start_rss, start_events, start_code, start_tail = run_child(
+            [sys.executable, os.path.join(SCRIPT_DIR, "start.py"), "--headless", "--language", language,
+             "--mode", mode, "--data-source", csv_path], workdir, environment)
+        revoke_seconds, revoke_rss, revoke_events, revoke_code, revoke_tail = run_child(
+            [sys.executable, os.path.join(SCRIPT_DIR, "revoke.py"), "--headless", "--language", language,
+             "--data-source", csv_path], workdir, environment)
+
+        summary = next((e for e in start_events if e["event"] == "summary"), {})
+        spans = []
+        trace_path = os.path.join(workdir, ".cache", "metrics", "trace.jsonl")
+        if os.path.exists(trace_path):
+            with open(trace_path, 'r', encoding='utf-8') as f:
+                spans = [json.loads(line) for line in f if line.strip()]
+        succeeded = summary.get("succeeded", 0)
+        return {
+            "users": count, "language": language, "engine": engine, "mode": mode,
+            "start": {"exit_code": start_code, "seconds": start_seconds, "peak_rss_mb": start_rss,
+                      "succeeded": succeeded, "failed": summary.get("failed", count),
+                      "users_per_minute": succeeded * 60.0 / start_seconds if start_seconds else 0.0,
+                      "emails_received": services.messages, "stages": summarize(spans),
+                      "output": start_tail if start_code else []},
+            "revoke": {"exit_code": revoke_code, "seconds": revoke_seconds, "peak_rss_mb": revoke_rss,
+                       "revoked": sum(1 for e in revoke_events if e["event"] == "revocation"
+                                      and e.get("status") == "revoked"),
+                       "output": revoke_tail if revoke_code else []},
+            "workdir": workdir if keep else None,
+        }
+    finally:
+        services.stop()
+        if sshd:
+            sshd[0].terminate()
+            sshd[0].wait()
+        if not keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+def print_result(result):
+    """
+    Prints the throughput, peak RSS and per-stage latency of one benchmark size.
+
+    Wyświetla przepustowość, szczytowe RSS i opóźnienia etapów jednego rozmiaru testu.
+    """
+    start, revoke = result["start"], result["revoke"]
+    print("=" * 70)
+    print(f"N = {result['users']} ({result['language']}, pki.engine {result['engine']}, {result['mode']})")
+    print(f"start.py:  {start['succeeded']} ok, {start['failed']} failed / błędy, "
+          f"{start['emails_received']} e-mails, {start['seconds']:.1f} s, "
+          f"{start['users_per_minute']:.1f} users/min, peak RSS {start['peak_rss_mb']:.0f} MB")
+    print(f"revoke.py: {revoke['revoked']} revoked / odwołane, {revoke['seconds']:.1f} s, "
+          f"peak RSS {revoke['peak_rss_mb']:.0f} MB")
+    for name in ("start", "revoke"):
+        if result[name]["output"]:
+            print(f"{name}.py exited with {result[name]['exit_code']} / zakończył się kodem {result[name]['exit_code']}:")
+            for line in result[name]["output"]:
+                print(f"    {line}")
+    if start["stages"]:
+        print_metrics({"spans": start["stages"], "seconds": start["seconds"], "succeeded": start["succeeded"],
+                       "users_per_minute": start["users_per_minute"]})
+    if result["workdir"]:
+        print(f"Work directory / Katalog roboczy: {result['workdir']}")
+
+
+# =====================================================================================
+# === SCRIPT ENTRY POINT ===
+# === PUNKT WEJŚCIA DO SKRYPTU ===
+# =====================================================================================
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Runs start.py and revoke.py for N synthetic users against a local fake TAK CA and "
+                    "a fake Gmail API, and reports throughput, per-stage latency and peak RSS.",
+        epilog="Example: python3 benchmark.py --sizes 10,100 --output bench.json"
+    )
+    parser.add_argument("--sizes", default=",".join(str(size) for size in DEFAULT_SIZES),
+                        help="Comma-separated numbers of users. (Liczby użytkowników rozdzielone przecinkami)")
+    parser.add_argument("--language", choices=["EN", "PL"], default="EN",
+                        help="Registration sheet schema. (Schemat arkusza rejestracji)")
+    parser.add_argument("--engine", choices=["makecert", "python"], default="makecert",
+                        help="pki.engine of the runs. (pki.engine przebiegów)")
+    parser.add_argument("--gmail-latency", type=float, default=0.0,
+                        help="Seconds the fake Gmail takes per message. (Sekundy na wiadomość w udawanym Gmailu)")
+    parser.add_argument("--sshd", action="store_true",
+                        help="Run in remote mode over a local sshd (needs sshd, sshpass, BLOX_BENCH_SSH_PASSWORD). "
+                             "(Tryb zdalny przez lokalny sshd)")
+    parser.add_argument("--keep", action="store_true",
+                        help="Keep the work directories. (Zachowaj katalogi robocze)")
+    parser.add_argument("--output", help="Also write the results as JSON. (Zapisz też wyniki jako JSON)")
+    parser.add_argument("--generate-csv", metavar="PATH",
+                        help="Only write a synthetic sheet of the first size to PATH. "
+                             "(Tylko zapisz syntetyczny arkusz pierwszego rozmiaru do PATH)")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+    if args.generate_csv:
+        generate_registrations(args.generate_csv, sizes[0], args.language)
+        print(f"{sizes[0]} registrations written to {args.generate_csv}.")
+        print(f"{sizes[0]} rejestracji zapisano do {args.generate_csv}.")
+        sys.exit(0)
+    if not shutil.which("openssl"):
+        print("ERROR: openssl is required for the fake TAK CA.")
+        print("BŁĄD: Udawane CA TAK wymaga openssl.")
+        sys.exit(1)
+
+    results = []
+    for size in sizes:
+        print(f"Benchmarking N = {size}...")
+        print(f"Test wydajności dla N = {size}...")
+        result = benchmark_size(size, args.language, args.engine, args.gmail_latency, args.sshd, args.keep)
+        print_result(result)
+        results.append(result)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    failed = any(r["start"]["exit_code"] or r["start"]["failed"] or r["revoke"]["exit_code"] for r in results)
+    sys.exit(1 if failed else 0)
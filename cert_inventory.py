@@ -0,0 +1,403 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# =====================================================================================
+# === INVENTORY OF ISSUED TAK CLIENT CERTIFICATES (SQLITE INDEX) ===
+# === SPIS WYSTAWIONYCH CERTYFIKATÓW KLIENTÓW TAK (INDEKS SQLITE) ===
+# =====================================================================================
+
+import datetime
+import os
+import shlex
+import sqlite3
+import tarfile
+import threading
+
+DEFAULT_INVENTORY_PATH = "cert_inventory.sqlite3"
+# Password of the .p12 files created by the TAK server scripts (cert-metadata.sh)
+# Hasło plików .p12 tworzonych przez skrypty serwera TAK (cert-metadata.sh)
+DEFAULT_P12_PASSWORD = "atakatak"
+# Below this number of files parsing in worker processes costs more than it saves
+# Poniżej tej liczby plików parsowanie w osobnych procesach kosztuje więcej, niż zyskuje
+_PARALLEL_THRESHOLD = 32
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS certificates (
+    filename    TEXT PRIMARY KEY,
+    mtime       REAL NOT NULL,
+    size        INTEGER NOT NULL,
+    cn          TEXT,
+    serial      TEXT,
+    not_before  TEXT,
+    not_after   TEXT,
+    is_ca       INTEGER NOT NULL DEFAULT 0,
+    error       TEXT,
+    scanned_at  TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS certificates_cn ON certificates (cn);
+CREATE INDEX IF NOT EXISTS certificates_not_after ON certificates (not_after);
+CREATE TABLE IF NOT EXISTS ca_database (
+    serial      TEXT PRIMARY KEY,
+    status      TEXT NOT NULL,
+    expires_at  TEXT,
+    revoked_at  TEXT,
+    cn          TEXT
+);
+"""
+
+
+# =====================================================================================
+# === HELPER FUNCTIONS ===
+# === FUNKCJE POMOCNICZE ===
+# =====================================================================================
+
+def _now():
+    return datetime.datetime.now(datetime.timezone.utc).strftime("%Y-%m-%dT%H:%M:%S")
+
+
+def _ca_time(value):
+    """
+    Converts an openssl CA database time (YYMMDDHHMMSSZ) to ISO format, or None.
+
+    Zamienia czas z bazy CA openssl (YYMMDDHHMMSSZ) na format ISO lub None.
+    """
+    value = value.split(",")[0].strip()
+    if not value:
+        return None
+    try:
+        return datetime.datetime.strptime(value, "%y%m%d%H%M%SZ").strftime("%Y-%m-%dT%H:%M:%S")
+    except ValueError:
+        return None
+
+
+def parse_ca_database(text):
+    """
+    Parses the openssl CA database (files/index.txt):
+    status, expiry, revocation date, serial, file name and subject per line.
+
+    Parsuje bazę CA openssl (files/index.txt):
+    status, data wygaśnięcia, data odwołania, numer seryjny, nazwa pliku i podmiot w każdej linii.
+    """
+    records = []
+    for line in text.splitlines():
+        fields = line.split("\t")
+        if len(fields) < 6:
+            continue
+        status, expires, revoked, serial, _, subject = fields[:6]
+        cn = None
+        for part in subject.split("/"):
+            if part.startswith("CN="):
+                cn = part[3:]
+        records.append((serial.upper().lstrip("0") or "0", status, _ca_time(expires), _ca_time(revoked), cn))
+    return records
+
+
+def parse_certificate(item):
+    """
+    Parses one .pem or .p12 file. Runs in worker processes, so it takes and returns
+    plain tuples: (filename, data, password) -> (filename, cn, serial, not_before,
+    not_after, is_ca, error).
+
+    Parsuje jeden plik .pem lub .p12. Działa w procesach roboczych, więc przyjmuje
+    i zwraca zwykłe krotki: (nazwa_pliku, dane, hasło) -> (nazwa_pliku, cn, numer,
+    ważny_od, ważny_do, czy_ca, błąd).
+    """
+    filename, data, password = item
+    from cryptography import x509
+    from cryptography.x509.oid import NameOID
+
+    try:
+        if filename.endswith(".p12"):
+            from cryptography.hazmat.primitives.serialization import pkcs12
+            _, certificate, additional = pkcs12.load_key_and_certificates(data, password.encode("utf-8"))
+            # A truststore has no own certificate, only the CA ones
+            # Truststore nie ma własnego certyfikatu, tylko certyfikaty CA
+            certificate = certificate or (additional[0] if additional else None)
+            if certificate is None:
+                return filename, None, None, None, None, 0, "no certificate in the file"
+        else:
+            certificate = x509.load_pem_x509_certificate(data)
+    except Exception as e:
+        return filename, None, None, None, None, 0, str(e) or type(e).__name__
+
+    names = certificate.subject.get_attributes_for_oid(NameOID.COMMON_NAME)
+    try:
+        is_ca = certificate.extensions.get_extension_for_class(x509.BasicConstraints).value.ca
+    except x509.ExtensionNotFound:
+        is_ca = False
+    return (filename, names[0].value if names else None, format(certificate.serial_number, "X"),
+            certificate.not_valid_before_utc.strftime("%Y-%m-%dT%H:%M:%S"),
+            certificate.not_valid_after_utc.strftime("%Y-%m-%dT%H:%M:%S"), int(is_ca), None)
+
+
+def parse_certificates(items, workers=None):
+    """
+    Parses many certificate files, in a pool of processes when there are enough of them.
+
+    Parsuje wiele plików certyfikatów, w puli procesów, gdy jest ich wystarczająco dużo.
+    """
+    if len(items) < _PARALLEL_THRESHOLD or workers == 1:
+        return [parse_certificate(item) for item in items]
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(parse_certificate, items, chunksize=16))
+
+
+def _list_script(files_dir):
+    return f"""
+        cd {shlex.quote(files_dir)} || exit 1
+        find . -maxdepth 1 -type f \\( -name '*.pem' -o -name '*.p12' \\) -printf '%T@\\t%s\\t%f\\n'
+        echo '--- index.txt ---'
+        cat index.txt 2>/dev/null || true
+    """
+
+
+def _read_files(session, files_dir, filenames):
+    """
+    Downloads the given files of the certificates directory as one tar stream. The names
+    go to tar on stdin (NUL-separated), so their number is not limited by ARG_MAX.
+
+    Pobiera podane pliki katalogu certyfikatów jako jeden strumień tar. Nazwy trafiają
+    do tar na stdin (rozdzielone NUL), więc ich liczby nie ogranicza ARG_MAX.
+    """
+    names = b"".join(name.encode("utf-8") + b"\0" for name in filenames)
+    process = session.popen(f"tar -C {shlex.quote(files_dir)} --null --verbatim-files-from -cf - -T -",
+                            sudo=True, input_data=names)
+    stderr_chunks = []
+    stderr_reader = threading.Thread(target=lambda: stderr_chunks.append(process.stderr.read()), daemon=True)
+    stderr_reader.start()
+    contents = {}
+    try:
+        with tarfile.open(fileobj=process.stdout, mode="r|") as archive:
+            for member in archive:
+                if member.isfile():
+                    contents[os.path.basename(member.name)] = archive.extractfile(member).read()
+    finally:
+        process.stdout.read()
+        process.wait()
+        stderr_reader.join()
+    return contents
+
+
+# =====================================================================================
+# === INVENTORY CLASS ===
+# === KLASA SPISU ===
+# =====================================================================================
+
+class CertificateInventory:
+    """
+    SQLite index of the certificate files in the TAK 'certs/files' directory (CN,
+    serial number, validity dates) and of the CA database (revocation state).
+    refresh() only downloads and parses files whose modification time or size changed.
+
+    Indeks SQLite plików certyfikatów w katalogu 'certs/files' serwera TAK (CN,
+    numer seryjny, daty ważności) i bazy CA (stan odwołania). refresh() pobiera
+    i parsuje tylko pliki, których czas modyfikacji lub rozmiar się zmienił.
+    """
+
+    def __init__(self, path=DEFAULT_INVENTORY_PATH):
+        self.path = path
+        self._connection = sqlite3.connect(path)
+        self._connection.row_factory = sqlite3.Row
+        with self._connection:
+            self._connection.executescript(_SCHEMA)
+
+    def close(self):
+        self._connection.close()
+
+    def refresh(self, session, certs_dir, p12_password=DEFAULT_P12_PASSWORD, workers=None):
+        """
+        Brings the index up to date with the server.
+
+        Aktualizuje indeks zgodnie ze stanem serwera.
+
+        Returns:
+            dict: Numbers of 'parsed', 'unchanged' and 'removed' files.
+                  Liczby plików 'parsed' (sparsowane), 'unchanged' (bez zmian) i 'removed' (usunięte).
+        """
+        files_dir = os.path.join(certs_dir, "files")
+        listing = session.exec(_list_script(files_dir), sudo=True).stdout
+        files_part, _, index_part = listing.partition("--- index.txt ---\n")
+
+        on_server = {}
+        for line in files_part.splitlines():
+            fields = line.split("\t")
+            if len(fields) == 3:
+                on_server[fields[2]] = (float(fields[0]), int(fields[1]))
+
+        known = {row['filename']: (row['mtime'], row['size'])
+                 for row in self._connection.execute("SELECT filename, mtime, size FROM certificates")}
+        changed = [name for name, stamp in on_server.items() if known.get(name) != stamp]
+        removed = [name for name in known if name not in on_server]
+
+        parsed = []
+        if changed:
+            contents = _read_files(session, files_dir, changed)
+            parsed = parse_certificates([(name, contents[name], p12_password) for name in changed
+                                         if name in contents], workers)
+
+        scanned_at = _now()
+        with self._connection:
+            self._connection.executemany("DELETE FROM certificates WHERE filename = ?", [(n,) for n in removed])
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO certificates (filename, mtime, size, cn, serial, not_before, not_after, "
+                "is_ca, error, scanned_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(row[0],) + on_server[row[0]] + row[1:] + (scanned_at,) for row in parsed]
+            )
+            # The CA database is small and is always read again completely
+            # Baza CA jest mała i zawsze odczytywana ponownie w całości
+            self._connection.execute("DELETE FROM ca_database")
+            self._connection.executemany("INSERT OR REPLACE INTO ca_database VALUES (?, ?, ?, ?, ?)",
+                                         parse_ca_database(index_part))
+        return {"parsed": len(parsed), "unchanged": len(on_server) - len(changed), "removed": len(removed)}
+
+    # --- Queries ---
+    # --- Zapytania ---
+
+    def certificates(self, include_ca=False, include_revoked=False, expiring_before=None):
+        """
+        Returns the indexed client certificates with their revocation state, ordered by expiry.
+
+        Zwraca zindeksowane certyfikaty klientów z ich stanem odwołania, według daty wygaśnięcia.
+        """
+        conditions = ["c.error IS NULL"]
+        parameters = []
+        if not include_ca:
+            conditions.append("c.is_ca = 0")
+        if not include_revoked:
+            conditions.append("COALESCE(d.status, 'V') != 'R'")
+        if expiring_before is not None:
+            conditions.append("c.not_after < ?")
+            parameters.append(expiring_before)
+        return self._connection.execute(
+            "SELECT c.*, COALESCE(d.status, '?') AS status, d.revoked_at FROM certificates c "
+            "LEFT JOIN ca_database d ON d.serial = c.serial "
+            f"WHERE {' AND '.join(conditions)} ORDER BY c.not_after, c.cn",
+            parameters
+        ).fetchall()
+
+    def expiring(self, days):
+        """
+        Returns the valid client certificates that expire within the given number of days.
+
+        Zwraca ważne certyfikaty klientów, które wygasają w ciągu podanej liczby dni.
+        """
+        limit = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(days=days)
+        return self.certificates(expiring_before=limit.strftime("%Y-%m-%dT%H:%M:%S"))
+
+    def not_registered(self, registered_names):
+        """
+        Returns the valid client certificates whose CN is not among the registered users.
+
+        Zwraca ważne certyfikaty klientów, których CN nie ma wśród zarejestrowanych użytkowników.
+        """
+        registered_names = set(registered_names)
+        return [row for row in self.certificates() if row['cn'] not in registered_names]
+
+    def registered_before(self, registrations, date):
+        """
+        Returns the valid client certificates of the users registered before the given date.
+
+        Zwraca ważne certyfikaty klientów użytkowników zarejestrowanych przed podaną datą.
+        """
+        names = {name for name, registered_at in registrations.items()
+                 if registered_at is not None and registered_at < date}
+        return [row for row in self.certificates() if row['cn'] in names]
+
+
+def registrations(config):
+    """
+    Returns {username: registration datetime or None} from all registration sheets.
+
+    Zwraca {nazwa_użytkownika: data rejestracji lub None} ze wszystkich arkuszy rejestracji.
+    """
+    import pandas as pd
+    from data_source import data_source_for
+
+    users = {}
+    for user_type in ("EN", "PL"):
+        source = data_source_for(config, user_type)
+        if source is None:
+            continue
+        df = source.read_dataframe()
+        name_column = 'Username:' if user_type == "EN" else 'Nazwa Użytkownika:'
+        # The PL sheet writes 'Sygnatura Czasowa:', so the column is found case-insensitively
+        # Arkusz PL zapisuje 'Sygnatura Czasowa:', więc kolumna jest wyszukiwana bez rozróżniania wielkości liter
+        time_columns = [c for c in df.columns if c.lower() in ('timestamp:', 'sygnatura czasowa:')]
+        times = (pd.to_datetime(df[time_columns[0]], errors='coerce') if time_columns
+                 else pd.Series([None] * len(df)))
+        for name, registered_at in zip(df[name_column], times):
+            users[str(name)] = None if pd.isna(registered_at) else registered_at.to_pydatetime().replace(tzinfo=None)
+    return users
+
+
+# =====================================================================================
+# === SCRIPT ENTRY POINT ===
+# === PUNKT WEJŚCIA DO SKRYPTU ===
+# =====================================================================================
+
+if __name__ == "__main__":
+    import argparse
+    import time
+    from config_loader import load_config
+    from remote_session import open_session
+    from tak_certs import tak_certs_dir
+
+    parser = argparse.ArgumentParser(
+        description="Indexes the TAK client certificates and answers questions about them.",
+        epilog="Example: python3 cert_inventory.py expiring 30 / python3 revoke.py $(python3 cert_inventory.py "
+               "unregistered --names)"
+    )
+    parser.add_argument("query", choices=["scan", "list", "expiring", "unregistered", "registered-before"],
+                        help="Query to run. (Zapytanie do wykonania)")
+    parser.add_argument("value", nargs="?", help="Days for 'expiring', YYYY-MM-DD for 'registered-before'. "
+                                                 "(Dni dla 'expiring', RRRR-MM-DD dla 'registered-before')")
+    parser.add_argument("--no-scan", action="store_true", help="Use the index as it is. (Użyj indeksu bez odświeżania)")
+    parser.add_argument("--names", action="store_true", help="Print only the names. (Wypisz tylko nazwy)")
+    parser.add_argument("--all", action="store_true",
+                        help="With 'list': include CA and revoked certificates. "
+                             "(Przy 'list': także certyfikaty CA i odwołane)")
+    args = parser.parse_args()
+
+    config_data = load_config()
+    if not config_data:
+        exit(1)
+    inventory = CertificateInventory((config_data.get('paths') or {}).get('inventory') or DEFAULT_INVENTORY_PATH)
+
+    if not args.no_scan or args.query == "scan":
+        started = time.monotonic()
+        with open_session(config_data) as session:
+            stats = inventory.refresh(session, tak_certs_dir(config_data),
+                                      (config_data.get('security') or {}).get('p12_password') or DEFAULT_P12_PASSWORD)
+        if not args.names:
+            print(f"Index refreshed in {time.monotonic() - started:.1f}s: parsed {stats['parsed']}, "
+                  f"unchanged {stats['unchanged']}, removed {stats['removed']}.")
+            print(f"Indeks odświeżony w {time.monotonic() - started:.1f}s: sparsowane {stats['parsed']}, "
+                  f"bez zmian {stats['unchanged']}, usunięte {stats['removed']}.")
+
+    if args.query in ("expiring", "registered-before") and not args.value:
+        parser.error(f"'{args.query}' needs a value / '{args.query}' wymaga wartości")
+    if args.query == "list":
+        rows = inventory.certificates(include_ca=args.all, include_revoked=args.all)
+    elif args.query == "expiring":
+        rows = inventory.expiring(int(args.value))
+    elif args.query == "unregistered":
+        rows = inventory.not_registered(registrations(config_data))
+    elif args.query == "registered-before":
+        rows = inventory.registered_before(registrations(config_data),
+                                           datetime.datetime.strptime(args.value, "%Y-%m-%d"))
+    else:
+        rows = []
+
+    printed_names = set()
+    for row in rows:
+        if args.names:
+            # A client usually has both a .pem and a .p12 file
+            # Klient ma zwykle zarówno plik .pem, jak i .p12
+            if row['cn'] not in printed_names:
+                printed_names.add(row['cn'])
+                print(row['cn'])
+        else:
+            state = {"V": "valid / ważny", "R": "REVOKED / ODWOŁANY", "E": "expired / wygasły"}.get(row['status'], "?")
+            print(f"{row['cn'] or '-':<32} {row['serial']:>18}  {row['not_after']}  {state:<20} {row['filename']}")
+    inventory.close()
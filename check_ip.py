@@ -6,11 +6,12 @@
 # === SKRYPT DO SPRAWDZANIA I AKTUALIZACJI ZEWNĘTRZNEGO ADRESU IP ===
 # =====================================================================================
 
-import os
-import time
-import requests
 import yaml
-import subprocess
+
+from config_loader import read_config
+from console import clear_screen, pause, progress
+from ip_detect import IpDetector
+from remote_session import open_session
 
 
 # =====================================================================================
@@ -18,104 +19,119 @@ import subprocess
 # === GŁÓWNA LOGIKA SKRYPTU ===
 # =====================================================================================
 
-def check_and_update_ip(config_path: str = "config.yaml"):
+def check_and_update_ip(config_path: str = "config.yaml", config: dict = None, session=None):
     """
     Checks the public IP of the local or remote machine depending on the mode
-    set in the configuration file and updates that file accordingly.
+    set in the configuration (see ip_detect.py) and saves it to the configuration
+    file if it has changed.
 
     Sprawdza publiczny adres IP maszyny lokalnej lub zdalnej w zależności od trybu
-    ustawionego w pliku konfiguracyjnym i aktualizuje ten plik.
+    ustawionego w konfiguracji (zob. ip_detect.py) i zapisuje go w pliku
+    konfiguracyjnym, jeśli się zmienił.
+
+    Args:
+        config_path (str): Configuration file to update.
+                           Plik konfiguracyjny do aktualizacji.
+        config (dict):     Already loaded configuration (updated in place); read from config_path if None.
+                           Wczytana już konfiguracja (aktualizowana w miejscu); odczytywana z config_path, jeśli None.
+        session:           Open RemoteSession/LocalSession to reuse in remote mode; a new one is opened if None.
+                           Otwarta sesja RemoteSession/LocalSession do ponownego użycia w trybie zdalnym;
+                           jeśli None, otwierana jest nowa.
+
+    Returns:
+        str: The external IP address.
+             Zewnętrzny adres IP.
+
+    Raises:
+        KeyError: Missing configuration key. / Brakujący klucz konfiguracji.
+        ValueError: Unknown execution mode or invalid configuration file.
+                    Nieznany tryb pracy lub niepoprawny plik konfiguracyjny.
+        RuntimeError: The address could not be determined. / Nie udało się ustalić adresu.
+        OSError: The configuration file could not be read or written. / Błąd odczytu lub zapisu pliku.
     """
     # --- Step 1: Loading configuration and execution mode ---
     # --- Krok 1: Wczytanie konfiguracji i trybu pracy ---
-    try:
-        with open(config_path, 'r', encoding='utf-8') as file:
-            config_data = yaml.safe_load(file)
-
-        mode = config_data.get('execution', {}).get('mode')
-        if not mode:
-            raise KeyError("Execution mode 'mode' is not defined in the 'execution' section.")
+    if config is None:
+        config = read_config(config_path)
 
-        sudo_pswd = config_data['security']['sudo_pswd']
-        remote_user = config_data['network']['remote_server']['user']
-        remote_host = config_data['network']['remote_server']['host']
-
-    except FileNotFoundError:
-        print(f"ERROR: Configuration file '{config_path}' not found!")
-        print(f"BŁĄD: Plik konfiguracyjny '{config_path}' nie został znaleziony!")
-        return
-    except KeyError as e:
-        print(f"ERROR: Invalid structure in '{config_path}'. Check missing key: {e}")
-        print(f"BŁĄD: Nieprawidłowa struktura pliku '{config_path}'. Sprawdź brakujący klucz: {e}")
-        return
+    mode = (config.get('execution') or {}).get('mode')
+    if not mode:
+        raise KeyError("Execution mode 'mode' is not defined in the 'execution' section.")
+    remote_host = config['network']['remote_server']['host']
 
     # --- Step 2: Fetching the IP address according to the loaded mode ---
     # --- Krok 2: Pobranie adresu IP zgodnie z wczytanym trybem ---
-    ip_address = None
-    ip_service_url = "https://api.ipify.org"
+    detector = IpDetector.from_config(config)
     print("---")
-
     if mode == 'local':
         print("LOCAL mode read. Checking this machine's IP address...")
         print("Odczytano tryb LOKALNY. Sprawdzam adres IP tej maszyny...")
-        try:
-            response = requests.get(ip_service_url, timeout=10)
-            response.raise_for_status()
-            ip_address = response.text.strip()
-        except requests.exceptions.RequestException as e:
-            print(f"\nNETWORK ERROR: Could not get IP from {ip_service_url}. {e}")
-            print(f"BŁĄD SIECIOWY: Nie można pobrać IP z {ip_service_url}. {e}")
-            return
-
+        cache_key = "local"
     elif mode == 'remote':
         print(f"REMOTE mode read. Checking server's IP address: {remote_host}...")
         print(f"Odczytano tryb ZDALNY. Sprawdzam adres IP serwera: {remote_host}...")
-        try:
-            command = f"sshpass -p '{sudo_pswd}' ssh -o StrictHostKeyChecking=no -o ConnectTimeout=10 {remote_user}@{remote_host} 'curl -s {ip_service_url}'"
-            result = subprocess.run(command, shell=True, capture_output=True, text=True, check=True, timeout=15)
-            ip_address = result.stdout.strip()
-            if not ip_address:
-                raise ValueError("Received an empty response from the remote server.")
-        except subprocess.CalledProcessError as e:
-            print("\nSSH ERROR: Problem executing command. Check password or connection.")
-            print(f"BŁĄD SSH: Problem z wykonaniem polecenia. Sprawdź hasło lub połączenie.")
-            print(f"Stderr: {e.stderr}")
-            return
-        except Exception as e:
-            print(f"\nERROR: {e}")
-            print(f"BŁĄD: {e}")
-            return
+        cache_key = f"remote:{remote_host}"
     else:
-        print(f"\nERROR: Unknown mode '{mode}' in the configuration file.")
-        print(f"BŁĄD: Nieznany tryb '{mode}' w pliku konfiguracyjym.")
-        return
+        raise ValueError(f"Unknown mode '{mode}' in the configuration file.")
+
+    # A fresh cached answer needs no provider and, in remote mode, no SSH connection
+    # Świeża zbuforowana odpowiedź nie wymaga dostawcy, a w trybie zdalnym połączenia SSH
+    ip_address, source = detector.cached(cache_key), "cache"
+    if ip_address is None:
+        if mode == 'local':
+            ip_address, source = detector.detect(cache_key=cache_key, use_cache=False)
+        elif session is not None:
+            ip_address, source = detector.detect(session, cache_key, use_cache=False)
+        else:
+            # The shared SSH connection is reused if start.py (or another script) already opened it
+            # Współdzielone połączenie SSH jest używane ponownie, jeśli start.py (lub inny skrypt) już je otworzył
+            with open_session(config) as new_session:
+                ip_address, source = detector.detect(new_session, cache_key, use_cache=False)
 
     # --- Step 3: Displaying and saving the IP address ---
     # --- Krok 3: Wyświetlenie i zapis adresu IP ---
     print("********************************")
     print(f"* EXTERNAL-IP: {ip_address} *")
     print("********************************")
-    time.sleep(3)
-    os.system("clear || cls")
-
-    try:
-        print("---")
-        print(f"Updating '{config_path}' with the new IP address...")
-        print(f"Aktualizuję plik '{config_path}' nowym adresem IP...")
+    print(f"Source: {source}")
+    print(f"Źródło: {source}")
+    changed = config['network'].get('external_ip') != ip_address
+    progress("external_ip", address=ip_address, source=source, changed=changed)
+    pause(3)
+    clear_screen()
 
-        config_data['network']['external_ip'] = ip_address
+    print("---")
+    if not changed:
+        print(f"The IP address has not changed, '{config_path}' is left as it is.")
+        print(f"Adres IP się nie zmienił, plik '{config_path}' pozostaje bez zmian.")
+        print("---\n")
+        return ip_address
 
-        with open(config_path, 'w', encoding='utf-8') as file:
-            yaml.dump(config_data, file, default_flow_style=False, allow_unicode=True, sort_keys=False)
+    print(f"Updating '{config_path}' with the new IP address...")
+    print(f"Aktualizuję plik '{config_path}' nowym adresem IP...")
 
-        print("The configuration file has been successfully updated.")
-        print("Plik konfiguracyjny został pomyślnie zaktualizowany.")
-        print("---\n")
+    config['network']['external_ip'] = ip_address
+    with open(config_path, 'w', encoding='utf-8') as file:
+        yaml.dump(config, file, default_flow_style=False, allow_unicode=True, sort_keys=False)
 
-    except Exception as e:
-        print(f"\nERROR: An unexpected error occurred while writing to the file: {e}")
-        print(f"BŁĄD: Wystąpił nieoczekiwany problem podczas zapisu do pliku: {e}")
+    print("The configuration file has been successfully updated.")
+    print("Plik konfiguracyjny został pomyślnie zaktualizowany.")
+    print("---\n")
+    return ip_address
 
 
 if __name__ == "__main__":
-    check_and_update_ip()
\ No newline at end of file
+    try:
+        check_and_update_ip()
+    except FileNotFoundError:
+        print("ERROR: Configuration file 'config.yaml' not found!")
+        print("BŁĄD: Plik konfiguracyjny 'config.yaml' nie został znaleziony!")
+        exit(1)
+    except KeyError as e:
+        print(f"ERROR: Invalid structure in 'config.yaml'. Check missing key: {e}")
+        print(f"BŁĄD: Nieprawidłowa struktura pliku 'config.yaml'. Sprawdź brakujący klucz: {e}")
+        exit(1)
+    except Exception as e:
+        print(f"\nERROR: {e}")
+        print(f"BŁĄD: {e}")
+        exit(1)
@@ -1,2 +1,6 @@
 #!/bin/bash
-clear
+# Nothing to clear when running unattended (BLOX_HEADLESS=1, see console.py)
+# Nic do czyszczenia przy pracy bezobsługowej (BLOX_HEADLESS=1, zob. console.py)
+if [ "${BLOX_HEADLESS:-0}" != "1" ]; then
+    clear
+fi
@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# =====================================================================================
+# === CONFIGURATION: PARSED AND VALIDATED ONCE, EXPORTED TO THE SHELL STAGES ===
+# === KONFIGURACJA: PARSOWANA I SPRAWDZANA RAZ, EKSPORTOWANA DO ETAPÓW POWŁOKI ===
+# =====================================================================================
+
+import copy
+import os
+import shlex
+import tempfile
+import threading
+
+import yaml
+
+DEFAULT_CONFIG_PATH = "config.yaml"
+DEFAULT_ENV_PATH = os.path.join(".cache", "config.env")
+
+# (key, kind, required) of the configuration; a missing or empty optional key is not checked
+# (klucz, rodzaj, wymagany) konfiguracji; brakujący lub pusty klucz opcjonalny nie jest sprawdzany
+CONFIG_SCHEMA = (
+    ("security", "section", True),
+    ("security.sudo_pswd", "text", True),
+    ("security.api_creds_path", "text", True),
+    ("security.p12_password", "text", False),
+    ("paths", "section", True),
+    ("paths.attachment_output", "text", True),
+    ("paths.preferences_output", "text", True),
+    ("paths.project_root", "text", True),
+    ("paths.tak_certs_dir", "text", False),
+    ("paths.ledger", "text", False),
+    ("paths.inventory", "text", False),
+    ("pki", "section", False),
+    ("pki.engine", ("makecert", "python"), False),
+    ("pki.ca_name", "text", False),
+    ("pki.validity_days", "count", False),
+    ("pki.key_algorithm", ("rsa", "ec"), False),
+    ("pki.key_size", "count", False),
+    ("pki.key_workers", "count", False),
+    ("pki.legacy_p12", "flag", False),
+    ("pki.key_pool", "section", False),
+    ("pki.key_pool.enabled", "flag", False),
+    ("pki.key_pool.path", "text", False),
+    ("pki.key_pool.depth", "count", False),
+    ("user_management", "section", True),
+    ("user_management.data_sources", "section", True),
+    ("user_management.data_sources.en", "text", True),
+    ("user_management.data_sources.pl", "text", True),
+    ("user_management.cache", "section", False),
+    ("user_management.cache.dir", "text", False),
+    ("user_management.cache.ttl_seconds", "number", False),
+    ("user_management.state", "section", True),
+    ("user_management.state.user_type", ("EN", "PL"), False),
+    ("email", "section", True),
+    ("email.sender_email", "text", True),
+    ("email.delivery", "section", False),
+    ("email.delivery.workers", "count", False),
+    ("email.delivery.max_attempts", "count", False),
+    ("email.delivery.base_delay", "number", False),
+    ("email.delivery.max_delay", "number", False),
+    ("email.delivery.timeout", "number", False),
+    ("email.delivery.resumable_threshold", "count", False),
+    ("email.delivery.chunk_size", "count", False),
+    ("email.delivery.api_endpoint", "text", False),
+    ("email.outbox", "section", False),
+    ("email.outbox.path", "text", False),
+    ("email.outbox.max_attempts", "count", False),
+    ("email.outbox.retry_delay", "number", False),
+    ("email.outbox.poll_interval", "number", False),
+    ("network", "section", True),
+    ("network.external_ip", "text", True),
+    ("network.ip_detection", "section", False),
+    ("network.ip_detection.providers", "list", False),
+    ("network.ip_detection.agree", "count", False),
+    ("network.ip_detection.timeout", "number", False),
+    ("network.ip_detection.ttl_seconds", "number", False),
+    ("network.ip_detection.cache_path", "text", False),
+    ("network.ip_watcher", "section", False),
+    ("network.ip_watcher.interval", "number", False),
+    ("network.ip_watcher.debounce_seconds", "number", False),
+    ("network.ip_watcher.workers", "count", False),
+    ("network.ip_watcher.steps", "list", False),
+    ("network.ip_watcher.history", "text", False),
+    ("network.remote_server", "section", True),
+    ("network.remote_server.host", "text", True),
+    ("network.remote_server.user", "text", True),
+    ("network.remote_server.port", "count", False),
+    ("network.wireguard", "section", False),
+    ("network.wireguard.update_mode", ("live", "restart"), False),
+    ("network.wireguard.client_config", "text", False),
+    ("network.wireguard.client_interface", "text", False),
+    ("network.wireguard.android_config", "text", False),
+    ("network.wireguard.server_interface", "text", False),
+    ("network.wireguard.peers", "section", False),
+    ("network.wireguard.peers.enabled", "flag", False),
+    ("network.wireguard.peers.server_config", "text", False),
+    ("network.wireguard.peers.subnet", "text", False),
+    ("network.wireguard.peers.server_address", "text", False),
+    ("network.wireguard.peers.allowed_ips", "text", False),
+    ("network.wireguard.peers.keepalive", "number", False),
+    ("network.wireguard.peers.registry", "text", False),
+    ("execution", "section", True),
+    ("execution.mode", ("local", "remote"), True),
+    ("execution.pipeline", "section", False),
+    ("execution.pipeline.cert_workers", "count", False),
+    ("execution.pipeline.package_workers", "count", False),
+    ("execution.pipeline.email_workers", "count", False),
+    ("execution.pipeline.queue_size", "count", False),
+    ("execution.pipeline.cert_batch_size", "count", False),
+    ("execution.artifact_cache", "section", False),
+    ("execution.artifact_cache.enabled", "flag", False),
+    ("execution.artifact_cache.dir", "text", False),
+    ("execution.artifact_cache.max_mb", "number", False),
+    ("execution.metrics", "section", False),
+    ("execution.metrics.enabled", "flag", False),
+    ("execution.metrics.trace", "text", False),
+    ("execution.metrics.prometheus_textfile", "text", False),
+    ("execution.startup_budget_ms", "section", False),
+)
+
+# Kind: (check, description used in the error messages)
+# Rodzaj: (sprawdzenie, opis używany w komunikatach błędów)
+_KINDS = {
+    "section": (lambda value: isinstance(value, dict), "a section (mapping)"),
+    "list": (lambda value: isinstance(value, list), "a list"),
+    "flag": (lambda value: isinstance(value, bool), "true or false"),
+    "text": (lambda value: isinstance(value, (str, int, float)) and not isinstance(value, bool), "a text value"),
+    "count": (lambda value: isinstance(value, int) and not isinstance(value, bool) and value >= 1,
+              "a whole number of at least 1"),
+    "number": (lambda value: isinstance(value, (int, float)) and not isinstance(value, bool) and value >= 0,
+               "a number of at least 0"),
+}
+
+# Variables of the shell stages: (configuration key, default for a missing or empty value)
+# Zmienne etapów powłoki: (klucz konfiguracji, wartość domyślna dla brakującej lub pustej)
+SHELL_VARIABLES = {
+    'BLOX_SUDO_PSWD': ('security.sudo_pswd', ''),
+    'BLOX_MODE': ('execution.mode', ''),
+    'BLOX_REMOTE_USER': ('network.remote_server.user', ''),
+    'BLOX_REMOTE_HOST': ('network.remote_server.host', ''),
+    'BLOX_REMOTE_PORT': ('network.remote_server.port', '22'),
+    'BLOX_EXTERNAL_IP': ('network.external_ip', ''),
+    'BLOX_PROJECT_ROOT': ('paths.project_root', ''),
+    'BLOX_PREFERENCES_OUTPUT': ('paths.preferences_output', ''),
+    'BLOX_TAK_CERTS_DIR': ('paths.tak_certs_dir', '/home/tak/tak-server/tak/certs'),
+    'BLOX_CLIENT_NAME': ('user_management.state.client_name', ''),
+    'BLOX_WG_UPDATE_MODE': ('network.wireguard.update_mode', 'live'),
+    'BLOX_WG_ANDROID_CONFIG': ('network.wireguard.android_config', '/etc/wireguard/android.conf'),
+}
+
+_MISSING = object()
+
+# Parsed files: absolute path -> ((mtime_ns, size), configuration, problems)
+# Sparsowane pliki: ścieżka bezwzględna -> ((mtime_ns, rozmiar), konfiguracja, problemy)
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+# =====================================================================================
+# === HELPER FUNCTIONS ===
+# === FUNKCJE POMOCNICZE ===
+# =====================================================================================
+
+def _lookup(config, key):
+    value = config
+    for part in key.split('.'):
+        if not isinstance(value, dict) or part not in value:
+            return _MISSING
+        value = value[part]
+    return value
+
+
+def _file_key(path):
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def validate_config(config):
+    """
+    Checks the configuration against CONFIG_SCHEMA and returns the list of problems
+    (empty when the configuration is valid).
+
+    Sprawdza konfigurację względem CONFIG_SCHEMA i zwraca listę problemów
+    (pustą, gdy konfiguracja jest poprawna).
+    """
+    if not isinstance(config, dict):
+        return ["the file does not contain a YAML mapping"]
+    problems = []
+    for key, kind, required in CONFIG_SCHEMA:
+        value = _lookup(config, key)
+        if value is _MISSING or value is None:
+            if required:
+                problems.append(f"'{key}' is missing")
+            continue
+        if isinstance(kind, tuple):
+            if value not in kind:
+                problems.append(f"'{key}' must be one of {', '.join(kind)}, not {value!r}")
+            continue
+        check, description = _KINDS[kind]
+        if not check(value):
+            problems.append(f"'{key}' must be {description}, not {value!r}")
+    return problems
+
+
+def _parse(path):
+    """
+    Returns (configuration, problems) of the file, parsing it again only when its
+    modification time or size changed since the last call.
+
+    Zwraca (konfigurację, problemy) pliku, parsując go ponownie tylko wtedy, gdy jego
+    czas modyfikacji lub rozmiar zmienił się od ostatniego wywołania.
+    """
+    path = os.path.abspath(path)
+    file_key = _file_key(path)
+    with _cache_lock:
+        cached = _cache.get(path)
+    if cached is not None and cached[0] == file_key:
+        return cached[1], cached[2]
+    with open(path, 'r', encoding='utf-8') as f:
+        try:
+            config = yaml.safe_load(f)
+        except yaml.YAMLError as e:
+            raise ValueError(f"Problem parsing the file '{path}': {e}") from e
+    problems = validate_config(config)
+    with _cache_lock:
+        _cache[path] = (file_key, config, problems)
+    return config, problems
+
+
+def read_config(path=DEFAULT_CONFIG_PATH, validate=True):
+    """
+    Returns the configuration from the YAML file. The parsed form is cached per file
+    and reused until the file changes; every caller gets its own copy, so it may be
+    modified freely.
+
+    Zwraca konfigurację z pliku YAML. Sparsowana postać jest buforowana dla pliku
+    i używana ponownie, dopóki plik się nie zmieni; każdy wywołujący dostaje własną
+    kopię, więc może ją dowolnie modyfikować.
+
+    Raises:
+        FileNotFoundError: The file does not exist. / Plik nie istnieje.
+        ValueError: The file is not valid YAML or (with validate) does not match the schema.
+                    Plik nie jest poprawnym YAML lub (z validate) nie pasuje do schematu.
+    """
+    config, problems = _parse(path)
+    if validate and problems:
+        raise ValueError(f"Invalid configuration file '{path}': " + "; ".join(problems))
+    return copy.deepcopy(config)
+
+
+def load_config(path=DEFAULT_CONFIG_PATH):
+    """
+    Loads, validates and returns the configuration; prints the problems and returns
+    None when the file is missing, malformed or invalid, so the caller can stop
+    before any remote work.
+
+    Wczytuje, sprawdza i zwraca konfigurację; wypisuje problemy i zwraca None, gdy
+    plik nie istnieje, jest uszkodzony lub niepoprawny, aby wywołujący mógł
+    zatrzymać się przed jakąkolwiek pracą zdalną.
+    """
+    try:
+        config, problems = _parse(path)
+    except FileNotFoundError:
+        print(f"ERROR: Configuration file '{path}' not found!")
+        print(f"BŁĄD: Plik konfiguracyjny '{path}' nie został znaleziony!")
+        return None
+    except Exception as e:
+        print(f"ERROR: Failed to load config file: {e}")
+        print(f"BŁĄD: Nie udało się wczytać pliku konfiguracyjnego: {e}")
+        return None
+    if problems:
+        print(f"ERROR: The configuration file '{path}' is invalid:")
+        print(f"BŁĄD: Plik konfiguracyjny '{path}' jest niepoprawny:")
+        for problem in problems:
+            print(f"  - {problem}")
+        return None
+    return copy.deepcopy(config)
+
+
+# =====================================================================================
+# === EXPORT TO THE SHELL STAGES ===
+# === EKSPORT DO ETAPÓW POWŁOKI ===
+# =====================================================================================
+
+def shell_environment(config):
+    """
+    Returns the configuration values used by the shell stages as BLOX_* environment
+    variables (see SHELL_VARIABLES), so the scripts do not have to call 'yq' for them.
+
+    Zwraca wartości konfiguracji używane przez etapy powłoki jako zmienne środowiskowe
+    BLOX_* (zob. SHELL_VARIABLES), aby skrypty nie musiały wywoływać dla nich 'yq'.
+    """
+    environment = {}
+    for name, (key, default) in SHELL_VARIABLES.items():
+        value = _lookup(config, key)
+        environment[name] = default if value is _MISSING or value is None or value == '' else str(value)
+    return environment
+
+
+def render_shell_env(config, source=DEFAULT_CONFIG_PATH):
+    """
+    Returns a file for the shell to source: every variable of shell_environment(),
+    safely quoted, set only when the environment does not define it already (values
+    passed by start.py take precedence).
+
+    Zwraca plik do wczytania przez powłokę: każdą zmienną z shell_environment(),
+    bezpiecznie cytowaną, ustawianą tylko wtedy, gdy środowisko jeszcze jej nie
+    definiuje (wartości przekazane przez start.py mają pierwszeństwo).
+    """
+    lines = [f"# Generated by config_loader.py from {source}, do not edit.",
+             f"# Wygenerowany przez config_loader.py z {source}, nie edytuj."]
+    for name, value in shell_environment(config).items():
+        lines.append(f'[ -n "${{{name}:-}}" ] || export {name}={shlex.quote(value)}')
+    return "\n".join(lines) + "\n"
+
+
+def shell_env_file(config_path=DEFAULT_CONFIG_PATH, env_path=DEFAULT_ENV_PATH):
+    """
+    Writes the validated configuration as a sourceable file (render_shell_env) and
+    returns its absolute path. The file is only written again after the configuration
+    changed; it holds the sudo password, so only the owner can read it.
+
+    Zapisuje sprawdzoną konfigurację jako plik do wczytania przez powłokę
+    (render_shell_env) i zwraca jego ścieżkę bezwzględną. Plik jest zapisywany ponownie
+    tylko po zmianie konfiguracji; zawiera hasło sudo, więc może go czytać tylko właściciel.
+
+    Raises:
+        FileNotFoundError, ValueError: As read_config(). / Jak read_config().
+    """
+    env_path = os.path.abspath(env_path)
+    config = read_config(config_path)
+    stamp = "# config: {} {} {}".format(os.path.abspath(config_path), *_file_key(config_path))
+    try:
+        with open(env_path, 'r', encoding='utf-8') as f:
+            if f.readline().rstrip("\n") == stamp:
+                return env_path
+    except FileNotFoundError:
+        pass
+
+    os.makedirs(os.path.dirname(env_path), exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(env_path), prefix=".config.env.")
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(stamp + "\n" + render_shell_env(config, config_path))
+        os.replace(temp_path, env_path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+    return env_path
+
+
+# =====================================================================================
+# === SCRIPT ENTRY POINT ===
+# === PUNKT WEJŚCIA DO SKRYPTU ===
+# =====================================================================================
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(
+        description="Validates config.yaml and exports it to the shell stages.",
+        epilog="Example: . \"$(python3 config_loader.py env-file)\""
+    )
+    parser.add_argument("action", choices=["check", "env", "env-file"],
+                        help="check: validate; env: print the variables to source; env-file: write them to a file "
+                             "and print its path. (check: sprawdź; env: wypisz zmienne; env-file: zapisz je do pliku "
+                             "i wypisz jego ścieżkę)")
+    parser.add_argument("--config", default=DEFAULT_CONFIG_PATH, help="Path to config.yaml. (Ścieżka do config.yaml)")
+    parser.add_argument("--output", default=DEFAULT_ENV_PATH,
+                        help="File written by env-file. (Plik zapisywany przez env-file)")
+    args = parser.parse_args()
+
+    # Messages go to stderr, so that stdout can be used by the shell
+    # Komunikaty trafiają na stderr, aby stdout mogła wykorzystać powłoka
+    sys.stdout, stdout = sys.stderr, sys.stdout
+    config_data = load_config(args.config)
+    if not config_data:
+        exit(1)
+    if args.action == "check":
+        print(f"The configuration file '{args.config}' is valid.")
+        print(f"Plik konfiguracyjny '{args.config}' jest poprawny.")
+    elif args.action == "env":
+        stdout.write(render_shell_env(config_data, args.config))
+    else:
+        stdout.write(shell_env_file(args.config, args.output) + "\n")
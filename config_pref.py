@@ -7,8 +7,9 @@
 # =====================================================================================
 
 import os
-import time
-import yaml
+from artifact_cache import write_if_changed
+from config_loader import load_config
+from console import clear_screen, pause, progress
 
 
 # =====================================================================================
@@ -16,23 +17,25 @@ import yaml
 # === FUNKCJE POMOCNICZE ===
 # =====================================================================================
 
-def load_config(path="config.yaml"):
+def render_pref(external_ip):
     """
-    Loads and returns the configuration from a YAML file.
+    Returns the content of config.pref for the given server address, as bytes.
 
-    Wczytuje i zwraca konfigurację z pliku YAML.
+    Zwraca treść config.pref dla podanego adresu serwera jako bajty.
     """
-    try:
-        with open(path, 'r', encoding='utf-8') as f:
-            return yaml.safe_load(f)
-    except FileNotFoundError:
-        print(f"ERROR: Configuration file '{path}' not found!")
-        print(f"BŁĄD: Plik konfiguracyjny '{path}' nie został znaleziony!")
-        return None
-    except Exception as e:
-        print(f"ERROR: Failed to load config file: {e}")
-        print(f"BŁĄD: Nie udało się wczytać pliku konfiguracyjnego: {e}")
-        return None
+    return f"""<?xml version="1.0" standalone="yes"?>
+<preferences>
+    <preference version="1" name="cot_streams">
+        <entry key="count" class="class java.lang.Integer">1</entry>
+        <entry key="description0" class="class java.lang.String">BLOX-TAK-SERVER</entry>
+        <entry key="enabled0" class="class java.lang.Boolean">true</entry>
+        <entry key="connectString0" class="class java.lang.String">{external_ip}:8089:ssl</entry>
+    </preference>
+    <preference version="1" name="com.atakmap.app_preferences">
+        <entry key="displayServerConnectionWidget" class="class java.lang.Boolean">true</entry>
+    </preference>
+</preferences>
+""".encode('utf-8')
 
 
 # =====================================================================================
@@ -40,73 +43,68 @@ def load_config(path="config.yaml"):
 # === GŁÓWNA LOGIKA SKRYPTU ===
 # =====================================================================================
 
-def generate_pref_file():
+def generate_pref_file(config=None, config_path="config.yaml"):
     """
     The main function that generates the .pref file.
 
     Główna funkcja generująca plik .pref.
+
+    Args:
+        config (dict):     Already loaded configuration; read from config_path if None.
+                           Wczytana już konfiguracja; odczytywana z config_path, jeśli None.
+
+    Returns:
+        str: Path of the written config.pref.
+             Ścieżka zapisanego pliku config.pref.
+
+    Raises:
+        RuntimeError: The configuration could not be loaded. / Nie udało się wczytać konfiguracji.
+        KeyError: Missing configuration key. / Brakujący klucz konfiguracji.
+        OSError: The file could not be written. / Nie udało się zapisać pliku.
     """
     print("*********************************")
     print("* Generating: 'PREF' File       *")
     print("* Generowanie pliku 'PREF'      *")
     print("*********************************")
-    time.sleep(2)
+    pause(2)
 
     # --- Step 1: Load configuration ---
     # --- Krok 1: Wczytanie konfiguracji ---
-    config = load_config()
-    if not config:
-        return
-
-    try:
-        external_ip = config['network']['external_ip']
-        pref_output_path = config['paths']['preferences_output']
-    except KeyError as e:
-        print(f"ERROR: Missing key in config.yaml: {e}")
-        print(f"BŁĄD: Brakujący klucz w config.yaml: {e}")
-        return
+    if config is None:
+        config = load_config(config_path)
+        if not config:
+            raise RuntimeError(f"could not load '{config_path}'")
 
-    # --- Step 2: Define XML content ---
-    # --- Krok 2: Zdefiniowanie treści XML ---
-    config_pref_content = f"""<?xml version="1.0" standalone="yes"?>
-<preferences>
-    <preference version="1" name="cot_streams">
-        <entry key="count" class="class java.lang.Integer">1</entry>
-        <entry key="description0" class="class java.lang.String">BLOX-TAK-SERVER</entry>
-        <entry key="enabled0" class="class java.lang.Boolean">true</entry>
-        <entry key="connectString0" class="class java.lang.String">{external_ip}:8089:ssl</entry>
-    </preference>
-    <preference version="1" name="com.atakmap.app_preferences">
-        <entry key="displayServerConnectionWidget" class="class java.lang.Boolean">true</entry>
-    </preference>
-</preferences>
-"""
+    external_ip = config['network']['external_ip']
+    pref_output_path = config['paths']['preferences_output']
 
-    # --- Step 3: Build the full output path and save the file ---
-    # --- Krok 3: Zbudowanie pełnej ścieżki i zapis pliku ---
+    # --- Step 2: Build the full output path and save the file if its content changed ---
+    # --- Krok 2: Zbudowanie pełnej ścieżki i zapis pliku, jeśli jego treść się zmieniła ---
     output_file_path = os.path.join(pref_output_path, "config.pref")
+    if not write_if_changed(output_file_path, render_pref(external_ip)):
+        print("config.pref is already current, not rewritten.")
+        print("config.pref jest już aktualny, nie został zapisany ponownie.")
 
-    try:
-        # Ensure the output directory exists
-        # Upewnij się, że katalog wyjściowy istnieje
-        os.makedirs(pref_output_path, exist_ok=True)
-
-        with open(output_file_path, "w", encoding='utf-8') as file:
-            file.write(config_pref_content)
-
-        print("*********************************")
-        print("* 'PREF' File Generated         *")
-        print("* Plik 'PREF' wygenerowany      *")
-        print("*********************************")
-        print(f"File saved to: {output_file_path}")
-        print(f"Plik zapisano w: {output_file_path}")
-        time.sleep(3)
-        os.system("clear || cls")
-
-    except Exception as e:
-        print(f"ERROR: Failed to write .pref file: {e}")
-        print(f"BŁĄD: Nie udało się zapisać pliku .pref: {e}")
+    print("*********************************")
+    print("* 'PREF' File Generated         *")
+    print("* Plik 'PREF' wygenerowany      *")
+    print("*********************************")
+    print(f"File saved to: {output_file_path}")
+    print(f"Plik zapisano w: {output_file_path}")
+    progress("pref_file", path=output_file_path)
+    pause(3)
+    clear_screen()
+    return output_file_path
 
 
 if __name__ == "__main__":
-    generate_pref_file()
\ No newline at end of file
+    try:
+        generate_pref_file()
+    except KeyError as e:
+        print(f"ERROR: Missing key in config.yaml: {e}")
+        print(f"BŁĄD: Brakujący klucz w config.yaml: {e}")
+        exit(1)
+    except (RuntimeError, OSError) as e:
+        print(f"ERROR: Failed to write .pref file: {e}")
+        print(f"BŁĄD: Nie udało się zapisać pliku .pref: {e}")
+        exit(1)
\ No newline at end of file
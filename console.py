@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# =====================================================================================
+# === CONSOLE HELPERS FOR INTERACTIVE AND HEADLESS (UNATTENDED) RUNS ===
+# === FUNKCJE KONSOLI DLA PRZEBIEGÓW INTERAKTYWNYCH I BEZOBSŁUGOWYCH ===
+# =====================================================================================
+
+import json
+import os
+import sys
+import threading
+import time
+
+# Set to '1' by '--headless' (or by cron / a service); inherited by every script started
+# from start.py, including the shell stages
+# Ustawiana na '1' przez '--headless' (lub przez cron / usługę); dziedziczona przez każdy
+# skrypt uruchomiony ze start.py, także przez etapy powłoki
+HEADLESS_ENV = "BLOX_HEADLESS"
+
+# Path of a file (or FIFO) receiving the JSON progress events instead of stdout, so that the
+# events and the human-readable output are separate streams; inherited the same way
+# Ścieżka pliku (lub FIFO) otrzymującego zdarzenia postępu JSON zamiast stdout, aby zdarzenia
+# i wyjście dla człowieka były osobnymi strumieniami; dziedziczona w ten sam sposób
+EVENTS_ENV = "BLOX_EVENTS"
+
+# Event file path -> descriptor opened for appending
+# Ścieżka pliku zdarzeń -> deskryptor otwarty do dopisywania
+_event_files = {}
+_event_files_lock = threading.Lock()
+
+
+# =====================================================================================
+# === HELPER FUNCTIONS ===
+# === FUNKCJE POMOCNICZE ===
+# =====================================================================================
+
+def is_headless():
+    """
+    Returns True when the scripts run unattended: no prompts, pauses or screen clears.
+
+    Zwraca True, gdy skrypty działają bez nadzoru: bez pytań, pauz i czyszczenia ekranu.
+    """
+    return os.environ.get(HEADLESS_ENV, "").strip().lower() in ("1", "true", "yes")
+
+
+def set_headless(enabled=True):
+    """
+    Switches headless mode on for this process and the scripts it starts.
+
+    Włącza tryb bezobsługowy dla tego procesu i uruchamianych przez niego skryptów.
+    """
+    if enabled:
+        os.environ[HEADLESS_ENV] = "1"
+    else:
+        os.environ.pop(HEADLESS_ENV, None)
+
+
+def set_events_file(path):
+    """
+    Sends the progress events of this process and the scripts it starts to a file.
+
+    Kieruje zdarzenia postępu tego procesu i uruchamianych przez niego skryptów do pliku.
+    """
+    os.environ[EVENTS_ENV] = os.path.abspath(path)
+
+
+def pause(seconds):
+    """
+    Gives the operator time to read the screen; does nothing in headless mode.
+
+    Daje operatorowi czas na przeczytanie ekranu; w trybie bezobsługowym nic nie robi.
+    """
+    if not is_headless():
+        time.sleep(seconds)
+
+
+def clear_screen():
+    """
+    Clears the terminal with an escape sequence instead of spawning 'clear'. Does
+    nothing in headless mode or when the output is not a terminal (log file, pipe).
+
+    Czyści terminal sekwencją sterującą zamiast uruchamiać 'clear'. Nic nie robi
+    w trybie bezobsługowym ani gdy wyjście nie jest terminalem (plik logu, potok).
+    """
+    if not is_headless() and sys.stdout.isatty():
+        sys.stdout.write("\033[H\033[2J\033[3J")
+        sys.stdout.flush()
+
+
+def _append_event(path, line):
+    with _event_files_lock:
+        descriptor = _event_files.get(path)
+        if descriptor is None:
+            descriptor = _event_files[path] = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+    # A single O_APPEND write: lines of other threads and processes cannot interleave with it
+    # Jeden zapis O_APPEND: linie innych wątków i procesów nie mogą się z nim przeplatać
+    os.write(descriptor, line.encode("utf-8"))
+
+
+def progress(event, **fields):
+    """
+    In headless mode writes one JSON line describing a progress event (e.g.
+    {"event": "stage", "stage": "cert", "user": "...", "status": "done"}) to the
+    file named by BLOX_EVENTS, or to stdout when it is not set.
+
+    W trybie bezobsługowym zapisuje jedną linię JSON opisującą zdarzenie postępu
+    (np. {"event": "stage", "stage": "cert", "user": "...", "status": "done"}) do
+    pliku wskazanego przez BLOX_EVENTS lub na stdout, gdy nie jest ustawiona.
+    """
+    if is_headless():
+        record = {"event": event, "time": round(time.time(), 3)}
+        record.update(fields)
+        line = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+        path = os.environ.get(EVENTS_ENV)
+        if path:
+            _append_event(path, line)
+            return
+        # One write for the whole line, so output of other threads cannot land inside it
+        # Jeden zapis całej linii, aby wyjście innych wątków nie trafiło do jej środka
+        sys.stdout.write(line)
+        sys.stdout.flush()
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# =====================================================================================
+# === CACHED REGISTRATION DATA SOURCES (GOOGLE SHEETS PUBLISHED AS CSV) ===
+# === BUFOROWANE ŹRÓDŁA DANYCH REJESTRACJI (ARKUSZE GOOGLE OPUBLIKOWANE JAKO CSV) ===
+# =====================================================================================
+
+import csv
+import hashlib
+import io
+import json
+import os
+import time
+from collections import Counter
+
+# pandas and requests are imported only when a sheet is actually read or downloaded
+# pandas i requests są importowane dopiero przy faktycznym odczycie lub pobraniu arkusza
+
+DEFAULT_CACHE_DIR = os.path.join(".cache", "data_sources")
+DEFAULT_TTL_SECONDS = 300
+
+
+# =====================================================================================
+# === DATA SOURCE CLASS ===
+# === KLASA ŹRÓDŁA DANYCH ===
+# =====================================================================================
+
+class DataSource:
+    """
+    A registration CSV behind a URL, with an on-disk cache. Within the TTL the cached
+    copy is used without any request; after it the server is asked with
+    If-None-Match / If-Modified-Since and only a changed sheet is downloaded. If the
+    server cannot be reached, the last good snapshot is used. Local file paths are
+    read directly.
+
+    CSV z rejestracjami pod adresem URL, z buforem na dysku. W czasie TTL kopia
+    z bufora jest używana bez żadnego zapytania; po nim serwer jest pytany z
+    If-None-Match / If-Modified-Since i pobierany jest tylko zmieniony arkusz. Jeśli
+    serwer jest nieosiągalny, używana jest ostatnia poprawna kopia. Ścieżki do
+    plików lokalnych są odczytywane bezpośrednio.
+    """
+
+    def __init__(self, url, cache_dir=DEFAULT_CACHE_DIR, ttl_seconds=DEFAULT_TTL_SECONDS, timeout=30):
+        self.url = str(url)
+        self.cache_dir = cache_dir
+        self.ttl_seconds = ttl_seconds
+        self.timeout = timeout
+        self.offline = False
+
+        key = hashlib.sha256(self.url.encode("utf-8")).hexdigest()[:16]
+        self._snapshot_path = os.path.join(cache_dir, f"{key}.csv")
+        self._previous_path = os.path.join(cache_dir, f"{key}.previous.csv")
+        self._meta_path = os.path.join(cache_dir, f"{key}.json")
+
+    @property
+    def is_remote(self):
+        return self.url.startswith(("http://", "https://"))
+
+    # --- Cache files ---
+    # --- Pliki bufora ---
+
+    def _read_meta(self):
+        try:
+            with open(self._meta_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _write_atomic(self, path, data):
+        temp_path = path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8', newline='') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+
+    def _read_snapshot(self, path=None):
+        try:
+            with open(path or self._snapshot_path, 'r', encoding='utf-8', newline='') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def _keep_previous(self, text):
+        """
+        Makes the given sheet the one the next appended_rows() compares against.
+
+        Ustawia podany arkusz jako ten, z którym porówna następne appended_rows().
+        """
+        if self._read_snapshot(self._previous_path) != text:
+            self._write_atomic(self._previous_path, text)
+
+    # --- Fetching ---
+    # --- Pobieranie ---
+
+    def fetch(self):
+        """
+        Returns the CSV text, using the cache and conditional requests as described above.
+
+        Zwraca treść CSV, korzystając z bufora i zapytań warunkowych opisanych powyżej.
+        """
+        if not self.is_remote:
+            with open(self.url, 'r', encoding='utf-8', newline='') as f:
+                return f.read()
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        meta = self._read_meta()
+        cached = self._read_snapshot()
+
+        if cached is not None and time.time() - meta.get("fetched_at", 0) < self.ttl_seconds:
+            self._keep_previous(cached)
+            return cached
+
+        headers = {}
+        if cached is not None:
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+
+        import requests
+
+        try:
+            response = requests.get(self.url, headers=headers, timeout=self.timeout)
+            if response.status_code != 304:
+                response.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            if cached is None:
+                raise
+            print(f"WARNING: Could not fetch {self.url} ({e}). Using the last saved copy.")
+            print(f"OSTRZEŻENIE: Nie można pobrać {self.url} ({e}). Używam ostatniej zapisanej kopii.")
+            self.offline = True
+            self._keep_previous(cached)
+            return cached
+
+        if response.status_code == 304:
+            meta["fetched_at"] = time.time()
+            self._write_atomic(self._meta_path, json.dumps(meta))
+            self._keep_previous(cached)
+            return cached
+
+        text = response.content.decode("utf-8")
+        # Keep the replaced snapshot to be able to tell which rows were appended
+        # Zachowaj zastąpioną kopię, aby móc określić, które wiersze zostały dopisane
+        if cached is not None:
+            os.replace(self._snapshot_path, self._previous_path)
+        elif os.path.exists(self._previous_path):
+            os.remove(self._previous_path)
+        self._write_atomic(self._snapshot_path, text)
+        self._write_atomic(self._meta_path, json.dumps({
+            "url": self.url,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "fetched_at": time.time(),
+        }))
+        return text
+
+    def read_dataframe(self):
+        """
+        Returns the registrations as a pandas DataFrame.
+
+        Zwraca rejestracje jako DataFrame biblioteki pandas.
+        """
+        import pandas as pd
+
+        return pd.read_csv(io.StringIO(self.fetch()))
+
+    def appended_rows(self):
+        """
+        Returns a DataFrame with the rows that appeared in the sheet since the previous
+        fetch, also one answered from the cache or with 304 (so a rerun without a change
+        returns no rows). Without an earlier snapshot all rows are new.
+
+        Zwraca DataFrame z wierszami, które pojawiły się w arkuszu od poprzedniego
+        pobrania, także takiego obsłużonego z bufora lub odpowiedzią 304 (więc ponowne
+        uruchomienie bez zmiany nie zwraca wierszy). Bez wcześniejszej kopii wszystkie
+        wiersze są nowe.
+        """
+        import pandas as pd
+
+        current = list(csv.reader(io.StringIO(self.fetch())))
+        if not current:
+            return pd.DataFrame()
+        header, rows = current[0], current[1:]
+
+        previous_text = self._read_snapshot(self._previous_path) if self.is_remote else None
+        previous = Counter(tuple(row) for row in csv.reader(io.StringIO(previous_text or "")))
+
+        appended = []
+        for row in rows:
+            if previous[tuple(row)]:
+                previous[tuple(row)] -= 1
+            else:
+                appended.append(row)
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(header)
+        writer.writerows(appended)
+        return pd.read_csv(io.StringIO(buffer.getvalue()))
+
+
+# =====================================================================================
+# === HELPER FUNCTIONS ===
+# === FUNKCJE POMOCNICZE ===
+# =====================================================================================
+
+def data_source_for(config, user_type, url=None):
+    """
+    Returns the DataSource for the given user type ('EN'/'PL') configured in
+    'user_management', or None if there is none. A given url replaces the configured one.
+
+    Zwraca DataSource dla danego typu użytkownika ('EN'/'PL') skonfigurowany
+    w 'user_management' lub None, jeśli go brak. Podany url zastępuje skonfigurowany.
+    """
+    user_management = config['user_management']
+    url = url or (user_management.get('data_sources') or {}).get(user_type.lower())
+    if not url:
+        return None
+    cache = user_management.get('cache') or {}
+    return DataSource(url, cache.get('dir', DEFAULT_CACHE_DIR), cache.get('ttl_seconds', DEFAULT_TTL_SECONDS))
+
+
+# =====================================================================================
+# === SCRIPT ENTRY POINT ===
+# === PUNKT WEJŚCIA DO SKRYPTU ===
+# =====================================================================================
+
+if __name__ == "__main__":
+    import argparse
+    from config_loader import load_config
+
+    parser = argparse.ArgumentParser(
+        description="Fetches a registration sheet through the cache and prints it.",
+        epilog="Example: python3 data_source.py en --new"
+    )
+    parser.add_argument("language", choices=["en", "pl"], help="Data source. (Źródło danych)")
+    parser.add_argument("--new", action="store_true",
+                        help="Only rows appended since the previous fetch. (Tylko wiersze dopisane od poprzedniego pobrania)")
+    args = parser.parse_args()
+
+    config_data = load_config()
+    if not config_data:
+        exit(1)
+
+    source = data_source_for(config_data, args.language)
+    if source is None:
+        print(f"ERROR: No data source for language '{args.language}'.")
+        print(f"BŁĄD: Brak źródła danych dla języka '{args.language}'.")
+        exit(1)
+
+    df = source.appended_rows() if args.new else source.read_dataframe()
+    print(df.to_string(index=False))
+    print(f"\nRows: {len(df)}")
+    print(f"Wiersze: {len(df)}")
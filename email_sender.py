@@ -7,21 +7,25 @@
 # =====================================================================================
 
 import os
+import argparse
 import mimetypes
 import base64
-import yaml
+import json
+import random
+import tempfile
+import threading
+import time
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.base import MIMEBase
-from email import encoders
 
-# --- Google Libraries ---
-# --- Biblioteki Google ---
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
+# The Google libraries are imported inside the functions that use them, because
+# importing them costs more than the rest of the script's startup.
+# Biblioteki Google są importowane w funkcjach, które z nich korzystają, ponieważ
+# ich import kosztuje więcej niż cała reszta uruchomienia skryptu.
+
+from config_loader import load_config
+from user_job import UserJob
 
 
 # =====================================================================================
@@ -29,31 +33,16 @@ from googleapiclient.errors import HttpError
 # === FUNKCJE POMOCNICZE ===
 # =====================================================================================
 
-def load_config(path="config.yaml"):
-    """
-    Loads and returns the configuration from a YAML file.
-
-    Wczytuje i zwraca konfigurację z pliku YAML.
-    """
-    try:
-        with open(path, 'r', encoding='utf-8') as f:
-            return yaml.safe_load(f)
-    except FileNotFoundError:
-        print(f"ERROR: Configuration file '{path}' not found!")
-        print(f"BŁĄD: Plik konfiguracyjny '{path}' nie został znaleziony!")
-        return None
-    except Exception as e:
-        print(f"ERROR: Failed to load config file: {e}")
-        print(f"BŁĄD: Nie udało się wczytać pliku konfiguracyjnego: {e}")
-        return None
-
-
 def google_api_authenticate(credentials_file, scopes):
     """
     Performs the Google API authentication process and returns credentials.
 
     Przeprowadza proces autentykacji Google API i zwraca dane uwierzytelniające.
     """
+    from google.auth.transport.requests import Request
+    from google.oauth2.credentials import Credentials
+    from google_auth_oauthlib.flow import InstalledAppFlow
+
     creds = None
     token_file = "token.json"
 
@@ -79,11 +68,21 @@ def google_api_authenticate(credentials_file, scopes):
     return creds
 
 
-def create_message_with_attachment(sender, to, subject, message_text, file_path):
+def write_message_with_attachment(fileobj, sender, to, subject, message_text, file_path):
     """
-    Creates an email message object with an attachment.
-
-    Tworzy obiekt wiadomości e-mail z załącznikiem.
+    Writes a complete e-mail (RFC 822) with an attachment to a binary file object.
+    The attachment is read and base64-encoded in chunks, so memory use does not
+    depend on its size, and the message is encoded only once: it is uploaded as is,
+    not wrapped in another base64 layer.
+
+    Zapisuje kompletną wiadomość e-mail (RFC 822) z załącznikiem do binarnego obiektu
+    pliku. Załącznik jest odczytywany i kodowany base64 porcjami, więc zużycie pamięci
+    nie zależy od jego rozmiaru, a wiadomość jest kodowana tylko raz: jest przesyłana
+    bez zmian, bez dodatkowej warstwy base64.
+
+    Returns:
+        bool: True if the message was written, False if the attachment is missing or unreadable.
+              True, jeśli wiadomość została zapisana, False, gdy brak załącznika lub nie można go odczytać.
     """
     message = MIMEMultipart()
     message['to'] = to
@@ -91,82 +90,53 @@ def create_message_with_attachment(sender, to, subject, message_text, file_path)
     message['subject'] = subject
     message.attach(MIMEText(message_text))
 
-    try:
-        content_type, _ = mimetypes.guess_type(file_path)
-        if content_type is None:
-            content_type = 'application/octet-stream'
-        main_type, sub_type = content_type.split('/', 1)
+    content_type, _ = mimetypes.guess_type(file_path)
+    if content_type is None:
+        content_type = 'application/octet-stream'
+    main_type, sub_type = content_type.split('/', 1)
+
+    # The attachment part gets a placeholder, replaced with the encoded file while writing
+    # Część z załącznikiem otrzymuje znacznik, zastępowany zakodowanym plikiem podczas zapisu
+    placeholder = f"@@ATTACHMENT-{os.getpid()}-{id(message)}@@"
+    attachment = MIMEBase(main_type, sub_type)
+    attachment.set_payload(placeholder)
+    attachment['Content-Transfer-Encoding'] = 'base64'
+    attachment.add_header('Content-Disposition', 'attachment', filename=os.path.basename(file_path))
+    message.attach(attachment)
+    head, tail = message.as_bytes().split(placeholder.encode("ascii"), 1)
 
+    try:
         with open(file_path, 'rb') as fp:
-            attachment = MIMEBase(main_type, sub_type)
-            attachment.set_payload(fp.read())
-
-        encoders.encode_base64(attachment)
-        filename = os.path.basename(file_path)
-        attachment.add_header('Content-Disposition', 'attachment', filename=filename)
-        message.attach(attachment)
-
-        # Return the message formatted for the Gmail API
-        # Zwróć wiadomość sformatowaną dla Gmail API
-        return {'raw': base64.urlsafe_b64encode(message.as_bytes()).decode()}
+            fileobj.write(head)
+            # 57 input bytes are one 76-character base64 line
+            # 57 bajtów wejściowych to jedna linia base64 o długości 76 znaków
+            for chunk in iter(lambda: fp.read(57 * 1024), b""):
+                fileobj.write(base64.encodebytes(chunk))
+            fileobj.write(tail)
+        return True
 
     except FileNotFoundError:
         print(f"ERROR: Attachment file not found: {file_path}")
         print(f"BŁĄD: Plik załącznika nie został znaleziony: {file_path}")
-        return None
-    except Exception as e:
+        return False
+    except OSError as e:
         print(f"ERROR: Failed to create attachment: {e}")
         print(f"BŁĄD: Nie udało się utworzyć załącznika: {e}")
-        return None
+        return False
 
 
-# =====================================================================================
-# === MAIN SCRIPT LOGIC ===
-# === GŁÓWNA LOGIKA SKRYPTU ===
-# =====================================================================================
-
-def main():
+def get_message_content(job):
     """
-    The main orchestrating function for sending emails.
-    Główna funkcja orkiestrująca wysyłanie e-maili.
-    """
-    print("---")
-    print("Starting e-mail sender script...")
-    print("Uruchamiam skrypt wysyłania e-mail...")
-
-    # --- Step 1: Load configuration ---
-    # --- Krok 1: Wczytanie konfiguracji ---
-    config = load_config()
-    if not config:
-        return
+    Returns the subject and the text of the e-mail for the given user job,
+    or None if the user type is unknown.
 
-    try:
-        user_state = config['user_management']['state']
-        client_name = user_state['client_name']
-        email_address = user_state['email_address']
-        registration_date = user_state['registration_date']
-        user_type = user_state['user_type']
-
-        attachment_output_path = config['paths']['attachment_output']
-        api_creds_path = config['security']['api_creds_path']
-        sender_email = config['email']['sender_email']
-    except KeyError as e:
-        print(f"ERROR: Missing key in config.yaml: {e}")
-        print(f"BŁĄD: Brakujący klucz w config.yaml: {e}")
-        return
-
-    # --- Step 2: Authenticate with Google API ---
-    # --- Krok 2: Autoryzacja w Google API ---
-    scopes = ["https://www.googleapis.com/auth/gmail.send"]
-    creds = google_api_authenticate(api_creds_path, scopes)
-    if not creds:
-        print("ERROR: Failed to obtain credentials.")
-        print("BŁĄD: Nie udało się uzyskać danych uwierzytelniających.")
-        return
+    Zwraca temat i treść wiadomości e-mail dla danego zadania użytkownika
+    lub None, jeśli typ użytkownika jest nieznany.
+    """
+    client_name = job.client_name
+    registration_date = job.registration_date
 
-    # --- Step 3: Define email content based on user type ---
-    # --- Krok 3: Zdefiniowanie treści maila na podstawie typu użytkownika ---
-    if user_type == "EN":
+    if job.user_type == "EN":
         subject = "BLOX-TAK-SERVER-IUCP"
         message_text = f"""Hello, {client_name}!
 
@@ -182,7 +152,7 @@ https://www.linkedin.com/in/lukebluelox/details/featured
 Best wishes from the "Giant Mountains" in Poland (in Polish: "Karkonosze"),
 Łukasz "LukeBlueLOx" Andruszkiewicz
 """
-    elif user_type == "PL":
+    elif job.user_type == "PL":
         subject = "BLOX-TAK-SERVER-IPPU"
         message_text = f"""Witaj, {client_name}!
 
@@ -199,40 +169,361 @@ Pozdrowienia z Karkonoszy,
 Łukasz "LukeBlueLOx" Andruszkiewicz
 """
     else:
-        print(f"ERROR: Unknown user type: '{user_type}'")
-        print(f"BŁĄD: Nieznany typ użytkownika: '{user_type}'")
-        return
+        print(f"ERROR: Unknown user type: '{job.user_type}'")
+        print(f"BŁĄD: Nieznany typ użytkownika: '{job.user_type}'")
+        return None
 
-    # --- Step 4: Create and send the message ---
-    # --- Krok 4: Utworzenie i wysłanie wiadomości ---
-    try:
-        service = build("gmail", "v1", credentials=creds)
+    return subject, message_text
+
+
+def authenticate(config):
+    """
+    Authenticates with the Google API using the credentials path from the configuration.
+
+    Przeprowadza autoryzację w Google API przy użyciu ścieżki poświadczeń z konfiguracji.
+    """
+    scopes = ["https://www.googleapis.com/auth/gmail.send"]
+    creds = google_api_authenticate(config['security']['api_creds_path'], scopes)
+    if not creds:
+        print("ERROR: Failed to obtain credentials.")
+        print("BŁĄD: Nie udało się uzyskać danych uwierzytelniających.")
+    return creds
+
+
+# =====================================================================================
+# === GMAIL DELIVERY ===
+# === DOSTARCZANIE PRZEZ GMAIL ===
+# =====================================================================================
+
+# HTTP statuses after which sending is retried (rate limit and server errors)
+# Statusy HTTP, po których wysyłka jest ponawiana (limit zapytań i błędy serwera)
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class DeliveryResult:
+    """
+    Outcome of sending one message: the Gmail message ID or the error, and the number of attempts.
+
+    Wynik wysłania jednej wiadomości: ID wiadomości Gmail lub błąd oraz liczba prób.
+    """
+
+    def __init__(self, job, message_id=None, error=None, attempts=0):
+        self.job = job
+        self.message_id = message_id
+        self.error = error
+        self.attempts = attempts
 
-        attachment_filename = f"IUCP-IPPU_PACKAGE_{client_name}.zip"
-        attachment_path = os.path.join(attachment_output_path, attachment_filename)
+    @property
+    def ok(self):
+        return self.message_id is not None
 
-        print(f"Creating message for: {email_address}")
-        print(f"Tworzę wiadomość dla: {email_address}")
-        message_body = create_message_with_attachment(sender_email, email_address, subject, message_text,
-                                                      attachment_path)
+    def __repr__(self):
+        return f"DeliveryResult({self.job!r}, message_id={self.message_id!r}, error={self.error!r})"
+
+
+class GmailDelivery:
+    """
+    Sends the packages of many users with one Google API authentication. Every
+    thread gets its own Gmail service object with its own HTTP connection (httplib2
+    is not thread-safe), built once and reused for all its messages. Rate limit and
+    server errors (429/5xx) and connection errors are retried with exponential
+    backoff and random jitter.
+
+    Wysyła paczki wielu użytkowników z jedną autoryzacją Google API. Każdy wątek
+    otrzymuje własny obiekt usługi Gmail z własnym połączeniem HTTP (httplib2 nie jest
+    bezpieczny wątkowo), tworzony raz i używany dla wszystkich jego wiadomości. Błędy
+    limitu zapytań i serwera (429/5xx) oraz błędy połączenia są ponawiane z wykładniczym
+    opóźnieniem i losowym rozrzutem.
+
+    Messages are written to a temporary file and uploaded as media (message/rfc822);
+    above resumable_threshold bytes the upload is resumable, in chunks of chunk_size,
+    so the memory used per message is bounded whatever the package size.
+    Wiadomości są zapisywane do pliku tymczasowego i przesyłane jako media
+    (message/rfc822); powyżej resumable_threshold bajtów przesyłanie jest wznawialne,
+    w porcjach po chunk_size, więc pamięć zużywana na wiadomość jest ograniczona
+    niezależnie od rozmiaru paczki.
+
+    Settings are read from the optional 'email.delivery' section of the configuration:
+    workers, max_attempts, base_delay, max_delay, timeout, resumable_threshold,
+    chunk_size and api_endpoint (e.g. a local fake Gmail server for tests).
+    Ustawienia są odczytywane z opcjonalnej sekcji 'email.delivery' konfiguracji:
+    workers, max_attempts, base_delay, max_delay, timeout, resumable_threshold,
+    chunk_size i api_endpoint (np. lokalny udawany serwer Gmail do testów).
+    """
+
+    def __init__(self, config, creds=None):
+        self.config = config
+        settings = (config.get('email') or {}).get('delivery') or {}
+        self.workers = max(1, int(settings.get('workers', 4)))
+        self.max_attempts = max(1, int(settings.get('max_attempts', 5)))
+        self.base_delay = float(settings.get('base_delay', 1.0))
+        self.max_delay = float(settings.get('max_delay', 32.0))
+        self.timeout = settings.get('timeout', 60)
+        self.api_endpoint = settings.get('api_endpoint')
+        self.resumable_threshold = int(settings.get('resumable_threshold', 5 * 1024 * 1024))
+        self.chunk_size = int(settings.get('chunk_size', 4 * 1024 * 1024))
+        self.creds = creds
+        self._creds_lock = threading.Lock()
+        self._local = threading.local()
+
+    def _credentials(self):
+        with self._creds_lock:
+            if self.creds is None:
+                self.creds = authenticate(self.config)
+                if not self.creds:
+                    self.creds = False
+            return self.creds
+
+    def _service(self):
+        """
+        Returns the Gmail service object of the current thread, building it on first use.
+
+        Zwraca obiekt usługi Gmail bieżącego wątku, tworząc go przy pierwszym użyciu.
+        """
+        service = getattr(self._local, 'service', None)
+        if service is None:
+            from google_auth_httplib2 import AuthorizedHttp
+            from googleapiclient.discovery import build
+            from googleapiclient.http import build_http
+
+            creds = self._credentials()
+            if not creds:
+                raise RuntimeError("Google API authentication failed")
+            # build_http() keeps HTTP 308 away from the redirect handling, as resumable uploads need
+            # build_http() wyłącza obsługę HTTP 308 jako przekierowania, czego wymaga przesyłanie wznawialne
+            raw_http = build_http()
+            raw_http.timeout = self.timeout
+            http = AuthorizedHttp(creds, http=raw_http)
+            if self.api_endpoint:
+                # The 'api_endpoint' client option does not apply to media uploads, so the
+                # root URL of the bundled discovery document is replaced instead
+                # Opcja 'api_endpoint' nie dotyczy przesyłania mediów, więc zamiast niej
+                # podmieniany jest główny adres dołączonego dokumentu discovery
+                from googleapiclient.discovery import build_from_document
+                from googleapiclient.discovery_cache import get_static_doc
+
+                document = json.loads(get_static_doc("gmail", "v1"))
+                document["rootUrl"] = self.api_endpoint.rstrip("/") + "/"
+                service = build_from_document(document, http=http)
+            else:
+                service = build("gmail", "v1", http=http, cache_discovery=False, static_discovery=True)
+            self._local.service = service
+        return service
+
+    def _backoff(self, attempt):
+        """
+        Returns the delay before the next attempt: 'full jitter' exponential backoff.
+
+        Zwraca opóźnienie przed kolejną próbą: wykładnicze opóźnienie z pełnym rozrzutem.
+        """
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def _upload(self, message_path):
+        """
+        Returns the media of the message file: a simple upload for small messages,
+        a resumable upload sent in chunks of chunk_size bytes for larger ones.
+
+        Zwraca media pliku wiadomości: zwykłe przesłanie dla małych wiadomości,
+        przesłanie wznawialne w porcjach po chunk_size bajtów dla większych.
+        """
+        from googleapiclient.http import MediaFileUpload
+
+        resumable = os.path.getsize(message_path) > self.resumable_threshold
+        return MediaFileUpload(message_path, mimetype='message/rfc822', chunksize=self.chunk_size,
+                               resumable=resumable)
+
+    def _execute(self, message_path, result):
+        import httplib2
+        from googleapiclient.errors import HttpError
+
+        request = None
+        while True:
+            result.attempts += 1
+            try:
+                if request is None:
+                    media = self._upload(message_path)
+                    request = self._service().users().messages().send(userId='me', media_body=media)
+                if not media.resumable():
+                    return request.execute()
+                # A resumable upload continues from the last chunk the server confirmed
+                # Przesyłanie wznawialne kontynuuje od ostatniej porcji potwierdzonej przez serwer
+                response = None
+                while response is None:
+                    _, response = request.next_chunk()
+                return response
+            except HttpError as error:
+                if error.resp.status not in RETRY_STATUSES or result.attempts >= self.max_attempts:
+                    raise
+                reason = f"HTTP {error.resp.status}"
+            except (OSError, httplib2.HttpLib2Error) as error:
+                if result.attempts >= self.max_attempts:
+                    raise
+                # The connection of this thread may be broken, so a new one is built
+                # Połączenie tego wątku może być zepsute, więc tworzone jest nowe
+                self._local.service = None
+                request = None
+                reason = str(error) or type(error).__name__
+            delay = self._backoff(result.attempts - 1)
+            print(f"Retrying {result.job.email_address} in {delay:.1f}s ({reason})...")
+            print(f"Ponawiam {result.job.email_address} za {delay:.1f}s ({reason})...")
+            time.sleep(delay)
+
+    def send(self, job, attachment_path=None):
+        """
+        Builds and sends the message with the package of one job.
+
+        Buduje i wysyła wiadomość z paczką jednego zadania.
+
+        Returns:
+            DeliveryResult: The message ID or the error.
+                            ID wiadomości lub błąd.
+        """
+        result = DeliveryResult(job)
+        try:
+            sender_email = self.config['email']['sender_email']
+            if attachment_path is None:
+                attachment_path = os.path.join(self.config['paths']['attachment_output'],
+                                               f"IUCP-IPPU_PACKAGE_{job.client_name}.zip")
+        except KeyError as e:
+            print(f"ERROR: Missing key in config.yaml: {e}")
+            print(f"BŁĄD: Brakujący klucz w config.yaml: {e}")
+            result.error = f"missing key in config.yaml: {e}"
+            return result
+
+        content = get_message_content(job)
+        if not content:
+            result.error = f"unknown user type '{job.user_type}'"
+            return result
+        subject, message_text = content
+
+        print(f"Creating message for: {job.email_address}")
+        print(f"Tworzę wiadomość dla: {job.email_address}")
+        message_file = tempfile.NamedTemporaryFile(prefix="blox-mail-", suffix=".eml", delete=False)
+        try:
+            with message_file:
+                written = write_message_with_attachment(message_file, sender_email, job.email_address, subject,
+                                                        message_text, attachment_path)
+            if not written:
+                result.error = "the message could not be created"
+                return result
+            message = self._execute(message_file.name, result)
+        except Exception as e:
+            result.error = str(e)
+            print(f"ERROR: Sending to {job.email_address} failed: {e}")
+            print(f"BŁĄD: Wysyłka do {job.email_address} nie powiodła się: {e}")
+            return result
+        finally:
+            os.remove(message_file.name)
+
+        result.message_id = message['id']
+        print(f"Message sent successfully, ID: {message['id']}")
+        print(f"Wiadomość pomyślnie wysłana, ID: {message['id']}")
+        return result
+
+    def send_all(self, jobs):
+        """
+        Sends the packages of all jobs using a pool of 'workers' threads.
+
+        Wysyła paczki wszystkich zadań przy użyciu puli 'workers' wątków.
+
+        Returns:
+            list: DeliveryResult of every job, in the order of the jobs.
+                  DeliveryResult każdego zadania, w kolejności zadań.
+        """
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="gmail") as pool:
+            return list(pool.map(self.send, jobs))
+
+
+# =====================================================================================
+# === MAIN SCRIPT LOGIC ===
+# === GŁÓWNA LOGIKA SKRYPTU ===
+# =====================================================================================
+
+def send_package(job, config, creds=None):
+    """
+    Sends the IUCP-IPPU package to the user described by the job. Already obtained
+    credentials can be passed in to skip the authentication step.
+    Returns the ID of the sent message, or None on failure.
 
-        if message_body:
-            print("Sending message...")
-            print("Wysyłam wiadomość...")
-            message = service.users().messages().send(userId='me', body=message_body).execute()
-            print(f"Message sent successfully, ID: {message['id']}")
-            print(f"Wiadomość pomyślnie wysłana, ID: {message['id']}")
+    Wysyła paczkę IUCP-IPPU do użytkownika opisanego przez zadanie. Można przekazać
+    uzyskane wcześniej dane uwierzytelniające, aby pominąć krok autoryzacji.
+    Zwraca ID wysłanej wiadomości lub None w przypadku błędu.
+    """
+    return GmailDelivery(config, creds).send(job).message_id
+
+
+def send(job, config, delivery=None, attachment_path=None):
+    """
+    Library form of send_package: sends the package of the job through the given
+    GmailDelivery (sharing its authenticated clients) or a new one.
+
+    Biblioteczna wersja send_package: wysyła paczkę zadania przez podany obiekt
+    GmailDelivery (współdzieląc jego uwierzytelnionych klientów) lub przez nowy.
+
+    Returns:
+        str: ID of the sent message.
+             ID wysłanej wiadomości.
+
+    Raises:
+        RuntimeError: The message could not be sent. / Nie udało się wysłać wiadomości.
+    """
+    result = (delivery or GmailDelivery(config)).send(job, attachment_path)
+    if result.error:
+        raise RuntimeError(f"sending to {job.email_address} failed: {result.error}")
+    return result.message_id
+
+
+def main(client_name=None, email_address=None, registration_date=None):
+    """
+    Sends the package as a standalone script. The recipient data can be passed
+    directly; otherwise it is read from the 'state' section of config.yaml.
+    Returns True when the message has been sent.
+
+    Wysyła paczkę jako samodzielny skrypt. Dane odbiorcy można przekazać
+    bezpośrednio; w przeciwnym razie są odczytywane z sekcji 'state' pliku config.yaml.
+    Zwraca True, gdy wiadomość została wysłana.
+    """
+    print("---")
+    print("Starting e-mail sender script...")
+    print("Uruchamiam skrypt wysyłania e-mail...")
+
+    config = load_config()
+    if not config:
+        return False
+
+    try:
+        user_state = config['user_management']['state']
+        job = UserJob(
+            number=1,
+            client_name=client_name or user_state['client_name'],
+            email_address=email_address or user_state['email_address'],
+            registration_date=registration_date or user_state['registration_date'],
+            user_type=user_state['user_type'],
+        )
+    except KeyError as e:
+        print(f"ERROR: Missing key in config.yaml: {e}")
+        print(f"BŁĄD: Brakujący klucz w config.yaml: {e}")
+        return False
 
-    except HttpError as error:
-        print(f"ERROR: An API error occurred: {error}")
-        print(f"BŁĄD: Wystąpił błąd API: {error}")
-    except Exception as e:
-        print(f"ERROR: An unexpected error occurred: {e}")
-        print(f"BŁĄD: Wystąpił nieoczekiwany błąd: {e}")
+    return send_package(job, config) is not None
 
 
 if __name__ == "__main__":
-    main()
+    # --- Argument Parser Setup ---
+    # --- Konfiguracja parsera argumentów ---
+    parser = argparse.ArgumentParser(
+        description="Sends the IUCP-IPPU package to a user. Missing values are read from config.yaml."
+    )
+    parser.add_argument("--client-name", help="User name. (Nazwa użytkownika)")
+    parser.add_argument("--email-address", help="Recipient address. (Adres odbiorcy)")
+    parser.add_argument("--registration-date", help="Registration timestamp. (Data rejestracji)")
+    args = parser.parse_args()
+
+    sent = main(args.client_name, args.email_address, args.registration_date)
     print("---")
     print("E-mail sender script finished.")
-    print("Skrypt wysyłania e-mail zakończył działanie.")
\ No newline at end of file
+    print("Skrypt wysyłania e-mail zakończył działanie.")
+    if not sent:
+        exit(1)
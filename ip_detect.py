@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# =====================================================================================
+# === EXTERNAL IP DETECTION: SEVERAL PROVIDERS RACED, RESULT CACHED ===
+# === WYKRYWANIE ZEWNĘTRZNEGO IP: WYŚCIG KILKU DOSTAWCÓW, WYNIK BUFOROWANY ===
+# =====================================================================================
+
+import ipaddress
+import json
+import os
+import shlex
+import socket
+import threading
+import time
+from collections import Counter
+
+DEFAULT_PROVIDERS = [
+    "https://api.ipify.org",
+    "https://checkip.amazonaws.com",
+    "https://icanhazip.com",
+    "https://ifconfig.me/ip",
+]
+# Special provider name: the address of the interface used for outgoing traffic
+# (for hosts with a public address directly on an interface, no HTTP request)
+# Specjalna nazwa dostawcy: adres interfejsu używanego dla ruchu wychodzącego
+# (dla hostów z publicznym adresem bezpośrednio na interfejsie, bez zapytania HTTP)
+INTERFACE_PROVIDER = "interface"
+DEFAULT_AGREE = 2
+DEFAULT_TIMEOUT = 3
+DEFAULT_TTL_SECONDS = 300
+DEFAULT_CACHE_PATH = os.path.join(".cache", "external_ip.json")
+
+
+# =====================================================================================
+# === HELPER FUNCTIONS ===
+# === FUNKCJE POMOCNICZE ===
+# =====================================================================================
+
+def parse_address(text):
+    """
+    Returns the IP address in a provider answer in canonical form, or None.
+
+    Zwraca adres IP z odpowiedzi dostawcy w postaci kanonicznej lub None.
+    """
+    try:
+        return str(ipaddress.ip_address((text or "").strip()))
+    except ValueError:
+        return None
+
+
+def _interface_address():
+    # connect() on a UDP socket only selects the route, no packet is sent
+    # connect() na gnieździe UDP tylko wybiera trasę, żaden pakiet nie jest wysyłany
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as probe:
+        probe.connect(("192.0.2.1", 9))
+        return probe.getsockname()[0]
+
+
+def _query(provider, timeout):
+    """
+    Asks one provider on this machine; returns the address or None.
+
+    Pyta jednego dostawcę na tej maszynie; zwraca adres lub None.
+    """
+    if provider == INTERFACE_PROVIDER:
+        try:
+            return parse_address(_interface_address())
+        except OSError:
+            return None
+    import requests
+    try:
+        response = requests.get(provider, timeout=timeout)
+        response.raise_for_status()
+    except requests.exceptions.RequestException:
+        return None
+    # Decoded by hand: for a short answer without a charset, requests may guess the encoding wrong
+    # Dekodowane ręcznie: dla krótkiej odpowiedzi bez kodowania requests może źle je zgadnąć
+    return parse_address(response.content[:64].decode("ascii", errors="ignore"))
+
+
+def _remote_script(providers, timeout):
+    """
+    Builds the shell script that asks all providers in parallel on the remote host and
+    prints '<provider>\\t<answer>' for each one as soon as it answers.
+
+    Buduje skrypt powłoki, który pyta równolegle wszystkich dostawców na zdalnym hoście
+    i wypisuje '<dostawca>\\t<odpowiedź>' dla każdego, gdy tylko odpowie.
+    """
+    jobs = []
+    for provider in providers:
+        name = shlex.quote(provider)
+        if provider == INTERFACE_PROVIDER:
+            command = "ip -o route get 192.0.2.1 2>/dev/null | sed -n 's/.* src \\([^ ]*\\).*/\\1/p'"
+        else:
+            command = f"curl -s -m {int(max(1, timeout))} {name}"
+        jobs.append(f"( printf '%s\\t%s\\n' {name} \"$({command} | head -c 64 | tr -d '\\r\\n')\" ) &")
+    return "\n".join(jobs) + "\nwait\n"
+
+
+# =====================================================================================
+# === IP DETECTOR CLASS ===
+# === KLASA WYKRYWANIA IP ===
+# =====================================================================================
+
+class IpDetector:
+    """
+    Asks several providers for the external address at the same time and returns the
+    first address reported by 'agree' of them, without waiting for the slower ones.
+    If the providers that answered never reach agreement, the most frequent answer is
+    used. Results are cached on disk for 'ttl_seconds', separately for this machine
+    and for every remote host.
+
+    Pyta kilku dostawców o adres zewnętrzny jednocześnie i zwraca pierwszy adres
+    zgłoszony przez 'agree' z nich, bez czekania na wolniejszych. Jeśli dostawcy,
+    którzy odpowiedzieli, nie osiągną zgody, używana jest najczęstsza odpowiedź.
+    Wyniki są buforowane na dysku przez 'ttl_seconds', osobno dla tej maszyny
+    i dla każdego zdalnego hosta.
+    """
+
+    def __init__(self, providers=None, agree=DEFAULT_AGREE, timeout=DEFAULT_TIMEOUT,
+                 ttl_seconds=DEFAULT_TTL_SECONDS, cache_path=DEFAULT_CACHE_PATH):
+        self.providers = list(providers or DEFAULT_PROVIDERS)
+        self.agree = max(1, min(int(agree), len(self.providers)))
+        self.timeout = float(timeout)
+        self.ttl_seconds = float(ttl_seconds)
+        self.cache_path = cache_path
+
+    @classmethod
+    def from_config(cls, config):
+        settings = (config.get('network') or {}).get('ip_detection') or {}
+        return cls(settings.get('providers'), settings.get('agree', DEFAULT_AGREE),
+                   settings.get('timeout', DEFAULT_TIMEOUT), settings.get('ttl_seconds', DEFAULT_TTL_SECONDS),
+                   settings.get('cache_path', DEFAULT_CACHE_PATH))
+
+    # --- Cache ---
+    # --- Bufor ---
+
+    def _read_cache(self):
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def cached(self, key):
+        """
+        Returns the cached address for the key if it is younger than the TTL, or None.
+
+        Zwraca zbuforowany adres dla klucza, jeśli jest młodszy niż TTL, lub None.
+        """
+        entry = self._read_cache().get(key)
+        if entry and time.time() - entry.get("checked_at", 0) < self.ttl_seconds:
+            return entry.get("address")
+        return None
+
+    def _store(self, key, address):
+        cache = self._read_cache()
+        cache[key] = {"address": address, "checked_at": time.time()}
+        os.makedirs(os.path.dirname(self.cache_path) or ".", exist_ok=True)
+        temp_path = self.cache_path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(cache, f)
+        os.replace(temp_path, self.cache_path)
+
+    # --- Voting ---
+    # --- Głosowanie ---
+
+    def _vote(self, answers):
+        """
+        Consumes (provider, address) pairs as they arrive and returns (address, providers)
+        once 'agree' providers reported the same address, or the most frequent answer
+        when the answers run out. Returns (None, []) if no provider answered. Providers
+        reporting different addresses and too few answers are warned about separately;
+        a single answer is used without a warning.
+
+        Pobiera pary (dostawca, adres) w miarę ich nadchodzenia i zwraca (adres, dostawcy),
+        gdy 'agree' dostawców zgłosiło ten sam adres, lub najczęstszą odpowiedź, gdy
+        odpowiedzi się skończą. Zwraca (None, []), jeśli żaden dostawca nie odpowiedział.
+        Różne adresy od dostawców i zbyt mało odpowiedzi są zgłaszane osobno; jedna
+        odpowiedź jest używana bez ostrzeżenia.
+        """
+        votes = Counter()
+        voters = {}
+        for provider, address in answers:
+            if address is None:
+                continue
+            votes[address] += 1
+            voters.setdefault(address, []).append(provider)
+            if votes[address] >= self.agree:
+                return address, voters[address]
+        if not votes:
+            return None, []
+        address = votes.most_common(1)[0][0]
+        answered = sum(votes.values())
+        if len(votes) > 1:
+            print(f"WARNING: The IP providers disagree ({dict(votes)}), using {address}.")
+            print(f"OSTRZEŻENIE: Dostawcy IP się nie zgadzają ({dict(votes)}), używam {address}.")
+        elif answered > 1:
+            print(f"WARNING: Not enough IP providers answered ({answered}/{len(self.providers)}, "
+                  f"{self.agree} must agree), using {address}.")
+            print(f"OSTRZEŻENIE: Odpowiedziało za mało dostawców IP ({answered}/{len(self.providers)}, "
+                  f"{self.agree} musi się zgadzać), używam {address}.")
+        return address, voters[address]
+
+    def _local_answers(self):
+        from concurrent.futures import ThreadPoolExecutor, as_completed
+
+        pool = ThreadPoolExecutor(max_workers=len(self.providers), thread_name_prefix="ip-detect")
+        futures = {pool.submit(_query, provider, self.timeout): provider for provider in self.providers}
+        try:
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+        finally:
+            # Slower providers are not waited for once the vote is decided
+            # Na wolniejszych dostawców nie czeka się, gdy głosowanie jest rozstrzygnięte
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _remote_answers(self, session):
+        process = session.popen(_remote_script(self.providers, self.timeout))
+        # The remote side is bounded by curl -m; the timer only guards against a hanging connection
+        # Strona zdalna jest ograniczona przez curl -m; zegar chroni tylko przed zawieszonym połączeniem
+        guard = threading.Timer(self.timeout + 10, process.kill)
+        guard.start()
+        try:
+            for line in process.stdout:
+                provider, _, answer = line.decode("utf-8", errors="replace").rstrip("\n").partition("\t")
+                yield provider, parse_address(answer)
+        finally:
+            guard.cancel()
+            if process.poll() is None:
+                process.kill()
+            process.wait()
+
+    # --- Detection ---
+    # --- Wykrywanie ---
+
+    def detect(self, session=None, cache_key="local", use_cache=True):
+        """
+        Returns the external address of this machine, or of the session's host when a
+        session is given.
+
+        Zwraca zewnętrzny adres tej maszyny lub hosta sesji, jeśli podano sesję.
+
+        Returns:
+            tuple: (address, source), source being 'cache' or the agreeing providers.
+                   (adres, źródło), gdzie źródło to 'cache' lub zgodni dostawcy.
+
+        Raises:
+            RuntimeError: No provider answered. / Żaden dostawca nie odpowiedział.
+        """
+        if use_cache:
+            address = self.cached(cache_key)
+            if address:
+                return address, "cache"
+        answers = self._remote_answers(session) if session is not None else self._local_answers()
+        address, providers = self._vote(answers)
+        answers.close()
+        if address is None:
+            raise RuntimeError(f"none of the IP providers answered: {', '.join(self.providers)}")
+        self._store(cache_key, address)
+        return address, ", ".join(providers)
+
+
+# =====================================================================================
+# === SCRIPT ENTRY POINT ===
+# === PUNKT WEJŚCIA DO SKRYPTU ===
+# =====================================================================================
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Prints the external IP address of this machine, asking several providers at once.",
+        epilog="Example: python3 ip_detect.py --no-cache https://api.ipify.org http://127.0.0.1:8000/"
+    )
+    parser.add_argument("providers", nargs="*", help="Provider URLs or 'interface'. (URL-e dostawców lub 'interface')")
+    parser.add_argument("--agree", type=int, default=DEFAULT_AGREE,
+                        help="Number of providers that must agree. (Liczba zgodnych dostawców)")
+    parser.add_argument("--no-cache", action="store_true", help="Ignore the cached address. (Pomiń bufor)")
+    args = parser.parse_args()
+
+    detector = IpDetector(args.providers or None, args.agree)
+    started = time.monotonic()
+    try:
+        ip_address, source = detector.detect(use_cache=not args.no_cache)
+    except RuntimeError as e:
+        print(f"ERROR: {e}")
+        print(f"BŁĄD: {e}")
+        exit(1)
+    print(f"{ip_address}  ({source}, {time.monotonic() - started:.2f}s)")
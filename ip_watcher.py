@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# =====================================================================================
+# === EXTERNAL IP WATCHER: REFRESHES EVERYTHING THAT DEPENDS ON THE IP AFTER A CHANGE ===
+# === OBSERWATOR ZEWNĘTRZNEGO IP: ODŚWIEŻA WSZYSTKO, CO ZALEŻY OD IP, PO JEGO ZMIANIE ===
+# =====================================================================================
+
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from config_loader import load_config, read_config
+from console import progress, set_headless
+from ip_detect import IpDetector
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_INTERVAL = 60
+DEFAULT_DEBOUNCE_SECONDS = 30
+DEFAULT_WORKERS = 4
+DEFAULT_HISTORY_PATH = os.path.join(".cache", "ip_watcher_history.jsonl")
+DEFAULT_STEPS = ["pref", "wg_client", "wg_android", "mumble"]
+
+
+# =====================================================================================
+# === REFRESH STEPS ===
+# === KROKI ODŚWIEŻANIA ===
+# =====================================================================================
+
+def _run_script(*command):
+    from start import run_stage_command
+    script = os.path.join(SCRIPT_DIR, command[0])
+    # Python scripts are started through the interpreter, they do not need the executable bit
+    # Skrypty Pythona są uruchamiane przez interpreter, nie potrzebują prawa wykonywania
+    prefix = [sys.executable] if script.endswith(".py") else []
+    run_stage_command(prefix + [script] + list(command[1:]), dict(os.environ))
+
+
+def _step_config(context):
+    from check_ip import check_and_update_ip
+    # The address has just been detected by the watcher, so it comes from the cache
+    # Adres został właśnie wykryty przez obserwatora, więc pochodzi z bufora
+    check_and_update_ip(context["config_path"], context["config"], context["session"])
+
+
+def _step_pref(context):
+    from config_pref import generate_pref_file
+    generate_pref_file(context["config"])
+
+
+def _step_wg_client(context):
+    from wg_live import update_client, wireguard_settings
+    if wireguard_settings(context["config"])['update_mode'] == 'live':
+        update_client(context["config"])
+    else:
+        _run_script("update_wireguard_endpoint_MDC2.py")
+
+
+def _step_wg_android(context):
+    _run_script("update_wireguard_android_endpoint.sh")
+
+
+def _step_mumble(context):
+    _run_script("make_cert_mumble.sh")
+
+
+# Step name: (function, steps it depends on). Every step needs the new IP in config.yaml first.
+# Nazwa kroku: (funkcja, kroki, od których zależy). Każdy krok wymaga najpierw nowego IP w config.yaml.
+STEPS = {
+    "config": (_step_config, []),
+    "pref": (_step_pref, ["config"]),
+    "wg_client": (_step_wg_client, ["config"]),
+    "wg_android": (_step_wg_android, ["config"]),
+    "mumble": (_step_mumble, ["config"]),
+}
+
+
+def run_graph(steps, context, workers=DEFAULT_WORKERS):
+    """
+    Runs the steps as soon as the steps they depend on have succeeded, up to 'workers'
+    at the same time. A step whose dependency failed is skipped.
+
+    Uruchamia kroki, gdy tylko kroki, od których zależą, zakończą się sukcesem, najwyżej
+    'workers' jednocześnie. Krok, którego zależność się nie powiodła, jest pomijany.
+
+    Args:
+        steps (dict): {name: (function(context), [dependencies])}.
+                      {nazwa: (funkcja(context), [zależności])}.
+
+    Returns:
+        dict: {name: {'status': 'done'|'failed'|'skipped', 'seconds': float, 'error': str|None}}.
+    """
+    results = {}
+    pending = dict(steps)
+    running = {}
+    with ThreadPoolExecutor(max_workers=max(1, int(workers)), thread_name_prefix="ip-refresh") as pool:
+        while pending or running:
+            for name, (function, dependencies) in list(pending.items()):
+                if any(results.get(d, {}).get("status") in ("failed", "skipped") for d in dependencies):
+                    results[name] = {"status": "skipped", "seconds": 0.0, "error": "dependency failed"}
+                    del pending[name]
+                elif all(results.get(d, {}).get("status") == "done" for d in dependencies):
+                    running[pool.submit(_timed, function, context)] = name
+                    del pending[name]
+            if not running:
+                continue
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                results[name] = future.result()
+                progress("refresh_step", step=name, **results[name])
+    return results
+
+
+def _timed(function, context):
+    # Ctrl+C and exit() are not step failures, they stop the watcher
+    # Ctrl+C i exit() nie są błędami kroku, zatrzymują obserwatora
+    started = time.monotonic()
+    try:
+        function(context)
+        return {"status": "done", "seconds": round(time.monotonic() - started, 3), "error": None}
+    except Exception as e:
+        return {"status": "failed", "seconds": round(time.monotonic() - started, 3), "error": str(e)}
+
+
+# =====================================================================================
+# === IP WATCHER CLASS ===
+# === KLASA OBSERWATORA IP ===
+# =====================================================================================
+
+class IpWatcher:
+    """
+    Checks the external IP every 'interval' seconds. A new address must stay the same
+    for 'debounce_seconds' before it counts as a change (an address that flaps back is
+    ignored); then the refresh steps run and their timings are appended to the history.
+
+    Sprawdza zewnętrzne IP co 'interval' sekund. Nowy adres musi pozostać taki sam przez
+    'debounce_seconds', zanim zostanie uznany za zmianę (adres, który wraca, jest
+    ignorowany); wtedy uruchamiane są kroki odświeżania, a ich czasy są dopisywane do historii.
+    """
+
+    def __init__(self, config_path="config.yaml", interval=DEFAULT_INTERVAL, debounce_seconds=DEFAULT_DEBOUNCE_SECONDS,
+                 steps=None, workers=DEFAULT_WORKERS, history_path=DEFAULT_HISTORY_PATH):
+        self.config_path = config_path
+        self.interval = float(interval)
+        self.debounce_seconds = float(debounce_seconds)
+        self.workers = workers
+        self.history_path = history_path
+        selected = ["config"] + [name for name in (steps or DEFAULT_STEPS) if name != "config"]
+        unknown = [name for name in selected if name not in STEPS]
+        if unknown:
+            raise ValueError(f"unknown refresh steps: {', '.join(unknown)} (known: {', '.join(STEPS)})")
+        self.steps = {name: STEPS[name] for name in selected}
+        self._stop = threading.Event()
+        self._session = None
+
+    @classmethod
+    def from_config(cls, config, config_path="config.yaml"):
+        settings = (config.get('network') or {}).get('ip_watcher') or {}
+        return cls(config_path, settings.get('interval', DEFAULT_INTERVAL),
+                   settings.get('debounce_seconds', DEFAULT_DEBOUNCE_SECONDS), settings.get('steps'),
+                   settings.get('workers', DEFAULT_WORKERS), settings.get('history', DEFAULT_HISTORY_PATH))
+
+    def _load_config(self):
+        # Parsed again only after config.yaml changed (config_loader.py)
+        # Parsowany ponownie dopiero po zmianie config.yaml (config_loader.py)
+        return read_config(self.config_path)
+
+    def _detect(self, config):
+        detector = IpDetector.from_config(config)
+        if config['execution']['mode'] != 'remote':
+            return detector.detect(cache_key="local", use_cache=False)[0]
+        if self._session is None:
+            from remote_session import open_session
+            self._session = open_session(config)
+        host = config['network']['remote_server']['host']
+        return detector.detect(self._session, f"remote:{host}", use_cache=False)[0]
+
+    def refresh(self, config, address):
+        """
+        Runs the refresh steps for a confirmed new address and records their timings.
+
+        Uruchamia kroki odświeżania dla potwierdzonego nowego adresu i zapisuje ich czasy.
+        """
+        started = time.monotonic()
+        context = {"config_path": self.config_path, "config": config, "session": self._session}
+        results = run_graph(self.steps, context, self.workers)
+        total = round(time.monotonic() - started, 3)
+
+        print("---")
+        print(f"Refresh after the IP change to {address} took {total}s:")
+        print(f"Odświeżenie po zmianie IP na {address} trwało {total}s:")
+        for name, result in results.items():
+            line = f"  {name:<11} {result['status']:<8} {result['seconds']:>7.2f}s"
+            print(line + (f"  {result['error'].splitlines()[0]}" if result['error'] else ""))
+        progress("refresh", address=address, seconds=total, steps=results)
+
+        os.makedirs(os.path.dirname(self.history_path) or ".", exist_ok=True)
+        with open(self.history_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps({"time": round(time.time(), 3), "address": address, "seconds": total,
+                                "steps": results}) + "\n")
+        return results
+
+    def initial_state(self):
+        return {"current": str(self._load_config()['network'].get('external_ip')), "candidate": None, "since": 0.0}
+
+    def check_once(self, state):
+        """
+        One check: detects the address and advances the debounce state
+        {'current', 'candidate', 'since'}. Returns True if a refresh ran. A check that
+        fails (no provider, SSH or network error) is retried at the next interval over
+        a new session.
+
+        Jedno sprawdzenie: wykrywa adres i przesuwa stan odbijania
+        {'current', 'candidate', 'since'}. Zwraca True, jeśli odświeżenie zostało wykonane.
+        Nieudane sprawdzenie (brak dostawcy, błąd SSH lub sieci) jest ponawiane przy
+        kolejnym interwale przez nową sesję.
+        """
+        config = self._load_config()
+        try:
+            address = self._detect(config)
+        except (RuntimeError, subprocess.CalledProcessError, OSError) as e:
+            self.close()
+            print(f"WARNING: IP check failed, retrying in {self.interval:.0f}s: {e}")
+            print(f"OSTRZEŻENIE: Sprawdzenie IP nie powiodło się, ponowienie za {self.interval:.0f}s: {e}")
+            return False
+
+        if address == state["current"]:
+            if state["candidate"]:
+                print(f"The IP returned to {address}, change to {state['candidate']} ignored.")
+                print(f"IP wróciło do {address}, zmiana na {state['candidate']} zignorowana.")
+            state["candidate"] = None
+            return False
+        if address != state["candidate"]:
+            print(f"New IP seen: {address}, waiting {self.debounce_seconds:.0f}s for it to settle...")
+            print(f"Wykryto nowe IP: {address}, czekam {self.debounce_seconds:.0f}s na jego ustalenie...")
+            state["candidate"], state["since"] = address, time.monotonic()
+        if time.monotonic() - state["since"] < self.debounce_seconds:
+            return False
+
+        self.refresh(config, address)
+        state["current"], state["candidate"] = address, None
+        return True
+
+    def run(self):
+        """
+        Watches until stop() is called (or Ctrl+C).
+
+        Obserwuje do wywołania stop() (lub Ctrl+C).
+        """
+        state = self.initial_state()
+        print(f"Watching the external IP (now {state['current']}) every {self.interval:.0f}s...")
+        print(f"Obserwuję zewnętrzne IP (obecnie {state['current']}) co {self.interval:.0f}s...")
+        try:
+            while not self._stop.is_set():
+                self.check_once(state)
+                # A pending change is confirmed sooner than the next regular check
+                # Oczekująca zmiana jest potwierdzana szybciej niż przy kolejnym zwykłym sprawdzeniu
+                delay = self.interval
+                if state["candidate"]:
+                    remaining = self.debounce_seconds - (time.monotonic() - state["since"])
+                    delay = max(0.0, min(delay, remaining))
+                self._stop.wait(delay)
+        finally:
+            self.close()
+
+    def stop(self):
+        self._stop.set()
+
+    def close(self):
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+
+# =====================================================================================
+# === SCRIPT ENTRY POINT ===
+# === PUNKT WEJŚCIA DO SKRYPTU ===
+# =====================================================================================
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Watches the external IP and refreshes config.yaml, config.pref, WireGuard and the "
+                    "Mumble certificate after a change.",
+        epilog="Example: python3 ip_watcher.py --once"
+    )
+    parser.add_argument("--config", default="config.yaml", help="Path to config.yaml. (Ścieżka do config.yaml)")
+    parser.add_argument("--once", action="store_true",
+                        help="Check once and refresh immediately if the IP differs. "
+                             "(Sprawdź raz i odśwież od razu, jeśli IP się różni)")
+    args = parser.parse_args()
+
+    # The refresh steps run unattended: no pauses or screen clears
+    # Kroki odświeżania działają bez nadzoru: bez pauz i czyszczenia ekranu
+    set_headless()
+    config_data = load_config(args.config)
+    if not config_data:
+        exit(1)
+    watcher = IpWatcher.from_config(config_data, args.config)
+    if args.once:
+        watcher.debounce_seconds = 0
+        watcher_state = watcher.initial_state()
+        try:
+            changed = watcher.check_once(watcher_state)
+        finally:
+            watcher.close()
+        if not changed:
+            print("The IP has not changed, nothing to refresh.")
+            print("IP się nie zmieniło, nic do odświeżenia.")
+        sys.exit(0)
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        print("\nWatcher stopped.")
+        print("Obserwator zatrzymany.")
@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# =====================================================================================
+# === WARM POOL OF PRE-GENERATED CLIENT KEY PAIRS ===
+# === PULA WSTĘPNIE WYGENEROWANYCH PAR KLUCZY KLIENTÓW ===
+# =====================================================================================
+
+import datetime
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_KEY_POOL_PATH = "key_pool.sqlite3"
+DEFAULT_DEPTH = 50
+DEFAULT_ALGORITHM = "rsa"
+DEFAULT_KEY_SIZE = 2048
+# Key sizes of the 'ec' algorithm are the bit sizes of these curves
+# Rozmiary kluczy algorytmu 'ec' to rozmiary w bitach tych krzywych
+_EC_CURVES = {256: "SECP256R1", 384: "SECP384R1", 521: "SECP521R1"}
+
+# The passphrase is stretched once per pool; every stored key is then encrypted with AES-GCM
+# Hasło jest wzmacniane raz na pulę; każdy zapisany klucz jest następnie szyfrowany AES-GCM
+_KDF_ITERATIONS = 600000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS keys (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    algorithm   TEXT NOT NULL,
+    key_size    INTEGER NOT NULL,
+    key_data    BLOB NOT NULL,
+    created_at  TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS settings (
+    name        TEXT PRIMARY KEY,
+    value       BLOB NOT NULL
+);
+"""
+
+
+# =====================================================================================
+# === HELPER FUNCTIONS ===
+# === FUNKCJE POMOCNICZE ===
+# =====================================================================================
+
+def generate_key(algorithm=DEFAULT_ALGORITHM, key_size=DEFAULT_KEY_SIZE):
+    """
+    Generates one private key and returns it as unencrypted PKCS#8 DER bytes.
+    Runs in worker processes, so it returns plain bytes.
+
+    Generuje jeden klucz prywatny i zwraca go jako niezaszyfrowane bajty PKCS#8 DER.
+    Działa w procesach roboczych, więc zwraca zwykłe bajty.
+    """
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import ec, rsa
+
+    if algorithm == "rsa":
+        key = rsa.generate_private_key(public_exponent=65537, key_size=int(key_size))
+    elif algorithm == "ec" and int(key_size) in _EC_CURVES:
+        key = ec.generate_private_key(getattr(ec, _EC_CURVES[int(key_size)])())
+    else:
+        raise ValueError(f"unsupported key type '{algorithm}' ({key_size} bits)")
+    return key.private_bytes(serialization.Encoding.DER, serialization.PrivateFormat.PKCS8,
+                             serialization.NoEncryption())
+
+
+def check_key_type(algorithm, key_size):
+    """
+    Raises ValueError unless generate_key() supports this algorithm and key size.
+
+    Zgłasza ValueError, chyba że generate_key() obsługuje ten algorytm i rozmiar klucza.
+    """
+    try:
+        size = int(key_size)
+    except (TypeError, ValueError):
+        raise ValueError(f"the key size '{key_size}' is not a number") from None
+    if not ((algorithm == "rsa" and size >= 1024) or (algorithm == "ec" and size in _EC_CURVES)):
+        raise ValueError(f"unsupported key type '{algorithm}' ({key_size} bits); use 'rsa' with at least "
+                         f"1024 bits or 'ec' with {', '.join(str(size) for size in _EC_CURVES)}")
+
+
+def _timed_generate_key(arguments):
+    started = time.monotonic()
+    return generate_key(*arguments), time.monotonic() - started
+
+
+def key_pool_settings(config):
+    """
+    Returns the 'pki.key_pool' section of the configuration (may be empty).
+
+    Zwraca sekcję 'pki.key_pool' konfiguracji (może być pusta).
+    """
+    return (config.get('pki') or {}).get('key_pool') or {}
+
+
+# =====================================================================================
+# === KEY POOL CLASS ===
+# === KLASA PULI KLUCZY ===
+# =====================================================================================
+
+class KeyPool:
+    """
+    Keeps 'depth' private keys generated ahead of time, stored in SQLite encrypted
+    with a key derived from a passphrase. A background thread refills the pool with a pool of processes
+    on all cores; take() hands out one key per issued certificate, so during a burst
+    of registrations issuing a certificate costs only the signing. When the pool is
+    empty the key is generated on the spot (counted as a miss). Safe to use from
+    several threads.
+
+    Przechowuje 'depth' kluczy prywatnych wygenerowanych z wyprzedzeniem, zapisanych
+    w SQLite i zaszyfrowanych kluczem wyprowadzonym z hasła. Wątek w tle uzupełnia pulę za pomocą puli
+    procesów na wszystkich rdzeniach; take() wydaje jeden klucz na każdy wystawiany
+    certyfikat, więc przy fali rejestracji wystawienie certyfikatu kosztuje tylko
+    podpisanie. Gdy pula jest pusta, klucz jest generowany na miejscu (liczony jako
+    chybienie). Bezpieczna w użyciu z wielu wątków.
+    """
+
+    def __init__(self, path=DEFAULT_KEY_POOL_PATH, passphrase=None, depth=DEFAULT_DEPTH,
+                 algorithm=DEFAULT_ALGORITHM, key_size=DEFAULT_KEY_SIZE, workers=None):
+        if not passphrase:
+            raise ValueError("the key pool needs a passphrase to encrypt the stored keys")
+        check_key_type(algorithm, key_size)
+        self.path = path
+        self.depth = max(0, int(depth))
+        self.algorithm = algorithm
+        self.key_size = int(key_size)
+        self.workers = workers or os.cpu_count() or 1
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        with self._connection:
+            self._connection.executescript(_SCHEMA)
+            self._connection.execute("INSERT OR IGNORE INTO settings (name, value) VALUES ('salt', ?)",
+                                     (os.urandom(16),))
+        salt = self._connection.execute("SELECT value FROM settings WHERE name = 'salt'").fetchone()[0]
+        self._cipher = self._make_cipher(str(passphrase), salt)
+        # The stored keys are as sensitive as the certificates issued with them
+        # Zapisane klucze są tak samo wrażliwe jak certyfikaty z nimi wystawione
+        os.chmod(path, 0o600)
+
+        self._stats = {"generated": 0, "served": 0, "misses": 0, "generation_seconds": 0.0}
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread = None
+        self._executor = None
+
+    @classmethod
+    def from_config(cls, config):
+        pki = config.get('pki') or {}
+        settings = key_pool_settings(config)
+        passphrase = settings.get('passphrase') or (config.get('security') or {}).get('p12_password')
+        return cls(settings.get('path', DEFAULT_KEY_POOL_PATH), passphrase, settings.get('depth', DEFAULT_DEPTH),
+                   pki.get('key_algorithm', DEFAULT_ALGORITHM), pki.get('key_size', DEFAULT_KEY_SIZE),
+                   settings.get('workers'))
+
+    def close(self):
+        self.stop()
+        self._connection.close()
+
+    @staticmethod
+    def _make_cipher(passphrase, salt):
+        from cryptography.hazmat.primitives import hashes
+        from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+        from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+
+        kdf = PBKDF2HMAC(algorithm=hashes.SHA256(), length=32, salt=salt, iterations=_KDF_ITERATIONS)
+        return AESGCM(kdf.derive(passphrase.encode("utf-8")))
+
+    def _label(self):
+        # Bound to the ciphertext, so a key cannot be passed off as another type
+        # Powiązane z szyfrogramem, aby klucza nie dało się podać jako innego typu
+        return f"{self.algorithm}:{self.key_size}".encode("utf-8")
+
+    # --- Stored keys ---
+    # --- Zapisane klucze ---
+
+    def available(self):
+        """
+        Returns the number of stored keys of the configured algorithm and size.
+
+        Zwraca liczbę zapisanych kluczy skonfigurowanego algorytmu i rozmiaru.
+        """
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM keys WHERE algorithm = ? AND key_size = ?",
+                                            (self.algorithm, self.key_size)).fetchone()[0]
+
+    def _store(self, key_der, seconds):
+        nonce = os.urandom(12)
+        key_data = nonce + self._cipher.encrypt(nonce, key_der, self._label())
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT INTO keys (algorithm, key_size, key_data, created_at) VALUES (?, ?, ?, ?)",
+                (self.algorithm, self.key_size, key_data, datetime.datetime.now().isoformat(timespec='seconds'))
+            )
+            self._stats["generated"] += 1
+            self._stats["generation_seconds"] += seconds
+
+    def _pop(self):
+        with self._lock, self._connection:
+            row = self._connection.execute(
+                "SELECT id, key_data FROM keys WHERE algorithm = ? AND key_size = ? ORDER BY id LIMIT 1",
+                (self.algorithm, self.key_size)
+            ).fetchone()
+            if row is None:
+                return None
+            # A key is deleted as it is handed out, so it is never used for two certificates
+            # Klucz jest usuwany przy wydaniu, więc nigdy nie trafi do dwóch certyfikatów
+            self._connection.execute("DELETE FROM keys WHERE id = ?", (row[0],))
+            return row[1]
+
+    def take(self):
+        """
+        Returns one private key (a cryptography key object) and removes it from the pool.
+
+        Zwraca jeden klucz prywatny (obiekt klucza cryptography) i usuwa go z puli.
+        """
+        from cryptography.hazmat.primitives import serialization
+
+        key_data = self._pop()
+        with self._lock:
+            if key_data is None:
+                self._stats["misses"] += 1
+            else:
+                self._stats["served"] += 1
+        self._wake.set()
+        if key_data is None:
+            key_der = generate_key(self.algorithm, self.key_size)
+        else:
+            key_der = self._cipher.decrypt(key_data[:12], key_data[12:], self._label())
+        # The key was generated here and is authenticated by AES-GCM, so the costly RSA
+        # consistency check of loading is skipped
+        # Klucz został wygenerowany tutaj i jest uwierzytelniony przez AES-GCM, więc
+        # kosztowne sprawdzenie spójności RSA przy wczytywaniu jest pomijane
+        return serialization.load_der_private_key(key_der, None, unsafe_skip_rsa_key_validation=True)
+
+    def metrics(self):
+        """
+        Returns the pool depth and counters: {'available', 'depth', 'generated', 'served',
+        'misses', 'avg_generation_ms'}.
+
+        Zwraca głębokość puli i liczniki: {'available', 'depth', 'generated', 'served',
+        'misses', 'avg_generation_ms'}.
+        """
+        available = self.available()
+        with self._lock:
+            stats = dict(self._stats)
+        seconds = stats.pop("generation_seconds")
+        stats["avg_generation_ms"] = round(1000 * seconds / stats["generated"], 1) if stats["generated"] else None
+        return dict(available=available, depth=self.depth, **stats)
+
+    # --- Refilling ---
+    # --- Uzupełnianie ---
+
+    def fill(self):
+        """
+        Generates keys in the process pool until the pool holds 'depth' keys
+        (or the pool is stopped). Returns the number of generated keys.
+
+        Generuje klucze w puli procesów, aż pula będzie zawierać 'depth' kluczy
+        (lub pula zostanie zatrzymana). Zwraca liczbę wygenerowanych kluczy.
+        """
+        from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+        missing = self.depth - self.available()
+        if missing <= 0:
+            return 0
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+
+        arguments = (self.algorithm, self.key_size)
+        generated = 0
+        running = set()
+        while (missing > 0 or running) and not self._stop.is_set():
+            # Never more keys in flight than there are workers, so stop() does not wait long
+            # Nigdy więcej kluczy w toku niż procesów, aby stop() nie czekał długo
+            while missing > 0 and len(running) < self.workers:
+                running.add(self._executor.submit(_timed_generate_key, arguments))
+                missing -= 1
+            done, running = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                self._store(*future.result())
+                generated += 1
+        return generated
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.fill()
+            except Exception as e:
+                print(f"ERROR: Key pool: {e}")
+                print(f"BŁĄD: Pula kluczy: {e}")
+            self._wake.wait(60)
+            self._wake.clear()
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="key-pool", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stops the background refilling; keys already generated stay in the pool.
+
+        Zatrzymuje uzupełnianie w tle; wygenerowane klucze pozostają w puli.
+        """
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+
+
+# =====================================================================================
+# === SCRIPT ENTRY POINT ===
+# === PUNKT WEJŚCIA DO SKRYPTU ===
+# =====================================================================================
+
+if __name__ == "__main__":
+    import argparse
+    from config_loader import load_config
+
+    parser = argparse.ArgumentParser(
+        description="Shows or fills the pool of pre-generated client keys.",
+        epilog="Example: python3 key_pool.py fill  (e.g. before an expected wave of registrations)"
+    )
+    parser.add_argument("action", choices=["status", "fill"], help="Action to perform. (Akcja do wykonania)")
+    args = parser.parse_args()
+
+    config_data = load_config()
+    if not config_data:
+        exit(1)
+    try:
+        pool = KeyPool.from_config(config_data)
+    except ValueError as e:
+        print(f"ERROR: {e}")
+        print("BŁĄD: Pula kluczy wymaga hasła (pki.key_pool.passphrase lub security.p12_password).")
+        exit(1)
+
+    if args.action == "fill":
+        started = time.monotonic()
+        count = pool.fill()
+        print(f"Generated {count} keys in {time.monotonic() - started:.1f}s.")
+        print(f"Wygenerowano {count} kluczy w {time.monotonic() - started:.1f}s.")
+    metrics = pool.metrics()
+    print(f"Keys in the pool: {metrics['available']}/{metrics['depth']} ({pool.algorithm} {pool.key_size})")
+    print(f"Klucze w puli: {metrics['available']}/{metrics['depth']} ({pool.algorithm} {pool.key_size})")
+    pool.close()
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# =====================================================================================
+# === PROVISIONING LEDGER (SQLITE) - which user went through which stage ===
+# === REJESTR PROVISIONINGU (SQLITE) - który użytkownik przeszedł który etap ===
+# =====================================================================================
+
+import datetime
+import hashlib
+import os
+import sqlite3
+import threading
+
+DEFAULT_LEDGER_PATH = "provisioning_ledger.sqlite3"
+
+# Stages in processing order, with the columns that record their completion
+# Etapy w kolejności przetwarzania, z kolumnami zapisującymi ich ukończenie
+STAGES = ("cert", "package", "email")
+_STAGE_COLUMNS = {
+    "cert": ("cert_issued_at", "cert_sha256"),
+    "package": ("packaged_at", "package_sha256"),
+    "email": ("emailed_at", "message_id"),
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    username        TEXT NOT NULL,
+    email           TEXT NOT NULL,
+    registered_at   TEXT NOT NULL,
+    cert_issued_at  TEXT,
+    cert_sha256     TEXT,
+    packaged_at     TEXT,
+    package_sha256  TEXT,
+    emailed_at      TEXT,
+    message_id      TEXT,
+    last_error      TEXT,
+    updated_at      TEXT,
+    PRIMARY KEY (username, email, registered_at)
+)
+"""
+
+
+# =====================================================================================
+# === HELPER FUNCTIONS ===
+# === FUNKCJE POMOCNICZE ===
+# =====================================================================================
+
+def file_sha256(path):
+    """
+    Returns the SHA-256 of a file, or None if the file does not exist.
+
+    Zwraca SHA-256 pliku lub None, jeśli plik nie istnieje.
+    """
+    if not os.path.isfile(path):
+        return None
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def certificate_path(config, job):
+    return os.path.join(config['paths']['preferences_output'], f"{job.client_name}.p12")
+
+
+def package_path(config, job):
+    return os.path.join(config['paths']['attachment_output'], f"IUCP-IPPU_PACKAGE_{job.client_name}.zip")
+
+
+def _now():
+    return datetime.datetime.now().isoformat(timespec='seconds')
+
+
+# =====================================================================================
+# === LEDGER CLASS ===
+# === KLASA REJESTRU ===
+# =====================================================================================
+
+class Ledger:
+    """
+    Local SQLite record of the provisioning progress, keyed by
+    (username, e-mail, registration timestamp). Safe to use from the pipeline threads.
+
+    Lokalny zapis postępu provisioningu w SQLite, z kluczem
+    (nazwa użytkownika, e-mail, data rejestracji). Bezpieczny w wątkach potoku.
+    """
+
+    def __init__(self, path=DEFAULT_LEDGER_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.row_factory = sqlite3.Row
+        with self._connection:
+            self._connection.execute(_SCHEMA)
+
+    def close(self):
+        self._connection.close()
+
+    @staticmethod
+    def _key(job):
+        return job.client_name, job.email_address, job.registration_date
+
+    def get(self, job):
+        """
+        Returns the ledger row of the job, or None if the user was never processed.
+
+        Zwraca wiersz rejestru dla zadania lub None, jeśli użytkownik nie był przetwarzany.
+        """
+        with self._lock:
+            return self._connection.execute(
+                "SELECT * FROM users WHERE username = ? AND email = ? AND registered_at = ?", self._key(job)
+            ).fetchone()
+
+    def resume_stage(self, job, config):
+        """
+        Returns the stage the job has to start from, or None if it is complete.
+        A finished stage only counts if its artifact is still on disk with the
+        recorded hash; otherwise the work is redone from the earliest missing stage.
+
+        Zwraca etap, od którego zadanie ma się rozpocząć, lub None, jeśli jest ukończone.
+        Ukończony etap liczy się tylko wtedy, gdy jego plik wciąż istnieje na dysku
+        z zapisanym skrótem; w przeciwnym razie praca jest powtarzana od najwcześniejszego
+        brakującego etapu.
+        """
+        row = self.get(job)
+        if row is None:
+            return "cert"
+        if row["emailed_at"]:
+            return None
+        if row["packaged_at"] and file_sha256(package_path(config, job)) == row["package_sha256"]:
+            return "email"
+        if row["cert_issued_at"] and file_sha256(certificate_path(config, job)) == row["cert_sha256"]:
+            return "package"
+        return "cert"
+
+    def record(self, job, stage, value=None):
+        """
+        Marks a stage of the job as completed now. 'value' is the artifact hash
+        (cert, package) or the message ID (email).
+
+        Oznacza etap zadania jako ukończony teraz. 'value' to skrót pliku
+        (cert, package) lub ID wiadomości (email).
+        """
+        done_column, value_column = _STAGE_COLUMNS[stage]
+        now = _now()
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR IGNORE INTO users (username, email, registered_at) VALUES (?, ?, ?)", self._key(job)
+            )
+            self._connection.execute(
+                f"UPDATE users SET {done_column} = ?, {value_column} = ?, last_error = NULL, updated_at = ? "
+                "WHERE username = ? AND email = ? AND registered_at = ?",
+                (now, value, now) + self._key(job)
+            )
+
+    def record_error(self, job, stage, error):
+        """
+        Stores the last error of the job, so it can be inspected before the next run.
+
+        Zapisuje ostatni błąd zadania, aby można go było sprawdzić przed kolejnym przebiegiem.
+        """
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR IGNORE INTO users (username, email, registered_at) VALUES (?, ?, ?)", self._key(job)
+            )
+            self._connection.execute(
+                "UPDATE users SET last_error = ?, updated_at = ? "
+                "WHERE username = ? AND email = ? AND registered_at = ?",
+                (f"[{stage}] {error}", _now()) + self._key(job)
+            )
+
+    def forget(self, username):
+        """
+        Removes every record of the user, so the next run provisions them again.
+
+        Usuwa wszystkie wpisy użytkownika, aby kolejny przebieg obsłużył go ponownie.
+        """
+        with self._lock, self._connection:
+            return self._connection.execute("DELETE FROM users WHERE username = ?", (username,)).rowcount
+
+    def rows(self):
+        with self._lock:
+            return self._connection.execute("SELECT * FROM users ORDER BY registered_at").fetchall()
+
+
+# =====================================================================================
+# === SCRIPT ENTRY POINT ===
+# === PUNKT WEJŚCIA DO SKRYPTU ===
+# =====================================================================================
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Shows or edits the provisioning ledger used by start.py.",
+        epilog="Example: python3 ledger.py forget john_doe"
+    )
+    parser.add_argument("action", choices=["status", "forget"], help="Action to perform. (Akcja do wykonania)")
+    parser.add_argument("username", nargs="?", help="User for 'forget'. (Użytkownik dla 'forget')")
+    parser.add_argument("--ledger", default=DEFAULT_LEDGER_PATH, help="Ledger file. (Plik rejestru)")
+    args = parser.parse_args()
+
+    ledger = Ledger(args.ledger)
+    if args.action == "status":
+        for row in ledger.rows():
+            stages = " ".join(f"{stage}:{'+' if row[_STAGE_COLUMNS[stage][0]] else '-'}" for stage in STAGES)
+            error = f"  ! {row['last_error']}" if row['last_error'] else ""
+            print(f"{row['registered_at']}  {row['username']:<24} {stages}{error}")
+    else:
+        if not args.username:
+            parser.error("'forget' needs a username / 'forget' wymaga nazwy użytkownika")
+        removed = ledger.forget(args.username)
+        print(f"Removed {removed} record(s) of '{args.username}'.")
+        print(f"Usunięto wpisy ({removed}) użytkownika '{args.username}'.")
+    ledger.close()
@@ -16,21 +16,24 @@ echo "---"
 echo "Wczytuję konfigurację..."
 echo "Loading configuration..."
 
-# Read data from the nested YAML structure
-# Odczyt danych z zagnieżdżonej struktury YAML
-sudo_pswd=$(yq '.security.sudo_pswd' "$config_file")
-client_name=$(yq '.user_management.state.client_name' "$config_file")
-mode=$(yq '.execution.mode' "$config_file")
-remote_user=$(yq '.network.remote_server.user' "$config_file")
-remote_host=$(yq '.network.remote_server.host' "$config_file")
+# Shared helpers: the configuration (blox_load_config_env) and the multiplexed SSH connection
+# Wspólne funkcje: konfiguracja (blox_load_config_env) i współdzielone połączenie SSH
+source "$(dirname "$0")/remote_lib.sh"
+blox_load_config_env "$config_file"
+
+client_name="${1:-$BLOX_CLIENT_NAME}"
+sudo_pswd="$BLOX_SUDO_PSWD"
+mode="$BLOX_MODE"
+remote_user="$BLOX_REMOTE_USER"
+remote_host="$BLOX_REMOTE_HOST"
 
 # Use the path from config.yaml as the destination
 # Użyj ścieżki z config.yaml jako docelowej
-destination_dir=$(yq -r '.paths.preferences_output' "$config_file")
+destination_dir="$BLOX_PREFERENCES_OUTPUT"
 
 # --- Paths and Commands Definitions ---
 # --- Definicje Ścieżek i Poleceń ---
-tak_certs_dir="/home/tak/tak-server/tak/certs"
+tak_certs_dir="$BLOX_TAK_CERTS_DIR"
 tak_certs_files_dir="${tak_certs_dir}/files"
 
 # Define paths for the client certificate
@@ -38,11 +41,20 @@ tak_certs_files_dir="${tak_certs_dir}/files"
 remote_temp_cert_path="/home/${remote_user}/${client_name}.p12"
 local_final_cert_path="${destination_dir}${client_name}.p12"
 
-# Define paths for the root certificate
-# Zdefiniuj ścieżki dla certyfikatu roota
-remote_temp_root_path="/home/${remote_user}/truststore-root.p12"
+# Define paths for the root certificate (the temporary copy is per client, so parallel runs do not collide)
+# Zdefiniuj ścieżki dla certyfikatu roota (kopia tymczasowa jest osobna dla klienta, aby równoległe uruchomienia się nie kolidowały)
+remote_temp_root_path="/home/${remote_user}/${client_name}.truststore-root.p12"
 local_final_root_path="${destination_dir}truststore-root.p12"
 
+# start.py sets BLOX_TRUSTSTORE_CACHED=1 after fetching the truststore once for the whole run
+# (artifact_cache.py); then only the client certificate is copied here
+# start.py ustawia BLOX_TRUSTSTORE_CACHED=1 po jednorazowym pobraniu truststore dla całego przebiegu
+# (artifact_cache.py); wtedy kopiowany jest tu tylko certyfikat klienta
+copy_root=1
+if [ "${BLOX_TRUSTSTORE_CACHED:-0}" == "1" ]; then
+    copy_root=0
+fi
+
 
 # Commands to be executed on the server (remote or local)
 # Polecenia do wykonania na serwerze (zdalnym lub lokalnym)
@@ -77,30 +89,36 @@ if [ "$mode" == "remote" ]; then
         echo '--- (ZDALNY) Kopiowanie certyfikatów (klient i root) do /home w celu pobrania ---';
         cp ${tak_certs_files_dir}/${client_name}.p12 ${remote_temp_cert_path};
         chown ${remote_user}:${remote_user} ${remote_temp_cert_path};
+    "
+    if [ "$copy_root" == "1" ]; then
+        remote_commands="${remote_commands}
         cp ${tak_certs_files_dir}/truststore-root.p12 ${remote_temp_root_path};
         chown ${remote_user}:${remote_user} ${remote_temp_root_path};
     "
+    fi
     # Execute remote commands
     # Wykonaj zdalne komendy
-    sshpass -p "$sudo_pswd" ssh -t "$remote_user@$remote_host" "echo '$sudo_pswd' | sudo -S bash -c \"$remote_commands\""
+    remote_sudo "$remote_user@$remote_host" "$remote_commands"
 
     # Copy files from the server to the local machine
     # Kopiuj pliki z serwera na maszynę lokalną
     echo "---"
     echo "Kopiuję certyfikat klienta (.p12) na maszynę lokalną..."
     echo "Copying client certificate (.p12) to the local machine..."
-    sshpass -p "$sudo_pswd" scp -o StrictHostKeyChecking=no "$remote_user@$remote_host:$remote_temp_cert_path" "$local_final_cert_path"
+    remote_scp "$remote_user@$remote_host:$remote_temp_cert_path" "$local_final_cert_path"
 
-    echo "Kopiuję certyfikat roota (truststore-root.p12) na maszynę lokalną..."
-    echo "Copying root certificate (truststore-root.p12) to the local machine..."
-    sshpass -p "$sudo_pswd" scp -o StrictHostKeyChecking=no "$remote_user@$remote_host:$remote_temp_root_path" "$local_final_root_path"
+    if [ "$copy_root" == "1" ]; then
+        echo "Kopiuję certyfikat roota (truststore-root.p12) na maszynę lokalną..."
+        echo "Copying root certificate (truststore-root.p12) to the local machine..."
+        remote_scp "$remote_user@$remote_host:$remote_temp_root_path" "$local_final_root_path"
+    fi
 
     # Cleanup on the remote server
     # Sprzątanie na serwerze zdalnym
     echo "---"
     echo "Sprzątam pliki tymczasowe na serwerze zdalnym..."
     echo "Cleaning up temporary files on the remote server..."
-    sshpass -p "$sudo_pswd" ssh "$remote_user@$remote_host" "rm ${remote_temp_cert_path} ${remote_temp_root_path}"
+    remote_ssh "$remote_user@$remote_host" "rm -f ${remote_temp_cert_path} ${remote_temp_root_path}"
 
 elif [ "$mode" == "local" ]; then
     # ### LOCAL MODE ###
@@ -118,11 +136,15 @@ elif [ "$mode" == "local" ]; then
         echo '--- (LOCAL) Copying certificates (client and root) to the project directory... ---';
         echo '--- (LOKALNY) Kopiowanie certyfikatów (klient i root) do katalogu projektu... ---';
         cp ${tak_certs_files_dir}/${client_name}.p12 ${local_final_cert_path};
+    "
+    if [ "$copy_root" == "1" ]; then
+        local_commands="${local_commands}
         cp ${tak_certs_files_dir}/truststore-root.p12 ${local_final_root_path};
     "
+    fi
     # Execute commands locally with sudo
     # Wykonaj komendy lokalnie z sudo
-    echo "$sudo_pswd" | sudo -S bash -c "$local_commands"
+    local_sudo bash -c "$local_commands"
 
 else
     echo "BŁĄD: Nieprawidłowy tryb '$mode' w pliku konfiguracyjnym. Użyj 'local' lub 'remote'." >&2
@@ -15,21 +15,26 @@
 # --- Path Definitions ---
 # --- Definicje ścieżek ---
 config_file="config.yaml"
-# Target directory on the local machine
-# Docelowy katalog na lokalnej maszynie
-cert_dir="/home/luke_blue_lox/PycharmProjects/BLOX-TAK-SERVER-IUCP/IUCP-IPPU_PACKAGE/certs"
-mkdir -p "$cert_dir"
 
 # --- Loading configuration ---
 # --- Wczytanie konfiguracji ---
 echo "---"
 echo "Loading configuration from '$config_file'..."
 echo "Wczytuję konfigurację z pliku '$config_file'..."
-sudo_pswd=$(yq '.security.sudo_pswd' "$config_file")
-ex_ip=$(yq '.network.external_ip' "$config_file")
-mode=$(yq '.execution.mode' "$config_file")
-remote_host=$(yq '.network.remote_server.host' "$config_file")
-remote_user=$(yq '.network.remote_server.user' "$config_file")
+# Shared helpers: the configuration (blox_load_config_env) and the multiplexed SSH connection
+# Wspólne funkcje: konfiguracja (blox_load_config_env) i współdzielone połączenie SSH
+source "$(dirname "$0")/remote_lib.sh"
+blox_load_config_env "$config_file"
+
+sudo_pswd="$BLOX_SUDO_PSWD"
+ex_ip="$BLOX_EXTERNAL_IP"
+mode="$BLOX_MODE"
+remote_host="$BLOX_REMOTE_HOST"
+remote_user="$BLOX_REMOTE_USER"
+# Target directory on the local machine (paths.preferences_output)
+# Docelowy katalog na lokalnej maszynie (paths.preferences_output)
+cert_dir="${BLOX_PREFERENCES_OUTPUT%/}"
+mkdir -p "$cert_dir"
 
 # --- Definition of commands to be executed on the server ---
 # --- Definicja poleceń do wykonania na serwerze ---
@@ -40,9 +45,9 @@ commands_to_execute="
     openssl req -x509 -sha256 -nodes -days 1080 -newkey rsa:2048 \
         -keyout /etc/mumble.key \
         -out /etc/mumble.cer \
-        -subj \\"/CN=$ex_ip\\" \
-        -addext \\"subjectAltName=IP:$ex_ip,IP:192.168.1.17,IP:10.0.0.1\\" \
-        -addext \\"extendedKeyUsage=serverAuth\\" &&
+        -subj \"/CN=$ex_ip\" \
+        -addext \"subjectAltName=IP:$ex_ip,IP:192.168.1.17,IP:10.0.0.1\" \
+        -addext \"extendedKeyUsage=serverAuth\" &&
 
     echo 'Setting permissions for the generated files...'
     echo 'Ustawiam uprawnienia dla wygenerowanych plików...'
@@ -72,9 +77,7 @@ if [ "$mode" == "remote" ]; then
 
     # Execute certificate generation commands on the remote server
     # Wykonanie poleceń generujących certyfikat na zdalnym serwerze
-    sshpass -p "$sudo_pswd" ssh -t "$remote_user@$remote_host" "
-        echo '$sudo_pswd' | sudo -S bash -c \"$commands_to_execute\"
-    "
+    remote_sudo "$remote_user@$remote_host" "$commands_to_execute"
 
     # <<< ADDED COPY LOGIC >>>
     # <<< DODANA LOGIKA KOPIOWANIA >>>
@@ -82,7 +85,7 @@ if [ "$mode" == "remote" ]; then
     echo "Copying mumble.cer certificate from the remote server..."
     echo "Kopiuję certyfikat mumble.cer z serwera zdalnego..."
 
-    sshpass -p "$sudo_pswd" scp -o StrictHostKeyChecking=no "$remote_user@$remote_host:/etc/mumble.cer" "$cert_dir/mumble.cer"
+    remote_scp "$remote_user@$remote_host:/etc/mumble.cer" "$cert_dir/mumble.cer"
 
     echo "Certificate copied to '$cert_dir'."
     echo "Certyfikat skopiowany do '$cert_dir'."
@@ -98,15 +101,15 @@ elif [ "$mode" == "local" ]; then
 
     # Execute commands locally
     # Wykonanie poleceń lokalnie
-    echo "$sudo_pswd" | sudo -S bash -c "$commands_to_execute"
+    local_sudo bash -c "$commands_to_execute"
 
     # Copy the certificate from /etc/ to the project directory
     # Kopiowanie certyfikatu z /etc/ do katalogu projektu
     echo "---"
     echo "Copying local mumble.cer certificate..."
     echo "Kopiuję lokalny certyfikat mumble.cer..."
-    echo "$sudo_pswd" | sudo -S cp "/etc/mumble.cer" "$cert_dir/mumble.cer"
-    echo "$sudo_pswd" | sudo -S chmod 755 "$cert_dir/mumble.cer"
+    local_sudo cp "/etc/mumble.cer" "$cert_dir/mumble.cer"
+    local_sudo chmod 755 "$cert_dir/mumble.cer"
     echo "Certificate copied to '$cert_dir'."
     echo "Certyfikat skopiowany do '$cert_dir'."
 
@@ -119,4 +122,8 @@ fi
 echo "---"
 echo "Process completed successfully!"
 echo "Proces zakończony pomyślnie!"
-sleep 5
\ No newline at end of file
+# No pause when running unattended (BLOX_HEADLESS=1, see console.py)
+# Bez pauzy przy pracy bezobsługowej (BLOX_HEADLESS=1, zob. console.py)
+if [ "${BLOX_HEADLESS:-0}" != "1" ]; then
+    sleep 5
+fi
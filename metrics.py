@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# =====================================================================================
+# === TIMING SPANS OF A PROVISIONING RUN: JSONL TRACE, PROMETHEUS TEXTFILE, SUMMARY ===
+# === ODCINKI CZASOWE PRZEBIEGU: ŚLAD JSONL, PLIK TEKSTOWY PROMETHEUS, PODSUMOWANIE ===
+# =====================================================================================
+
+import json
+import math
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+DEFAULT_TRACE_PATH = os.path.join(".cache", "metrics", "trace.jsonl")
+DEFAULT_PROMETHEUS_PATH = os.path.join(".cache", "metrics", "blox_provisioning.prom")
+
+# Recorder of the current run; spans are not recorded when none is active
+# Rejestrator bieżącego przebiegu; gdy żaden nie jest aktywny, odcinki nie są zapisywane
+_active = None
+# Names of the spans open in the current thread, so nested spans get a dotted name (e.g. 'cert.remote_exec')
+# Nazwy odcinków otwartych w bieżącym wątku, aby zagnieżdżone miały nazwę z kropką (np. 'cert.remote_exec')
+_open_spans = threading.local()
+
+
+# =====================================================================================
+# === HELPER FUNCTIONS ===
+# === FUNKCJE POMOCNICZE ===
+# =====================================================================================
+
+def percentile(values, fraction):
+    """
+    Returns the nearest-rank percentile of the values (fraction 0.5 = median).
+
+    Zwraca percentyl najbliższej rangi z wartości (fraction 0.5 = mediana).
+    """
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    rank = min(max(1, math.ceil(fraction * len(ordered))), len(ordered))
+    return ordered[rank - 1]
+
+
+def summarize(spans):
+    """
+    Returns {span name: {'count', 'p50', 'p95', 'max', 'total'}} of span records.
+
+    Zwraca {nazwa odcinka: {'count', 'p50', 'p95', 'max', 'total'}} z zapisów odcinków.
+    """
+    durations = {}
+    for record in spans:
+        durations.setdefault(record["span"], []).append(record["seconds"])
+    return {name: {"count": len(values), "p50": percentile(values, 0.5), "p95": percentile(values, 0.95),
+                   "max": max(values), "total": sum(values)}
+            for name, values in durations.items()}
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+@contextmanager
+def span(name, **fields):
+    """
+    Measures the enclosed block as one span of the active run (no-op without one).
+    Inside another span of the same thread the name becomes '<outer>.<name>'.
+
+    Mierzy objęty blok jako jeden odcinek aktywnego przebiegu (bez przebiegu nic nie robi).
+    Wewnątrz innego odcinka tego samego wątku nazwa przyjmuje postać '<zewnętrzny>.<nazwa>'.
+    """
+    recorder = _active
+    if recorder is None:
+        yield
+        return
+    stack = getattr(_open_spans, "names", None)
+    if stack is None:
+        stack = _open_spans.names = []
+    full_name = f"{stack[-1]}.{name}" if stack else name
+    stack.append(full_name)
+    started_at, started = time.time(), time.perf_counter()
+    status = "ok"
+    try:
+        yield
+    except BaseException:
+        status = "error"
+        raise
+    finally:
+        stack.pop()
+        recorder.record(full_name, time.perf_counter() - started, started_at, status, **fields)
+
+
+def record_span(name, seconds, **fields):
+    """
+    Records an already measured span of the active run, nested like span().
+
+    Zapisuje już zmierzony odcinek aktywnego przebiegu, zagnieżdżony jak w span().
+    """
+    recorder = _active
+    if recorder is None:
+        return
+    stack = getattr(_open_spans, "names", None)
+    full_name = f"{stack[-1]}.{name}" if stack else name
+    recorder.record(full_name, seconds, time.time() - seconds, "ok", **fields)
+
+
+def timed_handler(name, handler, batch=False):
+    """
+    Wraps a pipeline stage handler so every call is one span with the user (or the
+    users of a batch).
+
+    Opakowuje funkcję obsługi etapu potoku tak, aby każde wywołanie było jednym
+    odcinkiem z użytkownikiem (lub użytkownikami paczki).
+    """
+    def run(item):
+        users = [job.client_name for job in item] if batch else item.client_name
+        with span(name, user=users):
+            return handler(item)
+    return run
+
+
+# =====================================================================================
+# === RUN METRICS CLASS ===
+# === KLASA METRYK PRZEBIEGU ===
+# =====================================================================================
+
+class RunMetrics:
+    """
+    Collects the timing spans of one provisioning run. Every span is appended to the
+    JSONL trace as soon as it ends; finish() writes the Prometheus textfile (for the
+    node_exporter textfile collector) and returns the per-span p50/p95/max summary.
+    Safe to use from several threads.
+
+    Zbiera odcinki czasowe jednego przebiegu. Każdy odcinek jest dopisywany do śladu
+    JSONL zaraz po zakończeniu; finish() zapisuje plik tekstowy Prometheus (dla
+    kolektora textfile node_exportera) i zwraca podsumowanie p50/p95/max dla odcinków.
+    Bezpieczny w użyciu z wielu wątków.
+    """
+
+    def __init__(self, trace_path=DEFAULT_TRACE_PATH, prometheus_path=DEFAULT_PROMETHEUS_PATH):
+        self.run_id = uuid.uuid4().hex[:12]
+        self.trace_path = trace_path
+        self.prometheus_path = prometheus_path
+        self.spans = []
+        self.started_at = time.time()
+        self._started = time.perf_counter()
+        self._lock = threading.Lock()
+        self._trace = None
+        if trace_path:
+            os.makedirs(os.path.dirname(trace_path) or ".", exist_ok=True)
+            self._trace = open(trace_path, 'a', encoding='utf-8')
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        Returns the recorder configured in 'execution.metrics', or None if it is disabled.
+
+        Zwraca rejestrator skonfigurowany w 'execution.metrics' lub None, jeśli jest wyłączony.
+        """
+        settings = (config.get('execution') or {}).get('metrics') or {}
+        if not settings.get('enabled', True):
+            return None
+        return cls(settings.get('trace', DEFAULT_TRACE_PATH), settings.get('prometheus_textfile', DEFAULT_PROMETHEUS_PATH))
+
+    def activate(self):
+        """
+        Makes this the recorder of span() and record_span() in every module.
+
+        Ustawia ten rejestrator jako używany przez span() i record_span() we wszystkich modułach.
+        """
+        global _active
+        _active = self
+        return self
+
+    def record(self, name, seconds, started_at, status="ok", **fields):
+        entry = {"run": self.run_id, "span": name, "start": round(started_at, 6), "seconds": round(seconds, 6),
+                 "status": status}
+        entry.update(fields)
+        with self._lock:
+            self.spans.append(entry)
+            if self._trace is not None:
+                self._trace.write(json.dumps(entry, ensure_ascii=False, default=str) + "\n")
+                self._trace.flush()
+
+    def finish(self, succeeded, failed=0):
+        """
+        Ends the run: deactivates the recorder, closes the trace, writes the Prometheus
+        textfile and returns the summary
+        {'spans': summarize(), 'seconds', 'succeeded', 'failed', 'users_per_minute'}.
+
+        Kończy przebieg: wyłącza rejestrator, zamyka ślad, zapisuje plik Prometheus
+        i zwraca podsumowanie
+        {'spans': summarize(), 'seconds', 'succeeded', 'failed', 'users_per_minute'}.
+        """
+        global _active
+        if _active is self:
+            _active = None
+        seconds = time.perf_counter() - self._started
+        with self._lock:
+            result = {"run": self.run_id, "spans": summarize(self.spans), "seconds": seconds,
+                      "succeeded": succeeded, "failed": failed,
+                      "users_per_minute": succeeded * 60.0 / seconds if seconds > 0 else 0.0}
+            if self._trace is not None:
+                self._trace.close()
+                self._trace = None
+        if self.prometheus_path:
+            self.write_prometheus(result)
+        return result
+
+    def write_prometheus(self, result):
+        """
+        Writes the summary in the Prometheus text format, atomically, as the textfile
+        collector expects.
+
+        Zapisuje podsumowanie w formacie tekstowym Prometheus, atomowo, jak tego
+        oczekuje kolektor textfile.
+        """
+        lines = [
+            "# HELP blox_stage_duration_seconds Duration of the provisioning stages in the last run.",
+            "# TYPE blox_stage_duration_seconds summary",
+        ]
+        for name, row in sorted(result["spans"].items()):
+            stage = _label(name)
+            lines += [f'blox_stage_duration_seconds{{stage="{stage}",quantile="0.5"}} {row["p50"]:.6f}',
+                      f'blox_stage_duration_seconds{{stage="{stage}",quantile="0.95"}} {row["p95"]:.6f}',
+                      f'blox_stage_duration_seconds_sum{{stage="{stage}"}} {row["total"]:.6f}',
+                      f'blox_stage_duration_seconds_count{{stage="{stage}"}} {row["count"]}']
+        lines += ["# HELP blox_stage_duration_max_seconds Longest span of each stage in the last run.",
+                  "# TYPE blox_stage_duration_max_seconds gauge"]
+        lines += [f'blox_stage_duration_max_seconds{{stage="{_label(name)}"}} {row["max"]:.6f}'
+                  for name, row in sorted(result["spans"].items())]
+        lines += [
+            "# HELP blox_run_users Users of the last run by outcome.",
+            "# TYPE blox_run_users gauge",
+            f'blox_run_users{{status="succeeded"}} {result["succeeded"]}',
+            f'blox_run_users{{status="failed"}} {result["failed"]}',
+            "# HELP blox_run_duration_seconds Duration of the last run.",
+            "# TYPE blox_run_duration_seconds gauge",
+            f"blox_run_duration_seconds {result['seconds']:.6f}",
+            "# HELP blox_run_users_per_minute Provisioned users per minute in the last run.",
+            "# TYPE blox_run_users_per_minute gauge",
+            f"blox_run_users_per_minute {result['users_per_minute']:.6f}",
+            "# HELP blox_run_last_timestamp_seconds End time of the last run.",
+            "# TYPE blox_run_last_timestamp_seconds gauge",
+            f"blox_run_last_timestamp_seconds {time.time():.3f}",
+        ]
+        os.makedirs(os.path.dirname(self.prometheus_path) or ".", exist_ok=True)
+        temp_path = f"{self.prometheus_path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(temp_path, self.prometheus_path)
+
+
+def print_metrics(result):
+    """
+    Prints the p50/p95/max table of the spans and the users per minute.
+
+    Wyświetla tabelę p50/p95/max odcinków i liczbę użytkowników na minutę.
+    """
+    print("---")
+    print("Stage timings / Czasy etapów (s):")
+    print(f"  {'stage / etap':<30} {'count':>6} {'p50':>8} {'p95':>8} {'max':>8} {'total':>9}")
+    for name, row in sorted(result["spans"].items(), key=lambda item: -item[1]["total"]):
+        print(f"  {name:<30} {row['count']:>6} {row['p50']:>8.3f} {row['p95']:>8.3f} {row['max']:>8.3f} "
+              f"{row['total']:>9.3f}")
+    print(f"Users per minute: {result['users_per_minute']:.1f} ({result['succeeded']} in {result['seconds']:.1f} s)")
+    print(f"Użytkowników na minutę: {result['users_per_minute']:.1f} ({result['succeeded']} w {result['seconds']:.1f} s)")
+
+
+# =====================================================================================
+# === SCRIPT ENTRY POINT ===
+# === PUNKT WEJŚCIA DO SKRYPTU ===
+# =====================================================================================
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Prints the stage timings of a run recorded in the JSONL trace (the last one by default).",
+        epilog="Example: python3 metrics.py --trace .cache/metrics/trace.jsonl"
+    )
+    parser.add_argument("--trace", default=DEFAULT_TRACE_PATH, help="Path to the trace. (Ścieżka do śladu)")
+    parser.add_argument("--run", help="Run identifier. (Identyfikator przebiegu)")
+    args = parser.parse_args()
+
+    runs = {}
+    try:
+        with open(args.trace, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    runs.setdefault(entry["run"], []).append(entry)
+    except FileNotFoundError:
+        print(f"ERROR: Trace '{args.trace}' not found.")
+        print(f"BŁĄD: Nie znaleziono śladu '{args.trace}'.")
+        exit(1)
+    run_id = args.run or (list(runs)[-1] if runs else None)
+    if run_id not in runs:
+        print(f"ERROR: No spans of the run '{run_id}' in '{args.trace}'.")
+        print(f"BŁĄD: Brak odcinków przebiegu '{run_id}' w '{args.trace}'.")
+        exit(1)
+    spans = runs[run_id]
+    seconds = max(s["start"] + s["seconds"] for s in spans) - min(s["start"] for s in spans)
+    users = {s["user"] for s in spans if s["span"] == "package" and s["status"] == "ok" and isinstance(s.get("user"), str)}
+    print(f"Run / Przebieg: {run_id}")
+    print_metrics({"spans": summarize(spans), "seconds": seconds, "succeeded": len(users),
+                   "users_per_minute": len(users) * 60.0 / seconds if seconds > 0 else 0.0})
@@ -0,0 +1,400 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# =====================================================================================
+# === DURABLE E-MAIL OUTBOX WITH A BACKGROUND SENDER ===
+# === TRWAŁA KOLEJKA WYCHODZĄCYCH E-MAILI Z WYSYŁKĄ W TLE ===
+# =====================================================================================
+
+import datetime
+import sqlite3
+import threading
+import time
+
+from ledger import file_sha256
+from metrics import span
+from user_job import UserJob
+
+DEFAULT_OUTBOX_PATH = "outbox.sqlite3"
+DEFAULT_MAX_ATTEMPTS = 8
+DEFAULT_RETRY_DELAY = 60
+DEFAULT_POLL_INTERVAL = 5
+
+# A message left in 'sending' for this long belongs to a process that died while sending
+# Wiadomość pozostawiona w stanie 'sending' tak długo należy do procesu, który przerwał wysyłkę
+_STALE_SENDING_SECONDS = 600
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id              INTEGER PRIMARY KEY AUTOINCREMENT,
+    username        TEXT NOT NULL,
+    email           TEXT NOT NULL,
+    registered_at   TEXT NOT NULL,
+    user_type       TEXT NOT NULL,
+    package_path    TEXT NOT NULL,
+    package_sha256  TEXT,
+    state           TEXT NOT NULL DEFAULT 'pending',
+    attempts        INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL DEFAULT 0,
+    claimed_at      REAL,
+    last_error      TEXT,
+    message_id      TEXT,
+    created_at      TEXT NOT NULL,
+    sent_at         TEXT,
+    UNIQUE (username, email, registered_at)
+)
+"""
+
+
+# =====================================================================================
+# === HELPER FUNCTIONS ===
+# === FUNKCJE POMOCNICZE ===
+# =====================================================================================
+
+def _now():
+    return datetime.datetime.now().isoformat(timespec='seconds')
+
+
+def outbox_settings(config):
+    """
+    Returns the 'email.outbox' section of the configuration (may be empty).
+
+    Zwraca sekcję 'email.outbox' konfiguracji (może być pusta).
+    """
+    return (config.get('email') or {}).get('outbox') or {}
+
+
+def job_from_row(row):
+    """
+    Rebuilds the user job of an outbox entry.
+
+    Odtwarza zadanie użytkownika z wpisu kolejki.
+    """
+    return UserJob(row['id'], row['username'], row['email'], row['registered_at'], row['user_type'])
+
+
+# =====================================================================================
+# === OUTBOX CLASS ===
+# === KLASA KOLEJKI WYCHODZĄCEJ ===
+# =====================================================================================
+
+class Outbox:
+    """
+    E-mails waiting to be sent, stored in SQLite: the recipient, a reference to the
+    package (path and SHA-256) and the delivery state ('pending', 'sending', 'sent',
+    'failed'). Entries survive restarts and are sent by OutboxWorker. Safe to use
+    from several threads.
+
+    E-maile oczekujące na wysłanie, zapisane w SQLite: odbiorca, odwołanie do paczki
+    (ścieżka i SHA-256) i stan dostarczenia ('pending', 'sending', 'sent', 'failed').
+    Wpisy przetrwają restart i są wysyłane przez OutboxWorker. Bezpieczna w użyciu
+    z wielu wątków.
+    """
+
+    def __init__(self, path=DEFAULT_OUTBOX_PATH, max_attempts=DEFAULT_MAX_ATTEMPTS, retry_delay=DEFAULT_RETRY_DELAY):
+        self.path = path
+        self.max_attempts = max(1, int(max_attempts))
+        self.retry_delay = float(retry_delay)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._connection.row_factory = sqlite3.Row
+        with self._connection:
+            self._connection.execute(_SCHEMA)
+            # Messages claimed by a process that did not finish are sent again
+            # Wiadomości pobrane przez proces, który nie skończył, są wysyłane ponownie
+            self._connection.execute(
+                "UPDATE outbox SET state = 'pending', claimed_at = NULL WHERE state = 'sending' AND claimed_at < ?",
+                (time.time() - _STALE_SENDING_SECONDS,)
+            )
+
+    @classmethod
+    def from_config(cls, config):
+        settings = outbox_settings(config)
+        return cls(settings.get('path', DEFAULT_OUTBOX_PATH), settings.get('max_attempts', DEFAULT_MAX_ATTEMPTS),
+                   settings.get('retry_delay', DEFAULT_RETRY_DELAY))
+
+    def close(self):
+        self._connection.close()
+
+    def _find(self, job):
+        return self._connection.execute(
+            "SELECT * FROM outbox WHERE username = ? AND email = ? AND registered_at = ?",
+            (job.client_name, job.email_address, job.registration_date)
+        ).fetchone()
+
+    def enqueue(self, job, package_path, package_sha256=None):
+        """
+        Queues the package of the job for sending and returns the entry. A job that is
+        already queued is not added twice; a failed one (or one with a new package) is
+        queued again, a sent one is left as it is.
+
+        Dodaje paczkę zadania do kolejki wysyłki i zwraca wpis. Zadanie już obecne
+        w kolejce nie jest dodawane drugi raz; nieudane (lub z nową paczką) jest dodawane
+        ponownie, a wysłane pozostaje bez zmian.
+        """
+        with self._lock, self._connection:
+            row = self._find(job)
+            if row is None:
+                self._connection.execute(
+                    "INSERT INTO outbox (username, email, registered_at, user_type, package_path, package_sha256, "
+                    "created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (job.client_name, job.email_address, job.registration_date, job.user_type,
+                     package_path, package_sha256, _now())
+                )
+            elif row['state'] == 'failed' or (row['state'] == 'pending' and row['package_sha256'] != package_sha256):
+                self._connection.execute(
+                    "UPDATE outbox SET state = 'pending', attempts = 0, next_attempt_at = 0, last_error = NULL, "
+                    "package_path = ?, package_sha256 = ? WHERE id = ?",
+                    (package_path, package_sha256, row['id'])
+                )
+            return self._find(job)
+
+    def claim_due(self, limit):
+        """
+        Marks up to 'limit' pending entries whose retry time has come as 'sending'
+        and returns them. Entries claimed by another process are not returned.
+
+        Oznacza do 'limit' oczekujących wpisów, dla których nadszedł czas ponowienia,
+        jako 'sending' i je zwraca. Wpisy pobrane przez inny proces nie są zwracane.
+        """
+        now = time.time()
+        claimed = []
+        with self._lock, self._connection:
+            rows = self._connection.execute(
+                "SELECT * FROM outbox WHERE state = 'pending' AND next_attempt_at <= ? ORDER BY id LIMIT ?",
+                (now, limit)
+            ).fetchall()
+            for row in rows:
+                updated = self._connection.execute(
+                    "UPDATE outbox SET state = 'sending', claimed_at = ? WHERE id = ? AND state = 'pending'",
+                    (now, row['id'])
+                ).rowcount
+                if updated:
+                    claimed.append(row)
+        return claimed
+
+    def mark_sent(self, entry_id, message_id):
+        with self._lock, self._connection:
+            self._connection.execute(
+                "UPDATE outbox SET state = 'sent', message_id = ?, sent_at = ?, attempts = attempts + 1, "
+                "last_error = NULL, claimed_at = NULL WHERE id = ?",
+                (message_id, _now(), entry_id)
+            )
+
+    def mark_failed(self, entry_id, error):
+        """
+        Records a failed attempt. The entry is retried after an exponentially growing
+        delay, or marked 'failed' after max_attempts attempts.
+
+        Zapisuje nieudaną próbę. Wpis jest ponawiany po wykładniczo rosnącym opóźnieniu
+        lub oznaczany jako 'failed' po max_attempts próbach.
+        """
+        with self._lock, self._connection:
+            attempts = self._connection.execute("SELECT attempts FROM outbox WHERE id = ?",
+                                                (entry_id,)).fetchone()['attempts'] + 1
+            state = 'failed' if attempts >= self.max_attempts else 'pending'
+            next_attempt_at = time.time() + min(3600.0, self.retry_delay * (2 ** (attempts - 1)))
+            self._connection.execute(
+                "UPDATE outbox SET state = ?, attempts = ?, next_attempt_at = ?, last_error = ?, claimed_at = NULL "
+                "WHERE id = ?",
+                (state, attempts, next_attempt_at, str(error), entry_id)
+            )
+            return state
+
+    def retry_failed(self):
+        """
+        Queues all 'failed' entries again and returns their number.
+
+        Ponownie dodaje do kolejki wszystkie wpisy 'failed' i zwraca ich liczbę.
+        """
+        with self._lock, self._connection:
+            return self._connection.execute(
+                "UPDATE outbox SET state = 'pending', attempts = 0, next_attempt_at = 0 WHERE state = 'failed'"
+            ).rowcount
+
+    def counts(self):
+        with self._lock:
+            rows = self._connection.execute("SELECT state, COUNT(*) AS n FROM outbox GROUP BY state").fetchall()
+        return {row['state']: row['n'] for row in rows}
+
+    def rows(self):
+        with self._lock:
+            return self._connection.execute("SELECT * FROM outbox ORDER BY id").fetchall()
+
+
+# =====================================================================================
+# === BACKGROUND SENDER ===
+# === WYSYŁKA W TLE ===
+# =====================================================================================
+
+class OutboxWorker:
+    """
+    Drains the outbox: sends the due entries through email_sender.GmailDelivery,
+    records the outcome and calls on_sent(job, message_id) for every delivered
+    message. Can run in a background thread (start/stop) or step by step (run_once).
+
+    Opróżnia kolejkę: wysyła wpisy, na które przyszedł czas, przez
+    email_sender.GmailDelivery, zapisuje wynik i wywołuje on_sent(zadanie, id_wiadomości)
+    dla każdej dostarczonej wiadomości. Może działać w wątku w tle (start/stop)
+    lub krok po kroku (run_once).
+    """
+
+    def __init__(self, outbox, config, delivery=None, on_sent=None, poll_interval=None):
+        if delivery is None:
+            from email_sender import GmailDelivery
+            delivery = GmailDelivery(config)
+        self.outbox = outbox
+        self.delivery = delivery
+        self.on_sent = on_sent
+        self.poll_interval = float(poll_interval if poll_interval is not None
+                                   else outbox_settings(config).get('poll_interval', DEFAULT_POLL_INTERVAL))
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._draining = False
+        self._thread = None
+
+    def _send_entry(self, row):
+        """
+        Sends one claimed entry and records the outcome in the outbox.
+
+        Wysyła jeden pobrany wpis i zapisuje wynik w kolejce.
+        """
+        job = job_from_row(row)
+        try:
+            if row['package_sha256'] and file_sha256(row['package_path']) != row['package_sha256']:
+                raise RuntimeError(f"the package is missing or changed after it was queued: {row['package_path']}")
+            with span("email_send", user=job.client_name):
+                result = self.delivery.send(job, row['package_path'])
+            error = result.error
+        except Exception as e:
+            result, error = None, str(e)
+
+        if error is None:
+            self.outbox.mark_sent(row['id'], result.message_id)
+            if self.on_sent:
+                self.on_sent(job, result.message_id)
+            return True
+
+        state = self.outbox.mark_failed(row['id'], error)
+        if state == 'failed':
+            print(f"ERROR: Giving up on the e-mail to {job.email_address}: {error}")
+            print(f"BŁĄD: Rezygnuję z wysyłki e-maila do {job.email_address}: {error}")
+        return False
+
+    def run_once(self):
+        """
+        Sends every entry that is due now, in parallel groups of delivery.workers,
+        and returns the number of processed entries.
+
+        Wysyła każdy wpis, na który przyszedł czas, równolegle w grupach po
+        delivery.workers, i zwraca liczbę przetworzonych wpisów.
+        """
+        from concurrent.futures import ThreadPoolExecutor
+
+        processed = 0
+        with ThreadPoolExecutor(max_workers=self.delivery.workers, thread_name_prefix="outbox") as pool:
+            while not self._stop.is_set() or self._draining:
+                rows = self.outbox.claim_due(self.delivery.workers)
+                if not rows:
+                    break
+                processed += len(list(pool.map(self._send_entry, rows)))
+        return processed
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"ERROR: Outbox worker: {e}")
+                print(f"BŁĄD: Wątek kolejki wychodzącej: {e}")
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+    def wake(self):
+        """
+        Asks the background worker to look at the outbox now (e.g. right after enqueue).
+
+        Prosi wątek w tle o natychmiastowe sprawdzenie kolejki (np. zaraz po dodaniu wpisu).
+        """
+        self._wake.set()
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="outbox-worker", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, drain=True):
+        """
+        Stops the background worker. With drain=True the entries due now are sent
+        first; entries waiting for a later retry stay in the outbox for the next run.
+
+        Zatrzymuje wątek w tle. Przy drain=True najpierw wysyłane są wpisy, na które
+        przyszedł czas; wpisy czekające na późniejsze ponowienie zostają w kolejce
+        na kolejny przebieg.
+        """
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if drain:
+            self._draining = True
+            try:
+                self.run_once()
+            finally:
+                self._draining = False
+
+
+# =====================================================================================
+# === SCRIPT ENTRY POINT ===
+# === PUNKT WEJŚCIA DO SKRYPTU ===
+# =====================================================================================
+
+if __name__ == "__main__":
+    import argparse
+    from config_loader import load_config
+    from ledger import Ledger, DEFAULT_LEDGER_PATH
+
+    parser = argparse.ArgumentParser(
+        description="Shows or sends the e-mails queued by start.py.",
+        epilog="Example: python3 outbox.py run --forever"
+    )
+    parser.add_argument("action", choices=["status", "run", "retry"], help="Action to perform. (Akcja do wykonania)")
+    parser.add_argument("--forever", action="store_true",
+                        help="With 'run': keep waiting for new and retried e-mails. "
+                             "(Przy 'run': czekaj dalej na nowe i ponawiane e-maile)")
+    args = parser.parse_args()
+
+    config_data = load_config()
+    if not config_data:
+        exit(1)
+    outbox = Outbox.from_config(config_data)
+
+    if args.action == "status":
+        for row in outbox.rows():
+            error = f"  ! {row['last_error']}" if row['last_error'] and row['state'] != 'sent' else ""
+            print(f"{row['id']:>5} {row['state']:<8} {row['attempts']:>2}x  {row['username']:<24} {row['email']}{error}")
+        counts = ", ".join(f"{state}: {number}" for state, number in sorted(outbox.counts().items()))
+        print(f"\n{counts or 'empty / pusta'}")
+    elif args.action == "retry":
+        count = outbox.retry_failed()
+        print(f"Queued again: {count}")
+        print(f"Ponownie w kolejce: {count}")
+    else:
+        ledger = Ledger((config_data.get('paths') or {}).get('ledger') or DEFAULT_LEDGER_PATH)
+        worker = OutboxWorker(outbox, config_data, on_sent=lambda job, message_id: ledger.record(job, "email", message_id))
+        if args.forever:
+            worker.start()
+            try:
+                while True:
+                    time.sleep(3600)
+            except KeyboardInterrupt:
+                worker.stop(drain=False)
+        else:
+            worker.run_once()
+        ledger.close()
+        counts = ", ".join(f"{state}: {number}" for state, number in sorted(outbox.counts().items()))
+        print(f"Outbox: {counts}")
+        print(f"Kolejka wychodząca: {counts}")
+    outbox.close()
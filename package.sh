@@ -22,11 +22,14 @@ echo "---"
 echo "Loading configuration..."
 echo "Wczytuję konfigurację..."
 
-# Read data from the nested YAML structure
-# Odczyt danych z zagnieżdżonej struktury YAML
-client_name=$(yq '.user_management.state.client_name' "$CONFIG_FILE")
-project_root=$(yq -r '.paths.project_root' "$CONFIG_FILE")
-certs_dir=$(yq -r '.paths.preferences_output' "$CONFIG_FILE")
+# Shared helpers: the configuration (blox_load_config_env) and the multiplexed SSH connection
+# Wspólne funkcje: konfiguracja (blox_load_config_env) i współdzielone połączenie SSH
+source "$(dirname "$0")/remote_lib.sh"
+blox_load_config_env "$CONFIG_FILE"
+
+client_name="${1:-$BLOX_CLIENT_NAME}"
+project_root="$BLOX_PROJECT_ROOT"
+certs_dir="$BLOX_PREFERENCES_OUTPUT"
 # Define the source directory for the package from the project root
 # Zdefiniuj katalog źródłowy paczki na podstawie katalogu głównego projektu
 package_source_dir="${project_root}IUCP-IPPU_PACKAGE"
@@ -59,9 +62,12 @@ archive_name="../IUCP-IPPU_PACKAGE_${client_name}.zip"
 # Usuń stare archiwum, jeśli istnieje, aby uniknąć problemów
 rm -f "$archive_name"
 
-# Zip the contents, excluding logs and temporary files
-# Spakuj zawartość, wykluczając logi i pliki tymczasowe
-zip -r "$archive_name" . -x \*.log \*.tmp
+# Zip the contents, excluding logs, temporary files and certificates.
+# Other users' certificates may already be waiting here, so only this client's one is added.
+# Spakuj zawartość, wykluczając logi, pliki tymczasowe i certyfikaty.
+# Mogą tu już czekać certyfikaty innych użytkowników, więc dodawany jest tylko certyfikat tego klienta.
+zip -r "$archive_name" . -x \*.log \*.tmp \*.p12
+zip "$archive_name" "certs/truststore-root.p12" "certs/${client_name}.p12"
 
 # Return to the previous directory
 # Wróć do poprzedniego katalogu
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# =====================================================================================
+# === USER PACKAGE BUILDER (ZIP FROM A PRECOMPRESSED TEMPLATE) ===
+# === BUDOWANIE PACZEK UŻYTKOWNIKÓW (ZIP Z WSTĘPNIE SKOMPRESOWANEGO SZABLONU) ===
+# =====================================================================================
+
+import fnmatch
+import io
+import os
+import stat
+import struct
+import threading
+import time
+import zlib
+
+from tak_certs import TRUSTSTORE_FILENAME
+
+# Files of the package directory that are never packed (same as the 'zip -x' list of package.sh)
+# Pliki katalogu paczki, które nigdy nie są pakowane (jak lista 'zip -x' w package.sh)
+EXCLUDED_PATTERNS = ("*.log", "*.tmp", "*.p12")
+CERTS_SUBDIR = "certs"
+
+_LOCAL_HEADER = struct.Struct("<IHHHHHIIIHH")
+_CENTRAL_HEADER = struct.Struct("<IHHHHHHIIIHHHHHII")
+_END_OF_CENTRAL_DIRECTORY = struct.Struct("<IHHHHIIH")
+_VERSION_NEEDED = 20
+_VERSION_MADE_BY = (3 << 8) | 20  # Unix, zip 2.0
+_UTF8_FLAG = 0x0800
+_DEFLATED = 8
+_ZIP32_LIMIT = 0xFFFFFFFF
+
+
+# =====================================================================================
+# === HELPER FUNCTIONS ===
+# === FUNKCJE POMOCNICZE ===
+# =====================================================================================
+
+def _dos_timestamp(mtime):
+    """
+    Converts a file modification time to the (time, date) pair stored in zip headers.
+
+    Zamienia czas modyfikacji pliku na parę (czas, data) zapisywaną w nagłówkach zip.
+    """
+    t = time.localtime(max(mtime, 315532800))  # zip dates start in 1980 / daty zip zaczynają się w 1980
+    return ((t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2),
+            ((t.tm_year - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday)
+
+
+def _compress(data):
+    compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+    return compressor.compress(data) + compressor.flush()
+
+
+class _Entry:
+    """
+    One precompressed archive entry: everything needed to copy it into a zip as raw bytes.
+
+    Jeden wstępnie skompresowany wpis archiwum: wszystko, co potrzebne do skopiowania
+    go do pliku zip jako surowe bajty.
+    """
+
+    def __init__(self, name, data, mtime, mode):
+        self.name = name.encode("utf-8")
+        self.crc = zlib.crc32(data)
+        self.size = len(data)
+        self.mode = mode
+        self.dos_time, self.dos_date = _dos_timestamp(mtime)
+        if stat.S_ISDIR(mode):
+            self.method, self.payload = 0, b""
+        else:
+            self.method, self.payload = _DEFLATED, _compress(data)
+        if self.size > _ZIP32_LIMIT or len(self.payload) > _ZIP32_LIMIT:
+            raise ValueError(f"'{name}' is too large for a package")
+
+    def local_header(self):
+        return _LOCAL_HEADER.pack(0x04034B50, _VERSION_NEEDED, _UTF8_FLAG, self.method, self.dos_time,
+                                  self.dos_date, self.crc, len(self.payload), self.size, len(self.name), 0) + self.name
+
+    def central_header(self, offset):
+        return _CENTRAL_HEADER.pack(0x02014B50, _VERSION_MADE_BY, _VERSION_NEEDED, _UTF8_FLAG, self.method,
+                                    self.dos_time, self.dos_date, self.crc, len(self.payload), self.size,
+                                    len(self.name), 0, 0, 0, 0, self.external_attributes(), offset) + self.name
+
+    def external_attributes(self):
+        # Unix mode in the high word, MS-DOS directory bit in the low one
+        # Tryb Unix w starszym słowie, bit katalogu MS-DOS w młodszym
+        return ((self.mode & 0xFFFF) << 16) | (0x10 if stat.S_ISDIR(self.mode) else 0)
+
+
+# =====================================================================================
+# === PACKAGE BUILDER CLASS ===
+# === KLASA BUDOWANIA PACZEK ===
+# =====================================================================================
+
+class PackageBuilder:
+    """
+    Builds the per-user zip packages. The shared files of the package directory
+    (maps, config.pref, truststore-root.p12) are compressed once into a template kept
+    in memory; each package is then written by copying the compressed template entries
+    as raw bytes and compressing only the client's certificate. A template entry is
+    compressed again only when the content of its file really changes. Safe to use
+    from several threads.
+
+    Buduje paczki zip dla użytkowników. Wspólne pliki katalogu paczki (mapy,
+    config.pref, truststore-root.p12) są kompresowane raz do szablonu trzymanego
+    w pamięci; każda paczka jest następnie zapisywana przez skopiowanie skompresowanych
+    wpisów szablonu jako surowych bajtów i skompresowanie tylko certyfikatu klienta.
+    Wpis szablonu jest kompresowany ponownie tylko wtedy, gdy treść jego pliku
+    faktycznie się zmieni. Bezpieczny w użyciu z wielu wątków.
+    """
+
+    def __init__(self, source_dir):
+        self.source_dir = source_dir
+        self._lock = threading.Lock()
+        # relative path -> (mtime_ns, size, _Entry)
+        # ścieżka względna -> (mtime_ns, rozmiar, _Entry)
+        self._entries = {}
+
+    def _shared_files(self):
+        """
+        Yields (archive name, path, stat) of every shared file and directory, in archive order.
+
+        Zwraca (nazwa w archiwum, ścieżka, stat) każdego wspólnego pliku i katalogu, w kolejności archiwum.
+        """
+        truststore = f"{CERTS_SUBDIR}/{TRUSTSTORE_FILENAME}"
+        for root, dirs, files in os.walk(self.source_dir):
+            dirs.sort()
+            relative_root = os.path.relpath(root, self.source_dir).replace(os.sep, "/")
+            prefix = "" if relative_root == "." else relative_root + "/"
+            if prefix:
+                yield prefix, root, os.stat(root)
+            for filename in sorted(files):
+                name = prefix + filename
+                if name != truststore and any(fnmatch.fnmatch(filename, p) for p in EXCLUDED_PATTERNS):
+                    continue
+                path = os.path.join(root, filename)
+                yield name, path, os.stat(path)
+
+    def template(self):
+        """
+        Returns the current template entries, compressing only new or changed files.
+
+        Zwraca bieżące wpisy szablonu, kompresując tylko nowe lub zmienione pliki.
+        """
+        with self._lock:
+            entries = {}
+            for name, path, info in self._shared_files():
+                cached = self._entries.get(name)
+                if cached and cached[:2] == (info.st_mtime_ns, info.st_size):
+                    entries[name] = cached
+                    continue
+                data = b""
+                if not stat.S_ISDIR(info.st_mode):
+                    with open(path, 'rb') as f:
+                        data = f.read()
+                # A rewritten file with the same content (e.g. the truststore copied again
+                # after every certificate) keeps its compressed entry
+                # Plik zapisany ponownie z tą samą treścią (np. truststore kopiowany po każdym
+                # certyfikacie) zachowuje swój skompresowany wpis
+                if cached and cached[2].crc == zlib.crc32(data) and cached[2].size == len(data):
+                    entry = cached[2]
+                else:
+                    entry = _Entry(name, data, info.st_mtime, info.st_mode)
+                entries[name] = (info.st_mtime_ns, info.st_size, entry)
+            self._entries = entries
+            return [entry for _, _, entry in entries.values()]
+
+    def write(self, fileobj, client_name, certificate_path, extra_files=None):
+        """
+        Writes the package of one client to a binary file object.
+
+        Zapisuje paczkę jednego klienta do binarnego obiektu pliku.
+
+        Args:
+            fileobj:                Writable binary file object (file, socket, BytesIO).
+                                    Binarny obiekt pliku do zapisu (plik, gniazdo, BytesIO).
+            client_name (str):      Client name; the certificate is stored as 'certs/<client>.p12'.
+                                    Nazwa klienta; certyfikat zapisywany jest jako 'certs/<klient>.p12'.
+            certificate_path (str): Path of the client's .p12 certificate.
+                                    Ścieżka do certyfikatu .p12 klienta.
+            extra_files (dict):     Further files of this client only, {archive name: bytes}
+                                    (e.g. its WireGuard configuration, see wg_peers.py).
+                                    Dodatkowe pliki tylko tego klienta, {nazwa w archiwum: bajty}
+                                    (np. jego konfiguracja WireGuard, zob. wg_peers.py).
+        """
+        info = os.stat(certificate_path)
+        with open(certificate_path, 'rb') as f:
+            certificate = _Entry(f"{CERTS_SUBDIR}/{client_name}.p12", f.read(), info.st_mtime, info.st_mode)
+        now = time.time()
+        extras = [_Entry(name, data, now, stat.S_IFREG | 0o600) for name, data in (extra_files or {}).items()]
+
+        offset = 0
+        central_directory = []
+        for entry in self.template() + [certificate] + extras:
+            header = entry.local_header()
+            fileobj.write(header)
+            fileobj.write(entry.payload)
+            central_directory.append(entry.central_header(offset))
+            offset += len(header) + len(entry.payload)
+
+        directory = b"".join(central_directory)
+        fileobj.write(directory)
+        fileobj.write(_END_OF_CENTRAL_DIRECTORY.pack(0x06054B50, 0, 0, len(central_directory),
+                                                     len(central_directory), len(directory), offset, 0))
+
+    def build(self, client_name, certificate_path, extra_files=None):
+        """
+        Returns the package of one client as bytes.
+
+        Zwraca paczkę jednego klienta jako bajty.
+        """
+        buffer = io.BytesIO()
+        self.write(buffer, client_name, certificate_path, extra_files)
+        return buffer.getvalue()
+
+    def build_file(self, client_name, certificate_path, archive_path, extra_files=None):
+        """
+        Writes the package of one client to archive_path (atomically, readable by the owner
+        only, as it holds the private keys) and returns its content.
+
+        Zapisuje paczkę jednego klienta do archive_path (atomowo, czytelną tylko dla
+        właściciela, bo zawiera klucze prywatne) i zwraca jej zawartość.
+        """
+        data = self.build(client_name, certificate_path, extra_files)
+        temp_path = archive_path + ".tmp"
+        with open(os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), 'wb') as f:
+            f.write(data)
+        os.chmod(temp_path, 0o600)
+        os.replace(temp_path, archive_path)
+        return data
+
+
+def package_source_dir(config):
+    """
+    Returns the package directory (IUCP-IPPU_PACKAGE in the project root), as used by package.sh.
+
+    Zwraca katalog paczki (IUCP-IPPU_PACKAGE w katalogu głównym projektu), jak w package.sh.
+    """
+    return os.path.join(config['paths']['project_root'], "IUCP-IPPU_PACKAGE")
+
+
+# =====================================================================================
+# === SCRIPT ENTRY POINT ===
+# === PUNKT WEJŚCIA DO SKRYPTU ===
+# =====================================================================================
+
+if __name__ == "__main__":
+    import argparse
+    from config_loader import load_config
+
+    parser = argparse.ArgumentParser(
+        description="Builds the IUCP-IPPU packages of the given clients (the Python version of package.sh).",
+        epilog="Example: python3 package_builder.py user1 user2"
+    )
+    parser.add_argument("client_names", nargs="+", help="Client names. (Nazwy klientów)")
+    args = parser.parse_args()
+
+    config_data = load_config()
+    if not config_data:
+        exit(1)
+
+    builder = PackageBuilder(package_source_dir(config_data))
+    failed = False
+    for client in args.client_names:
+        certificate = os.path.join(config_data['paths']['preferences_output'], f"{client}.p12")
+        archive = os.path.join(config_data['paths']['attachment_output'], f"IUCP-IPPU_PACKAGE_{client}.zip")
+        try:
+            builder.build_file(client, certificate, archive)
+        except OSError as e:
+            print(f"ERROR: Could not build the package of {client}: {e}")
+            print(f"BŁĄD: Nie udało się zbudować paczki dla {client}: {e}")
+            failed = True
+            continue
+        print(f"Archive '{archive}' has been created successfully.")
+        print(f"Archiwum '{archive}' zostało pomyślnie utworzone.")
+    if failed:
+        exit(1)
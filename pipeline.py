@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# =====================================================================================
+# === STAGED PROCESSING PIPELINE WITH BOUNDED QUEUES ===
+# === ETAPOWY POTOK PRZETWARZANIA Z OGRANICZONYMI KOLEJKAMI ===
+# =====================================================================================
+
+import queue
+import threading
+import time
+
+
+# Marker passed through the queues to tell the workers that no more items will come.
+# Znacznik przekazywany przez kolejki, informujący wątki, że nie będzie więcej elementów.
+_STOP = object()
+
+
+# =====================================================================================
+# === PIPELINE BUILDING BLOCKS ===
+# === ELEMENTY SKŁADOWE POTOKU ===
+# =====================================================================================
+
+class Stage:
+    """
+    A single pipeline stage: a named handler with its own concurrency limit
+    and a bounded input queue.
+
+    Pojedynczy etap potoku: nazwana funkcja obsługi z własnym limitem
+    współbieżności i ograniczoną kolejką wejściową.
+
+    Args:
+        name (str):       Stage name used in progress messages and the summary.
+                          Nazwa etapu używana w komunikatach i podsumowaniu.
+        handler:          Callable taking one item. Raising an exception marks the item as failed.
+                          Funkcja przyjmująca jeden element. Wyjątek oznacza element jako nieudany.
+        workers (int):    Number of items processed by this stage at the same time.
+                          Liczba elementów przetwarzanych jednocześnie przez ten etap.
+        queue_size (int): Maximum number of items waiting in front of this stage.
+                          Maksymalna liczba elementów oczekujących przed tym etapem.
+        batch_size (int): When greater than 1, the handler receives a list of up to this many
+                          waiting items and returns a dict {item: error} of the failed ones.
+                          Gdy większe niż 1, funkcja otrzymuje listę do tylu oczekujących elementów
+                          i zwraca słownik {element: błąd} elementów nieudanych.
+    """
+
+    def __init__(self, name, handler, workers=1, queue_size=4, batch_size=1):
+        self.name = name
+        self.handler = handler
+        self.workers = max(1, int(workers))
+        self.batch_size = max(1, int(batch_size))
+        # A batch can only be as large as the queue in front of the stage
+        # Paczka może być najwyżej tak duża jak kolejka przed etapem
+        self.queue_size = max(1, int(queue_size), self.batch_size)
+
+
+class PipelineSummary:
+    """
+    Collects the outcome of every item that went through the pipeline.
+
+    Zbiera wynik każdego elementu, który przeszedł przez potok.
+    """
+
+    def __init__(self):
+        self.succeeded = []
+        self.failed = []
+        self.started_at = time.monotonic()
+        self.finished_at = None
+        self._lock = threading.Lock()
+
+    def add_success(self, item):
+        with self._lock:
+            self.succeeded.append(item)
+
+    def add_failure(self, item, stage_name, error):
+        with self._lock:
+            self.failed.append((item, stage_name, error))
+
+    @property
+    def elapsed(self):
+        end = self.finished_at if self.finished_at is not None else time.monotonic()
+        return end - self.started_at
+
+
+# =====================================================================================
+# === MAIN PIPELINE LOGIC ===
+# === GŁÓWNA LOGIKA POTOKU ===
+# =====================================================================================
+
+def run_pipeline(items, stages, on_event=None):
+    """
+    Pushes every item through all stages in order. Each stage runs in its own
+    pool of worker threads, connected to the next stage by a bounded queue, so
+    different items can be in different stages at the same time. A failure of
+    one item is recorded and does not stop the others.
+
+    Przepuszcza każdy element kolejno przez wszystkie etapy. Każdy etap działa we
+    własnej puli wątków, połączonej z kolejnym etapem ograniczoną kolejką, więc
+    różne elementy mogą jednocześnie znajdować się w różnych etapach. Błąd jednego
+    elementu jest zapisywany i nie zatrzymuje pozostałych.
+
+    Args:
+        items:           Iterable of items to process.
+                         Elementy do przetworzenia.
+        stages (list):   List of Stage objects, in processing order.
+                         Lista obiektów Stage w kolejności przetwarzania.
+        on_event:        Optional callback on_event(event, stage_name, item, error)
+                         called with 'done' or 'failed' after every stage.
+                         Opcjonalna funkcja wywoływana z 'done' lub 'failed' po każdym etapie.
+
+    Returns:
+        PipelineSummary: Successful and failed items.
+                         Elementy zakończone sukcesem i błędem.
+    """
+    summary = PipelineSummary()
+    if not stages:
+        for item in items:
+            summary.add_success(item)
+        summary.finished_at = time.monotonic()
+        return summary
+
+    queues = [queue.Queue(maxsize=stage.queue_size) for stage in stages]
+    remaining_workers = [stage.workers for stage in stages]
+    counters_lock = threading.Lock()
+
+    def notify(event, stage, item, error=None):
+        if on_event:
+            try:
+                on_event(event, stage.name, item, error)
+            except Exception:
+                pass
+
+    def worker(index):
+        stage = stages[index]
+        inbox = queues[index]
+        outbox = queues[index + 1] if index + 1 < len(stages) else None
+
+        while True:
+            item = inbox.get()
+            if item is _STOP:
+                break
+
+            # Collect the items that are already waiting, up to the batch size
+            # Zbierz elementy, które już czekają, do rozmiaru paczki
+            batch = [item]
+            stop_seen = False
+            while len(batch) < stage.batch_size:
+                try:
+                    next_item = inbox.get_nowait()
+                except queue.Empty:
+                    break
+                if next_item is _STOP:
+                    stop_seen = True
+                    break
+                batch.append(next_item)
+
+            try:
+                if stage.batch_size > 1:
+                    failures = stage.handler(batch) or {}
+                else:
+                    stage.handler(item)
+                    failures = {}
+            except Exception as e:
+                failures = {batch_item: e for batch_item in batch}
+
+            for batch_item in batch:
+                if batch_item in failures:
+                    summary.add_failure(batch_item, stage.name, failures[batch_item])
+                    notify('failed', stage, batch_item, failures[batch_item])
+                    continue
+                notify('done', stage, batch_item)
+                if outbox is not None:
+                    outbox.put(batch_item)
+                else:
+                    summary.add_success(batch_item)
+
+            if stop_seen:
+                break
+
+        # The last worker of a stage closes the next stage
+        # Ostatni wątek etapu zamyka kolejny etap
+        with counters_lock:
+            remaining_workers[index] -= 1
+            last_worker = remaining_workers[index] == 0
+        if last_worker and outbox is not None:
+            for _ in range(stages[index + 1].workers):
+                outbox.put(_STOP)
+
+    threads = []
+    for index, stage in enumerate(stages):
+        for number in range(stage.workers):
+            thread = threading.Thread(target=worker, args=(index,), name=f"{stage.name}-{number + 1}", daemon=True)
+            thread.start()
+            threads.append(thread)
+
+    # Feeding blocks when the first queue is full, which keeps memory bounded
+    # Podawanie blokuje się, gdy pierwsza kolejka jest pełna, co ogranicza zużycie pamięci
+    for item in items:
+        queues[0].put(item)
+    for _ in range(stages[0].workers):
+        queues[0].put(_STOP)
+
+    for thread in threads:
+        thread.join()
+
+    summary.finished_at = time.monotonic()
+    return summary
@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# =====================================================================================
+# === IN-PROCESS SIGNING OF TAK CLIENT CERTIFICATES (INSTEAD OF makeCert.sh) ===
+# === PODPISYWANIE CERTYFIKATÓW KLIENTÓW TAK W PROCESIE (ZAMIAST makeCert.sh) ===
+# =====================================================================================
+
+import datetime
+import io
+import os
+import shlex
+import tarfile
+import threading
+
+from key_pool import DEFAULT_ALGORITHM, DEFAULT_KEY_SIZE, generate_key
+from tak_certs import TRUSTSTORE_FILENAME, tak_certs_dir
+
+# Same defaults as makeCert.sh and cert-metadata.sh of the TAK server
+# Te same wartości domyślne co w makeCert.sh i cert-metadata.sh serwera TAK
+DEFAULT_CA_NAME = "ca"
+DEFAULT_PASSWORD = "atakatak"
+DEFAULT_VALIDITY_DAYS = 730
+_METADATA_FILE = "metadata"
+_METADATA_FIELDS = ("COUNTRY", "STATE", "CITY", "ORGANIZATION", "ORGANIZATIONAL_UNIT", "CAPASS", "PASS")
+
+
+# =====================================================================================
+# === HELPER FUNCTIONS ===
+# === FUNKCJE POMOCNICZE ===
+# =====================================================================================
+
+def _ca_files(ca_name):
+    # makeCert.sh signs with '<ca>.pem' and '<ca>-do-not-share.key'
+    # makeCert.sh podpisuje plikami '<ca>.pem' i '<ca>-do-not-share.key'
+    return f"{ca_name}.pem", f"{ca_name}-do-not-share.key"
+
+
+def _fetch_script(certs_dir, ca_name):
+    """
+    Builds the shell script that writes the cert-metadata.sh values, the signing CA
+    and the truststore to stdout as one tar archive.
+
+    Buduje skrypt powłoki, który zapisuje wartości z cert-metadata.sh, CA
+    podpisujące i truststore na stdout jako jedno archiwum tar.
+    """
+    ca_cert, ca_key = _ca_files(ca_name)
+    variables = " ".join(f'"${name}"' for name in _METADATA_FIELDS)
+    return f"""
+        set -e
+        cd {shlex.quote(certs_dir)}
+        . ./cert-metadata.sh >/dev/null 2>&1 || true
+        out=$(mktemp -d)
+        trap 'rm -rf "$out"' EXIT
+        printf '%s\\n' {variables} > "$out/{_METADATA_FILE}"
+        cp files/{shlex.quote(ca_cert)} files/{shlex.quote(ca_key)} "$out/"
+        cp files/{TRUSTSTORE_FILENAME} "$out/" 2>/dev/null || true
+        tar -C "$out" -cf - .
+    """
+
+
+# =====================================================================================
+# === PKI ENGINE CLASS ===
+# === KLASA SILNIKA PKI ===
+# =====================================================================================
+
+class PkiEngine:
+    """
+    Issues TAK client certificates in this process. The CA is loaded once; every
+    certificate is then signed in memory with the same subject, extensions and
+    validity as 'makeCert.sh client <name>' and written as '<client>.p12' next to
+    'truststore-root.p12', both protected with the cert-metadata.sh password.
+    Keys are taken from a KeyPool (key_pool.py) when one is given, otherwise they are
+    generated in a pool of processes; key generation is the only expensive step.
+
+    Wystawia certyfikaty klientów TAK w tym procesie. CA jest wczytywane raz; każdy
+    certyfikat jest następnie podpisywany w pamięci z tym samym podmiotem,
+    rozszerzeniami i ważnością co 'makeCert.sh client <nazwa>' i zapisywany jako
+    '<klient>.p12' obok 'truststore-root.p12', oba chronione hasłem z cert-metadata.sh.
+    Klucze są pobierane z KeyPool (key_pool.py), jeśli ją podano, w przeciwnym razie
+    są generowane w puli procesów; generowanie kluczy jest jedynym kosztownym krokiem.
+    """
+
+    def __init__(self, ca_cert_pem, ca_key_pem, ca_password=DEFAULT_PASSWORD, password=None, subject=None,
+                 truststore=None, validity_days=DEFAULT_VALIDITY_DAYS, key_algorithm=DEFAULT_ALGORITHM,
+                 key_size=DEFAULT_KEY_SIZE, workers=None, legacy_p12=True, key_pool=None):
+        """
+        Args:
+            ca_cert_pem (bytes):  Signing CA certificate (PEM).
+                                  Certyfikat CA podpisującego (PEM).
+            ca_key_pem (bytes):   Signing CA private key (PEM, encrypted with ca_password or not).
+                                  Klucz prywatny CA podpisującego (PEM, zaszyfrowany ca_password lub nie).
+            password (str):       Password of the .p12 files; defaults to ca_password (PASS=$CAPASS).
+                                  Hasło plików .p12; domyślnie ca_password (PASS=$CAPASS).
+            subject (dict):       cert-metadata.sh values (COUNTRY, STATE, CITY, ORGANIZATION,
+                                  ORGANIZATIONAL_UNIT) placed before the CN.
+                                  Wartości z cert-metadata.sh umieszczane przed CN.
+            truststore (bytes):   Existing truststore-root.p12; built from the CA when missing.
+                                  Istniejący truststore-root.p12; budowany z CA, gdy go brak.
+            legacy_p12 (bool):    Encrypt the .p12 files like 'openssl pkcs12 -legacy' (3DES/SHA1),
+                                  which older ATAK versions require.
+                                  Szyfruj pliki .p12 jak 'openssl pkcs12 -legacy' (3DES/SHA1),
+                                  czego wymagają starsze wersje ATAK.
+            key_pool (KeyPool):   Source of pre-generated keys (key_pool.py), optional.
+                                  Źródło wstępnie wygenerowanych kluczy (key_pool.py), opcjonalne.
+        """
+        from cryptography import x509
+        from cryptography.hazmat.primitives import serialization
+
+        self.password = password or ca_password
+        self.validity_days = int(validity_days)
+        self.key_algorithm = key_algorithm
+        self.key_size = int(key_size)
+        self.workers = workers
+        self.legacy_p12 = legacy_p12
+        self.key_pool = key_pool
+        self.ca_cert = x509.load_pem_x509_certificate(ca_cert_pem)
+        try:
+            self.ca_key = serialization.load_pem_private_key(ca_key_pem, (ca_password or "").encode("utf-8") or None)
+        except TypeError:
+            # The key is not encrypted, but a password was given
+            # Klucz nie jest zaszyfrowany, a podano hasło
+            self.ca_key = serialization.load_pem_private_key(ca_key_pem, None)
+        self.subject_base = self._subject_base(subject or {})
+        self.truststore = truststore or self._serialize_p12(None, None, None, [self.ca_cert])
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_session(cls, session, certs_dir, ca_name=DEFAULT_CA_NAME, password=None, **options):
+        """
+        Loads the signing CA, the truststore and the cert-metadata.sh values from the TAK
+        certificates directory with one privileged command over the session. The CA key
+        stays in memory only.
+
+        Wczytuje CA podpisujące, truststore i wartości z cert-metadata.sh z katalogu
+        certyfikatów TAK jednym uprzywilejowanym poleceniem przez sesję. Klucz CA
+        pozostaje tylko w pamięci.
+        """
+        result = session.exec(_fetch_script(certs_dir, ca_name), sudo=True, check=False, text=False)
+        contents = {}
+        try:
+            with tarfile.open(fileobj=io.BytesIO(result.stdout), mode="r:") as archive:
+                for member in archive:
+                    if member.isfile():
+                        contents[os.path.basename(member.name)] = archive.extractfile(member).read()
+        except tarfile.TarError:
+            pass
+        ca_cert, ca_key = _ca_files(ca_name)
+        if result.returncode != 0 or ca_cert not in contents or ca_key not in contents:
+            reason = (result.stderr.decode("utf-8", errors="replace").strip().splitlines() or ["no output"])[-1]
+            raise RuntimeError(f"could not load the CA '{ca_name}' from {certs_dir}: {reason}")
+
+        values = contents.get(_METADATA_FILE, b"").decode("utf-8").split("\n")
+        metadata = dict(zip(_METADATA_FIELDS, values))
+        return cls(contents[ca_cert], contents[ca_key], metadata.get("CAPASS") or DEFAULT_PASSWORD,
+                   password or metadata.get("PASS"), metadata, contents.get(TRUSTSTORE_FILENAME), **options)
+
+    def _subject_base(self, metadata):
+        from cryptography.x509.oid import NameOID
+
+        fields = (("COUNTRY", NameOID.COUNTRY_NAME), ("STATE", NameOID.STATE_OR_PROVINCE_NAME),
+                  ("CITY", NameOID.LOCALITY_NAME), ("ORGANIZATION", NameOID.ORGANIZATION_NAME),
+                  ("ORGANIZATIONAL_UNIT", NameOID.ORGANIZATIONAL_UNIT_NAME))
+        return [(oid, metadata[name]) for name, oid in fields if metadata.get(name)]
+
+    def _serialize_p12(self, name, key, certificate, cas):
+        from cryptography.hazmat.primitives import hashes, serialization
+        from cryptography.hazmat.primitives.serialization import pkcs12
+
+        if self.legacy_p12:
+            encryption = (serialization.PrivateFormat.PKCS12.encryption_builder()
+                          .kdf_rounds(2048)
+                          .key_cert_algorithm(pkcs12.PBES.PBESv1SHA1And3KeyTripleDESCBC)
+                          .hmac_hash(hashes.SHA1())
+                          .build(self.password.encode("utf-8")))
+        else:
+            encryption = serialization.BestAvailableEncryption(self.password.encode("utf-8"))
+        return pkcs12.serialize_key_and_certificates(name.encode("utf-8") if name else None,
+                                                    key, certificate, cas, encryption)
+
+    def sign(self, client_name, key):
+        """
+        Signs a client certificate for the key, with the extensions of the 'client'
+        section of the TAK config.cfg.
+
+        Podpisuje certyfikat klienta dla klucza, z rozszerzeniami sekcji 'client'
+        pliku config.cfg serwera TAK.
+        """
+        from cryptography import x509
+        from cryptography.hazmat.primitives import hashes
+        from cryptography.x509.oid import ExtendedKeyUsageOID, NameOID
+
+        subject = x509.Name([x509.NameAttribute(oid, value) for oid, value in self.subject_base] +
+                            [x509.NameAttribute(NameOID.COMMON_NAME, client_name)])
+        now = datetime.datetime.now(datetime.timezone.utc)
+        builder = (x509.CertificateBuilder()
+                   .subject_name(subject)
+                   .issuer_name(self.ca_cert.subject)
+                   .public_key(key.public_key())
+                   .serial_number(x509.random_serial_number())
+                   .not_valid_before(now - datetime.timedelta(minutes=5))
+                   .not_valid_after(now + datetime.timedelta(days=self.validity_days))
+                   .add_extension(x509.BasicConstraints(ca=False, path_length=None), critical=True)
+                   .add_extension(x509.KeyUsage(digital_signature=True, content_commitment=False,
+                                                key_encipherment=True, data_encipherment=False,
+                                                key_agreement=False, key_cert_sign=False, crl_sign=False,
+                                                encipher_only=False, decipher_only=False), critical=True)
+                   .add_extension(x509.ExtendedKeyUsage([ExtendedKeyUsageOID.CLIENT_AUTH]), critical=True))
+        return builder.sign(self.ca_key, hashes.SHA256())
+
+    def _keys(self, count):
+        """
+        Returns count new private keys, generated in worker processes when there is more than one.
+
+        Zwraca count nowych kluczy prywatnych, generowanych w procesach roboczych, gdy jest ich więcej niż jeden.
+        """
+        from cryptography.hazmat.primitives import serialization
+
+        if self.key_pool is not None:
+            return [self.key_pool.take() for _ in range(count)]
+        if count == 1 or self.workers == 1:
+            keys = [generate_key(self.key_algorithm, self.key_size) for _ in range(count)]
+        else:
+            from concurrent.futures import ProcessPoolExecutor
+            with ProcessPoolExecutor(max_workers=min(count, self.workers or os.cpu_count() or 1)) as pool:
+                keys = list(pool.map(generate_key, [self.key_algorithm] * count, [self.key_size] * count))
+        return [serialization.load_der_private_key(key, None, unsafe_skip_rsa_key_validation=True) for key in keys]
+
+    def issue(self, client_names, destination_dir):
+        """
+        Issues certificates for all given names and writes '<client>.p12' and
+        'truststore-root.p12' into destination_dir.
+
+        Wystawia certyfikaty dla wszystkich podanych nazw i zapisuje '<klient>.p12'
+        oraz 'truststore-root.p12' do destination_dir.
+
+        Returns:
+            tuple: ({client_name: None or "error"}, {client_name: certificate PEM bytes}),
+                   the same result format as tak_certs.issue_certificates plus the certificates.
+                   ({nazwa_klienta: None lub "błąd"}, {nazwa_klienta: bajty PEM certyfikatu}),
+                   ten sam format wyniku co tak_certs.issue_certificates plus certyfikaty.
+        """
+        from cryptography.hazmat.primitives import serialization
+
+        client_names = list(dict.fromkeys(str(name) for name in client_names))
+        if not client_names:
+            return {}, {}
+        os.makedirs(destination_dir, exist_ok=True)
+        truststore_path = os.path.join(destination_dir, TRUSTSTORE_FILENAME)
+        with self._lock:
+            with open(truststore_path, "wb") as f:
+                f.write(self.truststore)
+        os.chmod(truststore_path, 0o644)
+
+        results = {}
+        certificates = {}
+        for name, key in zip(client_names, self._keys(len(client_names))):
+            try:
+                certificate = self.sign(name, key)
+                data = self._serialize_p12(name, key, certificate, [self.ca_cert])
+                local_path = os.path.join(destination_dir, f"{name}.p12")
+                with open(local_path, "wb") as f:
+                    f.write(data)
+                os.chmod(local_path, 0o644)
+            except (ValueError, OSError) as e:
+                results[name] = f"signing failed: {e}"
+                continue
+            results[name] = None
+            certificates[name] = certificate.public_bytes(serialization.Encoding.PEM)
+        return results, certificates
+
+
+# =====================================================================================
+# === MAIN LOGIC ===
+# === GŁÓWNA LOGIKA ===
+# =====================================================================================
+
+def publish_certificates(session, certificates, certs_dir):
+    """
+    Copies the issued '<client>.pem' files into the TAK 'certs/files' directory with
+    one privileged command, so that revokeCert.sh, revoke.py and cert_inventory.py
+    find them like the ones made by makeCert.sh. Client keys are not copied.
+
+    Kopiuje wystawione pliki '<klient>.pem' do katalogu 'certs/files' serwera TAK
+    jednym uprzywilejowanym poleceniem, aby revokeCert.sh, revoke.py
+    i cert_inventory.py znajdowały je tak jak te z makeCert.sh. Klucze klientów
+    nie są kopiowane.
+
+    Returns:
+        str: None on success, the error message otherwise.
+             None w przypadku powodzenia, w przeciwnym razie komunikat błędu.
+    """
+    if not certificates:
+        return None
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w") as archive:
+        for name, data in certificates.items():
+            member = tarfile.TarInfo(f"{name}.pem")
+            member.size = len(data)
+            member.mode = 0o644
+            archive.addfile(member, io.BytesIO(data))
+    files_dir = shlex.quote(os.path.join(certs_dir, "files"))
+    result = session.exec(f"tar -C {files_dir} --no-same-owner -xf -", sudo=True, input_data=buffer.getvalue(),
+                          check=False, text=False)
+    if result.returncode != 0:
+        return (result.stderr.decode("utf-8", errors="replace").strip().splitlines() or ["tar failed"])[-1]
+    return None
+
+
+def engine_from_config(config, session, key_pool=None):
+    """
+    Returns a PkiEngine for the CA configured in the 'pki' section of the configuration,
+    taking its keys from key_pool when one is given.
+
+    Zwraca PkiEngine dla CA skonfigurowanego w sekcji 'pki' konfiguracji,
+    pobierający klucze z key_pool, jeśli ją podano.
+    """
+    settings = config.get('pki') or {}
+    return PkiEngine.from_session(
+        session, tak_certs_dir(config), settings.get('ca_name', DEFAULT_CA_NAME),
+        (config.get('security') or {}).get('p12_password'),
+        validity_days=settings.get('validity_days', DEFAULT_VALIDITY_DAYS),
+        key_algorithm=settings.get('key_algorithm', DEFAULT_ALGORITHM),
+        key_size=settings.get('key_size', DEFAULT_KEY_SIZE),
+        workers=settings.get('key_workers'),
+        legacy_p12=settings.get('legacy_p12', True),
+        key_pool=key_pool,
+    )
+
+
+# =====================================================================================
+# === SCRIPT ENTRY POINT ===
+# === PUNKT WEJŚCIA DO SKRYPTU ===
+# =====================================================================================
+
+if __name__ == "__main__":
+    import argparse
+    import time
+    from config_loader import load_config
+    from remote_session import open_session
+
+    parser = argparse.ArgumentParser(
+        description="Issues TAK client certificates in this process, without makeCert.sh.",
+        epilog="Example: python3 pki_engine.py user1 user2"
+    )
+    parser.add_argument("client_names", nargs="+", help="Client names. (Nazwy klientów)")
+    args = parser.parse_args()
+
+    config_data = load_config()
+    if not config_data:
+        exit(1)
+
+    failed = False
+    with open_session(config_data) as session:
+        try:
+            engine = engine_from_config(config_data, session)
+        except (RuntimeError, ValueError) as e:
+            print(f"ERROR: {e}")
+            print(f"BŁĄD: Nie udało się wczytać CA: {e}")
+            exit(1)
+        started = time.monotonic()
+        outcome, issued = engine.issue(args.client_names, config_data['paths']['preferences_output'])
+        elapsed = time.monotonic() - started
+        publish_error = publish_certificates(session, issued, tak_certs_dir(config_data))
+
+    for client, error in outcome.items():
+        if error:
+            failed = True
+            print(f"ERROR: {client}: {error}")
+            print(f"BŁĄD: {client}: {error}")
+    if publish_error:
+        failed = True
+        print(f"ERROR: The certificates were not copied to the server: {publish_error}")
+        print(f"BŁĄD: Certyfikaty nie zostały skopiowane na serwer: {publish_error}")
+    print(f"Issued {len(issued)} certificates in {elapsed:.2f}s.")
+    print(f"Wystawiono {len(issued)} certyfikatów w {elapsed:.2f}s.")
+    if failed:
+        exit(1)
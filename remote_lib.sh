@@ -0,0 +1,90 @@
+#!/bin/bash
+
+# =====================================================================================
+# === SHARED SHELL HELPERS - configuration, one multiplexed SSH connection per host ===
+# === WSPÓLNE FUNKCJE POWŁOKI - konfiguracja, jedno współdzielone połączenie SSH na host ===
+#
+# Sourced by the shell stages. blox_load_config_env loads the configuration into the
+# BLOX_* variables. The first remote_ssh/remote_scp call authenticates and keeps the
+# connection open in the background (ControlPersist), every later call - also from
+# remote_session.py - reuses it without a new handshake. remote_sudo and local_sudo run
+# commands as root with the password given through SUDO_ASKPASS. The calling script must
+# define $sudo_pswd before using them; the port is $BLOX_REMOTE_PORT
+# (network.remote_server.port, default 22).
+#
+# Dołączany przez etapy powłoki. blox_load_config_env wczytuje konfigurację do zmiennych
+# BLOX_*. Pierwsze wywołanie remote_ssh/remote_scp uwierzytelnia i utrzymuje połączenie
+# w tle (ControlPersist), każde kolejne - także z remote_session.py - korzysta z niego bez
+# nowego uzgadniania. remote_sudo i local_sudo uruchamiają polecenia jako root z hasłem
+# przekazanym przez SUDO_ASKPASS. Skrypt wywołujący musi zdefiniować $sudo_pswd przed ich
+# użyciem; port to $BLOX_REMOTE_PORT (network.remote_server.port, domyślnie 22).
+# =====================================================================================
+
+blox_lib_dir="$(dirname "${BASH_SOURCE[0]}")"
+
+# Loads the configuration into the BLOX_* variables. start.py passes them in the environment
+# and the snapshot file in BLOX_CONFIG_ENV; run alone, a script gets the validated snapshot
+# of the given config.yaml from config_loader.py (one Python call instead of a 'yq' per
+# value). Values already in the environment are kept; an invalid configuration ends the script.
+# Wczytuje konfigurację do zmiennych BLOX_*. start.py przekazuje je w środowisku, a plik
+# migawki w BLOX_CONFIG_ENV; uruchomiony samodzielnie skrypt pobiera sprawdzoną migawkę
+# podanego config.yaml z config_loader.py (jedno wywołanie Pythona zamiast 'yq' dla każdej
+# wartości). Wartości obecne już w środowisku są zachowywane; niepoprawna konfiguracja kończy skrypt.
+blox_load_config_env() {
+    if [ -z "${BLOX_CONFIG_ENV:-}" ]; then
+        BLOX_CONFIG_ENV=$(python3 "$blox_lib_dir/config_loader.py" env-file --config "${1:-config.yaml}") || exit 1
+    fi
+    source "$BLOX_CONFIG_ENV"
+}
+
+blox_ssh_control_path="${BLOX_SSH_CONTROL_PATH:-$HOME/.ssh/blox-%C}"
+blox_ssh_control_persist="${BLOX_SSH_CONTROL_PERSIST:-600}"
+mkdir -p "$(dirname "$blox_ssh_control_path")"
+
+blox_ssh_options=(
+    -o StrictHostKeyChecking=no
+    -o ConnectTimeout=10
+    -o ControlMaster=auto
+    -o "ControlPath=${blox_ssh_control_path}"
+    -o "ControlPersist=${blox_ssh_control_persist}"
+)
+
+# Runs ssh over the shared connection
+# Uruchamia ssh przez współdzielone połączenie
+remote_ssh() {
+    SSHPASS="$sudo_pswd" sshpass -e ssh "${blox_ssh_options[@]}" -p "${BLOX_REMOTE_PORT:-22}" "$@"
+}
+
+# Runs scp over the shared connection (scp takes the port as -P)
+# Uruchamia scp przez współdzielone połączenie (scp przyjmuje port jako -P)
+remote_scp() {
+    SSHPASS="$sudo_pswd" sshpass -e scp "${blox_ssh_options[@]}" -P "${BLOX_REMOTE_PORT:-22}" "$@"
+}
+
+# Quotes a string for a POSIX shell (like shlex.quote in remote_session.py)
+# Cytuje napis dla powłoki POSIX (jak shlex.quote w remote_session.py)
+blox_shell_quote() {
+    local quoted="${1//\'/\'\\\'\'}"
+    printf "'%s'" "$quoted"
+}
+
+# Runs a shell command as root on the host: remote_sudo <user@host> <command>. As in
+# remote_session.py, the remote shell reads the password line from stdin and sudo gets it
+# from 'printenv' as SUDO_ASKPASS (the prompt names the variable), so the password is
+# neither in the remote command line nor on the command's stdin.
+# Uruchamia polecenie powłoki jako root na hoście: remote_sudo <użytkownik@host> <polecenie>.
+# Jak w remote_session.py, zdalna powłoka odczytuje linię z hasłem ze stdin, a sudo pobiera
+# je z 'printenv' jako SUDO_ASKPASS (monit jest nazwą zmiennej), więc hasła nie ma ani
+# w zdalnym wierszu poleceń, ani na stdin polecenia.
+remote_sudo() {
+    local askpass='IFS= read -r BLOX_SUDO_PASSWORD && BLOX_SUDO_PASSWORD="$BLOX_SUDO_PASSWORD" SUDO_ASKPASS="$(command -v printenv)"'
+    printf '%s\n' "$sudo_pswd" | remote_ssh "$1" "$askpass sudo -A -p BLOX_SUDO_PASSWORD bash -c $(blox_shell_quote "$2")"
+}
+
+# Runs a command as root on this machine: local_sudo <command> [arguments...]. The password
+# goes to sudo through SUDO_ASKPASS as well, so the command's stdin stays its own.
+# Uruchamia polecenie jako root na tej maszynie: local_sudo <polecenie> [argumenty...]. Hasło
+# również trafia do sudo przez SUDO_ASKPASS, więc stdin polecenia pozostaje jego własne.
+local_sudo() {
+    BLOX_SUDO_PASSWORD="$sudo_pswd" SUDO_ASKPASS="$(command -v printenv)" sudo -A -p BLOX_SUDO_PASSWORD "$@"
+}
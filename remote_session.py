@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# =====================================================================================
+# === REUSABLE REMOTE EXECUTION LAYER (ONE MULTIPLEXED SSH SESSION PER HOST) ===
+# === WARSTWA ZDALNEGO WYKONYWANIA (JEDNA WSPÓŁDZIELONA SESJA SSH NA HOST) ===
+# =====================================================================================
+
+import os
+import shlex
+import shutil
+import subprocess
+import sys
+import threading
+
+from metrics import span
+
+# The same control socket is used by remote_lib.sh, so the shell scripts started
+# during a run reuse the connection opened here (and vice versa).
+# Ten sam socket kontrolny jest używany przez remote_lib.sh, więc skrypty powłoki
+# uruchamiane w trakcie przebiegu korzystają z połączenia otwartego tutaj (i odwrotnie).
+DEFAULT_CONTROL_PATH = os.environ.get("BLOX_SSH_CONTROL_PATH", os.path.join("~", ".ssh", "blox-%C"))
+DEFAULT_CONTROL_PERSIST = os.environ.get("BLOX_SSH_CONTROL_PERSIST", "600")
+
+# Shell variable holding the sudo password for SUDO_ASKPASS; it is also the prompt passed to
+# 'printenv', which then prints its value
+# Zmienna powłoki z hasłem sudo dla SUDO_ASKPASS; jest też monitem przekazywanym do 'printenv',
+# który wypisuje wtedy jej wartość
+SUDO_PASSWORD_VARIABLE = "BLOX_SUDO_PASSWORD"
+
+
+# =====================================================================================
+# === SESSION CLASSES ===
+# === KLASY SESJI ===
+# =====================================================================================
+
+class RemoteSession:
+    """
+    Runs commands and transfers files on a remote host over a single multiplexed
+    OpenSSH connection (ControlMaster). The first call authenticates, every later
+    ssh/scp call - also from the shell scripts - only opens a new channel in it.
+
+    Uruchamia polecenia i przesyła pliki na zdalny host przez jedno współdzielone
+    połączenie OpenSSH (ControlMaster). Pierwsze wywołanie uwierzytelnia, każde
+    kolejne wywołanie ssh/scp - także ze skryptów powłoki - otwiera w nim tylko nowy kanał.
+    """
+
+    def __init__(self, host, user, password, port=None, control_path=None, control_persist=None,
+                 extra_options=()):
+        self.host = host
+        self.user = user
+        self.password = password
+        self.port = port
+        self.control_path = os.path.expanduser(control_path or DEFAULT_CONTROL_PATH)
+        self.control_persist = str(control_persist or DEFAULT_CONTROL_PERSIST)
+        self.extra_options = list(extra_options)
+        self._owns_master = False
+
+    # --- Connection handling ---
+    # --- Obsługa połączenia ---
+
+    @property
+    def target(self):
+        return f"{self.user}@{self.host}"
+
+    def _ssh_options(self):
+        options = [
+            "-o", "StrictHostKeyChecking=no",
+            "-o", "ConnectTimeout=10",
+            "-o", "ControlMaster=auto",
+            "-o", f"ControlPath={self.control_path}",
+            "-o", f"ControlPersist={self.control_persist}",
+        ]
+        return options + self.extra_options
+
+    def _environment(self):
+        environment = dict(os.environ)
+        environment["SSHPASS"] = str(self.password)
+        return environment
+
+    def _ssh(self, *arguments):
+        port = ["-p", str(self.port)] if self.port else []
+        return ["sshpass", "-e", "ssh"] + self._ssh_options() + port + list(arguments)
+
+    def is_connected(self):
+        """
+        Checks whether a master connection to the host is already running.
+
+        Sprawdza, czy połączenie główne z hostem już działa.
+        """
+        result = subprocess.run(self._ssh("-O", "check", self.target), env=self._environment(),
+                                stdin=subprocess.DEVNULL, capture_output=True)
+        return result.returncode == 0
+
+    def open(self):
+        """
+        Opens the master connection, unless another process already did it.
+        Only a session that opened the connection closes it later.
+
+        Otwiera połączenie główne, chyba że zrobił to już inny proces.
+        Tylko sesja, która otworzyła połączenie, zamyka je później.
+        """
+        os.makedirs(os.path.dirname(self.control_path), mode=0o700, exist_ok=True)
+        if self.is_connected():
+            return self
+        with span("ssh_connect"):
+            self.exec("true")
+        self._owns_master = True
+        return self
+
+    def close(self):
+        """
+        Closes the master connection if this session opened it.
+
+        Zamyka połączenie główne, jeśli zostało otwarte przez tę sesję.
+        """
+        if self._owns_master:
+            subprocess.run(self._ssh("-O", "exit", self.target), env=self._environment(),
+                           stdin=subprocess.DEVNULL, capture_output=True)
+            self._owns_master = False
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    # --- Operations ---
+    # --- Operacje ---
+
+    def _command(self, command):
+        return self._ssh(self.target, command)
+
+    def _wrap(self, command, sudo):
+        """
+        Returns the command to run and the line to send in front of its stdin. With sudo
+        the login shell reads the password line itself and sudo gets it from 'printenv'
+        as SUDO_ASKPASS (the prompt names the variable), so the password never reaches
+        the command's stdin, also when sudo does not ask for it (cached, NOPASSWD, root).
+
+        Zwraca polecenie do uruchomienia i linię wysyłaną przed jego stdin. Przy sudo
+        powłoka logowania sama odczytuje linię z hasłem, a sudo pobiera je z 'printenv'
+        jako SUDO_ASKPASS (monit jest nazwą zmiennej), więc hasło nigdy nie trafia na
+        stdin polecenia, także gdy sudo o nie nie pyta (zapamiętane, NOPASSWD, root).
+        """
+        if not sudo:
+            return command, ""
+        variable = SUDO_PASSWORD_VARIABLE
+        return (f"IFS= read -r {variable} && {variable}=\"${variable}\" SUDO_ASKPASS=\"$(command -v printenv)\" "
+                f"sudo -A -p {variable} bash -c {shlex.quote(command)}"), str(self.password) + "\n"
+
+    @staticmethod
+    def _input(password_line, input_data, text):
+        if not password_line and input_data is None:
+            return None
+        if text:
+            return password_line + (input_data or "")
+        data = input_data or b""
+        if isinstance(data, str):
+            data = data.encode()
+        return password_line.encode() + data
+
+    def exec(self, command, sudo=False, input_data=None, check=True, timeout=None, text=True):
+        """
+        Runs a shell command on the host and returns the CompletedProcess.
+        With sudo=True the command runs as root; input_data is exactly what it reads on
+        stdin (the password goes to sudo separately, see _wrap).
+
+        Uruchamia polecenie powłoki na hoście i zwraca CompletedProcess.
+        Przy sudo=True polecenie działa jako root; input_data to dokładnie to, co odczyta
+        ze stdin (hasło trafia do sudo osobno, zob. _wrap).
+        """
+        command, password_line = self._wrap(command, sudo)
+        stdin_data = self._input(password_line, input_data, text)
+        with span("remote_exec"):
+            return subprocess.run(self._command(command), env=self._environment(), input=stdin_data,
+                                  stdin=None if stdin_data is not None else subprocess.DEVNULL,
+                                  capture_output=True, text=text, check=check, timeout=timeout)
+
+    def popen(self, command, sudo=False, input_data=None):
+        """
+        Starts a command on the host and returns the Popen object with a binary stdout
+        pipe, for streaming large outputs (e.g. tar archives). input_data (bytes) is
+        written to its stdin by a background thread, so a command that reads and writes
+        at the same time cannot block on full pipes.
+
+        Uruchamia polecenie na hoście i zwraca obiekt Popen z binarnym potokiem stdout,
+        do strumieniowania dużych wyników (np. archiwów tar). input_data (bajty) jest
+        zapisywane na jego stdin przez wątek w tle, więc polecenie, które jednocześnie
+        czyta i pisze, nie zablokuje się na pełnych potokach.
+        """
+        command, password_line = self._wrap(command, sudo)
+        process = subprocess.Popen(self._command(command), env=self._environment(),
+                                   stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        data = self._input(password_line, input_data, text=False)
+
+        def write_stdin():
+            try:
+                if data:
+                    process.stdin.write(data)
+                process.stdin.close()
+            except BrokenPipeError:
+                pass
+
+        if input_data is None:
+            write_stdin()
+        else:
+            threading.Thread(target=write_stdin, daemon=True).start()
+        return process
+
+    def get(self, remote_path, local_path):
+        """
+        Copies a file from the host to the local machine.
+
+        Kopiuje plik z hosta na maszynę lokalną.
+        """
+        port = ["-P", str(self.port)] if self.port else []
+        with span("transfer"):
+            subprocess.run(["sshpass", "-e", "scp"] + self._ssh_options() + port +
+                           [f"{self.target}:{remote_path}", local_path],
+                           env=self._environment(), stdin=subprocess.DEVNULL, capture_output=True, check=True)
+
+    def put(self, local_path, remote_path):
+        """
+        Copies a local file to the host.
+
+        Kopiuje plik lokalny na hosta.
+        """
+        port = ["-P", str(self.port)] if self.port else []
+        with span("transfer"):
+            subprocess.run(["sshpass", "-e", "scp"] + self._ssh_options() + port +
+                           [local_path, f"{self.target}:{remote_path}"],
+                           env=self._environment(), stdin=subprocess.DEVNULL, capture_output=True, check=True)
+
+
+class LocalSession(RemoteSession):
+    """
+    The same interface executed on this machine. Used in 'local' mode and as an
+    in-process stand-in for the remote host in tests (use_sudo=False).
+
+    Ten sam interfejs wykonywany na tej maszynie. Używany w trybie 'local' oraz jako
+    lokalny zamiennik zdalnego hosta w testach (use_sudo=False).
+    """
+
+    def __init__(self, password="", use_sudo=True):
+        super().__init__("localhost", os.environ.get("USER", ""), password)
+        self.use_sudo = use_sudo
+
+    def is_connected(self):
+        return True
+
+    def open(self):
+        return self
+
+    def close(self):
+        pass
+
+    def _environment(self):
+        return dict(os.environ)
+
+    def _command(self, command):
+        return ["bash", "-c", command]
+
+    def _wrap(self, command, sudo):
+        return super()._wrap(command, sudo and self.use_sudo)
+
+    def get(self, remote_path, local_path):
+        shutil.copyfile(remote_path, local_path)
+
+    def put(self, local_path, remote_path):
+        shutil.copyfile(local_path, remote_path)
+
+
+# =====================================================================================
+# === HELPER FUNCTIONS ===
+# === FUNKCJE POMOCNICZE ===
+# =====================================================================================
+
+def open_session(config):
+    """
+    Returns an opened session matching the execution mode from the configuration:
+    RemoteSession for 'remote', LocalSession for 'local'.
+
+    Zwraca otwartą sesję zgodną z trybem pracy z konfiguracji:
+    RemoteSession dla 'remote', LocalSession dla 'local'.
+    """
+    mode = config['execution']['mode']
+    password = config['security']['sudo_pswd']
+    if mode == 'remote':
+        remote_server = config['network']['remote_server']
+        return RemoteSession(remote_server['host'], remote_server['user'], password,
+                             port=remote_server.get('port')).open()
+    if mode == 'local':
+        return LocalSession(password)
+    raise ValueError(f"Unknown execution mode '{mode}'. Use 'local' or 'remote'.")
+
+
+# =====================================================================================
+# === SCRIPT ENTRY POINT ===
+# === PUNKT WEJŚCIA DO SKRYPTU ===
+# =====================================================================================
+
+if __name__ == "__main__":
+    import argparse
+    from config_loader import load_config
+
+    parser = argparse.ArgumentParser(
+        description="Opens, checks or closes the shared SSH connection to the remote server.",
+        epilog="Example: python3 remote_session.py open"
+    )
+    parser.add_argument("action", choices=["open", "check", "close"],
+                        help="Action to perform. (Akcja do wykonania)")
+    parser.add_argument("--config", default="config.yaml",
+                        help="Path to config.yaml. (Ścieżka do config.yaml)")
+    args = parser.parse_args()
+
+    config_data = load_config(args.config)
+    if not config_data:
+        exit(1)
+    remote = config_data['network']['remote_server']
+    session = RemoteSession(remote['host'], remote['user'], config_data['security']['sudo_pswd'],
+                            port=remote.get('port'))
+
+    if args.action == "open":
+        session.open()
+        print(f"Shared SSH connection to {session.target} is open ({session.control_path}).")
+        print(f"Współdzielone połączenie SSH z {session.target} jest otwarte ({session.control_path}).")
+    elif args.action == "check":
+        connected = session.is_connected()
+        print(f"Connected / Połączono: {connected}")
+        sys.exit(0 if connected else 1)
+    else:
+        session._owns_master = True
+        session.close()
+        print(f"Shared SSH connection to {session.target} closed.")
+        print(f"Współdzielone połączenie SSH z {session.target} zostało zamknięte.")
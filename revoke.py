@@ -6,36 +6,22 @@
 # === ORKIESTRATOR ODWOŁYWANIA CERTYFIKATÓW ===
 # =====================================================================================
 
+import fnmatch
 import os
-import time
-import pandas as pd
 import yaml
 
+from config_loader import load_config
+from console import EVENTS_ENV, clear_screen, is_headless, pause, progress, set_events_file, set_headless
+from data_source import data_source_for
+from remote_session import open_session
+from tak_certs import revoke_certificates, tak_certs_dir
+
 
 # =====================================================================================
 # === HELPER FUNCTIONS ===
 # === FUNKCJE POMOCNICZE ===
 # =====================================================================================
 
-def load_config(path="config.yaml"):
-    """
-    Loads and returns the configuration from a YAML file.
-
-    Wczytuje i zwraca konfigurację z pliku YAML.
-    """
-    try:
-        with open(path, 'r', encoding='utf-8') as f:
-            return yaml.safe_load(f)
-    except FileNotFoundError:
-        print("ERROR: Configuration file '{path}' not found!")
-        print(f"BŁĄD: Plik konfiguracyjny '{path}' nie został znaleziony!")
-        return None
-    except Exception as e:
-        print(f"ERROR: Failed to load config file: {e}")
-        print(f"BŁĄD: Nie udało się wczytać pliku konfiguracyjnego: {e}")
-        return None
-
-
 def save_config(data, path="config.yaml"):
     """
     Saves the configuration dictionary to a YAML file.
@@ -52,13 +38,25 @@ def save_config(data, path="config.yaml"):
         return False
 
 
-def set_language():
+def set_language(language=None):
     """
     Prompts the user to select a language and saves the choice to config.yaml.
 
     Pyta użytkownika o wybór języka i zapisuje go w pliku config.yaml.
+    With 'language' given (or in headless mode) nothing is asked.
+    Gdy podano 'language' (lub w trybie bezobsługowym), o nic nie pyta.
     """
-    while True:
+    user_type = str(language).upper() if language else None
+    if user_type is None and is_headless():
+        # The language stored by the previous run is kept
+        # Zachowany zostaje język zapisany przez poprzedni przebieg
+        return True
+    if user_type is not None and user_type not in ("EN", "PL"):
+        print(f"ERROR: Invalid language '{language}'. Use 'EN' or 'PL'.")
+        print(f"BŁĄD: Nieprawidłowy język '{language}'. Użyj 'EN' lub 'PL'.")
+        return False
+
+    while user_type is None:
         print("---")
         print("Select User Type:")
         print("Wybierz Typ Użytkownika:")
@@ -73,20 +71,18 @@ def set_language():
 
         if choice == "1":
             user_type = "EN"
-            break
         elif choice == "2":
             user_type = "PL"
-            break
         else:
-            os.system("clear || cls")
+            clear_screen()
             print("Invalid Choice")
             print("Niepoprawny Wybór")
 
-    os.system("clear || cls")
+    clear_screen()
     print(f"Selected: {user_type}")
     print(f"Wybrano: {user_type}")
-    time.sleep(2)
-    os.system("clear || cls")
+    pause(2)
+    clear_screen()
 
     config = load_config()
     if config:
@@ -96,86 +92,158 @@ def set_language():
     return False
 
 
+def read_client_names(config, user_type, url=None):
+    """
+    Returns the user names from the registration sheet of the given language,
+    or None if the sheet cannot be read.
+
+    Zwraca nazwy użytkowników z arkusza rejestracji dla danego języka
+    lub None, jeśli arkusza nie da się odczytać.
+    """
+    source = data_source_for(config, user_type, url)
+    if not source:
+        print(f"ERROR: No data source defined for language '{user_type}'.")
+        print(f"BŁĄD: Brak zdefiniowanego źródła danych dla języka '{user_type}'.")
+        return None
+
+    print("Loading user list for certificate revocation...")
+    print("Wczytuję listę użytkowników do odwołania certyfikatów...")
+    try:
+        df = source.read_dataframe()
+    except Exception as e:
+        print(f"ERROR: Failed to load data from CSV: {e}")
+        print(f"BŁĄD: Nie udało się wczytać danych z CSV: {e}")
+        return None
+
+    column_name = 'Username:' if user_type == "EN" else 'Nazwa Użytkownika:'
+    return [str(name) for name in df[column_name]]
+
+
+def print_revocation_report(outcome):
+    """
+    Prints the status of every user and returns the number of failures.
+
+    Wyświetla status każdego użytkownika i zwraca liczbę niepowodzeń.
+    """
+    labels = {
+        "revoked": "REVOKED / ODWOŁANY",
+        "missing": "NO CERTIFICATE / BRAK CERTYFIKATU",
+        "failed": "ERROR / BŁĄD",
+    }
+    print("---")
+    for client_name, (status, detail) in outcome.items():
+        suffix = f" - {detail}" if detail else ""
+        progress("revocation", user=client_name, status=status, detail=detail or None)
+        print(f"{client_name:<32} {labels.get(status, status)}{suffix}")
+
+    failed = sum(1 for status, _ in outcome.values() if status == "failed")
+    revoked = sum(1 for status, _ in outcome.values() if status == "revoked")
+    print("---")
+    print(f"Revoked: {revoked}, without a certificate: {len(outcome) - revoked - failed}, failed: {failed}")
+    print(f"Odwołane: {revoked}, bez certyfikatu: {len(outcome) - revoked - failed}, błędy: {failed}")
+    return failed
+
+
 # =====================================================================================
 # === MAIN SCRIPT LOGIC ===
 # === GŁÓWNA LOGIKA SKRYPTU ===
 # =====================================================================================
 
-def run_revocation_process():
+def run_revocation_process(client_names=None, match=None, language=None, data_source=None):
     """
     The main function that orchestrates the entire certificate revocation process.
+    All selected certificates are revoked together in one server session with a single
+    CRL regeneration (tak_certs.revoke_certificates).
 
     Główna funkcja orkiestrująca całym procesem odwoływania certyfikatów.
+    Wszystkie wybrane certyfikaty są odwoływane razem w jednej sesji serwera
+    z jednorazowym wygenerowaniem listy CRL (tak_certs.revoke_certificates).
+
+    Args:
+        client_names (list): Users to revoke; if empty, the users of the registration sheet.
+                             Użytkownicy do odwołania; jeśli brak, użytkownicy z arkusza rejestracji.
+        match (str):         Optional shell-style pattern the user names must match (e.g. 'test_*').
+                             Opcjonalny wzorzec w stylu powłoki, do którego muszą pasować nazwy (np. 'test_*').
+        language (str):      Language of the registration sheet ('EN'/'PL'); asked for when not given.
+                             Język arkusza rejestracji ('EN'/'PL'); pytanie, gdy nie podano.
+        data_source (str):   URL or path of the registration CSV instead of the configured one.
+                             URL lub ścieżka CSV z rejestracjami zamiast skonfigurowanego.
+
+    Returns:
+        int: Number of users whose revocation failed.
+             Liczba użytkowników, których odwołanie się nie powiodło.
     """
-    if not set_language():
+    if not client_names and not set_language(language):
         exit(1)
 
     config = load_config()
     if not config:
         exit(1)
 
-    user_type = config['user_management']['state']['user_type']
-    data_sources = config['user_management']['data_sources']
-    csv_path = data_sources.get(user_type.lower())
-
-    if not csv_path:
-        print(f"ERROR: No data source defined for language '{user_type}'.")
-        print(f"BŁĄD: Brak zdefiniowanego źródła danych dla języka '{user_type}'.")
-        exit(1)
+    if not client_names:
+        client_names = read_client_names(config, config['user_management']['state']['user_type'], data_source)
+        if client_names is None:
+            exit(1)
+    if match:
+        client_names = [name for name in client_names if fnmatch.fnmatchcase(name, match)]
+
+    print("\n--- Users to revoke / Lista użytkowników do odwołania ---")
+    for name in client_names:
+        print(name)
+    print(f"\nNumber Of Users: {len(client_names)}")
+    print(f"Liczba Użytkowników: {len(client_names)}")
+    if not client_names:
+        return 0
 
-    print("Loading user list for certificate revocation...")
-    print("Wczytuję listę użytkowników do odwołania certyfikatów...")
+    print("---")
+    print("Revoking all certificates in one session...")
+    print("Odwołuję wszystkie certyfikaty w jednej sesji...")
     try:
-        df = pd.read_csv(csv_path)
+        with open_session(config) as session:
+            outcome = revoke_certificates(session, client_names, tak_certs_dir(config))
     except Exception as e:
-        print(f"ERROR: Failed to load data from CSV: {e}")
-        print(f"BŁĄD: Nie udało się wczytać danych z CSV: {e}")
+        print(f"ERROR: Revocation failed: {e}")
+        print(f"BŁĄD: Odwoływanie nie powiodło się: {e}")
         exit(1)
 
-    if user_type == "EN":
-        column_name = 'Username:'
-        print("\n--- Users to revoke ---")
-    else:  # PL
-        column_name = 'Nazwa Użytkownika:'
-        print("\n--- Lista użytkowników do odwołania ---")
-
-    print(df[column_name].to_string(index=False))
-    print(f"\nNumber Of Users: {len(df)}")
-    print(f"Liczba Użytkowników: {len(df)}")
-    time.sleep(4)
-    os.system("clear || cls")
-
-    # --- Main revocation loop ---
-    # --- Główna pętla odwoływania ---
-    for index, row in df.iterrows():
-        client_name = row[column_name]
-
-        print(f"Revoking certificate for: {client_name} ({index + 1} of {len(df)})...")
-        print(f"Odwołuję certyfikat dla: {client_name} ({index + 1} z {len(df)})...")
-
-        # Save the current user's name to config.yaml so that revoke_cert.sh
-        # knows who to act upon.
-        # Zapisz nazwę bieżącego użytkownika do config.yaml, aby skrypt revoke_cert.sh
-        # wiedział, dla kogo ma działać.
-        current_config = load_config()
-        if not current_config:
-            print("CRITICAL ERROR: Lost access to config file during loop. Skipping user.")
-            print("BŁĄD KRYTYCZNY: Utracono dostęp do pliku konfiguracyjnego w trakcie pętli. Pomijam użytkownika.")
-            continue
-
-        current_config['user_management']['state']['client_name'] = str(client_name)
-        save_config(current_config)
-
-        # Call the shell script to perform the revocation
-        # Wywołaj skrypt powłoki, aby przeprowadzić odwołanie
-        os.system("./revoke_cert.sh")
-        os.system("clear || cls")
-        time.sleep(1)
-
+    failed = print_revocation_report(outcome)
     print("---")
     print("Certificate revocation process finished.")
     print("Proces odwoływania certyfikatów zakończony.")
+    return failed
+
 
+# =====================================================================================
+# === SCRIPT ENTRY POINT ===
+# === PUNKT WEJŚCIA DO SKRYPTU ===
+# =====================================================================================
 
 if __name__ == "__main__":
-    run_revocation_process()
\ No newline at end of file
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Revokes TAK client certificates of the given users, or of the users in the registration sheet.",
+        epilog="Example: python3 revoke.py --match 'test_*'"
+    )
+    parser.add_argument("client_names", nargs="*",
+                        help="Users to revoke (default: the registration sheet). "
+                             "(Użytkownicy do odwołania, domyślnie z arkusza rejestracji)")
+    parser.add_argument("--match", help="Only users matching this pattern. (Tylko użytkownicy pasujący do wzorca)")
+    parser.add_argument("--headless", action="store_true",
+                        help="Run unattended (also BLOX_HEADLESS=1). (Przebieg bezobsługowy, także BLOX_HEADLESS=1)")
+    parser.add_argument("--events", default=os.environ.get(EVENTS_ENV),
+                        help="File for the JSON progress lines instead of stdout (also BLOX_EVENTS). "
+                             "(Plik na linie postępu JSON zamiast stdout)")
+    parser.add_argument("--language", choices=["EN", "PL", "en", "pl"], default=os.environ.get("BLOX_LANGUAGE"),
+                        help="Registration sheet language (also BLOX_LANGUAGE). (Język arkusza rejestracji)")
+    parser.add_argument("--data-source", default=os.environ.get("BLOX_DATA_SOURCE"),
+                        help="URL or path of the registration CSV (also BLOX_DATA_SOURCE). "
+                             "(URL lub ścieżka CSV z rejestracjami)")
+    args = parser.parse_args()
+
+    if args.headless:
+        set_headless()
+    if args.events:
+        set_events_file(args.events)
+    if run_revocation_process(args.client_names, args.match, args.language, args.data_source):
+        exit(1)
@@ -22,13 +22,17 @@ echo "---"
 echo "Loading configuration..."
 echo "Wczytuję konfigurację..."
 
-# Read data from the nested YAML structure
-# Odczyt danych z zagnieżdżonej struktury YAML
-sudo_pswd=$(yq '.security.sudo_pswd' "$CONFIG_FILE")
-client_name=$(yq '.user_management.state.client_name' "$CONFIG_FILE")
-mode=$(yq '.execution.mode' "$CONFIG_FILE")
-remote_user=$(yq '.network.remote_server.user' "$CONFIG_FILE")
-remote_host=$(yq '.network.remote_server.host' "$CONFIG_FILE")
+# Shared helpers: the configuration (blox_load_config_env) and the multiplexed SSH connection
+# Wspólne funkcje: konfiguracja (blox_load_config_env) i współdzielone połączenie SSH
+source "$(dirname "$0")/remote_lib.sh"
+blox_load_config_env "$CONFIG_FILE"
+
+sudo_pswd="$BLOX_SUDO_PSWD"
+client_name="$BLOX_CLIENT_NAME"
+mode="$BLOX_MODE"
+remote_user="$BLOX_REMOTE_USER"
+remote_host="$BLOX_REMOTE_HOST"
+tak_certs_dir="$BLOX_TAK_CERTS_DIR"
 
 # --- Command Definitions ---
 # --- Definicje Poleceń ---
@@ -39,9 +43,9 @@ commands_to_execute="
     echo '--- (REMOTE/LOCAL) Revoking certificate for: ${client_name} ---';
     echo '--- (ZDALNY/LOKALNY) Odwoływanie certyfikatu dla: ${client_name} ---';
 
-    echo '--> Changing directory to /home/tak/tak-server/tak/certs';
-    echo '--> Zmiana katalogu na /home/tak/tak-server/tak/certs';
-    cd /home/tak/tak-server/tak/certs;
+    echo '--> Changing directory to ${tak_certs_dir}';
+    echo '--> Zmiana katalogu na ${tak_certs_dir}';
+    cd '${tak_certs_dir}';
 
     echo '--> Running revokeCert.sh...';
     echo '--> Uruchamiam revokeCert.sh...';
@@ -49,7 +53,7 @@ commands_to_execute="
 
     echo '--> Changing directory to .../certs/files';
     echo '--> Zmiana katalogu na .../certs/files';
-    cd /home/tak/tak-server/tak/certs/files;
+    cd '${tak_certs_dir}/files';
 
     echo '--> Deleting client certificate files (.p12, .pem, .key)...';
     echo '--> Usuwanie plików certyfikatów (.p12, .pem, .key) dla klienta...';
@@ -74,7 +78,7 @@ if [ "$mode" == "remote" ]; then
 
     # Execute remote commands using the established pattern
     # Wykonaj zdalne komendy, używając ustalonego wzorca
-    sshpass -p "$sudo_pswd" ssh -t "${remote_user}@${remote_host}" "echo '$sudo_pswd' | sudo -S bash -c \"$commands_to_execute\""
+    remote_sudo "${remote_user}@${remote_host}" "$commands_to_execute"
 
 elif [ "$mode" == "local" ]; then
     # --- LOCAL MODE ---
@@ -85,7 +89,7 @@ elif [ "$mode" == "local" ]; then
 
     # Execute the same commands locally with sudo
     # Wykonaj te same komendy lokalnie z sudo
-    echo "$sudo_pswd" | sudo -S bash -c "$commands_to_execute"
+    local_sudo bash -c "$commands_to_execute"
 
 else
     echo "ERROR: Invalid mode '$mode' in config.yaml. Use 'local' or 'remote'." >&2
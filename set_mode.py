@@ -9,29 +9,63 @@
 import os
 import yaml
 
+from config_loader import read_config
+from console import is_headless
+
+MODES = ('local', 'remote')
+
 # =====================================================================================
 # === MAIN SCRIPT LOGIC ===
 # === GŁÓWNA LOGIKA SKRYPTU ===
 # =====================================================================================
 
-def set_execution_mode(config_path: str = "config.yaml"):
+def set_execution_mode(config_path: str = "config.yaml", mode: str = None, config: dict = None):
     """
     Interactively prompts the user to select an execution mode ('local' or 'remote')
-    and updates the corresponding value in the YAML configuration file.
+    and updates the corresponding value in the YAML configuration file. With 'mode'
+    given the prompt is skipped; in headless mode without it the file is left as it is.
 
     Interaktywnie pyta użytkownika o wybór trybu wykonania ('local' lub 'remote')
-    i aktualizuje odpowiednią wartość w pliku konfiguracyjnym YAML.
+    i aktualizuje odpowiednią wartość w pliku konfiguracyjnym YAML. Gdy podano 'mode',
+    pytanie jest pomijane; w trybie bezobsługowym bez niego plik pozostaje bez zmian.
+
+    Args:
+        config_path (str): Configuration file to update.
+                           Plik konfiguracyjny do aktualizacji.
+        mode (str):        'local' or 'remote'; asked for when None.
+                           'local' lub 'remote'; pytanie, gdy None.
+        config (dict):     Already loaded configuration (updated in place); read from config_path if None.
+                           Wczytana już konfiguracja (aktualizowana w miejscu); odczytywana z config_path, jeśli None.
+
+    Returns:
+        str: The execution mode now in effect.
+             Obowiązujący teraz tryb pracy.
+
+    Raises:
+        FileNotFoundError: The configuration file does not exist. / Plik konfiguracyjny nie istnieje.
+        ValueError: Invalid mode or configuration file. / Nieprawidłowy tryb lub plik konfiguracyjny.
     """
     # --- Step 1: Check for the existence of the configuration file ---
     # --- Krok 1: Sprawdzenie dostępności pliku konfiguracyjnego ---
-    if not os.path.exists(config_path):
-        print(f"ERROR: Configuration file '{config_path}' not found!")
-        print(f"BŁĄD: Plik konfiguracyjny '{config_path}' nie został znaleziony!")
-        return
+    if config is None and not os.path.exists(config_path):
+        raise FileNotFoundError(f"Configuration file '{config_path}' not found")
+    if mode is not None and mode not in MODES:
+        raise ValueError(f"Invalid mode '{mode}'. Use 'local' or 'remote'.")
+
+    # Not validated, so that a wrong mode in the file can still be fixed here
+    # Bez sprawdzania, aby błędny tryb w pliku można było tu jeszcze poprawić
+    if config is None:
+        config = read_config(config_path, validate=False)
+
+    if mode is None and is_headless():
+        print("Headless mode: the execution mode from the configuration file is kept.")
+        print("Tryb bezobsługowy: zachowano tryb pracy z pliku konfiguracyjnego.")
+        return (config.get('execution') or {}).get('mode')
+    selected_mode = mode
 
     # --- Step 2: Interactive loop for user mode selection ---
     # --- Krok 2: Pętla interaktywnego wyboru trybu przez użytkownika ---
-    while True:
+    while selected_mode is None:
         print("\n" + "="*60)
         print("=== SCRIPT EXECUTION MODE SELECTION ===")
         print("=== WYBÓR TRYBU PRACY SKRYPTÓW ===")
@@ -47,50 +81,55 @@ def set_execution_mode(config_path: str = "config.yaml"):
 
         if choice == '1':
             selected_mode = 'local'
-            break
         elif choice == '2':
             selected_mode = 'remote'
-            break
         else:
             print("\nINVALID CHOICE! Please enter '1' or '2'.")
             print("BŁĘDNY WYBÓR! Proszę wprowadzić '1' lub '2'.")
 
-    # --- Step 3: Load, update, and save the YAML file ---
-    # --- Krok 3: Wczytanie, aktualizacja i zapis pliku YAML ---
-    try:
-        with open(config_path, 'r', encoding='utf-8') as file:
-            config_data = yaml.safe_load(file)
+    # --- Step 3: Update and save the YAML file ---
+    # --- Krok 3: Aktualizacja i zapis pliku YAML ---
+    # Update the value in the dictionary
+    # Aktualizacja wartości w słowniku
+    if 'execution' in config and isinstance(config['execution'], dict):
+        config['execution']['mode'] = selected_mode
+    else:
+        # If the 'execution' section does not exist, it can be added
+        # Jeśli sekcja 'execution' nie istnieje, można ją dodać
+        config['execution'] = {'mode': selected_mode}
+        print(f"\nWARNING: 'execution' section missing in the file. It has been added.")
+        print(f"OSTRZEŻENIE: Brak sekcji 'execution' w pliku. Została ona dodana.")
 
-        # Update the value in the dictionary
-        # Aktualizacja wartości w słowniku
-        if 'execution' in config_data and isinstance(config_data['execution'], dict):
-            config_data['execution']['mode'] = selected_mode
-        else:
-            # If the 'execution' section does not exist, it can be added
-            # Jeśli sekcja 'execution' nie istnieje, można ją dodać
-            config_data['execution'] = {'mode': selected_mode}
-            print(f"\nWARNING: 'execution' section missing in the file. It has been added.")
-            print(f"OSTRZEŻENIE: Brak sekcji 'execution' w pliku. Została ona dodana.")
-
-        # Save the updated configuration back to the file
-        # Zapisanie zaktualizowanej konfiguracji z powrotem do pliku
-        with open(config_path, 'w', encoding='utf-8') as file:
-            yaml.dump(config_data, file, default_flow_style=False, allow_unicode=True, sort_keys=False)
-
-        print("\n" + "*"*60)
-        print(f"SUCCESS! Execution mode has been set to: '{selected_mode}'.")
-        print(f"SUKCES! Tryb pracy został ustawiony na: '{selected_mode}'.")
-        print("*"*60 + "\n")
-
-    except yaml.YAMLError as e:
-        print(f"\nERROR: Problem parsing the file '{config_path}': {e}")
-        print(f"BŁĄD: Problem z parsowaniem pliku '{config_path}': {e}")
-    except Exception as e:
-        print(f"\nERROR: An unexpected error occurred during the file operation: {e}")
-        print(f"BŁĄD: Wystąpił nieoczekiwany problem podczas operacji na pliku: {e}")
+    # Save the updated configuration back to the file
+    # Zapisanie zaktualizowanej konfiguracji z powrotem do pliku
+    with open(config_path, 'w', encoding='utf-8') as file:
+        yaml.dump(config, file, default_flow_style=False, allow_unicode=True, sort_keys=False)
+
+    print("\n" + "*"*60)
+    print(f"SUCCESS! Execution mode has been set to: '{selected_mode}'.")
+    print(f"SUKCES! Tryb pracy został ustawiony na: '{selected_mode}'.")
+    print("*"*60 + "\n")
+    return selected_mode
 
 
 if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Sets the execution mode (local/remote) in config.yaml.",
+                                     epilog="Example: python3 set_mode.py remote")
+    parser.add_argument("mode", nargs="?", choices=MODES,
+                        help="Mode to set without asking. (Tryb do ustawienia bez pytania)")
+    args = parser.parse_args()
+
     # Call the main function of the script
     # Wywołanie głównej funkcji skryptu
-    set_execution_mode()
\ No newline at end of file
+    try:
+        set_execution_mode(mode=args.mode)
+    except FileNotFoundError:
+        print("ERROR: Configuration file 'config.yaml' not found!")
+        print("BŁĄD: Plik konfiguracyjny 'config.yaml' nie został znaleziony!")
+        exit(1)
+    except (ValueError, OSError) as e:
+        print(f"\nERROR: {e}")
+        print(f"BŁĄD: {e}")
+        exit(1)
@@ -6,35 +6,35 @@
 # === GŁÓWNY SKRYPT ORKIESTRUJĄCY ===
 # =====================================================================================
 
+import hashlib
 import os
-import time
-import pandas as pd
+import subprocess
+import threading
 import yaml
 
+from artifact_cache import ArtifactCache
+from check_ip import check_and_update_ip
+from config_loader import load_config, shell_env_file, shell_environment
+from config_pref import generate_pref_file
+from console import EVENTS_ENV, clear_screen, is_headless, pause, progress, set_events_file, set_headless
+from data_source import data_source_for
+from metrics import RunMetrics, print_metrics, span, timed_handler
+from pipeline import Stage, run_pipeline
+from remote_session import open_session
+from tak_certs import TRUSTSTORE_FILENAME, fetch_truststore, issue_certificates, tak_certs_dir
+from outbox import Outbox, OutboxWorker
+from package_builder import PackageBuilder, package_source_dir
+from ledger import Ledger, DEFAULT_LEDGER_PATH, STAGES, certificate_path, file_sha256, package_path
+from set_mode import set_execution_mode
+from user_job import UserJob, job_environment
+from wg_peers import PeerProvisioner, package_files, peer_settings
+
 
 # =====================================================================================
 # === HELPER FUNCTIONS ===
 # === FUNKCJE POMOCNICZE ===
 # =====================================================================================
 
-def load_config(path="config.yaml"):
-    """
-    Loads and returns the configuration from a YAML file.
-    Wczytuje i zwraca konfigurację z pliku YAML.
-    """
-    try:
-        with open(path, 'r', encoding='utf-8') as f:
-            return yaml.safe_load(f)
-    except FileNotFoundError:
-        print("ERROR: Configuration file '{path}' not found!")
-        print(f"BŁĄD: Plik konfiguracyjny '{path}' nie został znaleziony!")
-        return None
-    except Exception as e:
-        print(f"ERROR: Failed to load config file: {e}")
-        print(f"BŁĄD: Nie udało się wczytać pliku konfiguracyjnego: {e}")
-        return None
-
-
 def save_config(data, path="config.yaml"):
     """
     Saves the configuration dictionary to a YAML file.
@@ -50,12 +50,26 @@ def save_config(data, path="config.yaml"):
         return False
 
 
-def set_language():
+def set_language(language=None, config=None):
     """
     Prompts the user to select a language and saves the choice to config.yaml.
     Pyta użytkownika o wybór języka i zapisuje go w pliku config.yaml.
+    With 'language' given (or in headless mode) nothing is asked. An already loaded
+    config is updated in place.
+    Gdy podano 'language' (lub w trybie bezobsługowym), o nic nie pyta. Wczytana już
+    konfiguracja config jest aktualizowana w miejscu.
     """
-    while True:
+    user_type = str(language).upper() if language else None
+    if user_type is None and is_headless():
+        # The language stored by the previous run is kept
+        # Zachowany zostaje język zapisany przez poprzedni przebieg
+        return True
+    if user_type is not None and user_type not in ("EN", "PL"):
+        print(f"ERROR: Invalid language '{language}'. Use 'EN' or 'PL'.")
+        print(f"BŁĄD: Nieprawidłowy język '{language}'. Użyj 'EN' lub 'PL'.")
+        return False
+
+    while user_type is None:
         print("---")
         print("Select User Type:")
         print("Wybierz Typ Użytkownika:")
@@ -68,22 +82,21 @@ def set_language():
 
         if choice == "1":
             user_type = "EN"
-            break
         elif choice == "2":
             user_type = "PL"
-            break
         else:
-            os.system("clear || cls")
+            clear_screen()
             print("Invalid Choice")
             print("Niepoprawny Wybór")
 
-    os.system("clear || cls")
+    clear_screen()
     print(f"Selected: {user_type}")
     print(f"Wybrano: {user_type}")
-    time.sleep(2)
-    os.system("clear || cls")
+    pause(2)
+    clear_screen()
 
-    config = load_config()
+    if config is None:
+        config = load_config()
     if config:
         config['user_management']['state']['user_type'] = user_type
         if save_config(config):
@@ -91,59 +104,355 @@ def set_language():
     return False
 
 
+# =====================================================================================
+# === PIPELINE STAGES ===
+# === ETAPY POTOKU ===
+# =====================================================================================
+
+_print_lock = threading.Lock()
+
+
+def run_stage_command(command, environment):
+    """
+    Runs a single stage command and raises an error with the end of its output
+    if it fails. The output is captured, so that parallel users do not mix it up.
+
+    Uruchamia pojedyncze polecenie etapu i zgłasza błąd z końcówką jego wyjścia,
+    jeśli się nie powiedzie. Wyjście jest przechwytywane, aby równoległe przetwarzanie
+    użytkowników go nie wymieszało.
+    """
+    result = subprocess.run(command, env=environment, stdin=subprocess.DEVNULL, capture_output=True, text=True)
+    if result.returncode != 0:
+        output = (result.stdout + result.stderr).strip().splitlines()
+        message = f"'{' '.join(command)}' exited with code {result.returncode}"
+        if output:
+            message += ":\n" + "\n".join(output[-5:])
+        raise RuntimeError(message)
+
+
+def build_stages(config, session, ledger, outbox, worker=None, key_pool=None, artifact_cache=None,
+                 wireguard_configs=None):
+    """
+    Builds the certificate, package and e-mail stages of the provisioning pipeline with
+    the concurrency limits of 'execution.pipeline'. Stages a job already completed in an
+    earlier run are skipped; every completed stage is recorded in the ledger.
+
+    Buduje etapy certyfikatu, paczki i e-maila potoku provisioningu z limitami
+    współbieżności z 'execution.pipeline'. Etapy ukończone przez zadanie w poprzednim
+    przebiegu są pomijane; każdy ukończony etap jest zapisywany w rejestrze.
+
+    Args:
+        config (dict):                  Loaded configuration.
+                                        Wczytana konfiguracja.
+        session (RemoteSession):        Shared session to the TAK server.
+                                        Współdzielona sesja z serwerem TAK.
+        ledger (Ledger):                Ledger of the completed stages (ledger.py).
+                                        Rejestr ukończonych etapów (ledger.py).
+        outbox (Outbox):                Outbox the e-mail stage queues the packages into (outbox.py).
+                                        Kolejka wychodząca, do której etap e-mail dodaje paczki (outbox.py).
+        worker (OutboxWorker):          Outbox worker woken after every queued e-mail, or None.
+                                        Wątek kolejki budzony po każdym dodanym e-mailu lub None.
+        key_pool (KeyPool):             Pre-generated keys for 'pki.engine: python' (key_pool.py), or None.
+                                        Klucze gotowe z wyprzedzeniem dla 'pki.engine: python' (key_pool.py) lub None.
+        artifact_cache (ArtifactCache): Cache through which the truststore is fetched once per run
+                                        (artifact_cache.py), or None.
+                                        Bufor, przez który truststore jest pobierany raz na przebieg
+                                        (artifact_cache.py), lub None.
+        wireguard_configs (dict):       {username: WireGuard client configuration} added to the
+                                        packages (wg_peers.py), or None.
+                                        {nazwa_użytkownika: konfiguracja klienta WireGuard} dodawana
+                                        do paczek (wg_peers.py) lub None.
+
+    Returns:
+        list: The pipeline stages for run_pipeline().
+              Etapy potoku dla run_pipeline().
+    """
+    settings = (config.get('execution') or {}).get('pipeline') or {}
+    queue_size = settings.get('queue_size', 4)
+    cert_batch_size = settings.get('cert_batch_size', 1)
+    # The shell stages get the configuration and the job through their environment, so config.yaml is only read
+    # Etapy powłoki otrzymują konfigurację i zadanie przez swoje środowisko, więc config.yaml jest tylko odczytywany
+    base_environment = shell_environment(config)
+    package_builder = PackageBuilder(package_source_dir(config))
+    cert_engine = (config.get('pki') or {}).get('engine', 'makecert')
+    pki_engine = []
+    pki_engine_lock = threading.Lock()
+    truststore_fetched = []
+    truststore_lock = threading.Lock()
+
+    def pending(job, stage):
+        return STAGES.index(stage) >= STAGES.index(job.resume_from)
+
+    def fetch_truststore_once():
+        with truststore_lock:
+            if truststore_fetched:
+                return
+            truststore_fetched.append(True)
+            try:
+                fetch_truststore(session, config['paths']['preferences_output'], tak_certs_dir(config), artifact_cache)
+            except Exception as e:
+                # make_cert.sh then copies the truststore itself, as before
+                # make_cert.sh kopiuje wtedy truststore samodzielnie, jak wcześniej
+                with _print_lock:
+                    print(f"WARNING: Could not fetch {TRUSTSTORE_FILENAME} in advance: {e}")
+                    print(f"OSTRZEŻENIE: Nie udało się pobrać {TRUSTSTORE_FILENAME} z wyprzedzeniem: {e}")
+                return
+            base_environment['BLOX_TRUSTSTORE_CACHED'] = "1"
+
+    def make_cert(job):
+        if not pending(job, "cert"):
+            return
+        if artifact_cache is not None:
+            fetch_truststore_once()
+        run_stage_command(["./make_cert.sh"], job_environment(job, base_environment))
+        ledger.record(job, "cert", file_sha256(certificate_path(config, job)))
+
+    def make_cert_batch(jobs):
+        jobs = [job for job in jobs if pending(job, "cert")]
+        if not jobs:
+            return {}
+        outcome = issue_certificates(session, [job.client_name for job in jobs],
+                                     config['paths']['preferences_output'], tak_certs_dir(config))
+        failures = {}
+        for job in jobs:
+            if outcome[job.client_name]:
+                failures[job] = RuntimeError(outcome[job.client_name])
+            else:
+                ledger.record(job, "cert", file_sha256(certificate_path(config, job)))
+        return failures
+
+    def make_cert_pki_batch(jobs):
+        jobs = [job for job in jobs if pending(job, "cert")]
+        if not jobs:
+            return {}
+        # pki_engine (and cryptography) is only imported when this engine is selected
+        # pki_engine (i cryptography) jest importowany tylko, gdy wybrano ten silnik
+        from pki_engine import engine_from_config, publish_certificates
+        with pki_engine_lock:
+            if not pki_engine:
+                pki_engine.append(engine_from_config(config, session, key_pool))
+        outcome, issued = pki_engine[0].issue([job.client_name for job in jobs], config['paths']['preferences_output'])
+        publish_error = publish_certificates(session, issued, tak_certs_dir(config))
+        failures = {}
+        for job in jobs:
+            if outcome[job.client_name]:
+                failures[job] = RuntimeError(outcome[job.client_name])
+            elif publish_error:
+                failures[job] = RuntimeError(f"certificate not copied to the server: {publish_error}")
+            else:
+                ledger.record(job, "cert", file_sha256(certificate_path(config, job)))
+        return failures
+
+    def make_cert_pki(job):
+        failures = make_cert_pki_batch([job])
+        if failures:
+            raise failures[job]
+
+    def package(job):
+        if not pending(job, "package"):
+            return
+        certificate = certificate_path(config, job)
+        wireguard_config = (wireguard_configs or {}).get(job.client_name)
+        extra_files = package_files(job.client_name, wireguard_config) if wireguard_config else None
+        data = package_builder.build_file(job.client_name, certificate, package_path(config, job), extra_files)
+        ledger.record(job, "package", hashlib.sha256(data).hexdigest())
+        # Same cleanup as package.sh: the certificate is only needed inside the package
+        # To samo sprzątanie co w package.sh: certyfikat jest potrzebny tylko w paczce
+        os.remove(certificate)
+
+    def send_email(job):
+        # The e-mail is only queued here; the outbox worker sends it and records it in the ledger
+        # E-mail jest tu tylko dodawany do kolejki; wysyła go wątek kolejki i zapisuje w rejestrze
+        archive = package_path(config, job)
+        entry = outbox.enqueue(job, archive, file_sha256(archive))
+        if entry['state'] == 'sent':
+            ledger.record(job, "email", entry['message_id'])
+        elif worker is not None:
+            worker.wake()
+
+    if cert_engine == 'python':
+        cert_handler = make_cert_pki_batch if cert_batch_size > 1 else make_cert_pki
+    else:
+        cert_handler = make_cert_batch if cert_batch_size > 1 else make_cert
+
+    # Every handler call is a timing span (metrics.py); the e-mail span only covers queuing,
+    # the delivery itself is the 'email_send' span of the outbox worker
+    # Każde wywołanie funkcji obsługi jest odcinkiem czasowym (metrics.py); odcinek e-mail obejmuje
+    # tylko dodanie do kolejki, sama wysyłka to odcinek 'email_send' wątku kolejki
+    return [
+        Stage("cert", timed_handler("cert", cert_handler, cert_batch_size > 1), settings.get('cert_workers', 1),
+              queue_size, cert_batch_size),
+        Stage("package", timed_handler("package", package), settings.get('package_workers', 2), queue_size),
+        Stage("email", timed_handler("email", send_email), settings.get('email_workers', 2), queue_size),
+    ]
+
+
+def report_stage_event(event, stage_name, job, error):
+    """
+    Prints the progress of a single user through the pipeline.
+
+    Wyświetla postęp pojedynczego użytkownika w potoku.
+    """
+    with _print_lock:
+        progress("stage", stage=stage_name, number=job.number, user=job.client_name,
+                 status=event, error=str(error) if error else None)
+        if event == 'done':
+            print(f"[{stage_name}] #{job.number} {job.client_name}: OK")
+        else:
+            print(f"[{stage_name}] #{job.number} {job.client_name}: ERROR / BŁĄD")
+            print(f"    {error}")
+
+
+def print_summary(summary, outbox_counts=None):
+    """
+    Prints the number of successful and failed users, the reasons of the failures
+    and the state of the e-mail outbox.
+
+    Wyświetla liczbę użytkowników obsłużonych pomyślnie i z błędem, przyczyny błędów
+    oraz stan kolejki wychodzących e-maili.
+    """
+    progress("summary", succeeded=len(summary.succeeded), failed=len(summary.failed),
+             elapsed=round(summary.elapsed, 3), outbox=outbox_counts or {})
+    print("---")
+    print(f"Succeeded: {len(summary.succeeded)}, failed: {len(summary.failed)}, time: {summary.elapsed:.1f} s")
+    print(f"Sukces: {len(summary.succeeded)}, błędy: {len(summary.failed)}, czas: {summary.elapsed:.1f} s")
+    if summary.failed:
+        print("Failed users / Użytkownicy z błędem:")
+        for job, stage_name, error in sorted(summary.failed, key=lambda failure: failure[0].number):
+            print(f"  #{job.number} {job.client_name} [{stage_name}]: {error}")
+
+    if outbox_counts:
+        waiting = outbox_counts.get('pending', 0) + outbox_counts.get('sending', 0)
+        print(f"Outbox - sent: {outbox_counts.get('sent', 0)}, waiting for a retry: {waiting}, "
+              f"failed: {outbox_counts.get('failed', 0)} (python3 outbox.py status)")
+        print(f"Kolejka wychodząca - wysłane: {outbox_counts.get('sent', 0)}, oczekujące na ponowienie: {waiting}, "
+              f"nieudane: {outbox_counts.get('failed', 0)} (python3 outbox.py status)")
+
+    print("---")
+    print("Script has finished.")
+    print("Skrypt zakończył działanie.")
+
+
 # =====================================================================================
 # === MAIN EXECUTION FUNCTION ===
 # === GŁÓWNA FUNKCJA WYKONAWCZA ===
 # =====================================================================================
 
-def run_orchestration():
+def run_orchestration(language=None, mode=None, data_source=None):
     """
     The main function that orchestrates the entire process.
     Główna funkcja orkiestrująca całym procesem.
+
+    Args:
+        language (str):    'EN' or 'PL'; asked for when not given (kept from config.yaml when headless).
+                           'EN' lub 'PL'; pytanie, gdy nie podano (z config.yaml w trybie bezobsługowym).
+        mode (str):        'local' or 'remote'; asked for when not given (kept when headless).
+                           'local' lub 'remote'; pytanie, gdy nie podano (zachowany w trybie bezobsługowym).
+        data_source (str): URL or path of the registration CSV instead of the configured one.
+                           URL lub ścieżka CSV z rejestracjami zamiast skonfigurowanego.
     """
+    # The configuration is loaded once and shared by all steps, which run in this process
+    # Konfiguracja jest wczytywana raz i współdzielona przez wszystkie kroki wykonywane w tym procesie
+    config = load_config()
+    if not config:
+        exit(1)
+
+    # Timing spans of this run go to the trace and, at the end, to the Prometheus textfile
+    # Odcinki czasowe tego przebiegu trafiają do śladu, a na końcu do pliku tekstowego Prometheus
+    run_metrics = RunMetrics.from_config(config)
+    if run_metrics is not None:
+        run_metrics.activate()
+
     # --- Step 1: Configuration questions for the user ---
     # --- Krok 1: Pytania konfiguracyjne do użytkownika ---
-    if not set_language():
+    if not set_language(language, config):
         exit(1)
 
     print("---")
     print("Select the operating mode (local/remote)...")
     print("Wybierz tryb pracy (local/remote)...")
-    os.system("python3 set_mode.py")
-    os.system("clear || cls")
+    try:
+        set_execution_mode(mode=mode, config=config)
+    except (ValueError, OSError) as e:
+        print(f"ERROR: Could not set the execution mode: {e}")
+        print(f"BŁĄD: Nie udało się ustawić trybu pracy: {e}")
+        exit(1)
+    clear_screen()
+
+    # The key pool is set up (and its settings checked) before the session and the outbox worker
+    # are opened; its background generation only starts with the pipeline
+    # Pula kluczy jest tworzona (a jej ustawienia sprawdzane) przed otwarciem sesji i wątku kolejki
+    # wychodzącej; generowanie w tle rusza dopiero z potokiem
+    key_pool = None
+    pki = config.get('pki') or {}
+    if pki.get('engine') == 'python' and (pki.get('key_pool') or {}).get('enabled'):
+        try:
+            from key_pool import KeyPool
+            key_pool = KeyPool.from_config(config)
+        except Exception as e:
+            print(f"ERROR: Invalid key pool settings (pki.key_pool): {e}")
+            print(f"BŁĄD: Niepoprawne ustawienia puli kluczy (pki.key_pool): {e}")
+            exit(1)
+
+    # In remote mode one SSH connection is opened for the whole run and shared by all steps and stages
+    # W trybie zdalnym jedno połączenie SSH jest otwierane na cały przebieg i współdzielone przez kroki i etapy
+    try:
+        session = open_session(config)
+    except Exception as e:
+        print(f"ERROR: Failed to connect to the server: {e}")
+        print(f"BŁĄD: Nie udało się połączyć z serwerem: {e}")
+        exit(1)
 
-    # --- Step 2: Running preparation scripts ---
-    # --- Krok 2: Uruchomienie skryptów przygotowawczych ---
+    # --- Step 2: Preparation (external IP and config.pref) ---
+    # --- Krok 2: Przygotowanie (zewnętrzny adres IP i config.pref) ---
     print("---")
-    print("Running preparation scripts...")
-    print("Uruchamiam skrypty przygotowawcze...")
-    os.system("python3 check_ip.py")
-    os.system("python3 config_pref.py")
-    os.system("clear || cls")
+    print("Running preparation steps...")
+    print("Uruchamiam kroki przygotowawcze...")
+    try:
+        with span("ip_check"):
+            check_and_update_ip(config=config, session=session)
+    except Exception as e:
+        print(f"WARNING: Could not check the external IP ({e}). Using {config['network'].get('external_ip')}.")
+        print(f"OSTRZEŻENIE: Nie udało się sprawdzić zewnętrznego IP ({e}). "
+              f"Używam {config['network'].get('external_ip')}.")
+    try:
+        with span("pref"):
+            generate_pref_file(config)
+    except (KeyError, OSError) as e:
+        print(f"ERROR: Failed to write the .pref file: {e}")
+        print(f"BŁĄD: Nie udało się zapisać pliku .pref: {e}")
+        session.close()
+        exit(1)
+    # The shell stages source this snapshot of config.yaml instead of creating it themselves
+    # Etapy powłoki wczytują tę migawkę config.yaml zamiast tworzyć ją samodzielnie
+    try:
+        os.environ['BLOX_CONFIG_ENV'] = shell_env_file()
+    except (OSError, ValueError) as e:
+        print(f"WARNING: Could not write the configuration snapshot for the shell stages: {e}")
+        print(f"OSTRZEŻENIE: Nie udało się zapisać migawki konfiguracji dla etapów powłoki: {e}")
+    clear_screen()
 
     # --- Step 3: Loading data and preparing for the loop ---
     # --- Krok 3: Wczytanie danych i przygotowanie do pętli ---
-    config = load_config()
-    if not config:
-        exit(1)
-
     user_type = config['user_management']['state']['user_type']
-    data_sources = config['user_management']['data_sources']
-    csv_path = data_sources.get(user_type.lower())
+    source = data_source_for(config, user_type, data_source)
 
-    if not csv_path:
+    if not source:
         print(f"ERROR: No data source for language '{user_type}'.")
         print(f"BŁĄD: Brak źródła danych dla języka '{user_type}'.")
+        session.close()
         exit(1)
 
     print("---")
     print("Loading user list...")
     print("Wczytuję listę użytkowników...")
     try:
-        df = pd.read_csv(csv_path)
+        with span("csv_fetch"):
+            df = source.read_dataframe()
     except Exception as e:
         print(f"ERROR: Failed to load data from CSV: {e}")
         print(f"BŁĄD: Nie udało się wczytać danych z CSV: {e}")
+        session.close()
         exit(1)
 
     if user_type == "EN":
@@ -156,51 +465,107 @@ def run_orchestration():
         column_name1 = 'Adres E-Mail:'
         column_name2 = 'Sygnatura czasowa:'
         print("\n--- Lista Użytkowników ---")
+    # The PL sheet writes 'Sygnatura Czasowa:', so the column is found case-insensitively
+    # Arkusz PL zapisuje 'Sygnatura Czasowa:', więc kolumna jest wyszukiwana bez rozróżniania wielkości liter
+    column_name2 = next((c for c in df.columns if c.lower() == column_name2.lower()), column_name2)
 
     number_users = len(df)
     print(df[column_name].to_string(index=False))
     print(f"\nNumber Of Users: {number_users}")
     print(f"Liczba Użytkowników: {number_users}")
-    time.sleep(3)
-    os.system("clear || cls")
-
-    config['user_management']['state']['number_users'] = number_users
-    save_config(config)
-
-    # --- Step 4: Main processing loop ---
-    # --- Krok 4: Główna pętla przetwarzania ---
-    for index, row in df.iterrows():
-        print("---")
-        print(f"Processing user {index + 1} of {number_users}...")
-        print(f"Przetwarzam użytkownika {index + 1} z {number_users}...")
-
-        client_name = row[column_name]
-        email_address = row[column_name1]
-        registration_date = row[column_name2]
-
-        print(f"Client: {client_name}")
-        print(f"Klient: {client_name}")
-        time.sleep(2)
-
-        config['user_management']['state']['client_name'] = str(client_name)
-        config['user_management']['state']['email_address'] = str(email_address)
-        config['user_management']['state']['registration_date'] = str(registration_date)
-        save_config(config)
-
-        # Call scripts for the current user
-        # Wywołanie skryptów dla bieżącego użytkownika
-        os.system("./make_cert.sh")
-        os.system("clear || cls")
-        os.system("./package.sh")
-        time.sleep(3)
-        os.system("clear || cls")
-        os.system("python3 email_sender.py")
-        time.sleep(6)
-        os.system("clear || cls")
+    progress("users", language=user_type, count=number_users)
+    pause(3)
+    clear_screen()
+
+    # Every user gets an in-memory job; config.yaml is not written during the run
+    # Każdy użytkownik otrzymuje zadanie w pamięci; config.yaml nie jest zapisywany w trakcie przebiegu
+    jobs = [
+        UserJob(index + 1, row[column_name], row[column_name1], row[column_name2], user_type)
+        for index, row in df.iterrows()
+    ]
+
+    # Users already provisioned in an earlier run are skipped, interrupted ones resume at their stage
+    # Użytkownicy obsłużeni we wcześniejszym przebiegu są pomijani, przerwani wznawiają od swojego etapu
+    ledger = Ledger(config['paths'].get('ledger') or DEFAULT_LEDGER_PATH)
+    for job in jobs:
+        job.resume_from = ledger.resume_stage(job, config)
+    skipped = sum(1 for job in jobs if job.resume_from is None)
+    jobs = [job for job in jobs if job.resume_from is not None]
+
+    def on_event(event, stage_name, job, error):
+        if event == 'failed':
+            ledger.record_error(job, stage_name, error)
+        report_stage_event(event, stage_name, job, error)
+
+    # --- Step 4: Main processing pipeline ---
+    # --- Krok 4: Główny potok przetwarzania ---
+    print("---")
+    print(f"Already provisioned (skipped): {skipped}")
+    print(f"Już obsłużeni (pominięci): {skipped}")
+    print(f"Processing {len(jobs)} users in the pipeline (certificate -> package -> e-mail)...")
+    print(f"Przetwarzam {len(jobs)} użytkowników w potoku (certyfikat -> paczka -> e-mail)...")
+
+    # E-mails go through the durable outbox, sent in the background with one Google API
+    # authentication; whatever is left (e.g. after a Gmail outage) is sent by the next run
+    # or by 'python3 outbox.py run'
+    # E-maile przechodzą przez trwałą kolejkę wychodzącą, wysyłaną w tle z jedną autoryzacją
+    # Google API; to, co zostanie (np. po awarii Gmaila), wyśle kolejny przebieg
+    # lub 'python3 outbox.py run'
+    outbox = Outbox.from_config(config)
+    worker = OutboxWorker(outbox, config, on_sent=lambda job, message_id: ledger.record(job, "email", message_id))
+    worker.start()
+
+    # Client keys are generated ahead in the background while the earlier stages run
+    # Klucze klientów są generowane z wyprzedzeniem w tle, gdy trwają wcześniejsze etapy
+    if key_pool is not None:
+        key_pool.start()
+
+    artifact_cache = ArtifactCache.from_config(config)
+    with session:
+        # Per-user WireGuard peers: one server update for all users that still need a package
+        # Peery WireGuard dla użytkowników: jedna aktualizacja serwera dla wszystkich, którzy potrzebują paczki
+        wireguard_configs = None
+        if peer_settings(config)['enabled']:
+            provisioner = PeerProvisioner(config, session)
+            try:
+                with span("wireguard_peers"):
+                    wireguard_configs = provisioner.provision(
+                        [job.client_name for job in jobs if STAGES.index(job.resume_from) <= STAGES.index("package")])
+                print(f"WireGuard peers created: {len(wireguard_configs)}")
+                print(f"Utworzone peery WireGuard: {len(wireguard_configs)}")
+            except Exception as e:
+                print(f"WARNING: WireGuard peers not created, packages go out without them: {e}")
+                print(f"OSTRZEŻENIE: Peery WireGuard nie zostały utworzone, paczki wyjdą bez nich: {e}")
+            finally:
+                provisioner.close()
+        summary = run_pipeline(jobs, build_stages(config, session, ledger, outbox, worker, key_pool, artifact_cache,
+                                                  wireguard_configs),
+                               on_event=on_event)
+    if artifact_cache is not None:
+        artifact_cache.close()
+
+    if key_pool is not None:
+        key_metrics = key_pool.metrics()
+        key_pool.close()
+        print(f"Key pool - served: {key_metrics['served']}, generated on the spot: {key_metrics['misses']}, "
+              f"left: {key_metrics['available']}/{key_metrics['depth']}")
+        print(f"Pula kluczy - wydane: {key_metrics['served']}, wygenerowane na miejscu: {key_metrics['misses']}, "
+              f"pozostało: {key_metrics['available']}/{key_metrics['depth']}")
 
     print("---")
-    print("Script has finished.")
-    print("Skrypt zakończył działanie.")
+    print("Waiting for the queued e-mails...")
+    print("Czekam na e-maile z kolejki...")
+    worker.stop(drain=True)
+    outbox_counts = outbox.counts()
+    outbox.close()
+    ledger.close()
+    if run_metrics is not None:
+        metrics_result = run_metrics.finish(len(summary.succeeded), len(summary.failed))
+        progress("metrics", run=metrics_result["run"], users_per_minute=round(metrics_result["users_per_minute"], 2),
+                 stages=metrics_result["spans"])
+        print_metrics(metrics_result)
+    print_summary(summary, outbox_counts)
+    return summary
 
 
 # =====================================================================================
@@ -209,4 +574,39 @@ def run_orchestration():
 # =====================================================================================
 
 if __name__ == "__main__":
-    run_orchestration()
\ No newline at end of file
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Provisions TAK users from the registration sheet.")
+    parser.add_argument("--startup-report", action="store_true",
+                        help="Only print the import cost of the scripts and check their budgets. "
+                             "(Tylko wypisz koszt importu skryptów i sprawdź ich limity)")
+    parser.add_argument("--headless", action="store_true",
+                        help="Run unattended (also BLOX_HEADLESS=1): no questions, pauses or screen clears, "
+                             "JSON progress lines on stdout or in --events. (Przebieg bezobsługowy, także "
+                             "BLOX_HEADLESS=1: bez pytań, pauz i czyszczenia ekranu, postęp jako linie JSON na stdout "
+                             "lub w --events)")
+    parser.add_argument("--events", default=os.environ.get(EVENTS_ENV),
+                        help="File for the JSON progress lines instead of stdout (also BLOX_EVENTS). "
+                             "(Plik na linie postępu JSON zamiast stdout)")
+    parser.add_argument("--language", choices=["EN", "PL", "en", "pl"], default=os.environ.get("BLOX_LANGUAGE"),
+                        help="Registration sheet language (also BLOX_LANGUAGE). (Język arkusza rejestracji)")
+    parser.add_argument("--mode", choices=["local", "remote"], default=os.environ.get("BLOX_MODE"),
+                        help="Execution mode (also BLOX_MODE). (Tryb pracy)")
+    parser.add_argument("--data-source", default=os.environ.get("BLOX_DATA_SOURCE"),
+                        help="URL or path of the registration CSV (also BLOX_DATA_SOURCE). "
+                             "(URL lub ścieżka CSV z rejestracjami)")
+    args = parser.parse_args()
+
+    if args.startup_report:
+        from startup_report import startup_report
+        exit(0 if startup_report() else 1)
+
+    if args.headless:
+        # Exported, so check_ip.py, config_pref.py and the shell stages run headless too
+        # Eksportowane, aby check_ip.py, config_pref.py i etapy powłoki też działały bezobsługowo
+        set_headless()
+    if args.events:
+        set_events_file(args.events)
+    result = run_orchestration(args.language, args.mode, args.data_source)
+    if result.failed:
+        exit(1)
\ No newline at end of file
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# =====================================================================================
+# === STARTUP TIME REPORT FOR THE PROJECT SCRIPTS (BASED ON -X importtime) ===
+# === RAPORT CZASU URUCHAMIANIA SKRYPTÓW PROJEKTU (NA PODSTAWIE -X importtime) ===
+# =====================================================================================
+
+import os
+import subprocess
+import sys
+
+# Scripts started as separate processes, with their allowed import time in milliseconds.
+# Can be overridden in config.yaml under execution.startup_budget_ms.
+# Skrypty uruchamiane jako osobne procesy, z dozwolonym czasem importu w milisekundach.
+# Można je nadpisać w config.yaml w sekcji execution.startup_budget_ms.
+DEFAULT_BUDGETS_MS = {
+    "start.py": 150,
+    "benchmark.py": 150,
+    # Also covers the batch revocation (tak_certs.py), imported at the top
+    # Obejmuje też wsadowe odwoływanie (tak_certs.py), importowane na początku
+    "revoke.py": 100,
+    "email_sender.py": 100,
+    "check_ip.py": 100,
+    "ip_watcher.py": 100,
+    "config_pref.py": 80,
+    "set_mode.py": 80,
+    "pki_engine.py": 80,
+    "data_source.py": 50,
+    "ledger.py": 50,
+    "tak_certs.py": 50,
+    "remote_session.py": 50,
+    "wg_peers.py": 50,
+    "wg_live.py": 50,
+    "key_pool.py": 50,
+    "metrics.py": 50,
+    "outbox.py": 50,
+    "cert_inventory.py": 50,
+    "artifact_cache.py": 50,
+    "package_builder.py": 50,
+    "ip_detect.py": 50,
+    "config_loader.py": 50,
+}
+
+# Number of imported modules shown for every script
+# Liczba importowanych modułów pokazywanych dla każdego skryptu
+TOP_MODULES = 5
+
+
+# =====================================================================================
+# === HELPER FUNCTIONS ===
+# === FUNKCJE POMOCNICZE ===
+# =====================================================================================
+
+def load_budgets(path="config.yaml"):
+    """
+    Returns the budgets, with the values from config.yaml (execution.startup_budget_ms)
+    taking precedence over the defaults.
+
+    Zwraca limity, przy czym wartości z config.yaml (execution.startup_budget_ms)
+    mają pierwszeństwo przed domyślnymi.
+    """
+    budgets = dict(DEFAULT_BUDGETS_MS)
+    if not os.path.isfile(path):
+        return budgets
+    try:
+        import yaml
+        with open(path, 'r', encoding='utf-8') as f:
+            config = yaml.safe_load(f) or {}
+    except Exception as e:
+        print(f"WARNING: Could not read budgets from '{path}': {e}")
+        print(f"OSTRZEŻENIE: Nie udało się odczytać limitów z '{path}': {e}")
+        return budgets
+    budgets.update((config.get('execution') or {}).get('startup_budget_ms') or {})
+    return budgets
+
+
+def measure_imports(script):
+    """
+    Imports the script as a module in a fresh interpreter with '-X importtime'
+    and returns the total import time and the cost of every imported module.
+    The script body behind 'if __name__ == "__main__"' is not executed.
+
+    Importuje skrypt jako moduł w nowym interpreterze z '-X importtime'
+    i zwraca całkowity czas importu oraz koszt każdego importowanego modułu.
+    Część skryptu za 'if __name__ == "__main__"' nie jest wykonywana.
+
+    Returns:
+        tuple: (total_us, {module: cumulative_us}) or None if the import failed.
+               (suma_us, {moduł: skumulowane_us}) lub None, jeśli import się nie powiódł.
+    """
+    module = os.path.splitext(os.path.basename(script))[0]
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=os.path.dirname(os.path.abspath(script)),
+        capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        last_line = (result.stderr.strip().splitlines() or ["?"])[-1]
+        print(f"ERROR: Importing {script} failed: {last_line}")
+        print(f"BŁĄD: Import {script} nie powiódł się: {last_line}")
+        return None
+
+    # Lines look like: "import time:  self [us] | cumulative | imported package", with nested
+    # imports indented and listed before the module that imported them
+    # Linie wyglądają tak: "import time:  self [us] | cumulative | imported package", a importy
+    # zagnieżdżone są wcięte i wypisane przed modułem, który je zaimportował
+    total = None
+    direct = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[1].strip().isdigit():
+            continue
+        name = fields[2].rstrip()
+        depth = len(name) - len(name.lstrip())
+        name = name.strip()
+        if depth == 1:
+            if name == module:
+                total = int(fields[1])
+                break
+            # A top-level import of the interpreter startup (site, ...), not of the script
+            # Import najwyższego poziomu przy starcie interpretera (site, ...), a nie skryptu
+            direct = {}
+        elif depth == 3:
+            direct[name] = int(fields[1])
+
+    if total is None:
+        return None
+    return total, direct
+
+
+# =====================================================================================
+# === MAIN SCRIPT LOGIC ===
+# === GŁÓWNA LOGIKA SKRYPTU ===
+# =====================================================================================
+
+def startup_report(scripts=None):
+    """
+    Prints the import cost of every script and checks it against its budget.
+
+    Wypisuje koszt importu każdego skryptu i porównuje go z jego limitem.
+
+    Args:
+        scripts (list): Scripts to measure; by default all from the budget list.
+                        Skrypty do zmierzenia; domyślnie wszystkie z listy limitów.
+
+    Returns:
+        bool: True if every script is within its budget, False otherwise.
+              True, jeśli każdy skrypt mieści się w limicie, w przeciwnym razie False.
+    """
+    budgets = load_budgets()
+    project_root = os.path.dirname(os.path.abspath(__file__))
+    within_budget = True
+
+    print("--- Startup time report (import cost per script) ---")
+    print("--- Raport czasu uruchamiania (koszt importu dla każdego skryptu) ---")
+    for script in scripts or budgets:
+        measured = measure_imports(os.path.join(project_root, script))
+        if measured is None:
+            within_budget = False
+            continue
+        total_us, direct = measured
+        budget_ms = budgets.get(script)
+        total_ms = total_us / 1000
+
+        if budget_ms is None:
+            status = "no budget / brak limitu"
+        elif total_ms <= float(budget_ms):
+            status = f"OK (budget / limit {budget_ms} ms)"
+        else:
+            status = f"OVER BUDGET / PRZEKROCZONY LIMIT ({budget_ms} ms)"
+            within_budget = False
+
+        print(f"\n{script:<20} {total_ms:8.1f} ms  {status}")
+        for name, cumulative in sorted(direct.items(), key=lambda entry: -entry[1])[:TOP_MODULES]:
+            print(f"    {name:<32} {cumulative / 1000:8.1f} ms")
+
+    print("")
+    if within_budget:
+        print("All scripts are within their startup budget.")
+        print("Wszystkie skrypty mieszczą się w limicie czasu uruchamiania.")
+    else:
+        print("Some scripts exceed their startup budget or could not be imported.")
+        print("Niektóre skrypty przekraczają limit czasu uruchamiania lub nie dało się ich zaimportować.")
+    return within_budget
+
+
+# =====================================================================================
+# === SCRIPT ENTRY POINT ===
+# === PUNKT WEJŚCIA DO SKRYPTU ===
+# =====================================================================================
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Prints the import cost of the project scripts and checks their startup budgets.",
+        epilog="Example: python3 startup_report.py email_sender.py check_ip.py"
+    )
+    parser.add_argument("scripts", nargs="*", help="Scripts to measure (default: all). (Skrypty do zmierzenia, domyślnie wszystkie)")
+    args = parser.parse_args()
+
+    if not startup_report(args.scripts):
+        exit(1)
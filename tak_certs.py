@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# =====================================================================================
+# === BATCH OPERATIONS ON TAK SERVER CLIENT CERTIFICATES ===
+# === OPERACJE WSADOWE NA CERTYFIKATACH KLIENTÓW SERWERA TAK ===
+# =====================================================================================
+
+import hashlib
+import os
+import shlex
+import tarfile
+import threading
+import time
+
+from artifact_cache import write_if_changed
+from metrics import record_span
+
+# Default location of the TAK server certificate scripts (paths.tak_certs_dir in config.yaml)
+# Domyślna lokalizacja skryptów certyfikatów serwera TAK (paths.tak_certs_dir w config.yaml)
+DEFAULT_TAK_CERTS_DIR = "/home/tak/tak-server/tak/certs"
+TRUSTSTORE_FILENAME = "truststore-root.p12"
+_ISSUED_LIST = "issued.txt"
+
+# CA used by revoke_cert.sh ('./revokeCert.sh <client> root-ca-do-not-share root-ca')
+# CA używane przez revoke_cert.sh ('./revokeCert.sh <klient> root-ca-do-not-share root-ca')
+SIGNING_CA = "root-ca-do-not-share"
+CRL_NAME = "root-ca"
+
+
+# =====================================================================================
+# === HELPER FUNCTIONS ===
+# === FUNKCJE POMOCNICZE ===
+# =====================================================================================
+
+def tak_certs_dir(config):
+    """
+    Returns the TAK certificates directory from the configuration, or the default one.
+
+    Zwraca katalog certyfikatów TAK z konfiguracji lub katalog domyślny.
+    """
+    return (config.get('paths') or {}).get('tak_certs_dir') or DEFAULT_TAK_CERTS_DIR
+
+
+def _issue_script(client_names, certs_dir):
+    """
+    Builds the shell script that issues all certificates in one privileged session
+    and writes a single tar archive with the results to stdout.
+
+    Buduje skrypt powłoki, który wystawia wszystkie certyfikaty w jednej
+    uprzywilejowanej sesji i zapisuje jedno archiwum tar z wynikami na stdout.
+    """
+    names = " ".join(shlex.quote(name) for name in client_names)
+    return f"""
+        set -e
+        out=$(mktemp -d)
+        trap 'rm -rf "$out"' EXIT
+        cd {shlex.quote(certs_dir)}
+        : > "$out/{_ISSUED_LIST}"
+        for name in {names}; do
+            echo "--- Generating client certificate for: $name ---" >&2
+            echo "--- Generowanie certyfikatu klienta dla: $name ---" >&2
+            if ./makeCert.sh client "$name" >&2 </dev/null && [ -f "files/$name.p12" ]; then
+                cp "files/$name.p12" "$out/"
+                printf '%s\\n' "$name" >> "$out/{_ISSUED_LIST}"
+            fi
+        done
+        cp files/{TRUSTSTORE_FILENAME} "$out/"
+        tar -C "$out" -cf - .
+    """
+
+
+def _revoke_script(client_names, certs_dir, signing_ca, crl_name):
+    """
+    Builds the shell script that revokes all certificates with the same openssl
+    calls as revokeCert.sh, but generates the CRL only once at the end. Every
+    client gets one tab-separated status line on stdout.
+
+    Buduje skrypt powłoki, który odwołuje wszystkie certyfikaty tymi samymi
+    wywołaniami openssl co revokeCert.sh, ale generuje listę CRL tylko raz na końcu.
+    Każdy klient otrzymuje jedną linię statusu rozdzieloną tabulatorami na stdout.
+    """
+    names = " ".join(shlex.quote(name) for name in client_names)
+    ca = shlex.quote(signing_ca)
+    return f"""
+        cd {shlex.quote(certs_dir)} || exit 1
+        . ./cert-metadata.sh >/dev/null 2>&1 || true
+        cd files || exit 1
+        revoked=0
+        for name in {names}; do
+            if [ ! -f "$name.pem" ]; then
+                printf 'missing\t%s\t%s\n' "$name" "no certificate on the server"
+                continue
+            fi
+            if out=$(openssl ca -config ../config.cfg -revoke "$name.pem" -keyfile {ca}.key \
+                        -key "$CAPASS" -cert {ca}.pem 2>&1); then
+                printf 'revoked\t%s\t\n' "$name"
+                revoked=1
+            elif printf '%s' "$out" | grep -q 'Already revoked'; then
+                printf 'revoked\t%s\t%s\n' "$name" "already revoked"
+            else
+                printf 'failed\t%s\t%s\n' "$name" "$(printf '%s' "$out" | tail -n 1)"
+                continue
+            fi
+            rm -f -- "$name".*
+        done
+        if [ "$revoked" = 1 ]; then
+            if out=$(openssl ca -config ../config.cfg -gencrl -keyfile {ca}.key -key "$CAPASS" \
+                        -cert {ca}.pem -out {shlex.quote(crl_name)}.crl 2>&1); then
+                printf 'crl\t\t\n'
+            else
+                printf 'crl-failed\t\t%s\n' "$(printf '%s' "$out" | tail -n 1)"
+            fi
+        fi
+    """
+
+
+# =====================================================================================
+# === MAIN LOGIC ===
+# === GŁÓWNA LOGIKA ===
+# =====================================================================================
+
+def issue_certificates(session, client_names, destination_dir, certs_dir=DEFAULT_TAK_CERTS_DIR):
+    """
+    Issues client certificates for all given names with a single privileged command
+    and receives every '<client>.p12' plus one copy of 'truststore-root.p12' as one
+    tar stream, unpacked directly into destination_dir.
+
+    Wystawia certyfikaty klienckie dla wszystkich podanych nazw jednym
+    uprzywilejowanym poleceniem i odbiera każdy plik '<klient>.p12' oraz jedną kopię
+    'truststore-root.p12' jako jeden strumień tar, rozpakowywany od razu do destination_dir.
+
+    Args:
+        session:               RemoteSession or LocalSession (remote_session.py).
+                               RemoteSession lub LocalSession (remote_session.py).
+        client_names (list):   Names of the clients to issue certificates for.
+                               Nazwy klientów, dla których mają zostać wystawione certyfikaty.
+        destination_dir (str): Local directory for the received .p12 files.
+                               Lokalny katalog na odebrane pliki .p12.
+        certs_dir (str):       TAK server certificates directory (with makeCert.sh).
+                               Katalog certyfikatów serwera TAK (z makeCert.sh).
+
+    Returns:
+        dict: {client_name: None} for issued certificates, {client_name: "error"} otherwise.
+              {nazwa_klienta: None} dla wystawionych certyfikatów, w przeciwnym razie {nazwa_klienta: "błąd"}.
+    """
+    client_names = list(dict.fromkeys(str(name) for name in client_names))
+    if not client_names:
+        return {}
+    os.makedirs(destination_dir, exist_ok=True)
+
+    expected = {f"{name}.p12": name for name in client_names}
+    received = set()
+    issued = set()
+
+    # Time to the first archive member = remote execution (makeCert.sh), the rest = transfer
+    # Czas do pierwszego elementu archiwum = wykonanie zdalne (makeCert.sh), reszta = przesyłanie
+    started = time.perf_counter()
+    first_member = None
+    process = session.popen(_issue_script(client_names, certs_dir), sudo=True)
+
+    # stderr is drained in the background, so a long makeCert.sh log cannot block the tar stream
+    # stderr jest odczytywany w tle, aby długi log makeCert.sh nie zablokował strumienia tar
+    stderr_chunks = []
+    stderr_reader = threading.Thread(target=lambda: stderr_chunks.append(process.stderr.read()), daemon=True)
+    stderr_reader.start()
+    try:
+        with tarfile.open(fileobj=process.stdout, mode="r|") as archive:
+            for member in archive:
+                if first_member is None:
+                    first_member = time.perf_counter()
+                if not member.isfile():
+                    continue
+                filename = os.path.basename(member.name)
+                data = archive.extractfile(member).read()
+                if filename == _ISSUED_LIST:
+                    issued.update(line for line in data.decode("utf-8").splitlines() if line)
+                    continue
+                # Only the expected files are written, whatever the archive contains
+                # Zapisywane są tylko oczekiwane pliki, niezależnie od zawartości archiwum
+                if filename != TRUSTSTORE_FILENAME and filename not in expected:
+                    continue
+                local_path = os.path.join(destination_dir, filename)
+                with open(local_path, "wb") as f:
+                    f.write(data)
+                os.chmod(local_path, 0o644)
+                received.add(filename)
+    except tarfile.TarError as e:
+        stream_error = f"invalid archive from the server: {e}"
+    else:
+        stream_error = None
+    finally:
+        process.stdout.read()
+        process.wait()
+        stderr_reader.join()
+        finished = time.perf_counter()
+        first_member = first_member or finished
+        record_span("remote_exec", first_member - started, users=len(client_names))
+        record_span("transfer", finished - first_member, users=len(client_names))
+
+    if process.returncode != 0 or stream_error or TRUSTSTORE_FILENAME not in received:
+        stderr_lines = b"".join(stderr_chunks).decode("utf-8", errors="replace").strip().splitlines()
+        reason = (stderr_lines[-1] if stderr_lines else None) or stream_error or "no output"
+        return {name: f"batch failed (exit code {process.returncode}): {reason}" for name in client_names}
+
+    results = {}
+    for filename, name in expected.items():
+        if name in issued and filename in received:
+            results[name] = None
+        else:
+            results[name] = "makeCert.sh did not produce the certificate"
+    return results
+
+
+def fetch_truststore(session, destination_dir, certs_dir=DEFAULT_TAK_CERTS_DIR, cache=None):
+    """
+    Copies 'truststore-root.p12' from the server into destination_dir. Only its SHA-256
+    is read from the server when the artifact cache already holds this truststore.
+
+    Kopiuje 'truststore-root.p12' z serwera do destination_dir. Gdy bufor artefaktów
+    zawiera już ten truststore, z serwera odczytywany jest tylko jego SHA-256.
+
+    Returns:
+        str: Local path of the truststore. / Lokalna ścieżka truststore.
+
+    Raises:
+        subprocess.CalledProcessError: The file could not be read on the server.
+                                       Nie udało się odczytać pliku na serwerze.
+        RuntimeError: The received file does not match its hash. / Odebrany plik nie zgadza się ze skrótem.
+    """
+    remote_path = shlex.quote(f"{certs_dir}/files/{TRUSTSTORE_FILENAME}")
+
+    def download():
+        data = session.exec(f"cat {remote_path}", sudo=True, text=False).stdout
+        if hashlib.sha256(data).hexdigest() != digest:
+            raise RuntimeError(f"{TRUSTSTORE_FILENAME} changed while it was downloaded")
+        return data
+
+    digest = session.exec(f"sha256sum {remote_path}", sudo=True).stdout.split()[0]
+    data = cache.get_or_create("truststore", {"sha256": digest}, download) if cache is not None else download()
+    local_path = os.path.join(destination_dir, TRUSTSTORE_FILENAME)
+    write_if_changed(local_path, data)
+    return local_path
+
+
+def revoke_certificates(session, client_names, certs_dir=DEFAULT_TAK_CERTS_DIR, signing_ca=SIGNING_CA,
+                        crl_name=CRL_NAME):
+    """
+    Revokes the certificates of all given clients in one privileged command,
+    removes their certificate files and regenerates the CRL once, instead of once
+    per client as revokeCert.sh does.
+
+    Odwołuje certyfikaty wszystkich podanych klientów jednym uprzywilejowanym
+    poleceniem, usuwa ich pliki certyfikatów i generuje listę CRL raz, zamiast
+    osobno dla każdego klienta jak revokeCert.sh.
+
+    Args:
+        session:           RemoteSession or LocalSession (remote_session.py).
+                           RemoteSession lub LocalSession (remote_session.py).
+        client_names:      Names of the clients to revoke.
+                           Nazwy klientów do odwołania.
+        certs_dir (str):   TAK server certificates directory.
+                           Katalog certyfikatów serwera TAK.
+        signing_ca (str):  CA that signed the client certificates.
+                           CA, które podpisało certyfikaty klientów.
+        crl_name (str):    Name of the generated CRL file (without '.crl').
+                           Nazwa generowanego pliku CRL (bez '.crl').
+
+    Returns:
+        dict: {client_name: (status, detail)}, status being 'revoked', 'missing' or 'failed'.
+              {nazwa_klienta: (status, szczegóły)}, gdzie status to 'revoked', 'missing' lub 'failed'.
+    """
+    client_names = list(dict.fromkeys(str(name) for name in client_names))
+    if not client_names:
+        return {}
+
+    result = session.exec(_revoke_script(client_names, certs_dir, signing_ca, crl_name), sudo=True, check=False)
+    outcome = {}
+    crl_error = None
+    for line in result.stdout.splitlines():
+        fields = line.split("\t")
+        if len(fields) != 3:
+            continue
+        status, name, detail = fields
+        if status == "crl-failed":
+            crl_error = detail or "CRL generation failed"
+        elif name in client_names:
+            outcome[name] = (status, detail)
+
+    for name in client_names:
+        if name not in outcome:
+            reason = (result.stderr.strip().splitlines() or [f"exit code {result.returncode}"])[-1]
+            outcome[name] = ("failed", reason)
+        elif crl_error and outcome[name][0] == "revoked":
+            # Revoked in the CA database, but not yet in the published CRL
+            # Odwołany w bazie CA, ale jeszcze nie na opublikowanej liście CRL
+            outcome[name] = ("failed", f"revoked, but the CRL was not generated: {crl_error}")
+    return outcome
+
+
+# =====================================================================================
+# === SCRIPT ENTRY POINT ===
+# === PUNKT WEJŚCIA DO SKRYPTU ===
+# =====================================================================================
+
+if __name__ == "__main__":
+    import argparse
+    from config_loader import load_config
+    from remote_session import open_session
+
+    parser = argparse.ArgumentParser(
+        description="Issues or revokes TAK client certificates for many users in one session.",
+        epilog="Example: python3 tak_certs.py issue user1 user2 user3"
+    )
+    parser.add_argument("action", choices=["issue", "revoke"], help="Action to perform. (Akcja do wykonania)")
+    parser.add_argument("client_names", nargs="+", help="Client names. (Nazwy klientów)")
+    args = parser.parse_args()
+
+    config_data = load_config()
+    if not config_data:
+        exit(1)
+
+    with open_session(config_data) as session:
+        if args.action == "issue":
+            outcome = issue_certificates(session, args.client_names, config_data['paths']['preferences_output'],
+                                         tak_certs_dir(config_data))
+        else:
+            outcome = {name: None if status != "failed" else detail for name, (status, detail)
+                       in revoke_certificates(session, args.client_names, tak_certs_dir(config_data)).items()}
+
+    for client, error in outcome.items():
+        if error:
+            print(f"{client}: ERROR / BŁĄD - {error}")
+        else:
+            print(f"{client}: OK")
+    if any(outcome.values()):
+        exit(1)
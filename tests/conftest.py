@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+
+# =====================================================================================
+# === SHARED TEST FIXTURES ===
+# === WSPÓLNE ELEMENTY TESTÓW ===
+# =====================================================================================
+
+import os
+import sys
+
+import pytest
+
+# The scripts are flat modules in the project root
+# Skrypty są płaskimi modułami w katalogu głównym projektu
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+# Stand-in for a sudo that does not ask for the password (cached timestamp, NOPASSWD, root)
+# Zamiennik sudo, które nie pyta o hasło (zapamiętane, NOPASSWD, root)
+SUDO_NO_PROMPT = """#!/bin/bash
+while [ $# -gt 0 ]; do
+    case "$1" in
+        -A|-S) shift ;;
+        -p) shift 2 ;;
+        *) break ;;
+    esac
+done
+exec "$@"
+"""
+
+# Stand-in for a sudo that asks for the password through SUDO_ASKPASS and records the answer
+# Zamiennik sudo, które pyta o hasło przez SUDO_ASKPASS i zapisuje odpowiedź
+SUDO_ASKPASS_PROMPT = """#!/bin/bash
+prompt=""
+while [ $# -gt 0 ]; do
+    case "$1" in
+        -A) shift ;;
+        -p) prompt="$2"; shift 2 ;;
+        *) break ;;
+    esac
+done
+"$SUDO_ASKPASS" "$prompt" > "$(dirname "$0")/received_password" || exit 1
+exec "$@"
+"""
+
+
+def write_executable(path, content):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    os.chmod(path, 0o755)
+    return str(path)
+
+
+@pytest.fixture(params=["no_prompt", "askpass"])
+def fake_sudo(request, tmp_path, monkeypatch):
+    """
+    Puts a sudo stand-in first on PATH; returns the directory it lives in.
+
+    Umieszcza zamiennik sudo na początku PATH; zwraca jego katalog.
+    """
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    write_executable(bin_dir / "sudo", SUDO_NO_PROMPT if request.param == "no_prompt" else SUDO_ASKPASS_PROMPT)
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+    return bin_dir
+
+
+# Stand-ins for 'wg' and 'wg-quick': every call is logged to 'calls'; '<interface>.endpoints'
+# is what 'wg show <interface> endpoints' prints (missing: the interface is down) and
+# 'wg-quick strip <interface>' prints '<interface>.conf' without comments
+# Zamienniki 'wg' i 'wg-quick': każde wywołanie jest zapisywane w 'calls'; '<interfejs>.endpoints'
+# to wynik 'wg show <interfejs> endpoints' (brak: interfejs wyłączony), a 'wg-quick strip
+# <interfejs>' wypisuje '<interfejs>.conf' bez komentarzy
+FAKE_WG = """#!/bin/bash
+dir="$(dirname "$0")"
+echo "wg $*" >> "$dir/calls"
+case "$1 $3" in
+    "show endpoints") cat "$dir/$2.endpoints" 2>/dev/null || exit 1 ;;
+    "show public-key") echo "SERVERPUBLICKEY=" ;;
+    "show listen-port") echo "51820" ;;
+esac
+if [ "$1" = syncconf ]; then
+    cat "$3" > "$dir/$2.synced"
+fi
+"""
+
+FAKE_WG_QUICK = """#!/bin/bash
+dir="$(dirname "$0")"
+echo "wg-quick $*" >> "$dir/calls"
+if [ "$1" = strip ]; then
+    grep -v '^#' "$dir/$2.conf"
+fi
+"""
+
+
+@pytest.fixture
+def fake_wg(tmp_path, monkeypatch):
+    """
+    Installs the 'wg' and 'wg-quick' stand-ins for wg_live.py and wg_peers.py; returns
+    their directory.
+
+    Instaluje zamienniki 'wg' i 'wg-quick' dla wg_live.py i wg_peers.py; zwraca ich katalog.
+    """
+    import wg_live
+    import wg_peers
+
+    wg_dir = tmp_path / "wg"
+    wg_dir.mkdir()
+    wg = write_executable(wg_dir / "wg", FAKE_WG)
+    wg_quick = write_executable(wg_dir / "wg-quick", FAKE_WG_QUICK)
+    for module in (wg_live, wg_peers):
+        monkeypatch.setattr(module, "WG_BIN", wg)
+        monkeypatch.setattr(module, "WG_QUICK_BIN", wg_quick)
+    return wg_dir
+
+
+def wg_calls(wg_dir):
+    path = wg_dir / "calls"
+    return path.read_text(encoding='utf-8').splitlines() if path.exists() else []
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+
+# =====================================================================================
+# === TESTS OF THE ARTIFACT CACHE ===
+# === TESTY BUFORA ARTEFAKTÓW ===
+# =====================================================================================
+
+import os
+import stat
+
+import artifact_cache
+from artifact_cache import ArtifactCache, artifact_key
+
+
+def _mode(path):
+    return stat.S_IMODE(os.stat(path).st_mode)
+
+
+def test_artifacts_are_readable_by_the_owner_only(tmp_path):
+    cache = ArtifactCache(str(tmp_path / "cache"))
+    cache.put("truststore", {"sha256": "x"}, b"data")
+    cache.close()
+
+    key = artifact_key("truststore", {"sha256": "x"})
+    assert _mode(tmp_path / "cache") == 0o700
+    assert _mode(tmp_path / "cache" / key[:2] / key) == 0o600
+
+
+def test_opening_the_cache_purges_retired_kinds(tmp_path):
+    directory = str(tmp_path / "cache")
+    cache = ArtifactCache(directory)
+    for kind in ("package", "qr", "pref", "truststore"):
+        cache.put(kind, {"client_name": "alice"}, kind.encode())
+    cache.close()
+
+    cache = ArtifactCache(directory)
+    try:
+        assert {kind for kind, row in cache.stats().items() if row["entries"]} == {"truststore"}
+        for kind in ("package", "qr", "pref"):
+            key = artifact_key(kind, {"client_name": "alice"})
+            assert not os.path.exists(os.path.join(directory, key[:2], key))
+        assert cache.get("truststore", {"client_name": "alice"}) == b"truststore"
+    finally:
+        cache.close()
+
+
+def _stored(cache):
+    return sorted(inputs for inputs in range(10) if os.path.exists(cache._path(artifact_key("truststore", inputs))))
+
+
+def test_evict_removes_the_least_recently_used_first(tmp_path, monkeypatch):
+    clock = iter(range(1000))
+    monkeypatch.setattr(artifact_cache.time, "time", lambda: next(clock))
+    cache = ArtifactCache(str(tmp_path / "cache"), max_bytes=30)
+    try:
+        for inputs in range(3):
+            cache.put("truststore", inputs, b"x" * 10)
+        assert cache.get("truststore", 0) == b"x" * 10
+
+        cache.put("truststore", 3, b"x" * 10)
+
+        assert _stored(cache) == [0, 2, 3]
+        assert cache.stats()["truststore"]["bytes"] == 30
+        assert cache.get("truststore", 1) is None
+    finally:
+        cache.close()
+
+
+def test_evict_keeps_the_new_artifact_and_skips_oversized_ones(tmp_path):
+    cache = ArtifactCache(str(tmp_path / "cache"), max_bytes=30)
+    try:
+        cache.put("truststore", 0, b"x" * 10)
+        cache.put("truststore", 1, b"x" * 25)
+        assert _stored(cache) == [1]
+
+        cache.put("truststore", 2, b"x" * 31)
+        assert _stored(cache) == [1]
+        assert cache.get("truststore", 2) is None
+    finally:
+        cache.close()
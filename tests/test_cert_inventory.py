@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+
+# =====================================================================================
+# === TESTS OF THE CERTIFICATE INVENTORY (LOCAL CERTS DIRECTORY) ===
+# === TESTY SPISU CERTYFIKATÓW (LOKALNY KATALOG CERTYFIKATÓW) ===
+# =====================================================================================
+
+import concurrent.futures
+import datetime
+import os
+
+import pytest
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.hazmat.primitives.serialization import pkcs12
+from cryptography.x509.oid import NameOID
+
+import cert_inventory
+from cert_inventory import DEFAULT_P12_PASSWORD, CertificateInventory, parse_certificates
+from remote_session import LocalSession
+
+NOW = datetime.datetime.now(datetime.timezone.utc).replace(microsecond=0)
+
+
+def _name(cn):
+    return x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, cn)])
+
+
+class _CA:
+    """
+    Minimal CA writing client certificates and the openssl index.txt into certs/files.
+
+    Minimalne CA zapisujące certyfikaty klientów i plik index.txt openssl do certs/files.
+    """
+
+    def __init__(self, certs_dir):
+        self.files = certs_dir / "files"
+        self.files.mkdir(parents=True)
+        self.key = ec.generate_private_key(ec.SECP256R1())
+        self.certificate = self._sign("root-ca", self.key.public_key(), 1, 3650, ca=True)
+        (self.files / "root-ca.pem").write_bytes(self.certificate.public_bytes(serialization.Encoding.PEM))
+        self.index = []
+
+    def _sign(self, cn, public_key, serial, days, ca=False):
+        return (x509.CertificateBuilder().subject_name(_name(cn)).issuer_name(_name("root-ca"))
+                .public_key(public_key).serial_number(serial)
+                .not_valid_before(NOW - datetime.timedelta(days=1)).not_valid_after(NOW + datetime.timedelta(days=days))
+                .add_extension(x509.BasicConstraints(ca=ca, path_length=None), critical=True)
+                .sign(self.key, hashes.SHA256()))
+
+    def issue(self, cn, serial, days=365, p12=False, revoked=False):
+        key = ec.generate_private_key(ec.SECP256R1())
+        certificate = self._sign(cn, key.public_key(), serial, days)
+        (self.files / f"{cn}.pem").write_bytes(certificate.public_bytes(serialization.Encoding.PEM))
+        if p12:
+            (self.files / f"{cn}.p12").write_bytes(pkcs12.serialize_key_and_certificates(
+                cn.encode(), key, certificate, [self.certificate],
+                serialization.BestAvailableEncryption(DEFAULT_P12_PASSWORD.encode())))
+        expires = (NOW + datetime.timedelta(days=days)).strftime("%y%m%d%H%M%SZ")
+        self.index.append(f"{'R' if revoked else 'V'}\t{expires}\t{NOW.strftime('%y%m%d%H%M%SZ') if revoked else ''}"
+                          f"\t{serial:X}\tunknown\t/C=US/CN={cn}")
+        (self.files / "index.txt").write_text("\n".join(self.index) + "\n", encoding='utf-8')
+        return certificate
+
+
+@pytest.fixture
+def ca(tmp_path):
+    return _CA(tmp_path / "certs")
+
+
+@pytest.fixture
+def inventory(tmp_path):
+    inventory = CertificateInventory(str(tmp_path / "inventory.sqlite3"))
+    yield inventory
+    inventory.close()
+
+
+def _refresh(inventory, ca, workers=1):
+    return inventory.refresh(LocalSession(use_sudo=False), str(ca.files.parent), workers=workers)
+
+
+def _touch(path):
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10_000_000))
+
+
+# --- Incremental index / Indeks przyrostowy ---
+
+def test_only_changed_files_are_parsed_again(ca, inventory):
+    ca.issue("alice", 0x10, p12=True)
+    ca.issue("bob", 0x11)
+
+    assert _refresh(inventory, ca) == {"parsed": 4, "unchanged": 0, "removed": 0}
+    assert _refresh(inventory, ca) == {"parsed": 0, "unchanged": 4, "removed": 0}
+
+    # A new mtime or size is enough, the content is not compared
+    # Wystarczy nowy czas modyfikacji lub rozmiar, zawartość nie jest porównywana
+    _touch(ca.files / "bob.pem")
+    ca.issue("carol", 0x12)
+    (ca.files / "alice.p12").unlink()
+    assert _refresh(inventory, ca) == {"parsed": 2, "unchanged": 2, "removed": 1}
+    assert sorted(row['filename'] for row in inventory.certificates(include_ca=True)) == [
+        "alice.pem", "bob.pem", "carol.pem", "root-ca.pem"]
+
+
+def test_a_reissued_certificate_replaces_the_old_row(ca, inventory):
+    ca.issue("alice", 0x10)
+    _refresh(inventory, ca)
+
+    ca.issue("alice", 0x20, days=700)
+    _touch(ca.files / "alice.pem")
+    _refresh(inventory, ca)
+
+    rows = inventory.certificates()
+    assert [(row['cn'], row['serial']) for row in rows] == [("alice", "20")]
+
+
+def test_unreadable_files_are_kept_with_their_error(ca, inventory):
+    ca.issue("alice", 0x10)
+    (ca.files / "broken.pem").write_text("not a certificate\n", encoding='utf-8')
+    (ca.files / "-odd name.p12").write_bytes(b"not a p12")
+
+    assert _refresh(inventory, ca)["parsed"] == 4
+    assert [row['cn'] for row in inventory.certificates()] == ["alice"]
+    errors = dict(inventory._connection.execute("SELECT filename, error FROM certificates WHERE error IS NOT NULL"))
+    assert set(errors) == {"broken.pem", "-odd name.p12"} and all(errors.values())
+
+
+def test_thousands_of_long_file_names_are_read_in_one_pass(ca, inventory):
+    # Together far more than one command line argument may hold (MAX_ARG_STRLEN, 128 KiB)
+    # Razem znacznie więcej, niż może pomieścić jeden argument wiersza poleceń (MAX_ARG_STRLEN, 128 KiB)
+    names = [f"{index:05d}-" + "x" * 200 + ".pem" for index in range(1000)]
+    for name in names:
+        (ca.files / name).write_bytes(b"-----BEGIN CERTIFICATE-----\n")
+
+    stats = _refresh(inventory, ca, workers=2)
+
+    assert stats == {"parsed": 1001, "unchanged": 0, "removed": 0}
+    assert inventory._connection.execute("SELECT COUNT(*) FROM certificates WHERE error IS NOT NULL").fetchone()[0] \
+        == 1000
+
+
+# --- Parallel parsing / Parsowanie równoległe ---
+
+def test_more_than_32_files_are_parsed_in_a_process_pool(ca, monkeypatch):
+    for serial in range(40):
+        ca.issue(f"user{serial:02d}", 0x100 + serial)
+    items = [(path.name, path.read_bytes(), DEFAULT_P12_PASSWORD) for path in sorted(ca.files.glob("*.pem"))]
+    pools = []
+
+    class RecordingPool(concurrent.futures.ProcessPoolExecutor):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            pools.append(self)
+
+    monkeypatch.setattr(concurrent.futures, "ProcessPoolExecutor", RecordingPool)
+
+    assert parse_certificates(items[:cert_inventory._PARALLEL_THRESHOLD - 1], workers=2) == \
+        parse_certificates(items[:cert_inventory._PARALLEL_THRESHOLD - 1], workers=1)
+    assert pools == []
+    parallel = parse_certificates(items, workers=2)
+    assert len(pools) == 1
+    assert parallel == parse_certificates(items, workers=1)
+    assert [row[1] for row in parallel] == ["root-ca"] + [f"user{serial:02d}" for serial in range(40)]
+
+
+# --- Queries / Zapytania ---
+
+@pytest.fixture
+def populated(ca, inventory):
+    ca.issue("alice", 0x10, days=10, p12=True)
+    ca.issue("bob", 0x11, days=100)
+    ca.issue("carol", 0x12, days=5, revoked=True)
+    ca.issue("mallory", 0x13, days=400)
+    _refresh(inventory, ca)
+    return inventory
+
+
+def test_certificates_are_joined_with_the_ca_database(populated):
+    rows = populated.certificates()
+    assert [(row['cn'], row['status']) for row in rows] == [
+        ("alice", "V"), ("alice", "V"), ("bob", "V"), ("mallory", "V")]
+
+    everything = populated.certificates(include_ca=True, include_revoked=True)
+    revoked = [row for row in everything if row['cn'] == "carol"]
+    assert [(row['status'], row['revoked_at'] is not None) for row in revoked] == [("R", True)]
+    assert any(row['is_ca'] for row in everything)
+
+
+def test_expiring_skips_revoked_and_ca_certificates(populated):
+    assert sorted(row['filename'] for row in populated.expiring(30)) == ["alice.p12", "alice.pem"]
+    assert {row['cn'] for row in populated.expiring(200)} == {"alice", "bob"}
+    assert populated.expiring(1) == []
+
+
+def test_not_registered_lists_the_unknown_names(populated):
+    assert {row['cn'] for row in populated.not_registered(["alice", "bob"])} == {"mallory"}
+    assert populated.not_registered(["alice", "bob", "mallory"]) == []
+
+
+def test_registered_before_uses_the_registration_dates(populated):
+    registrations = {"alice": datetime.datetime(2025, 1, 1), "bob": datetime.datetime(2026, 6, 1), "mallory": None}
+
+    rows = populated.registered_before(registrations, datetime.datetime(2026, 1, 1))
+
+    assert {row['cn'] for row in rows} == {"alice"}
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+
+# =====================================================================================
+# === TESTS OF THE SHELL CONFIGURATION SNAPSHOT ===
+# === TESTY MIGAWKI KONFIGURACJI DLA POWŁOKI ===
+# =====================================================================================
+
+import os
+import subprocess
+
+import pytest
+
+from config_loader import SHELL_VARIABLES, render_shell_env
+from conftest import PROJECT_ROOT
+
+AWKWARD_VALUES = ["it's", 'say "hi"', "$HOME `id` $(id)", "two  spaces\tand tab", "line\nbreak", "back\\slash", "; rm -rf /"]
+
+
+def _clean_environment(**variables):
+    environment = {name: value for name, value in os.environ.items()
+                   if name not in SHELL_VARIABLES and name != "BLOX_CONFIG_ENV"}
+    environment.update(variables)
+    return environment
+
+
+def _source(tmp_path, text, script, **variables):
+    env_path = tmp_path / "config.env"
+    env_path.write_text(text, encoding='utf-8')
+    return subprocess.run(["bash", "-c", f'source "{env_path}" && {script}'], env=_clean_environment(**variables),
+                          capture_output=True, text=True, check=True).stdout
+
+
+@pytest.mark.parametrize("value", AWKWARD_VALUES)
+def test_values_come_back_unchanged_from_the_shell(tmp_path, value):
+    config = {"security": {"sudo_pswd": value}, "network": {"remote_server": {"host": value}}}
+    output = _source(tmp_path, render_shell_env(config), 'printf "%s\\0%s" "$BLOX_SUDO_PSWD" "$BLOX_REMOTE_HOST"')
+    assert output == f"{value}\0{value}"
+
+
+def test_defaults_fill_missing_and_empty_values(tmp_path):
+    output = _source(tmp_path, render_shell_env({"network": {"remote_server": {"port": ""}}}),
+                     'printf "%s|%s" "$BLOX_REMOTE_PORT" "$BLOX_WG_UPDATE_MODE"')
+    assert output == "22|live"
+
+
+def test_values_already_in_the_environment_are_kept(tmp_path):
+    output = _source(tmp_path, render_shell_env({"user_management": {"state": {"client_name": "from-file"}}}),
+                     'printf "%s" "$BLOX_CLIENT_NAME"', BLOX_CLIENT_NAME="from-start.py")
+    assert output == "from-start.py"
+
+
+def _load_in(directory, config_text):
+    (directory / "config.yaml").write_text(config_text, encoding='utf-8')
+    script = (f'source "{os.path.join(PROJECT_ROOT, "remote_lib.sh")}" && blox_load_config_env config.yaml '
+              f'&& printf "loaded:%s" "$BLOX_MODE"')
+    return subprocess.run(["bash", "-c", script], cwd=directory, capture_output=True, text=True,
+                          env=_clean_environment(BLOX_SSH_CONTROL_PATH=str(directory / "ssh" / "blox-%C")))
+
+
+def test_blox_load_config_env_reads_the_validated_snapshot(tmp_path):
+    with open(os.path.join(PROJECT_ROOT, "config.example.yaml"), 'r', encoding='utf-8') as f:
+        result = _load_in(tmp_path, f.read())
+    assert result.returncode == 0, result.stderr
+    assert result.stdout == "loaded:remote"
+    assert (tmp_path / ".cache" / "config.env").exists()
+
+
+def test_blox_load_config_env_stops_on_an_invalid_configuration(tmp_path):
+    result = _load_in(tmp_path, "execution: [not, a, section\n")
+    assert result.returncode != 0
+    assert "loaded:" not in result.stdout
@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+
+# =====================================================================================
+# === TESTS OF THE PREFERENCE FILE GENERATOR ===
+# === TESTY GENERATORA PLIKU PREFERENCJI ===
+# =====================================================================================
+
+import os
+
+from config_pref import generate_pref_file, render_pref
+
+
+def test_config_pref_is_only_rewritten_when_the_ip_changes(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("BLOX_HEADLESS", "1")
+    config = {"network": {"external_ip": "203.0.113.7"}, "paths": {"preferences_output": f"{tmp_path}/"}}
+
+    path = generate_pref_file(config)
+    assert open(path, 'rb').read() == render_pref("203.0.113.7")
+    assert b"203.0.113.7:8089:ssl" in render_pref("203.0.113.7")
+    os.utime(path, ns=(0, 0))
+
+    generate_pref_file(config)
+    assert os.stat(path).st_mtime_ns == 0
+
+    config["network"]["external_ip"] = "198.51.100.1"
+    generate_pref_file(config)
+    assert open(path, 'rb').read() == render_pref("198.51.100.1")
+    assert not (tmp_path / ".cache").exists()
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+
+# =====================================================================================
+# === TESTS OF THE HEADLESS PROGRESS EVENTS ===
+# === TESTY ZDARZEŃ POSTĘPU W TRYBIE BEZOBSŁUGOWYM ===
+# =====================================================================================
+
+import json
+import os
+import subprocess
+import sys
+
+from conftest import PROJECT_ROOT
+from console import EVENTS_ENV, HEADLESS_ENV, progress
+
+
+def test_events_go_to_stdout_by_default(monkeypatch, capsys):
+    monkeypatch.setenv(HEADLESS_ENV, "1")
+    monkeypatch.delenv(EVENTS_ENV, raising=False)
+    progress("users", count=2)
+    record = json.loads(capsys.readouterr().out)
+    assert record["event"] == "users" and record["count"] == 2
+
+
+def test_nothing_is_written_outside_headless_mode(monkeypatch, capsys, tmp_path):
+    monkeypatch.delenv(HEADLESS_ENV, raising=False)
+    monkeypatch.setenv(EVENTS_ENV, str(tmp_path / "events.jsonl"))
+    progress("users", count=2)
+    assert capsys.readouterr().out == ""
+    assert not (tmp_path / "events.jsonl").exists()
+
+
+def test_events_file_keeps_stdout_human_only(tmp_path):
+    # Two processes (and the threads of one) append to the same file
+    # Dwa procesy (i wątki jednego) dopisują do tego samego pliku
+    script = ("import threading\n"
+              "from console import progress\n"
+              "print('human line')\n"
+              "threads = [threading.Thread(target=lambda n=n: [progress('stage', user=n, step=i) for i in range(50)])\n"
+              "           for n in range(4)]\n"
+              "[thread.start() for thread in threads]\n"
+              "[thread.join() for thread in threads]\n")
+    events_path = tmp_path / "events.jsonl"
+    environment = dict(os.environ, **{HEADLESS_ENV: "1", EVENTS_ENV: str(events_path)})
+    outputs = [subprocess.run([sys.executable, "-c", script], cwd=PROJECT_ROOT, env=environment,
+                              capture_output=True, text=True, check=True).stdout for _ in range(2)]
+
+    assert outputs == ["human line\n", "human line\n"]
+    records = [json.loads(line) for line in events_path.read_text(encoding='utf-8').splitlines()]
+    assert len(records) == 2 * 4 * 50
+    assert {record["event"] for record in records} == {"stage"}
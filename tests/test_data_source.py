@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+
+# =====================================================================================
+# === TESTS OF THE CACHED DATA SOURCE (LOCAL HTTP SHEET) ===
+# === TESTY BUFOROWANEGO ŹRÓDŁA DANYCH (LOKALNY ARKUSZ HTTP) ===
+# =====================================================================================
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from data_source import DataSource, data_source_for
+
+SHEET = "Timestamp:,Username:,E-Mail Address:\n2026-01-01,alice,alice@example.com\n"
+APPENDED = "2026-01-02,bob,bob@example.com\n"
+
+
+class _Sheet(BaseHTTPRequestHandler):
+    """
+    A published sheet: answers 304 to a matching If-None-Match or If-Modified-Since.
+
+    Opublikowany arkusz: odpowiada 304 na pasujące If-None-Match lub If-Modified-Since.
+    """
+
+    def do_GET(self):
+        sheet = self.server.sheet
+        self.server.requests.append(dict(self.headers))
+        if (self.headers.get("If-None-Match") == sheet["etag"]
+                or self.headers.get("If-Modified-Since") == sheet["last_modified"]):
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = sheet["body"].encode("utf-8")
+        self.send_response(200)
+        self.send_header("ETag", sheet["etag"])
+        self.send_header("Last-Modified", sheet["last_modified"])
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def sheet_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Sheet)
+    server.sheet = {"body": SHEET, "etag": '"v1"', "last_modified": "Thu, 01 Jan 2026 00:00:00 GMT"}
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.url = f"http://127.0.0.1:{server.server_address[1]}/sheet.csv"
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_within_the_ttl_no_request_is_made(sheet_server, tmp_path):
+    source = DataSource(sheet_server.url, str(tmp_path), ttl_seconds=300)
+    assert source.fetch() == SHEET
+    assert source.fetch() == SHEET
+    assert len(sheet_server.requests) == 1
+    assert "If-None-Match" not in sheet_server.requests[0]
+
+
+def test_after_the_ttl_the_request_is_conditional(sheet_server, tmp_path):
+    source = DataSource(sheet_server.url, str(tmp_path), ttl_seconds=0)
+    source.fetch()
+    assert source.fetch() == SHEET
+
+    conditional = sheet_server.requests[1]
+    assert conditional["If-None-Match"] == '"v1"'
+    assert conditional["If-Modified-Since"] == "Thu, 01 Jan 2026 00:00:00 GMT"
+    assert not source.offline
+
+
+def test_only_the_appended_rows_are_new(sheet_server, tmp_path):
+    source = DataSource(sheet_server.url, str(tmp_path), ttl_seconds=0)
+    assert list(source.appended_rows()["Username:"]) == ["alice"]
+
+    sheet_server.sheet.update(body=SHEET + APPENDED, etag='"v2"', last_modified="Fri, 02 Jan 2026 00:00:00 GMT")
+    assert list(source.appended_rows()["Username:"]) == ["bob"]
+    assert list(source.read_dataframe()["Username:"]) == ["alice", "bob"]
+
+
+@pytest.mark.parametrize("ttl_seconds", [0, 300])
+def test_a_rerun_without_a_change_reports_no_new_rows(sheet_server, tmp_path, ttl_seconds):
+    # A rerun is a new process; the sheet is answered with 304 (TTL 0) or from the cache
+    # Ponowne uruchomienie to nowy proces; arkusz jest obsłużony odpowiedzią 304 (TTL 0) lub z bufora
+    DataSource(sheet_server.url, str(tmp_path), ttl_seconds=0).fetch()
+    sheet_server.sheet.update(body=SHEET + APPENDED, etag='"v2"', last_modified="Fri, 02 Jan 2026 00:00:00 GMT")
+    assert list(DataSource(sheet_server.url, str(tmp_path), ttl_seconds=0).appended_rows()["Username:"]) == ["bob"]
+
+    rerun = DataSource(sheet_server.url, str(tmp_path), ttl_seconds=ttl_seconds).appended_rows()
+
+    assert list(rerun.columns) == ["Timestamp:", "Username:", "E-Mail Address:"] and rerun.empty
+    assert len(sheet_server.requests) == (2 if ttl_seconds else 3)
+
+
+def test_the_last_copy_is_used_when_the_server_is_down(sheet_server, tmp_path, capsys):
+    source = DataSource(sheet_server.url, str(tmp_path), ttl_seconds=0, timeout=2)
+    source.fetch()
+    sheet_server.shutdown()
+    sheet_server.server_close()
+
+    assert source.fetch() == SHEET
+    assert source.offline
+    assert "Using the last saved copy" in capsys.readouterr().out
+
+
+def test_without_a_saved_copy_the_error_is_raised(tmp_path):
+    with pytest.raises(requests.exceptions.ConnectionError):
+        DataSource("http://127.0.0.1:9/sheet.csv", str(tmp_path), timeout=2).fetch()
+
+
+def test_local_paths_are_read_directly(tmp_path):
+    path = tmp_path / "sheet.csv"
+    path.write_text(SHEET, encoding='utf-8')
+    config = {"user_management": {"data_sources": {"en": "unused"}, "cache": {"dir": str(tmp_path / "cache")}}}
+    source = data_source_for(config, "EN", str(path))
+    assert list(source.read_dataframe()["Username:"]) == ["alice"]
+    assert list(source.appended_rows()["Username:"]) == ["alice"]
+    assert not (tmp_path / "cache").exists()
@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+
+# =====================================================================================
+# === TESTS OF THE GMAIL DELIVERY (LOCAL FAKE GMAIL ENDPOINT) ===
+# === TESTY DOSTARCZANIA PRZEZ GMAIL (LOKALNY UDAWANY SERWER GMAIL) ===
+# =====================================================================================
+
+import json
+import socket
+import threading
+from email import message_from_bytes
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from google.oauth2.credentials import Credentials
+
+import email_sender
+from email_sender import GmailDelivery
+from user_job import UserJob
+
+
+class _FakeGmail(BaseHTTPRequestHandler):
+    """
+    messages.send of the Gmail API: answers every recipient with the statuses queued
+    for it in 'failures', then with 200 and the ID 'id-<recipient>'.
+
+    messages.send z Gmail API: odpowiada każdemu odbiorcy statusami zapisanymi dla
+    niego w 'failures', a potem 200 i ID 'id-<odbiorca>'.
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        recipient = message_from_bytes(body)["to"]
+        with self.server.lock:
+            self.server.attempts.setdefault(recipient, 0)
+            self.server.attempts[recipient] += 1
+            queued = self.server.failures.get(recipient) or []
+            status = queued.pop(0) if queued else 200
+        if status == 200:
+            reply = {"id": f"id-{recipient}", "labelIds": ["SENT"]}
+        else:
+            reply = {"error": {"code": status, "message": "fake failure"}}
+        payload = json.dumps(reply).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def gmail():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _FakeGmail)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.failures = {}
+    server.attempts = {}
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.url = f"http://127.0.0.1:{server.server_address[1]}/"
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def delays(monkeypatch):
+    """
+    Records the backoff delays instead of sleeping; the jitter always picks the upper bound.
+
+    Zapisuje opóźnienia zamiast czekać; rozrzut zawsze wybiera górną granicę.
+    """
+    recorded = []
+    monkeypatch.setattr(email_sender.random, "uniform", lambda low, high: high)
+    monkeypatch.setattr(email_sender.time, "sleep", recorded.append)
+    return recorded
+
+
+def _delivery(tmp_path, api_endpoint, **settings):
+    delivery = {"api_endpoint": api_endpoint, "max_attempts": 4, "base_delay": 0.5, "max_delay": 8, "timeout": 5}
+    delivery.update(settings)
+    config = {"email": {"sender_email": "blox@example.com", "delivery": delivery},
+              "paths": {"attachment_output": str(tmp_path)}}
+    return GmailDelivery(config, Credentials(token="fake-token"))
+
+
+def _job(tmp_path, number, name):
+    (tmp_path / f"IUCP-IPPU_PACKAGE_{name}.zip").write_bytes(b"PK\x05\x06" + bytes(18))
+    return UserJob(number, name, f"{name}@example.com", "2026-01-01", "EN")
+
+
+def test_rate_limit_and_server_errors_are_retried_with_backoff(gmail, delays, tmp_path):
+    gmail.failures["alice@example.com"] = [429, 503, 500]
+
+    result = _delivery(tmp_path, gmail.url).send(_job(tmp_path, 1, "alice"))
+
+    assert result.ok and result.message_id == "id-alice@example.com"
+    assert result.attempts == 4 and gmail.attempts["alice@example.com"] == 4
+    assert delays == [0.5, 1.0, 2.0]
+
+
+def test_backoff_is_capped_at_max_delay(gmail, delays, tmp_path):
+    gmail.failures["alice@example.com"] = [502, 504, 503]
+
+    _delivery(tmp_path, gmail.url, base_delay=1, max_delay=1.5).send(_job(tmp_path, 1, "alice"))
+
+    assert delays == [1.0, 1.5, 1.5]
+
+
+def test_jitter_stays_within_the_backoff_window(gmail, monkeypatch, tmp_path):
+    recorded = []
+    monkeypatch.setattr(email_sender.time, "sleep", recorded.append)
+    gmail.failures["alice@example.com"] = [429] * 5
+
+    result = _delivery(tmp_path, gmail.url, max_attempts=6, base_delay=0.5, max_delay=4).send(
+        _job(tmp_path, 1, "alice"))
+
+    assert result.ok and len(recorded) == 5
+    assert all(0 <= delay <= min(4, 0.5 * 2 ** attempt) for attempt, delay in enumerate(recorded))
+
+
+def test_other_client_errors_are_not_retried(gmail, delays, tmp_path):
+    gmail.failures["alice@example.com"] = [400]
+
+    result = _delivery(tmp_path, gmail.url).send(_job(tmp_path, 1, "alice"))
+
+    assert not result.ok and "400" in result.error
+    assert result.attempts == 1 and delays == []
+
+
+def test_retries_stop_after_max_attempts(gmail, delays, tmp_path):
+    gmail.failures["alice@example.com"] = [503] * 10
+
+    result = _delivery(tmp_path, gmail.url, max_attempts=3).send(_job(tmp_path, 1, "alice"))
+
+    assert not result.ok and "503" in result.error
+    assert result.attempts == 3 and gmail.attempts["alice@example.com"] == 3
+    assert len(delays) == 2
+
+
+def test_connection_errors_are_retried(delays, tmp_path):
+    # A port nothing listens on / Port, na którym nic nie nasłuchuje
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        closed_url = f"http://127.0.0.1:{probe.getsockname()[1]}/"
+
+    result = _delivery(tmp_path, closed_url, max_attempts=3).send(_job(tmp_path, 1, "alice"))
+
+    assert not result.ok and result.attempts == 3 and delays == [0.5, 1.0]
+
+
+def test_send_all_reports_every_message_id_in_job_order(gmail, delays, tmp_path):
+    names = ["alice", "bob", "carol", "dave", "erin"]
+    gmail.failures.update({"bob@example.com": [429], "carol@example.com": [403], "erin@example.com": [500, 502]})
+    jobs = [_job(tmp_path, number, name) for number, name in enumerate(names, 1)]
+
+    results = _delivery(tmp_path, gmail.url, workers=3).send_all(jobs)
+
+    assert [result.job for result in results] == jobs
+    assert {result.job.client_name: result.message_id for result in results} == {
+        "alice": "id-alice@example.com", "bob": "id-bob@example.com", "carol": None,
+        "dave": "id-dave@example.com", "erin": "id-erin@example.com"}
+    assert [result.attempts for result in results] == [1, 2, 1, 1, 3]
+    assert "403" in results[2].error
+
+
+def test_missing_attachment_is_reported_without_a_request(gmail, delays, tmp_path):
+    job = UserJob(1, "alice", "alice@example.com", "2026-01-01", "EN")
+
+    result = _delivery(tmp_path, gmail.url).send(job)
+
+    assert not result.ok and result.error == "the message could not be created"
+    assert gmail.attempts == {}
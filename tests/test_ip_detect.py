@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+
+# =====================================================================================
+# === TESTS OF THE EXTERNAL IP DETECTION (LOCAL HTTP PROVIDERS) ===
+# === TESTY WYKRYWANIA ZEWNĘTRZNEGO IP (LOKALNI DOSTAWCY HTTP) ===
+# =====================================================================================
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from ip_detect import IpDetector
+
+# Path -> (delay in seconds, HTTP status, body) of the provider stand-ins
+# Ścieżka -> (opóźnienie w sekundach, status HTTP, treść) zamienników dostawców
+ROUTES = {
+    "/a": (0.0, 200, b"203.0.113.7\n"),
+    "/b": (0.05, 200, b"203.0.113.7"),
+    "/slow": (2.0, 200, b"198.51.100.1\n"),
+    "/error": (0.0, 500, b"203.0.113.7\n"),
+    "/garbage": (0.0, 200, b"<html>blocked</html>"),
+}
+
+
+class _Provider(BaseHTTPRequestHandler):
+    def do_GET(self):
+        delay, status, body = ROUTES[self.path]
+        time.sleep(delay)
+        self.server.requests.append(self.path)
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def providers():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Provider)
+    server.daemon_threads = True
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    yield lambda *paths: [base + path for path in paths], server
+    server.shutdown()
+
+
+def _detector(urls, tmp_path, agree=2, ttl_seconds=300):
+    return IpDetector(urls, agree=agree, timeout=5, ttl_seconds=ttl_seconds,
+                      cache_path=str(tmp_path / "external_ip.json"))
+
+
+# --- Voting ---
+# --- Głosowanie ---
+
+def test_vote_stops_at_agreement(capsys):
+    answers = iter([("p1", "1.1.1.1"), ("p2", None), ("p3", "1.1.1.1"), ("p4", "2.2.2.2")])
+    assert IpDetector(["p1", "p2", "p3", "p4"])._vote(answers) == ("1.1.1.1", ["p1", "p3"])
+    assert next(answers) == ("p4", "2.2.2.2")
+    assert capsys.readouterr().out == ""
+
+
+def test_vote_reports_a_disagreement(capsys):
+    detector = IpDetector(["p1", "p2", "p3"], agree=2)
+    assert detector._vote([("p1", "1.1.1.1"), ("p2", "2.2.2.2")]) == ("1.1.1.1", ["p1"])
+    output = capsys.readouterr().out
+    assert "disagree" in output and "Not enough" not in output
+
+
+def test_vote_reports_too_few_answers(capsys):
+    detector = IpDetector(["p1", "p2", "p3", "p4"], agree=3)
+    assert detector._vote([("p1", "1.1.1.1"), ("p2", None), ("p3", "1.1.1.1")]) == ("1.1.1.1", ["p1", "p3"])
+    output = capsys.readouterr().out
+    assert "Not enough IP providers answered (2/4, 3 must agree)" in output
+    assert "disagree" not in output
+
+
+def test_vote_uses_a_single_answer_without_a_warning(capsys):
+    detector = IpDetector(["p1", "p2", "p3"], agree=2)
+    assert detector._vote([("p1", None), ("p2", "1.1.1.1"), ("p3", None)]) == ("1.1.1.1", ["p2"])
+    assert capsys.readouterr().out == ""
+
+
+def test_vote_without_answers():
+    assert IpDetector(["p1"])._vote([("p1", None)]) == (None, [])
+
+
+# --- Detection against the local providers ---
+# --- Wykrywanie z lokalnymi dostawcami ---
+
+def test_detect_does_not_wait_for_slow_providers(providers, tmp_path):
+    urls, _ = providers
+    started = time.monotonic()
+    address, source = _detector(urls("/a", "/slow", "/b"), tmp_path).detect()
+    assert address == "203.0.113.7"
+    assert source == ", ".join(urls("/a", "/b"))
+    assert time.monotonic() - started < 1.5
+
+
+def test_detect_ignores_errors_and_garbage(providers, tmp_path):
+    urls, _ = providers
+    with pytest.raises(RuntimeError, match="none of the IP providers answered"):
+        _detector(urls("/error", "/garbage"), tmp_path).detect()
+    assert not (tmp_path / "external_ip.json").exists()
+
+
+def test_detect_caches_per_key_until_the_ttl(providers, tmp_path):
+    urls, server = providers
+    detector = _detector(urls("/a", "/b"), tmp_path)
+    assert detector.detect(cache_key="remote:host") == ("203.0.113.7", ", ".join(urls("/a", "/b")))
+    count = len(server.requests)
+
+    assert detector.detect(cache_key="remote:host") == ("203.0.113.7", "cache")
+    assert len(server.requests) == count
+    assert detector.cached("local") is None
+
+    cache = json.loads((tmp_path / "external_ip.json").read_text(encoding='utf-8'))
+    cache["remote:host"]["checked_at"] -= 301
+    (tmp_path / "external_ip.json").write_text(json.dumps(cache), encoding='utf-8')
+    assert detector.detect(cache_key="remote:host")[1] != "cache"
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+
+# =====================================================================================
+# === TESTS OF THE IP WATCHER ERROR HANDLING ===
+# === TESTY OBSŁUGI BŁĘDÓW OBSERWATORA IP ===
+# =====================================================================================
+
+import json
+import os
+import stat
+import subprocess
+import time
+
+import pytest
+import yaml
+
+from config_loader import read_config
+from conftest import PROJECT_ROOT, wg_calls, write_executable
+from ip_watcher import DEFAULT_STEPS, IpWatcher, run_graph
+
+CONFIG = {"network": {"external_ip": "1.1.1.1"}}
+
+
+def _fail(context):
+    raise ValueError("broken step")
+
+
+def _interrupt(context):
+    raise KeyboardInterrupt
+
+
+def test_a_failed_step_skips_its_dependents():
+    steps = {"config": (_fail, []), "pref": (lambda context: None, ["config"])}
+    results = run_graph(steps, {})
+    assert results["config"]["status"] == "failed" and results["config"]["error"] == "broken step"
+    assert results["pref"]["status"] == "skipped"
+
+
+def test_ctrl_c_in_a_step_is_not_reported_as_a_failure():
+    with pytest.raises(KeyboardInterrupt):
+        run_graph({"config": (_interrupt, [])}, {})
+
+
+class _Session:
+    closed = False
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.mark.parametrize("error", [subprocess.CalledProcessError(255, ["ssh"]), ConnectionRefusedError("refused"),
+                                   RuntimeError("no provider answered")])
+def test_a_failed_check_is_retried_with_a_new_session(monkeypatch, capsys, error):
+    watcher = IpWatcher(interval=5, debounce_seconds=0, steps=[])
+    monkeypatch.setattr(watcher, "_load_config", lambda: CONFIG)
+    session = watcher._session = _Session()
+    answers = [error, "1.1.1.1"]
+
+    def detect(config):
+        answer = answers.pop(0)
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+    monkeypatch.setattr(watcher, "_detect", detect)
+    state = {"current": "1.1.1.1", "candidate": None, "since": 0.0}
+
+    assert watcher.check_once(state) is False
+    assert session.closed and watcher._session is None
+    assert "WARNING: IP check failed, retrying in 5s" in capsys.readouterr().out
+    assert watcher.check_once(state) is False
+    assert answers == []
+
+
+def test_a_settled_change_runs_the_refresh(monkeypatch, tmp_path):
+    watcher = IpWatcher(interval=5, debounce_seconds=0, steps=[], history_path=str(tmp_path / "history.jsonl"))
+    monkeypatch.setattr(watcher, "_load_config", lambda: CONFIG)
+    monkeypatch.setattr(watcher, "_detect", lambda config: "2.2.2.2")
+    watcher.steps = {"config": (lambda context: None, [])}
+    state = {"current": "1.1.1.1", "candidate": None, "since": 0.0}
+
+    assert watcher.check_once(state) is True
+    assert state["current"] == "2.2.2.2"
+    assert '"address": "2.2.2.2"' in (tmp_path / "history.jsonl").read_text(encoding='utf-8')
+
+
+# --- The real refresh steps ---
+# --- Prawdziwe kroki odświeżania ---
+
+CLIENT_CONF = "[Interface]\nPrivateKey = CLIENTPRIVATE=\n\n[Peer]\nPublicKey = SERVER=\nEndpoint = 1.1.1.1:51820\n"
+
+
+def test_the_default_steps_refresh_everything(fake_sudo, fake_wg, monkeypatch, tmp_path):
+    """
+    Runs the default step list (not stand-ins) in local mode: only the programs below
+    the steps (sudo, wg, wg-quick, qrencode, openssl, systemctl) are replaced.
+
+    Uruchamia domyślną listę kroków (nie zamienniki) w trybie lokalnym: zastąpione są
+    tylko programy pod krokami (sudo, wg, wg-quick, qrencode, openssl, systemctl).
+    """
+    for name, content in (("qrencode", "#!/bin/bash\ncat\n"), ("openssl", "#!/bin/bash\n"),
+                          ("systemctl", "#!/bin/bash\n")):
+        write_executable(fake_sudo / name, content)
+    monkeypatch.setenv("BLOX_WG_BIN", str(fake_wg / "wg"))
+    monkeypatch.setenv("BLOX_WG_QUICK_BIN", str(fake_wg / "wg-quick"))
+    monkeypatch.delenv("BLOX_CONFIG_ENV", raising=False)
+    monkeypatch.setenv("BLOX_HEADLESS", "1")
+    monkeypatch.chdir(tmp_path)
+
+    with open(os.path.join(PROJECT_ROOT, "config.example.yaml"), encoding='utf-8') as f:
+        config = yaml.safe_load(f)
+    output = tmp_path / "out"
+    config['execution']['mode'] = 'local'
+    config['network']['external_ip'] = "1.1.1.1"
+    config['network']['ip_detection']['cache_path'] = str(tmp_path / "external_ip.json")
+    config['network']['wireguard'].update(client_config=str(tmp_path / "wg0-client.conf"),
+                                          android_config=str(tmp_path / "android.conf"))
+    config['paths'].update(preferences_output=f"{output}/certs/", project_root=f"{output}/")
+    (tmp_path / "config.yaml").write_text(yaml.dump(config), encoding='utf-8')
+    (tmp_path / "wg0-client.conf").write_text(CLIENT_CONF, encoding='utf-8')
+    (tmp_path / "android.conf").write_text(CLIENT_CONF, encoding='utf-8')
+    (fake_wg / "wg0-client.endpoints").write_text("SERVER=\t1.1.1.1:51820\n", encoding='utf-8')
+    (tmp_path / "external_ip.json").write_text(json.dumps({"local": {"address": "2.2.2.2",
+                                                                     "checked_at": time.time()}}))
+
+    watcher = IpWatcher("config.yaml", history_path=str(tmp_path / "history.jsonl"))
+    assert list(watcher.steps) == ["config"] + DEFAULT_STEPS
+    results = watcher.refresh(read_config("config.yaml"), "2.2.2.2")
+
+    assert {name: result["status"] for name, result in results.items()} == dict.fromkeys(watcher.steps, "done")
+    assert yaml.safe_load((tmp_path / "config.yaml").read_text(encoding='utf-8'))['network']['external_ip'] == "2.2.2.2"
+    assert "2.2.2.2" in (output / "certs" / "config.pref").read_text(encoding='utf-8')
+    assert "Endpoint = 2.2.2.2:51820" in (tmp_path / "wg0-client.conf").read_text(encoding='utf-8')
+    assert "wg set wg0-client peer SERVER= endpoint 2.2.2.2:51820" in wg_calls(fake_wg)
+    assert "Endpoint = 2.2.2.2:51820" in (tmp_path / "android.conf").read_text(encoding='utf-8')
+    qr_code = output / "android_wireguard_qr.png"
+    assert qr_code.read_bytes() == (tmp_path / "android.conf").read_bytes()
+    assert stat.S_IMODE(os.stat(qr_code).st_mode) == 0o600
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+
+# =====================================================================================
+# === TESTS OF THE KEY POOL SETTINGS ===
+# === TESTY USTAWIEŃ PULI KLUCZY ===
+# =====================================================================================
+
+import pytest
+
+import start
+from key_pool import KeyPool, check_key_type
+
+
+@pytest.mark.parametrize("algorithm, key_size", [("rsa", 512), ("ec", 255), ("dsa", 2048), ("rsa", "big")])
+def test_unsupported_key_types_are_rejected_before_the_pool_is_created(tmp_path, algorithm, key_size):
+    with pytest.raises(ValueError):
+        check_key_type(algorithm, key_size)
+    with pytest.raises(ValueError):
+        KeyPool(str(tmp_path / "pool.sqlite3"), "passphrase", algorithm=algorithm, key_size=key_size)
+    assert not (tmp_path / "pool.sqlite3").exists()
+
+
+def test_start_stops_on_invalid_key_pool_settings_before_connecting(monkeypatch, capsys):
+    config = {"pki": {"engine": "python", "key_algorithm": "ec", "key_size": 255,
+                      "key_pool": {"enabled": True, "passphrase": "passphrase"}}}
+    opened = []
+    monkeypatch.setattr(start, "load_config", lambda: config)
+    monkeypatch.setattr(start, "set_language", lambda language, config: True)
+    monkeypatch.setattr(start, "set_execution_mode", lambda mode, config: None)
+    monkeypatch.setattr(start, "open_session", opened.append)
+
+    with pytest.raises(SystemExit) as exit_info:
+        start.run_orchestration("EN", "local")
+
+    assert exit_info.value.code == 1
+    assert opened == []
+    output = capsys.readouterr().out
+    assert "ERROR: Invalid key pool settings (pki.key_pool)" in output
+    assert "BŁĄD: Niepoprawne ustawienia puli kluczy (pki.key_pool)" in output
@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+
+# =====================================================================================
+# === TESTS OF THE PROVISIONING LEDGER (RESUME AFTER A CRASH OR RERUN) ===
+# === TESTY REJESTRU PROVISIONINGU (WZNOWIENIE PO AWARII LUB PONOWNYM URUCHOMIENIU) ===
+# =====================================================================================
+
+import pytest
+
+from ledger import Ledger, certificate_path, file_sha256, package_path
+from user_job import UserJob
+
+
+@pytest.fixture
+def setup(tmp_path):
+    """
+    Returns (ledger, config, job) with the artifact directories in tmp_path.
+
+    Zwraca (rejestr, konfiguracja, zadanie) z katalogami plików w tmp_path.
+    """
+    (tmp_path / "certs").mkdir()
+    config = {"paths": {"preferences_output": str(tmp_path / "certs"), "attachment_output": str(tmp_path)}}
+    job = UserJob(1, "alice", "alice@example.com", "2026-01-01 10:00:00", "EN")
+    ledger = Ledger(str(tmp_path / "ledger.sqlite3"))
+    yield ledger, config, job
+    ledger.close()
+
+
+def _issue(ledger, config, job, content=b"p12"):
+    with open(certificate_path(config, job), 'wb') as f:
+        f.write(content)
+    ledger.record(job, "cert", file_sha256(certificate_path(config, job)))
+
+
+def _package(ledger, config, job, content=b"zip"):
+    with open(package_path(config, job), 'wb') as f:
+        f.write(content)
+    ledger.record(job, "package", file_sha256(package_path(config, job)))
+
+
+def test_a_new_user_starts_with_the_certificate(setup):
+    ledger, config, job = setup
+    assert ledger.resume_stage(job, config) == "cert"
+
+
+def test_resume_after_each_stage(setup):
+    ledger, config, job = setup
+    _issue(ledger, config, job)
+    assert ledger.resume_stage(job, config) == "package"
+    _package(ledger, config, job)
+    assert ledger.resume_stage(job, config) == "email"
+    ledger.record(job, "email", "id-1")
+    assert ledger.resume_stage(job, config) is None
+
+
+def test_a_completed_run_is_a_no_op(setup, tmp_path):
+    ledger, config, job = setup
+    _issue(ledger, config, job)
+    _package(ledger, config, job)
+    ledger.record(job, "email", "id-1")
+    ledger.close()
+
+    # A new process (rerun) sees the same ledger; the sent e-mail is never repeated,
+    # even when the local files were cleaned up afterwards
+    # Nowy proces (ponowne uruchomienie) widzi ten sam rejestr; wysłany e-mail nigdy nie
+    # jest powtarzany, nawet gdy pliki lokalne zostały potem usunięte
+    reopened = Ledger(str(tmp_path / "ledger.sqlite3"))
+    try:
+        assert reopened.resume_stage(job, config) is None
+        (tmp_path / "IUCP-IPPU_PACKAGE_alice.zip").unlink()
+        (tmp_path / "certs" / "alice.p12").unlink()
+        assert reopened.resume_stage(job, config) is None
+        assert reopened.get(job)["message_id"] == "id-1"
+    finally:
+        reopened.close()
+
+
+@pytest.mark.parametrize("damage", ["changed", "missing"])
+def test_a_damaged_certificate_is_issued_again(setup, tmp_path, damage):
+    ledger, config, job = setup
+    _issue(ledger, config, job)
+    certificate = tmp_path / "certs" / "alice.p12"
+    if damage == "changed":
+        certificate.write_bytes(b"other p12")
+    else:
+        certificate.unlink()
+
+    assert ledger.resume_stage(job, config) == "cert"
+
+
+@pytest.mark.parametrize("damage", ["changed", "missing"])
+def test_a_damaged_package_is_built_again_from_the_certificate(setup, tmp_path, damage):
+    ledger, config, job = setup
+    _issue(ledger, config, job)
+    _package(ledger, config, job)
+    package = tmp_path / "IUCP-IPPU_PACKAGE_alice.zip"
+    if damage == "changed":
+        package.write_bytes(b"truncated")
+    else:
+        package.unlink()
+
+    assert ledger.resume_stage(job, config) == "package"
+
+
+def test_damaged_package_and_certificate_redo_everything(setup, tmp_path):
+    ledger, config, job = setup
+    _issue(ledger, config, job)
+    _package(ledger, config, job)
+    (tmp_path / "IUCP-IPPU_PACKAGE_alice.zip").unlink()
+    (tmp_path / "certs" / "alice.p12").write_bytes(b"other p12")
+
+    assert ledger.resume_stage(job, config) == "cert"
+
+
+def test_a_reissued_certificate_counts_with_its_new_hash(setup, tmp_path):
+    ledger, config, job = setup
+    _issue(ledger, config, job, b"first")
+    _issue(ledger, config, job, b"second")
+
+    assert ledger.resume_stage(job, config) == "package"
+
+
+def test_an_error_does_not_change_the_resume_stage(setup):
+    ledger, config, job = setup
+    _issue(ledger, config, job)
+    ledger.record_error(job, "package", "template missing")
+
+    assert ledger.resume_stage(job, config) == "package"
+    assert ledger.get(job)["last_error"] == "[package] template missing"
+    _package(ledger, config, job)
+    assert ledger.get(job)["last_error"] is None
+
+
+def test_users_are_told_apart_by_their_registration(setup):
+    ledger, config, job = setup
+    _issue(ledger, config, job)
+    _package(ledger, config, job)
+    ledger.record(job, "email", "id-1")
+    registered_again = UserJob(2, "alice", "alice@example.com", "2026-02-01 10:00:00", "EN")
+
+    assert ledger.resume_stage(registered_again, config) == "cert"
+    assert ledger.forget("alice") == 1
+    assert ledger.resume_stage(job, config) == "cert"
@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+
+# =====================================================================================
+# === TESTS OF THE RUN METRICS (SPANS, PERCENTILES, PROMETHEUS TEXTFILE, SUMMARY) ===
+# === TESTY METRYK PRZEBIEGU (ODCINKI, PERCENTYLE, PLIK PROMETHEUS, PODSUMOWANIE) ===
+# =====================================================================================
+
+import json
+import os
+import re
+import subprocess
+import sys
+import threading
+
+import pytest
+
+from conftest import PROJECT_ROOT
+from metrics import RunMetrics, percentile, record_span, span, summarize
+
+
+@pytest.fixture
+def recorder(tmp_path):
+    recorder = RunMetrics(str(tmp_path / "trace.jsonl"), str(tmp_path / "blox.prom")).activate()
+    yield recorder
+    recorder.finish(0)
+
+
+def _names(recorder):
+    return sorted(record["span"] for record in recorder.spans)
+
+
+# --- Spans / Odcinki ---
+
+def test_nested_spans_get_dotted_names_per_thread(recorder):
+    inner_open = threading.Event()
+    outer_may_close = threading.Event()
+
+    def worker():
+        # Opened while 'cert' is open in the main thread, but not inside it
+        # Otwarty, gdy 'cert' jest otwarty w wątku głównym, ale nie wewnątrz niego
+        with span("email"):
+            with span("send"):
+                inner_open.set()
+                outer_may_close.wait(5)
+
+    with span("cert"):
+        thread = threading.Thread(target=worker)
+        thread.start()
+        inner_open.wait(5)
+        with span("remote_exec"):
+            record_span("transfer", 0.25)
+        outer_may_close.set()
+        thread.join()
+
+    assert _names(recorder) == ["cert", "cert.remote_exec", "cert.remote_exec.transfer", "email", "email.send"]
+    transfer = next(record for record in recorder.spans if record["span"].endswith("transfer"))
+    assert transfer["seconds"] == 0.25
+
+
+def test_a_failing_span_is_recorded_with_its_status(recorder):
+    with pytest.raises(ValueError):
+        with span("package", user="alice"):
+            raise ValueError("template missing")
+    with span("package", user="bob"):
+        pass
+
+    assert [(record["user"], record["status"]) for record in recorder.spans] == [("alice", "error"), ("bob", "ok")]
+    with open(recorder.trace_path, encoding='utf-8') as f:
+        assert [json.loads(line)["user"] for line in f] == ["alice", "bob"]
+
+
+def test_spans_are_not_recorded_without_an_active_run(tmp_path):
+    recorder = RunMetrics(str(tmp_path / "trace.jsonl"), None).activate()
+    recorder.finish(0)
+
+    with span("cert"):
+        record_span("transfer", 1.0)
+
+    assert recorder.spans == []
+
+
+# --- Percentiles / Percentyle ---
+
+@pytest.mark.parametrize("values, p50, p95", [
+    (list(range(1, 11)), 5, 10),
+    (list(range(20, 0, -1)), 10, 19),
+    ([7.5], 7.5, 7.5),
+    ([1, 1, 1, 100], 1, 100),
+    ([], 0.0, 0.0),
+])
+def test_percentile_uses_the_nearest_rank(values, p50, p95):
+    assert (percentile(values, 0.5), percentile(values, 0.95)) == (p50, p95)
+
+
+def test_summarize_groups_the_spans_by_name():
+    spans = [{"span": "cert", "seconds": float(value)} for value in range(1, 21)]
+    spans += [{"span": "email", "seconds": 0.5}]
+
+    summary = summarize(spans)
+
+    assert summary["cert"] == {"count": 20, "p50": 10.0, "p95": 19.0, "max": 20.0, "total": 210.0}
+    assert summary["email"] == {"count": 1, "p50": 0.5, "p95": 0.5, "max": 0.5, "total": 0.5}
+
+
+# --- Prometheus textfile / Plik tekstowy Prometheus ---
+
+_METRIC_NAME = r"[a-zA-Z_:][a-zA-Z0-9_:]*"
+_LABEL = r'[a-zA-Z_][a-zA-Z0-9_]*="(?:[^"\\\n]|\\[\\"n])*"'
+_SAMPLE = re.compile(rf"({_METRIC_NAME})(?:\{{({_LABEL}(?:,{_LABEL})*)?\}})? (\S+)(?: -?\d+)?")
+
+
+def _parse_exposition(text):
+    """
+    Checks the Prometheus text exposition format and returns {family: (type, [(name, labels, value)])}.
+
+    Sprawdza format tekstowy Prometheus i zwraca {rodzina: (typ, [(nazwa, etykiety, wartość)])}.
+    """
+    assert text.endswith("\n")
+    families = {}
+    current = None
+    for line in text.splitlines():
+        if line.startswith("# HELP "):
+            name = line.split(" ", 3)[2]
+            assert re.fullmatch(_METRIC_NAME, name) and name not in families, line
+        elif line.startswith("# TYPE "):
+            _, _, name, kind = line.split(" ")
+            assert kind in ("counter", "gauge", "summary", "histogram", "untyped") and name not in families, line
+            families[name] = (kind, [])
+            current = name
+        else:
+            match = _SAMPLE.fullmatch(line)
+            assert match, line
+            name, labels, value = match.groups()
+            # The samples of a family follow its TYPE line (summaries add _sum and _count)
+            # Próbki rodziny następują po jej linii TYPE (podsumowania dodają _sum i _count)
+            assert name in (current, f"{current}_sum", f"{current}_count"), line
+            families[current][1].append((name, dict(re.findall(r'([a-zA-Z_]\w*)="((?:[^"\\]|\\.)*)"', labels or "")),
+                                         float(value)))
+    return families
+
+
+def test_the_prometheus_textfile_is_valid_exposition_text(recorder):
+    for seconds in (0.1, 0.2, 0.3, 0.4):
+        record_span("cert", seconds)
+    record_span('odd "stage"\\name', 1.0)
+
+    result = recorder.finish(3, 1)
+
+    with open(recorder.prometheus_path, encoding='utf-8') as f:
+        families = _parse_exposition(f.read())
+    kind, samples = families["blox_stage_duration_seconds"]
+    cert = {(name, labels.get("quantile")): value for name, labels, value in samples if labels["stage"] == "cert"}
+    assert kind == "summary"
+    assert cert == {("blox_stage_duration_seconds", "0.5"): 0.2, ("blox_stage_duration_seconds", "0.95"): 0.4,
+                    ("blox_stage_duration_seconds_sum", None): 1.0, ("blox_stage_duration_seconds_count", None): 4}
+    assert {labels["stage"] for _, labels, _ in samples} == {"cert", 'odd \\"stage\\"\\\\name'}
+    assert {labels["status"]: value for _, labels, value in families["blox_run_users"][1]} == {
+        "succeeded": 3, "failed": 1}
+    assert families["blox_run_duration_seconds"][1][0][2] == pytest.approx(result["seconds"], abs=1e-6)
+    assert not [name for name in os.listdir(os.path.dirname(recorder.prometheus_path)) if name.endswith(".tmp")]
+
+
+# --- Summary of a recorded run / Podsumowanie zapisanego przebiegu ---
+
+def _run_main(*arguments):
+    return subprocess.run([sys.executable, os.path.join(PROJECT_ROOT, "metrics.py")] + list(arguments),
+                          capture_output=True, text=True)
+
+
+def test_main_prints_the_last_run_of_the_trace(tmp_path):
+    trace = str(tmp_path / "trace.jsonl")
+    runs = []
+    for users in (["alice"], ["bob", "carol", "dave"]):
+        recorder = RunMetrics(trace, None).activate()
+        for user in users:
+            recorder.record("package", 0.5, 1000.0 + len(runs) * 100 + users.index(user) * 10, user=user)
+        recorder.record("package", 0.5, 1000.0, "error", user="mallory")
+        recorder.finish(len(users))
+        runs.append(recorder.run_id)
+
+    last = _run_main("--trace", trace)
+    first = _run_main("--trace", trace, "--run", runs[0])
+
+    assert last.returncode == 0 and f"Run / Przebieg: {runs[1]}" in last.stdout
+    # Three users packaged between the first span start (1000.0) and the last span end (1120.5)
+    # Trzech użytkowników spakowanych między początkiem pierwszego odcinka (1000.0) a końcem ostatniego (1120.5)
+    assert "Users per minute: 1.5 (3 in 120.5 s)" in last.stdout
+    assert re.search(r"package\s+4\s+0\.500\s+0\.500\s+0\.500\s+2\.000", last.stdout)
+    assert first.returncode == 0 and f"Run / Przebieg: {runs[0]}" in first.stdout
+    assert "(1 in " in first.stdout
+
+
+def test_main_fails_on_a_missing_trace_or_run(tmp_path):
+    assert _run_main("--trace", str(tmp_path / "none.jsonl")).returncode == 1
+
+    trace = tmp_path / "trace.jsonl"
+    trace.write_text("", encoding='utf-8')
+    result = _run_main("--trace", str(trace), "--run", "nope")
+    assert result.returncode == 1 and "'nope'" in result.stdout
@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+
+# =====================================================================================
+# === TESTS OF THE DURABLE OUTBOX (RETRY TIMING) ===
+# === TESTY TRWAŁEJ KOLEJKI WYCHODZĄCEJ (CZAS PONOWIEŃ) ===
+# =====================================================================================
+
+import threading
+import time
+
+import pytest
+
+import outbox as outbox_module
+from email_sender import DeliveryResult
+from ledger import file_sha256
+from outbox import Outbox, OutboxWorker
+from user_job import UserJob
+
+
+class _Clock:
+    """
+    Stands in for the 'time' module of outbox.py: the wall clock moves only when told to.
+
+    Zastępuje moduł 'time' w outbox.py: zegar przesuwa się tylko na polecenie.
+    """
+
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+class _Delivery:
+    """
+    GmailDelivery stand-in: fails the first 'failures' attempts of every recipient.
+
+    Zamiennik GmailDelivery: pierwsze 'failures' prób każdego odbiorcy kończy błędem.
+    """
+
+    workers = 2
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.sent = []
+        self._attempts = {}
+        self._lock = threading.Lock()
+
+    def send(self, job, attachment_path=None):
+        with self._lock:
+            attempt = self._attempts[job.email_address] = self._attempts.get(job.email_address, 0) + 1
+            self.sent.append(job.email_address)
+        if attempt <= self.failures:
+            return DeliveryResult(job, error=f"HTTP 503 (attempt {attempt})", attempts=1)
+        return DeliveryResult(job, message_id=f"id-{job.client_name}", attempts=1)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(outbox_module, "time", clock)
+    return clock
+
+
+def _enqueue(box, tmp_path, name):
+    package = tmp_path / f"IUCP-IPPU_PACKAGE_{name}.zip"
+    package.write_bytes(name.encode("utf-8"))
+    return box.enqueue(UserJob(0, name, f"{name}@example.com", "2026-01-01", "EN"), str(package),
+                       file_sha256(str(package)))
+
+
+def test_retry_delay_doubles_and_is_capped_at_an_hour(clock, tmp_path):
+    box = Outbox(str(tmp_path / "outbox.sqlite3"), max_attempts=10, retry_delay=600)
+    entry = _enqueue(box, tmp_path, "alice")
+
+    delays = []
+    for _ in range(5):
+        box.mark_failed(entry['id'], "HTTP 503")
+        delays.append(box.rows()[0]['next_attempt_at'] - clock.now)
+
+    assert delays == [600, 1200, 2400, 3600, 3600]
+
+
+def test_an_entry_is_not_claimed_before_its_retry_time(clock, tmp_path):
+    box = Outbox(str(tmp_path / "outbox.sqlite3"), retry_delay=60)
+    entry = _enqueue(box, tmp_path, "alice")
+    assert [row['id'] for row in box.claim_due(5)] == [entry['id']]
+    assert box.mark_failed(entry['id'], "HTTP 429") == 'pending'
+
+    clock.now += 59
+    assert box.claim_due(5) == []
+    clock.now += 1
+    assert [row['id'] for row in box.claim_due(5)] == [entry['id']]
+
+
+def test_worker_follows_the_retry_schedule_until_sent(clock, tmp_path):
+    box = Outbox(str(tmp_path / "outbox.sqlite3"), retry_delay=10)
+    delivery = _Delivery(failures=2)
+    sent = []
+    worker = OutboxWorker(box, {}, delivery, on_sent=lambda job, message_id: sent.append((job.client_name, message_id)))
+    _enqueue(box, tmp_path, "alice")
+
+    assert worker.run_once() == 1
+    assert worker.run_once() == 0
+    clock.now += 10
+    assert worker.run_once() == 1
+    clock.now += 19
+    assert worker.run_once() == 0
+    clock.now += 1
+    assert worker.run_once() == 1
+
+    row = box.rows()[0]
+    assert (row['state'], row['attempts'], row['message_id'], row['last_error']) == ('sent', 3, 'id-alice', None)
+    assert sent == [("alice", "id-alice")] and len(delivery.sent) == 3
+
+
+def test_worker_gives_up_after_max_attempts(clock, tmp_path):
+    box = Outbox(str(tmp_path / "outbox.sqlite3"), max_attempts=2, retry_delay=10)
+    worker = OutboxWorker(box, {}, _Delivery(failures=5))
+    _enqueue(box, tmp_path, "alice")
+
+    worker.run_once()
+    clock.now += 10
+    worker.run_once()
+    clock.now += 3600
+    assert worker.run_once() == 0
+
+    row = box.rows()[0]
+    assert (row['state'], row['attempts'], row['last_error']) == ('failed', 2, "HTTP 503 (attempt 2)")
+    assert box.retry_failed() == 1
+    assert worker.run_once() == 1
+
+
+def test_a_changed_package_is_not_sent(clock, tmp_path):
+    box = Outbox(str(tmp_path / "outbox.sqlite3"))
+    delivery = _Delivery()
+    _enqueue(box, tmp_path, "alice")
+    (tmp_path / "IUCP-IPPU_PACKAGE_alice.zip").write_bytes(b"tampered")
+
+    OutboxWorker(box, {}, delivery).run_once()
+
+    row = box.rows()[0]
+    assert row['state'] == 'pending' and "changed after it was queued" in row['last_error']
+    assert delivery.sent == []
+
+
+def test_stale_sending_entries_are_released_on_open(clock, tmp_path):
+    path = str(tmp_path / "outbox.sqlite3")
+    box = Outbox(path)
+    _enqueue(box, tmp_path, "alice")
+    box.claim_due(1)
+    box.close()
+
+    clock.now += 60
+    assert Outbox(path).claim_due(1) == []
+    clock.now += 600
+    assert len(Outbox(path).claim_due(1)) == 1
+
+
+def test_wake_sends_without_waiting_for_the_poll_interval(tmp_path):
+    box = Outbox(str(tmp_path / "outbox.sqlite3"))
+    delivery = _Delivery()
+    worker = OutboxWorker(box, {}, delivery, poll_interval=60).start()
+    try:
+        _enqueue(box, tmp_path, "alice")
+        worker.wake()
+        deadline = time.monotonic() + 5
+        while box.counts().get('sent') != 1 and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        worker.stop(drain=False)
+
+    assert box.counts() == {'sent': 1}
+
+
+def test_stop_drains_the_due_entries_only(clock, tmp_path):
+    box = Outbox(str(tmp_path / "outbox.sqlite3"), retry_delay=10)
+    worker = OutboxWorker(box, {}, _Delivery(failures=1), poll_interval=60)
+    _enqueue(box, tmp_path, "alice")
+    worker.run_once()
+    _enqueue(box, tmp_path, "bob")
+
+    worker.stop()
+
+    states = {row['username']: row['state'] for row in box.rows()}
+    assert states == {"alice": "pending", "bob": "pending"}
+    clock.now += 10
+    worker.stop()
+    assert box.counts() == {'sent': 2}
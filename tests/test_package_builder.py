@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+
+# =====================================================================================
+# === TESTS OF THE PACKAGE BUILDER (HAND-WRITTEN ZIP CHECKED BY ZIPFILE) ===
+# === TESTY BUDOWANIA PACZEK (RĘCZNIE ZAPISANY ZIP SPRAWDZANY PRZEZ ZIPFILE) ===
+# =====================================================================================
+
+import io
+import os
+import stat
+import zipfile
+import zlib
+
+import pytest
+
+from package_builder import PackageBuilder
+from wg_peers import package_files
+
+SHARED_FILES = {
+    "certs/config.pref": b"<preferences>1.1.1.1</preferences>\n",
+    "certs/truststore-root.p12": b"\x30\x82truststore" * 50,
+    "maps/layer.kml": b"<kml>" + b"x" * 100_000 + b"</kml>",
+    "readme.txt": "Zażółć gęślą jaźń\n".encode("utf-8"),
+}
+# Left out of every package, as by the 'zip -x' list of package.sh
+# Pomijane w każdej paczce, jak przez listę 'zip -x' w package.sh
+EXCLUDED_FILES = {"certs/bob.p12": b"someone else's key", "debug.log": b"log", "maps/cache.tmp": b"tmp"}
+CLIENT_CONF = "[Interface]\nPrivateKey = ALICEPRIVATE=\nAddress = 10.0.0.2/32\n"
+
+
+@pytest.fixture
+def template(tmp_path):
+    source = tmp_path / "IUCP-IPPU_PACKAGE"
+    for name, data in {**SHARED_FILES, **EXCLUDED_FILES}.items():
+        (source / name).parent.mkdir(parents=True, exist_ok=True)
+        (source / name).write_bytes(data)
+    certificate = tmp_path / "alice.p12"
+    certificate.write_bytes(os.urandom(2500))
+    return source, certificate
+
+
+def _open(data):
+    archive = zipfile.ZipFile(io.BytesIO(data))
+    assert archive.testzip() is None
+    return archive
+
+
+def test_package_is_a_valid_zip_with_the_shared_and_client_files(template):
+    source, certificate = template
+
+    archive = _open(PackageBuilder(str(source)).build("alice", str(certificate)))
+
+    assert archive.namelist() == ["readme.txt", "certs/", "certs/config.pref", "certs/truststore-root.p12",
+                                  "maps/", "maps/layer.kml", "certs/alice.p12"]
+    for name, data in SHARED_FILES.items():
+        info = archive.getinfo(name)
+        assert archive.read(name) == data
+        assert (info.CRC, info.file_size, info.compress_type) == (zlib.crc32(data), len(data), zipfile.ZIP_DEFLATED)
+    assert archive.read("certs/alice.p12") == certificate.read_bytes()
+    assert archive.getinfo("certs/alice.p12").CRC == zlib.crc32(certificate.read_bytes())
+    assert archive.getinfo("maps/").is_dir() and archive.read("maps/") == b""
+
+
+def test_wireguard_files_are_added_for_this_client_only(template):
+    source, certificate = template
+    builder = PackageBuilder(str(source))
+    extras = package_files("alice", CLIENT_CONF)
+
+    archive = _open(builder.build("alice", str(certificate), extras))
+
+    assert archive.namelist()[-3:] == ["certs/alice.p12", "wireguard/alice.conf", "wireguard/alice.png"]
+    assert archive.read("wireguard/alice.conf") == CLIENT_CONF.encode("utf-8")
+    assert archive.read("wireguard/alice.png").startswith(b"\x89PNG")
+    for name, data in extras.items():
+        info = archive.getinfo(name)
+        assert info.CRC == zlib.crc32(data)
+        assert stat.S_IMODE(info.external_attr >> 16) == 0o600
+    assert not any(name.startswith("wireguard/") for name in _open(builder.build("bob", str(certificate))).namelist())
+
+
+def test_changed_template_files_are_picked_up(template):
+    source, certificate = template
+    builder = PackageBuilder(str(source))
+    builder.build("alice", str(certificate))
+
+    pref = source / "certs" / "config.pref"
+    pref.write_bytes(b"<preferences>2.2.2.2</preferences>\n")
+    os.utime(pref, ns=(pref.stat().st_atime_ns, pref.stat().st_mtime_ns + 10_000_000))
+    (source / "maps" / "new.kml").write_bytes(b"<kml/>")
+
+    archive = _open(builder.build("alice", str(certificate)))
+    assert archive.read("certs/config.pref") == b"<preferences>2.2.2.2</preferences>\n"
+    assert archive.read("maps/new.kml") == b"<kml/>"
+
+
+def test_build_file_is_readable_by_the_owner_only(template, tmp_path):
+    source, certificate = template
+    target = tmp_path / "IUCP-IPPU_PACKAGE_alice.zip"
+
+    data = PackageBuilder(str(source)).build_file("alice", str(certificate), str(target))
+
+    assert target.read_bytes() == data
+    assert stat.S_IMODE(os.stat(target).st_mode) == 0o600
+    with zipfile.ZipFile(target) as archive:
+        assert archive.testzip() is None
+    assert not os.path.exists(str(target) + ".tmp")
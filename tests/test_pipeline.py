@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+
+# =====================================================================================
+# === TESTS OF THE STAGED PIPELINE (BATCH ERROR MAPPING) ===
+# === TESTY POTOKU ETAPÓW (PRZYPISANIE BŁĘDÓW PACZEK) ===
+# =====================================================================================
+
+import threading
+
+from pipeline import Stage, run_pipeline
+
+
+def _recorder():
+    """
+    Returns (events, on_event) recording every (event, stage, item, error).
+
+    Zwraca (zdarzenia, on_event) zapisujące każde (zdarzenie, etap, element, błąd).
+    """
+    events = []
+    lock = threading.Lock()
+
+    def on_event(event, stage_name, item, error):
+        with lock:
+            events.append((event, stage_name, item, error))
+
+    return events, on_event
+
+
+def test_batch_failures_are_mapped_to_their_items():
+    batches = []
+    errors = {}
+
+    def issue(batch):
+        batches.append(list(batch))
+        failures = {}
+        for item in batch:
+            if item % 3 == 0:
+                failures[item] = errors.setdefault(item, RuntimeError(f"bad name {item}"))
+        return failures
+
+    delivered = []
+    events, on_event = _recorder()
+    summary = run_pipeline(range(1, 11), [Stage("cert", issue, queue_size=4, batch_size=4),
+                                          Stage("email", delivered.append, workers=2)], on_event)
+
+    assert sorted(summary.succeeded) == [1, 2, 4, 5, 7, 8, 10]
+    assert sorted(delivered) == [1, 2, 4, 5, 7, 8, 10]
+    assert sorted(summary.failed, key=lambda failure: failure[0]) == [
+        (3, "cert", errors[3]), (6, "cert", errors[6]), (9, "cert", errors[9])]
+    assert sorted(item for batch in batches for item in batch) == list(range(1, 11))
+    assert all(1 <= len(batch) <= 4 for batch in batches)
+    assert sorted(item for event, stage, item, _ in events if (event, stage) == ("failed", "cert")) == [3, 6, 9]
+    assert sorted(item for event, stage, item, _ in events if (event, stage) == ("done", "cert")) == [
+        1, 2, 4, 5, 7, 8, 10]
+
+
+def test_a_raising_batch_handler_fails_the_whole_batch():
+    error = RuntimeError("ssh connection lost")
+    seen = []
+
+    def issue(batch):
+        seen.append(list(batch))
+        if 5 in batch:
+            raise error
+        return None
+
+    summary = run_pipeline(range(1, 9), [Stage("cert", issue, queue_size=8, batch_size=8)])
+
+    failed_batch = next(batch for batch in seen if 5 in batch)
+    assert sorted(item for item, _, _ in summary.failed) == sorted(failed_batch)
+    assert all((stage, reason) == ("cert", error) for _, stage, reason in summary.failed)
+    assert sorted(summary.succeeded + failed_batch) == list(range(1, 9))
+
+
+def test_failures_for_unknown_items_are_ignored():
+    # Only the items of the batch can fail; a stray key must not drop or duplicate anything
+    # Zawieść mogą tylko elementy paczki; obcy klucz nie może niczego pominąć ani powielić
+    summary = run_pipeline([1, 2], [Stage("cert", lambda batch: {99: RuntimeError("stray")}, batch_size=2)])
+
+    assert sorted(summary.succeeded) == [1, 2] and summary.failed == []
+
+
+def test_single_item_stage_failure_stops_only_that_item():
+    def package(item):
+        if item == 2:
+            raise ValueError("template missing")
+
+    summary = run_pipeline([1, 2, 3], [Stage("package", package, workers=2), Stage("email", lambda item: None)])
+
+    assert sorted(summary.succeeded) == [1, 3]
+    assert [(item, stage, str(error)) for item, stage, error in summary.failed] == [(2, "package", "template missing")]
+
+
+def test_batch_size_raises_the_queue_size():
+    stage = Stage("cert", lambda batch: None, queue_size=2, batch_size=6)
+
+    assert stage.queue_size == 6
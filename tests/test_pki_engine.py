@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+
+# =====================================================================================
+# === TESTS OF THE PYTHON PKI ENGINE (THROWAWAY CA) ===
+# === TESTY SILNIKA PKI W PYTHONIE (JEDNORAZOWE CA) ===
+# =====================================================================================
+
+import datetime
+import os
+
+import pytest
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec, padding
+from cryptography.hazmat.primitives.serialization import pkcs12
+from cryptography.x509.oid import ExtendedKeyUsageOID, NameOID
+
+from pki_engine import PkiEngine, publish_certificates
+from remote_session import LocalSession
+from tak_certs import TRUSTSTORE_FILENAME
+
+CA_PASSWORD = "atakatak"
+METADATA = """COUNTRY=PL
+STATE=dolnoslaskie
+CITY=Karkonosze
+ORGANIZATION=BLOX
+ORGANIZATIONAL_UNIT=test
+CAPASS=atakatak
+PASS=atakatak
+"""
+
+
+@pytest.fixture(scope="module")
+def throwaway_ca():
+    """
+    Returns (certificate PEM, key PEM encrypted with CA_PASSWORD) of a new CA.
+
+    Zwraca (PEM certyfikatu, PEM klucza zaszyfrowany CA_PASSWORD) nowego CA.
+    """
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "Throwaway test CA")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    certificate = (x509.CertificateBuilder().subject_name(name).issuer_name(name).public_key(key.public_key())
+                   .serial_number(x509.random_serial_number()).not_valid_before(now)
+                   .not_valid_after(now + datetime.timedelta(days=1))
+                   .add_extension(x509.BasicConstraints(ca=True, path_length=None), critical=True)
+                   .sign(key, hashes.SHA256()))
+    return (certificate.public_bytes(serialization.Encoding.PEM),
+            key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                              serialization.BestAvailableEncryption(CA_PASSWORD.encode())))
+
+
+def _engine(throwaway_ca, **options):
+    return PkiEngine(*throwaway_ca, ca_password=CA_PASSWORD, key_algorithm="ec", key_size=256, workers=1, **options)
+
+
+def test_issue_writes_p12_files_signed_by_the_ca(throwaway_ca, tmp_path):
+    engine = _engine(throwaway_ca, subject={"COUNTRY": "PL", "ORGANIZATION": "BLOX"})
+    results, certificates = engine.issue(["alice", "bob", "alice"], str(tmp_path))
+
+    assert results == {"alice": None, "bob": None}
+    ca = x509.load_pem_x509_certificate(throwaway_ca[0])
+    for name in ("alice", "bob"):
+        with open(tmp_path / f"{name}.p12", "rb") as f:
+            key, certificate, extra = pkcs12.load_key_and_certificates(f.read(), CA_PASSWORD.encode())
+        assert certificate.public_bytes(serialization.Encoding.PEM) == certificates[name]
+        assert certificate.subject.rfc4514_string() == f"CN={name},O=BLOX,C=PL"
+        assert certificate.issuer == ca.subject
+        assert list(certificate.extensions.get_extension_for_class(x509.ExtendedKeyUsage).value) == \
+            [ExtendedKeyUsageOID.CLIENT_AUTH]
+        ca.public_key().verify(certificate.signature, certificate.tbs_certificate_bytes,
+                               ec.ECDSA(certificate.signature_hash_algorithm))
+        assert [cert.subject for cert in extra] == [ca.subject]
+
+
+def test_issue_writes_a_truststore_with_the_ca(throwaway_ca, tmp_path):
+    _engine(throwaway_ca, legacy_p12=False).issue(["alice"], str(tmp_path))
+    with open(tmp_path / TRUSTSTORE_FILENAME, "rb") as f:
+        key, certificate, extra = pkcs12.load_key_and_certificates(f.read(), CA_PASSWORD.encode())
+    assert key is None
+    assert [cert.public_bytes(serialization.Encoding.PEM) for cert in extra] == [throwaway_ca[0]]
+
+
+def test_from_session_reads_the_tak_certs_directory(throwaway_ca, tmp_path):
+    files = tmp_path / "files"
+    files.mkdir()
+    (tmp_path / "cert-metadata.sh").write_text(METADATA, encoding='utf-8')
+    (files / "ca.pem").write_bytes(throwaway_ca[0])
+    (files / "ca-do-not-share.key").write_bytes(throwaway_ca[1])
+
+    engine = PkiEngine.from_session(LocalSession(use_sudo=False), str(tmp_path), key_algorithm="ec",
+                                    key_size=256, workers=1)
+
+    certificate = engine.sign("carol", ec.generate_private_key(ec.SECP256R1()))
+    assert certificate.subject.rfc4514_string() == "CN=carol,OU=test,O=BLOX,L=Karkonosze,ST=dolnoslaskie,C=PL"
+
+
+def test_from_session_reports_a_missing_ca(tmp_path):
+    with pytest.raises(RuntimeError, match="could not load the CA"):
+        PkiEngine.from_session(LocalSession(use_sudo=False), str(tmp_path))
+
+
+def test_publish_certificates_extracts_exactly_the_pem_files(fake_sudo, tmp_path):
+    (tmp_path / "files").mkdir()
+    certificates = {"alice": b"-----BEGIN CERTIFICATE-----\nA\n", "bob": b"-----BEGIN CERTIFICATE-----\nB\n"}
+
+    assert publish_certificates(LocalSession("s3cret"), certificates, str(tmp_path)) is None
+
+    assert sorted(os.listdir(tmp_path / "files")) == ["alice.pem", "bob.pem"]
+    for name, data in certificates.items():
+        assert (tmp_path / "files" / f"{name}.pem").read_bytes() == data
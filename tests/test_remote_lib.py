@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+
+# =====================================================================================
+# === TESTS OF THE SHELL SSH HELPERS (FAKE sshpass) ===
+# === TESTY FUNKCJI SSH POWŁOKI (UDAWANY sshpass) ===
+# =====================================================================================
+
+import os
+import subprocess
+
+import pytest
+
+from config_loader import shell_environment
+from conftest import PROJECT_ROOT, write_executable
+
+# Prints the arguments it got, one per line, instead of connecting
+# Wypisuje otrzymane argumenty, po jednym w linii, zamiast się łączyć
+FAKE_SSHPASS = """#!/bin/bash
+printf '%s\\n' "$@"
+"""
+
+
+def _run(tmp_path, call, port=None):
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir(exist_ok=True)
+    write_executable(bin_dir / "sshpass", FAKE_SSHPASS)
+    environment = dict(os.environ, PATH=f"{bin_dir}{os.pathsep}{os.environ['PATH']}",
+                       BLOX_SSH_CONTROL_PATH=str(tmp_path / "ssh" / "blox-%C"))
+    environment.pop("BLOX_REMOTE_PORT", None)
+    if port is not None:
+        environment["BLOX_REMOTE_PORT"] = port
+    script = f"source {os.path.join(PROJECT_ROOT, 'remote_lib.sh')} && {call}"
+    return subprocess.run(["bash", "-c", script], env=environment, capture_output=True, text=True,
+                          check=True).stdout.splitlines()
+
+
+@pytest.mark.parametrize("call, flag", [("remote_ssh user@host true", "-p"),
+                                        ("remote_scp user@host:/a /tmp/b", "-P")])
+def test_the_configured_port_is_passed(tmp_path, call, flag):
+    arguments = _run(tmp_path, call, port="2222")
+    assert arguments[arguments.index(flag) + 1] == "2222"
+    assert arguments.index(flag) < arguments.index(call.split()[1])
+
+
+def test_the_port_defaults_to_22(tmp_path):
+    arguments = _run(tmp_path, "remote_ssh user@host true")
+    assert arguments[arguments.index("-p") + 1] == "22"
+
+
+def test_the_port_is_exported_to_the_shell_stages():
+    config = {"network": {"remote_server": {"host": "h", "user": "u", "port": 2222}}}
+    assert shell_environment(config)["BLOX_REMOTE_PORT"] == "2222"
+    assert shell_environment({})["BLOX_REMOTE_PORT"] == "22"
+
+
+# Runs the remote command (the last argument) here, as the login shell on the host would
+# Uruchamia zdalne polecenie (ostatni argument) tutaj, jak zrobiłaby to powłoka na hoście
+FAKE_SSHPASS_EXEC = """#!/bin/bash
+exec bash -c "${@: -1}"
+"""
+
+PASSWORD = "pa ss'word"
+COMMAND = """echo "user: $(id -u)"; printf '%s\\n' 'it'"'"'s'; cat"""
+
+
+def _run_sudo(tmp_path, call):
+    bin_dir = tmp_path / "bin"
+    write_executable(bin_dir / "sshpass", FAKE_SSHPASS_EXEC)
+    environment = dict(os.environ, BLOX_SSH_CONTROL_PATH=str(tmp_path / "ssh" / "blox-%C"))
+    script = f"source {os.path.join(PROJECT_ROOT, 'remote_lib.sh')} && sudo_pswd=\"$1\" && {call}"
+    return subprocess.run(["bash", "-c", script, "bash", PASSWORD, COMMAND], env=environment,
+                          input="stdin data\n", capture_output=True, text=True, check=True).stdout
+
+
+def test_remote_sudo_keeps_the_password_out_of_the_command(tmp_path, fake_sudo):
+    output = _run_sudo(tmp_path, 'remote_sudo user@host "$2"')
+
+    # The command reads nothing: the password line was taken by the remote shell
+    # Polecenie nic nie odczytuje: linię z hasłem pobrała zdalna powłoka
+    assert output == f"user: {os.getuid()}\nit's\n"
+
+
+def test_local_sudo_leaves_the_stdin_to_the_command(tmp_path, fake_sudo):
+    output = _run_sudo(tmp_path, 'local_sudo bash -c "$2"')
+
+    assert output == f"user: {os.getuid()}\nit's\nstdin data\n"
+
+
+@pytest.mark.parametrize("fake_sudo", ["askpass"], indirect=True)
+@pytest.mark.parametrize("call", ['remote_sudo user@host "$2"', 'local_sudo bash -c "$2"'])
+def test_sudo_helpers_give_the_password_through_askpass(tmp_path, fake_sudo, call):
+    _run_sudo(tmp_path, call)
+    assert (fake_sudo / "received_password").read_text(encoding='utf-8') == PASSWORD + "\n"
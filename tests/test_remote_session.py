@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+
+# =====================================================================================
+# === TESTS OF THE REMOTE EXECUTION LAYER (LOCAL STAND-IN) ===
+# === TESTY WARSTWY ZDALNEGO WYKONYWANIA (LOKALNY ZAMIENNIK) ===
+# =====================================================================================
+
+import os
+
+import pytest
+
+from remote_session import LocalSession
+
+PASSWORD = "s3cret"
+PAYLOAD = "[Interface]\nPrivateKey=x\n"
+
+
+def test_exec_without_sudo_returns_output():
+    session = LocalSession(PASSWORD)
+    assert session.exec("echo hello").stdout == "hello\n"
+
+
+def test_sudo_command_receives_exactly_the_input(fake_sudo):
+    session = LocalSession(PASSWORD)
+    assert session.exec("cat", sudo=True, input_data=PAYLOAD).stdout == PAYLOAD
+
+
+def test_sudo_command_receives_exactly_the_binary_input(fake_sudo):
+    session = LocalSession(PASSWORD)
+    data = b"\x00\x01tar stream\n\xff"
+    assert session.exec("cat", sudo=True, input_data=data, text=False).stdout == data
+
+
+def test_sudo_command_without_input_reads_nothing(fake_sudo):
+    session = LocalSession(PASSWORD)
+    assert session.exec("cat", sudo=True).stdout == ""
+
+
+def test_sudo_popen_does_not_leak_the_password(fake_sudo):
+    process = LocalSession(PASSWORD).popen("cat", sudo=True)
+    assert process.stdout.read() == b""
+    assert process.wait() == 0
+
+
+@pytest.mark.parametrize("fake_sudo", ["askpass"], indirect=True)
+def test_sudo_gets_the_password_through_askpass(fake_sudo):
+    LocalSession(PASSWORD).exec("true", sudo=True)
+    with open(os.path.join(fake_sudo, "received_password"), encoding='utf-8') as f:
+        assert f.read() == PASSWORD + "\n"
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+
+# =====================================================================================
+# === TESTS OF THE STARTUP TIME REPORT (BUDGETS AND THEIR STATUS) ===
+# === TESTY RAPORTU CZASU URUCHAMIANIA (LIMITY I ICH STATUS) ===
+# =====================================================================================
+
+import os
+
+import pytest
+
+import startup_report
+from conftest import PROJECT_ROOT
+from startup_report import DEFAULT_BUDGETS_MS, load_budgets
+
+
+def test_every_budgeted_script_exists():
+    missing = [script for script in DEFAULT_BUDGETS_MS if not os.path.isfile(os.path.join(PROJECT_ROOT, script))]
+    assert missing == []
+
+
+def test_load_budgets_without_a_config_returns_the_defaults(tmp_path):
+    budgets = load_budgets(str(tmp_path / "config.yaml"))
+
+    assert budgets == DEFAULT_BUDGETS_MS and budgets is not DEFAULT_BUDGETS_MS
+
+
+def test_the_config_overrides_and_extends_the_defaults(tmp_path):
+    path = tmp_path / "config.yaml"
+    path.write_text("execution:\n  startup_budget_ms:\n    start.py: 500\n    extra.py: 7\n", encoding='utf-8')
+
+    budgets = load_budgets(str(path))
+
+    assert budgets["start.py"] == 500 and budgets["extra.py"] == 7
+    assert budgets["wg_live.py"] == DEFAULT_BUDGETS_MS["wg_live.py"]
+    assert DEFAULT_BUDGETS_MS["start.py"] == 150
+
+
+def test_an_unreadable_config_falls_back_to_the_defaults(tmp_path, capsys):
+    path = tmp_path / "config.yaml"
+    path.write_text("execution: [unclosed\n", encoding='utf-8')
+
+    assert load_budgets(str(path)) == DEFAULT_BUDGETS_MS
+    assert "WARNING: Could not read budgets" in capsys.readouterr().out
+
+
+@pytest.fixture
+def measured(tmp_path, monkeypatch):
+    """
+    Replaces the import measurement with fixed times in microseconds ({script: total_us}).
+
+    Zastępuje pomiar importu stałymi czasami w mikrosekundach ({skrypt: suma_us}).
+    """
+    times = {}
+    monkeypatch.setattr(startup_report, "measure_imports",
+                        lambda path: (times[os.path.basename(path)], {"yaml": 900}) if os.path.basename(path) in times
+                        else None)
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "config.yaml").write_text("execution:\n  startup_budget_ms:\n    fast.py: 10\n    slow.py: 10\n",
+                                          encoding='utf-8')
+    return times
+
+
+def test_a_script_over_its_budget_fails_the_report(measured, capsys):
+    measured.update({"fast.py": 10_000, "slow.py": 10_001})
+
+    assert startup_report.startup_report(["fast.py", "slow.py"]) is False
+
+    lines = capsys.readouterr().out.splitlines()
+    assert any(line.startswith("fast.py") and "OK (budget / limit 10 ms)" in line for line in lines)
+    assert any(line.startswith("slow.py") and "OVER BUDGET / PRZEKROCZONY LIMIT (10 ms)" in line for line in lines)
+    assert "Some scripts exceed their startup budget or could not be imported." in lines
+
+
+def test_scripts_within_or_without_a_budget_pass(measured, capsys):
+    measured.update({"fast.py": 2_000, "unlisted.py": 999_000})
+
+    assert startup_report.startup_report(["fast.py", "unlisted.py"]) is True
+    output = capsys.readouterr().out
+    assert "no budget / brak limitu" in output and "All scripts are within their startup budget." in output
+
+
+def test_a_script_that_cannot_be_imported_fails_the_report(measured):
+    assert startup_report.startup_report(["broken.py"]) is False
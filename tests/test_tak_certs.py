@@ -0,0 +1,275 @@
+# -*- coding: utf-8 -*-
+
+# =====================================================================================
+# === TESTS OF THE BATCH TAK CERTIFICATE OPERATIONS (LOCAL FAKE TAK CA) ===
+# === TESTY WSADOWYCH OPERACJI NA CERTYFIKATACH TAK (LOKALNE UDAWANE CA TAK) ===
+# =====================================================================================
+
+import io
+import os
+import shutil
+import subprocess
+import sys
+import tarfile
+
+import pytest
+import yaml
+from cryptography import x509
+from cryptography.hazmat.primitives.serialization import pkcs12
+from cryptography.x509.oid import NameOID
+
+from benchmark import CA_PASSWORD, generate_registrations, setup_fake_tak
+from conftest import PROJECT_ROOT
+from remote_session import LocalSession
+from tak_certs import CRL_NAME, TRUSTSTORE_FILENAME, issue_certificates, revoke_certificates
+
+
+@pytest.fixture(scope="module")
+def tak_template(tmp_path_factory):
+    # The CA is generated once; every test works on its own copy
+    # CA jest generowane raz; każdy test pracuje na własnej kopii
+    certs_dir = tmp_path_factory.mktemp("tak") / "certs"
+    setup_fake_tak(str(certs_dir))
+    return certs_dir
+
+
+@pytest.fixture
+def tak(tak_template, tmp_path):
+    certs_dir = tmp_path / "certs"
+    shutil.copytree(tak_template, certs_dir)
+    return certs_dir
+
+
+def _break_make_cert(certs_dir, name):
+    """
+    Makes makeCert.sh fail for one client name, as it does for a name the TAK CA rejects.
+
+    Sprawia, że makeCert.sh kończy się błędem dla jednej nazwy klienta, jak dla nazwy
+    odrzuconej przez CA TAK.
+    """
+    script = certs_dir / "makeCert.sh"
+    lines = script.read_text(encoding='utf-8').splitlines(keepends=True)
+    lines.insert(1, f'[ "$2" = "{name}" ] && {{ echo "invalid name: $2" >&2; exit 1; }}\n')
+    script.write_text("".join(lines), encoding='utf-8')
+
+
+def _common_name(path):
+    _, certificate, _ = pkcs12.load_key_and_certificates(path.read_bytes(), CA_PASSWORD.encode())
+    return certificate.subject.get_attributes_for_oid(NameOID.COMMON_NAME)[0].value
+
+
+# --- Issuing / Wystawianie ---
+
+def test_every_certificate_of_the_batch_arrives_in_one_stream(tak, tmp_path):
+    destination = tmp_path / "out"
+
+    outcome = issue_certificates(LocalSession(use_sudo=False), ["alice", "bob", "alice", "carol"],
+                                 str(destination), str(tak))
+
+    assert outcome == {"alice": None, "bob": None, "carol": None}
+    assert sorted(os.listdir(destination)) == ["alice.p12", "bob.p12", "carol.p12", TRUSTSTORE_FILENAME]
+    for name in ("alice", "bob", "carol"):
+        assert (destination / f"{name}.p12").read_bytes() == (tak / "files" / f"{name}.p12").read_bytes()
+        assert _common_name(destination / f"{name}.p12") == name
+    assert (destination / TRUSTSTORE_FILENAME).read_bytes() == (tak / "files" / TRUSTSTORE_FILENAME).read_bytes()
+
+
+def test_one_bad_user_fails_alone(tak, tmp_path):
+    _break_make_cert(tak, "bob")
+    destination = tmp_path / "out"
+
+    outcome = issue_certificates(LocalSession(use_sudo=False), ["alice", "bob", "carol"], str(destination), str(tak))
+
+    assert outcome == {"alice": None, "bob": "makeCert.sh did not produce the certificate", "carol": None}
+    assert sorted(os.listdir(destination)) == ["alice.p12", "carol.p12", TRUSTSTORE_FILENAME]
+
+
+def test_a_stale_certificate_of_a_failed_user_is_not_sent(tak, tmp_path):
+    # A .p12 left on the server by an earlier run does not count as issued now
+    # Plik .p12 pozostawiony na serwerze przez wcześniejszy przebieg nie liczy się jako wystawiony teraz
+    (tak / "files" / "bob.p12").write_bytes(b"old")
+    _break_make_cert(tak, "bob")
+
+    outcome = issue_certificates(LocalSession(use_sudo=False), ["alice", "bob"], str(tmp_path / "out"), str(tak))
+
+    assert outcome["alice"] is None and outcome["bob"] is not None
+    assert not (tmp_path / "out" / "bob.p12").exists()
+
+
+def test_the_whole_batch_fails_when_the_server_side_fails(tmp_path):
+    outcome = issue_certificates(LocalSession(use_sudo=False), ["alice", "bob"], str(tmp_path / "out"),
+                                 str(tmp_path / "no-such-dir"))
+
+    assert set(outcome) == {"alice", "bob"}
+    assert all(error.startswith("batch failed (exit code 1)") for error in outcome.values())
+
+
+class _ArchiveSession(LocalSession):
+    """
+    Session whose privileged command streams a prepared archive instead of running the script.
+
+    Sesja, której uprzywilejowane polecenie przesyła przygotowane archiwum zamiast uruchamiać skrypt.
+    """
+
+    def __init__(self, archive_path):
+        super().__init__(use_sudo=False)
+        self.archive_path = archive_path
+
+    def popen(self, command, sudo=False):
+        return super().popen(f"cat '{self.archive_path}'", sudo)
+
+
+def _archive(path, members):
+    with tarfile.open(path, "w") as archive:
+        for name, data in members.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+    return str(path)
+
+
+def test_only_the_expected_members_are_written(tmp_path):
+    destination = tmp_path / "out"
+    archive = _archive(tmp_path / "batch.tar", {
+        "./issued.txt": b"alice\nbob\n",
+        "./alice.p12": b"alice key",
+        "./../../evil.sh": b"rm -rf /",
+        "./mallory.p12": b"not requested",
+        f"./{TRUSTSTORE_FILENAME}": b"truststore",
+    })
+
+    outcome = issue_certificates(_ArchiveSession(archive), ["alice", "bob"], str(destination))
+
+    assert outcome == {"alice": None, "bob": "makeCert.sh did not produce the certificate"}
+    assert sorted(os.listdir(destination)) == ["alice.p12", TRUSTSTORE_FILENAME]
+    assert not (tmp_path / "evil.sh").exists()
+
+
+def test_a_listed_certificate_missing_from_the_archive_fails(tmp_path):
+    archive = _archive(tmp_path / "batch.tar", {"./issued.txt": b"alice\n", f"./{TRUSTSTORE_FILENAME}": b"t"})
+
+    outcome = issue_certificates(_ArchiveSession(archive), ["alice"], str(tmp_path / "out"))
+
+    assert outcome == {"alice": "makeCert.sh did not produce the certificate"}
+
+
+@pytest.mark.parametrize("members", [{"./issued.txt": b"alice\n", "./alice.p12": b"key"}, None])
+def test_an_archive_without_the_truststore_fails_the_batch(tmp_path, members):
+    path = tmp_path / "batch.tar"
+    if members is None:
+        path.write_bytes(b"this is not a tar archive" * 100)
+    else:
+        _archive(path, members)
+
+    outcome = issue_certificates(_ArchiveSession(str(path)), ["alice", "bob"], str(tmp_path / "out"))
+
+    assert set(outcome) == {"alice", "bob"}
+    assert all(error.startswith("batch failed") for error in outcome.values())
+
+
+# --- Revoking / Odwoływanie ---
+
+def _issued(tak, *names):
+    outcome = issue_certificates(LocalSession(use_sudo=False), names, str(tak.parent / "issued"), str(tak))
+    assert set(outcome.values()) == {None}
+
+
+def _crl_number(tak):
+    # openssl increments crlnumber once per generated CRL (setup_fake_tak starts at 1000)
+    # openssl zwiększa crlnumber raz na wygenerowaną listę CRL (setup_fake_tak zaczyna od 1000)
+    return int((tak / "files" / "crlnumber").read_text(encoding='utf-8'), 16) - 0x1000
+
+
+def _revoked_names(tak):
+    lines = (tak / "files" / "index.txt").read_text(encoding='utf-8').splitlines()
+    return sorted(line.rsplit("CN=", 1)[1] for line in lines if line.startswith("R"))
+
+
+def test_partial_failures_are_reported_per_user_with_one_crl(tak):
+    _issued(tak, "alice", "bob", "carol")
+    (tak / "files" / "bob.pem").write_text("not a certificate\n", encoding='utf-8')
+
+    outcome = revoke_certificates(LocalSession(use_sudo=False), ["alice", "bob", "carol", "ghost"], str(tak))
+
+    assert {name: status for name, (status, _) in outcome.items()} == {
+        "alice": "revoked", "bob": "failed", "carol": "revoked", "ghost": "missing"}
+    assert outcome["bob"][1] and outcome["ghost"][1] == "no certificate on the server"
+    assert _revoked_names(tak) == ["alice", "carol"]
+    assert _crl_number(tak) == 1
+    crl = x509.load_pem_x509_crl((tak / "files" / f"{CRL_NAME}.crl").read_bytes())
+    assert len(list(crl)) == 2
+    assert not list((tak / "files").glob("alice.*")) and (tak / "files" / "bob.pem").exists()
+
+
+def test_no_crl_is_generated_when_nothing_was_revoked(tak):
+    outcome = revoke_certificates(LocalSession(use_sudo=False), ["ghost"], str(tak))
+
+    assert outcome == {"ghost": ("missing", "no certificate on the server")}
+    assert _crl_number(tak) == 0 and not (tak / "files" / f"{CRL_NAME}.crl").exists()
+
+
+def test_a_failed_crl_marks_the_revoked_users_as_failed(tak):
+    _issued(tak, "alice")
+
+    outcome = revoke_certificates(LocalSession(use_sudo=False), ["alice", "ghost"], str(tak),
+                                  crl_name="no-such-dir/root-ca")
+
+    assert outcome["alice"][0] == "failed"
+    assert outcome["alice"][1].startswith("revoked, but the CRL was not generated")
+    assert outcome["ghost"][0] == "missing"
+
+
+def _revoke_config(tak, tmp_path):
+    with open(os.path.join(PROJECT_ROOT, "config.example.yaml"), encoding='utf-8') as f:
+        config = yaml.safe_load(f)
+    config['execution']['mode'] = 'local'
+    config['paths']['tak_certs_dir'] = str(tak)
+    (tmp_path / "config.yaml").write_text(yaml.dump(config), encoding='utf-8')
+
+
+def test_revoke_py_match_revokes_only_the_matching_users(tak, tmp_path, fake_sudo):
+    _issued(tak, "test_1", "test_2", "alice")
+    _revoke_config(tak, tmp_path)
+    environment = {name: value for name, value in os.environ.items() if name != "BLOX_EVENTS"}
+
+    result = subprocess.run([sys.executable, os.path.join(PROJECT_ROOT, "revoke.py"), "--headless", "--match",
+                             "test_*", "test_1", "test_2", "test_3", "alice"],
+                            cwd=tmp_path, env=environment, capture_output=True, text=True)
+
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert "Number Of Users: 3" in result.stdout
+    assert _revoked_names(tak) == ["test_1", "test_2"]
+    assert _crl_number(tak) == 1
+    assert (tak / "files" / "alice.p12").exists()
+
+
+def test_revoke_py_match_filters_the_registration_sheet(tak, tmp_path, monkeypatch):
+    import revoke
+
+    names = generate_registrations(str(tmp_path / "sheet.csv"), 4)
+    _issued(tak, *names)
+    _revoke_config(tak, tmp_path)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("BLOX_HEADLESS", "1")
+    monkeypatch.setattr(revoke, "open_session", lambda config: LocalSession(use_sudo=False))
+
+    failed = revoke.run_revocation_process(match="bench_0000[13]", language="EN",
+                                           data_source=str(tmp_path / "sheet.csv"))
+
+    assert failed == 0
+    assert _revoked_names(tak) == ["bench_00001", "bench_00003"]
+    assert _crl_number(tak) == 1
+
+
+def test_revoke_cert_sh_uses_the_configured_certs_dir(tak, tmp_path, fake_sudo):
+    _issued(tak, "alice", "bob")
+    _revoke_config(tak, tmp_path)
+    environment = {name: value for name, value in os.environ.items() if name != "BLOX_CONFIG_ENV"}
+    environment["BLOX_CLIENT_NAME"] = "alice"
+
+    result = subprocess.run([os.path.join(PROJECT_ROOT, "revoke_cert.sh")], cwd=tmp_path, env=environment,
+                            capture_output=True, text=True)
+
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert _revoked_names(tak) == ["alice"]
+    assert not list((tak / "files").glob("alice.*")) and (tak / "files" / "bob.p12").exists()
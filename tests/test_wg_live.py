@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+
+# =====================================================================================
+# === TESTS OF THE LIVE WIREGUARD UPDATE (FAKE 'wg' BINARY) ===
+# === TESTY AKTUALIZACJI WIREGUARD NA ŻYWO (UDAWANY PROGRAM 'wg') ===
+# =====================================================================================
+
+import os
+import stat
+
+from conftest import wg_calls, write_executable
+from remote_session import LocalSession
+from wg_live import parse_peers, replace_endpoint_host, update_android, update_endpoint, write_root_file
+
+CLIENT_CONF = """[Interface]
+PrivateKey = CLIENTPRIVATE=
+Address = 10.0.0.2/32
+
+[Peer]
+PublicKey = PEERA=
+Endpoint = 1.1.1.1:51820
+AllowedIPs = 10.0.0.0/24
+
+[Peer]
+PublicKey = PEERB=
+Endpoint = 1.1.1.1:51821
+"""
+
+
+def test_replace_endpoint_host_keeps_the_port():
+    text = replace_endpoint_host(CLIENT_CONF, "2.2.2.2")
+    assert [peer["endpoint"] for peer in parse_peers(text)] == ["2.2.2.2:51820", "2.2.2.2:51821"]
+    assert replace_endpoint_host("Endpoint = 1.1.1.1:7\n", "::1") == "Endpoint = [::1]:7\n"
+
+
+def test_write_root_file_writes_exactly_the_content(fake_sudo, tmp_path):
+    path = tmp_path / "wg0.conf"
+    path.write_text("old\n", encoding='utf-8')
+    write_root_file(LocalSession("s3cret"), str(path), CLIENT_CONF)
+    assert path.read_bytes() == CLIENT_CONF.encode("utf-8")
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+    assert [name for name in os.listdir(tmp_path) if name.startswith(".blox-wg")] == []
+
+
+def test_update_endpoint_applies_only_the_changed_peers(fake_wg, tmp_path):
+    conf = tmp_path / "wg0-client.conf"
+    conf.write_text(CLIENT_CONF, encoding='utf-8')
+    (fake_wg / "wg0-client.endpoints").write_text("PEERA=\t2.2.2.2:51820\nPEERB=\t1.1.1.1:51821\n")
+
+    report = update_endpoint(LocalSession(use_sudo=False), str(conf), "2.2.2.2", interface="wg0-client")
+
+    assert conf.read_text(encoding='utf-8') == CLIENT_CONF.replace("1.1.1.1", "2.2.2.2")
+    assert report["file_changed"] and not report["started"]
+    assert [peer["public_key"] for peer in report["changed"]] == ["PEERA=", "PEERB="]
+    assert report["applied"] == ["PEERB="]
+    assert wg_calls(fake_wg) == ["wg show wg0-client endpoints",
+                                 "wg set wg0-client peer PEERB= endpoint 2.2.2.2:51821"]
+
+
+def test_update_endpoint_does_nothing_when_current(fake_wg, tmp_path):
+    conf = tmp_path / "wg0-client.conf"
+    conf.write_text(CLIENT_CONF, encoding='utf-8')
+    before = os.stat(conf).st_mtime_ns
+    (fake_wg / "wg0-client.endpoints").write_text("PEERA=\t1.1.1.1:51820\nPEERB=\t1.1.1.1:51821\n")
+
+    report = update_endpoint(LocalSession(use_sudo=False), str(conf), "1.1.1.1", interface="wg0-client")
+
+    assert not report["file_changed"] and report["changed"] == [] and report["applied"] == []
+    assert os.stat(conf).st_mtime_ns == before
+    assert wg_calls(fake_wg) == ["wg show wg0-client endpoints"]
+
+
+def test_update_endpoint_brings_a_down_interface_up(fake_wg, tmp_path):
+    conf = tmp_path / "wg0-client.conf"
+    conf.write_text(CLIENT_CONF, encoding='utf-8')
+
+    report = update_endpoint(LocalSession(use_sudo=False), str(conf), "2.2.2.2", interface="wg0-client")
+
+    assert report["started"] and report["applied"] == []
+    assert wg_calls(fake_wg)[-1] == "wg-quick up wg0-client"
+
+
+def test_update_endpoint_syncs_the_server_interface(fake_wg):
+    conf = fake_wg / "wg0.conf"
+    conf.write_text(CLIENT_CONF, encoding='utf-8')
+
+    update_endpoint(LocalSession(use_sudo=False), str(conf), "2.2.2.2", sync_interface="wg0")
+
+    assert (fake_wg / "wg0.synced").read_text(encoding='utf-8') == CLIENT_CONF.replace("1.1.1.1", "2.2.2.2")
+    assert sorted(call.split()[1] for call in wg_calls(fake_wg)) == ["strip", "syncconf"]
+
+
+def test_update_android_reloads_no_interface(fake_wg, tmp_path, monkeypatch):
+    # android.conf is the phone's configuration: 'wg syncconf wg0' would read wg0.conf instead
+    # android.conf to konfiguracja telefonu: 'wg syncconf wg0' wczytałoby zamiast niej wg0.conf
+    conf = tmp_path / "android.conf"
+    conf.write_text(CLIENT_CONF, encoding='utf-8')
+    write_executable(fake_wg / "qrencode", "#!/bin/bash\ncat\n")
+    monkeypatch.setenv("PATH", f"{fake_wg}{os.pathsep}{os.environ['PATH']}")
+    config = {"network": {"external_ip": "2.2.2.2", "wireguard": {"android_config": str(conf)}}}
+
+    report = update_android(config, LocalSession(use_sudo=False), str(tmp_path / "qr.png"))
+
+    assert report["file_changed"]
+    assert conf.read_text(encoding='utf-8') == CLIENT_CONF.replace("1.1.1.1", "2.2.2.2")
+    assert (tmp_path / "qr.png").read_text(encoding='utf-8') == report["text"]
+    assert wg_calls(fake_wg) == []
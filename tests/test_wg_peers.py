@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+
+# =====================================================================================
+# === TESTS OF THE PER-USER WIREGUARD PEERS (FAKE 'wg' BINARY) ===
+# === TESTY PEERÓW WIREGUARD UŻYTKOWNIKÓW (UDAWANY PROGRAM 'wg') ===
+# =====================================================================================
+
+from conftest import wg_calls
+from remote_session import LocalSession
+from wg_peers import PeerProvisioner, update_server_config
+
+SERVER_CONF = """[Interface]
+PrivateKey = SERVERPRIVATE=
+ListenPort = 51820
+
+[Peer]
+PublicKey = MANUAL=
+AllowedIPs = 10.0.0.50/32
+"""
+
+
+def _block(name, public_key, address):
+    return f"[Peer]\n# BLOX peer: {name}\nPublicKey = {public_key}\nAllowedIPs = {address}/32\n"
+
+
+def test_update_server_config_adds_new_blocks():
+    updated = update_server_config(SERVER_CONF, {"alice": ("A=", "10.0.0.2")})
+    assert updated == SERVER_CONF + "\n" + _block("alice", "A=", "10.0.0.2")
+
+
+def test_update_server_config_replaces_only_the_given_clients():
+    text = SERVER_CONF + "\n" + _block("alice", "A=", "10.0.0.2") + "\n" + _block("bob", "B=", "10.0.0.3")
+    updated = update_server_config(text, {"alice": ("A2=", "10.0.0.2")})
+    assert updated == SERVER_CONF + "\n" + _block("bob", "B=", "10.0.0.3") + "\n" + _block("alice", "A2=", "10.0.0.2")
+    assert "MANUAL=" in updated and "PublicKey = A=\n" not in updated
+
+
+def test_update_server_config_replaces_a_last_block_without_newline():
+    text = SERVER_CONF + "\n" + _block("alice", "A=", "10.0.0.2").rstrip("\n")
+    updated = update_server_config(text, {"alice": ("A2=", "10.0.0.2")})
+    assert updated == SERVER_CONF + "\n" + _block("alice", "A2=", "10.0.0.2")
+
+
+def _config(wg_dir, tmp_path):
+    return {
+        "network": {"external_ip": "203.0.113.7",
+                    "wireguard": {"server_interface": "wg0",
+                                  "peers": {"server_config": str(wg_dir / "wg0.conf"),
+                                            "registry": str(tmp_path / "peers.sqlite3"), "dns": "10.0.0.1"}}},
+    }
+
+
+def test_provision_writes_the_server_config_and_syncs_once(fake_wg, fake_sudo, tmp_path):
+    (fake_wg / "wg0.conf").write_text(SERVER_CONF, encoding='utf-8')
+    provisioner = PeerProvisioner(_config(fake_wg, tmp_path), LocalSession("s3cret"))
+    try:
+        configs = provisioner.provision(["alice", "bob", "alice"])
+        peers = provisioner.peers()
+    finally:
+        provisioner.close()
+
+    assert list(configs) == ["alice", "bob"]
+    assert [(name, address) for name, _, address, _ in peers] == [("alice", "10.0.0.2"), ("bob", "10.0.0.3")]
+    keys = {name: public_key for name, public_key, _, _ in peers}
+    expected = (SERVER_CONF + "\n" + _block("alice", keys["alice"], "10.0.0.2") + "\n"
+                + _block("bob", keys["bob"], "10.0.0.3"))
+    assert (fake_wg / "wg0.conf").read_text(encoding='utf-8') == expected
+    assert (fake_wg / "wg0.synced").read_text(encoding='utf-8') == \
+        "".join(line + "\n" for line in expected.splitlines() if not line.startswith("#"))
+    assert sum(call.startswith("wg syncconf wg0") for call in wg_calls(fake_wg)) == 1
+
+    alice = configs["alice"]
+    assert "Address = 10.0.0.2/32\n" in alice and "DNS = 10.0.0.1\n" in alice
+    assert "PublicKey = SERVERPUBLICKEY=\nEndpoint = 203.0.113.7:51820\n" in alice
+
+
+def test_provision_again_keeps_the_address_and_renews_the_key(fake_wg, tmp_path):
+    (fake_wg / "wg0.conf").write_text(SERVER_CONF, encoding='utf-8')
+    provisioner = PeerProvisioner(_config(fake_wg, tmp_path), LocalSession(use_sudo=False))
+    try:
+        provisioner.provision(["alice"])
+        first = provisioner.peers()
+        provisioner.provision(["alice"])
+        second = provisioner.peers()
+    finally:
+        provisioner.close()
+
+    assert first[0][2] == second[0][2] == "10.0.0.2"
+    assert first[0][1] != second[0][1]
+    assert (fake_wg / "wg0.conf").read_text(encoding='utf-8').count("# BLOX peer: alice") == 1
@@ -22,19 +22,31 @@ echo "---"
 echo "Loading configuration..."
 echo "Wczytuję konfigurację..."
 
-# Read data from the nested YAML structure
-# Odczyt danych z zagnieżdżonej struktury YAML
-sudo_pswd=$(yq '.security.sudo_pswd' "$CONFIG_FILE")
-new_ip=$(yq '.network.external_ip' "$CONFIG_FILE")
-remote_user=$(yq '.network.remote_server.user' "$CONFIG_FILE")
-remote_host=$(yq '.network.remote_server.host' "$CONFIG_FILE")
-local_project_root=$(yq -r '.paths.project_root' "$CONFIG_FILE")
-mode=$(yq '.execution.mode' "$CONFIG_FILE")
+# Shared helpers: the configuration (blox_load_config_env) and the multiplexed SSH connection
+# Wspólne funkcje: konfiguracja (blox_load_config_env) i współdzielone połączenie SSH
+source "$(dirname "$0")/remote_lib.sh"
+blox_load_config_env "$CONFIG_FILE"
+
+sudo_pswd="$BLOX_SUDO_PSWD"
+new_ip="$BLOX_EXTERNAL_IP"
+remote_user="$BLOX_REMOTE_USER"
+remote_host="$BLOX_REMOTE_HOST"
+local_project_root="$BLOX_PROJECT_ROOT"
+mode="$BLOX_MODE"
+update_mode="$BLOX_WG_UPDATE_MODE"
 modifier_script="modify_android_conf.py"
 
+# Live mode: only a changed file is written and the QR code is renewed, no interface is restarted
+# Tryb na żywo: zapisywany jest tylko zmieniony plik i odnawiany kod QR, żaden interfejs nie jest restartowany
+if [ "$update_mode" == "live" ]; then
+    echo "Live update mode: no WireGuard restart."
+    echo "Tryb aktualizacji na żywo: bez restartu WireGuard."
+    exec python3 "$(dirname "$0")/wg_live.py" android --config "$CONFIG_FILE"
+fi
+
 # --- Path Definitions ---
 # --- Definicje Ścieżek ---
-wg_config_path="/etc/wireguard/android.conf"
+wg_config_path="$BLOX_WG_ANDROID_CONFIG"
 local_qr_destination="${local_project_root}android_wireguard_qr.png"
 
 # =====================================================================================
@@ -60,7 +72,7 @@ if [ "$mode" == "remote" ]; then
     echo "---"
     echo "Downloading original config file from the server..."
     echo "Pobieram oryginalny plik konfiguracyjny z serwera..."
-    sshpass -p "$sudo_pswd" ssh "${remote_user}@${remote_host}" "echo '$sudo_pswd' | sudo -S cat $wg_config_path" > "$local_temp_conf"
+    remote_sudo "${remote_user}@${remote_host}" "cat '${wg_config_path}'" > "$local_temp_conf"
 
     if [ ! -s "$local_temp_conf" ]; then
         echo "ERROR: Failed to download the config file content." >&2
@@ -89,7 +101,7 @@ if [ "$mode" == "remote" ]; then
     echo "---"
     echo "Uploading modified file to the server..."
     echo "Wysyłam zmodyfikowany plik na serwer..."
-    sshpass -p "$sudo_pswd" scp "$local_temp_conf" "${remote_user}@${remote_host}:${remote_temp_conf}"
+    remote_scp "$local_temp_conf" "${remote_user}@${remote_host}:${remote_temp_conf}"
 
     # --- Step 5 (Remote): Perform final operations on the server ---
     # --- Krok 5 (Zdalny): Wykonanie finalnych operacji na serwerze ---
@@ -110,7 +122,7 @@ if [ "$mode" == "remote" ]; then
         wg-quick down wg0 || true;
         wg-quick up wg0;
     "
-    sshpass -p "$sudo_pswd" ssh -t "${remote_user}@${remote_host}" "echo '$sudo_pswd' | sudo -S bash -c \"$remote_commands\""
+    remote_sudo "${remote_user}@${remote_host}" "$remote_commands"
 
     # --- Step 6 (Remote): Cleanup ---
     # --- Krok 6 (Zdalny): Sprzątanie ---
@@ -132,25 +144,25 @@ elif [ "$mode" == "local" ]; then
         set -e;
         echo '--- (LOCAL) Modifying the configuration file... ---';
         echo '--- (LOKALNY) Modyfikacja pliku konfiguracyjnego... ---';
-        echo '$sudo_pswd' | sudo -S python3 '$modifier_script' '$wg_config_path' '$new_ip';
+        python3 '$modifier_script' '$wg_config_path' '$new_ip';
 
         echo '--- (LOCAL) Restarting WireGuard interface (wg0)... ---';
         echo '--- (LOKALNY) Restart interfejsu WireGuard (wg0)... ---';
-        echo '$sudo_pswd' | sudo -S wg-quick down wg0 || true;
-        echo '$sudo_pswd' | sudo -S wg-quick up wg0;
+        wg-quick down wg0 || true;
+        wg-quick up wg0;
     "
 
-    # --- Execute local commands without a new sudo pipe for each ---
-    # --- Wykonanie poleceń lokalnych bez nowego potoku sudo dla każdego ---
+    # --- Execute local commands with one sudo call ---
+    # --- Wykonanie poleceń lokalnych jednym wywołaniem sudo ---
     echo "---"
-    bash -c "$local_commands"
+    local_sudo bash -c "$local_commands"
 
     # --- Generate QR code locally ---
     # --- Generowanie kodu QR lokalnie ---
     echo "---"
     echo "Generating QR code locally..."
     echo "Generuję kod QR lokalnie..."
-    echo "$sudo_pswd" | sudo -S cat "$wg_config_path" | qrencode -o "$local_qr_destination"
+    local_sudo cat "$wg_config_path" | qrencode -o "$local_qr_destination"
     echo "QR code PNG image successfully saved to: $local_qr_destination"
     echo "Obraz PNG z kodem QR został pomyślnie zapisany w: $local_qr_destination"
 
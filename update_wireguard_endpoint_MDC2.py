@@ -9,30 +9,15 @@
 import os
 import re
 import subprocess
-import yaml
+
+from config_loader import load_config
+from wg_live import update_client, wireguard_settings
 
 # =====================================================================================
 # === HELPER FUNCTIONS ===
 # === FUNKCJE POMOCNICZE ===
 # =====================================================================================
 
-def load_config(path="config.yaml"):
-    """
-    Loads and returns the configuration from a YAML file.
-    Wczytuje i zwraca konfigurację z pliku YAML.
-    """
-    try:
-        with open(path, 'r', encoding='utf-8') as file:
-            return yaml.safe_load(file)
-    except FileNotFoundError:
-        print(f"ERROR: Configuration file '{path}' not found!")
-        print(f"BŁĄD: Plik konfiguracyjny '{path}' nie został znaleziony!")
-        return None
-    except Exception as e:
-        print(f"ERROR: Failed to load config file: {e}")
-        print(f"BŁĄD: Nie udało się wczytać pliku konfiguracyjnego: {e}")
-        return None
-
 def run_sudo_command(command: str, password: str) -> bool:
     """
     Runs a command with sudo, piping the password to it.
@@ -78,10 +63,13 @@ def run_sudo_command(command: str, password: str) -> bool:
 
 def update_wireguard_endpoint(config_path: str = "config.yaml"):
     """
-    Updates the Endpoint in the WireGuard configuration file and restarts the service.
-    Aktualizuje Endpoint w pliku konfiguracyjnym WireGuard i restartuje usługę.
+    Updates the Endpoint in the WireGuard configuration file and applies it: live,
+    without dropping the tunnel (network.wireguard.update_mode 'live', see wg_live.py),
+    or by restarting the interface ('restart').
+    Aktualizuje Endpoint w pliku konfiguracyjnym WireGuard i stosuje go: na żywo,
+    bez zrywania tunelu (network.wireguard.update_mode 'live', zob. wg_live.py),
+    lub przez restart interfejsu ('restart').
     """
-    wg_config_path = "/etc/wireguard/wg0-client.conf"
     temp_wg_config_path = "/tmp/wg0-client.conf.temp"
 
     # --- Step 1: Load configuration from YAML ---
@@ -101,6 +89,23 @@ def update_wireguard_endpoint(config_path: str = "config.yaml"):
         print(f"BŁĄD: Brakujący klucz w config.yaml: {e}")
         return
 
+    settings = wireguard_settings(config_data)
+    wg_config_path = settings['client_config']
+    if settings['update_mode'] == 'live':
+        print("\nApplying the new endpoint live (no interface restart)...")
+        print("Stosuję nowy endpoint na żywo (bez restartu interfejsu)...")
+        try:
+            update_client(config_data)
+        except subprocess.CalledProcessError as e:
+            print(f"\nERROR: Live WireGuard update failed: {e.stderr or e}")
+            print(f"BŁĄD: Aktualizacja WireGuard na żywo nie powiodła się: {e.stderr or e}")
+            return
+        print("\n---")
+        print("Process completed successfully!")
+        print("Proces zakończony pomyślnie!")
+        print("---")
+        return
+
     # --- Step 2: Read WireGuard configuration using sudo ---
     # --- Krok 2: Odczytanie konfiguracji WireGuard za pomocą sudo ---
     print(f"\nReading WireGuard configuration file: {wg_config_path}")
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# =====================================================================================
+# === PER-USER JOB CONTEXT ===
+# === KONTEKST ZADANIA DLA POJEDYNCZEGO UŻYTKOWNIKA ===
+# =====================================================================================
+
+import os
+
+
+# =====================================================================================
+# === JOB OBJECT ===
+# === OBIEKT ZADANIA ===
+# =====================================================================================
+
+class UserJob:
+    """
+    Everything the stages need to know about one user. It is passed to every stage
+    directly, so config.yaml does not have to be rewritten for each user.
+
+    Wszystko, co etapy muszą wiedzieć o jednym użytkowniku. Obiekt jest przekazywany
+    bezpośrednio do każdego etapu, więc config.yaml nie musi być nadpisywany dla
+    każdego użytkownika.
+    """
+
+    def __init__(self, number, client_name, email_address, registration_date, user_type):
+        self.number = number
+        self.client_name = str(client_name)
+        self.email_address = str(email_address)
+        self.registration_date = str(registration_date)
+        self.user_type = str(user_type)
+        # First stage to run (set from the provisioning ledger, see ledger.py)
+        # Pierwszy etap do wykonania (ustawiany z rejestru provisioningu, zob. ledger.py)
+        self.resume_from = "cert"
+
+    def __repr__(self):
+        return f"UserJob(#{self.number} {self.client_name!r})"
+
+
+# =====================================================================================
+# === HELPER FUNCTIONS ===
+# === FUNKCJE POMOCNICZE ===
+# =====================================================================================
+
+def job_environment(job, base_environment):
+    """
+    Builds the full environment for a shell stage of the given job: the current
+    process environment, the configuration values (config_loader.shell_environment)
+    and the job fields.
+
+    Buduje pełne środowisko dla etapu powłoki danego zadania: środowisko bieżącego
+    procesu, wartości konfiguracji (config_loader.shell_environment) i pola zadania.
+    """
+    environment = dict(os.environ)
+    environment.update(base_environment)
+    environment.update({
+        'BLOX_CLIENT_NAME': job.client_name,
+        'BLOX_EMAIL_ADDRESS': job.email_address,
+        'BLOX_REGISTRATION_DATE': job.registration_date,
+        'BLOX_USER_TYPE': job.user_type,
+    })
+    return environment
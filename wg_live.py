@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# =====================================================================================
+# === LIVE WIREGUARD ENDPOINT UPDATE WITHOUT RESTARTING THE INTERFACE ===
+# === AKTUALIZACJA ENDPOINTU WIREGUARD NA ŻYWO BEZ RESTARTU INTERFEJSU ===
+# =====================================================================================
+
+import os
+import re
+import shlex
+import subprocess
+
+from artifact_cache import write_if_changed
+from console import progress
+
+# Paths of the WireGuard tools, e.g. a fake 'wg' script in tests
+# Ścieżki narzędzi WireGuard, np. udawany skrypt 'wg' w testach
+WG_BIN = os.environ.get("BLOX_WG_BIN", "wg")
+WG_QUICK_BIN = os.environ.get("BLOX_WG_QUICK_BIN", "wg-quick")
+
+DEFAULT_SETTINGS = {
+    "update_mode": "live",
+    "client_config": "/etc/wireguard/wg0-client.conf",
+    "client_interface": "wg0-client",
+    "android_config": "/etc/wireguard/android.conf",
+    "server_interface": "wg0",
+}
+
+_ENDPOINT_RE = re.compile(r'(^\s*Endpoint\s*=\s*)(\[[^\]]*\]|[^\s:]+)(:\d+)', re.MULTILINE)
+
+
+# =====================================================================================
+# === HELPER FUNCTIONS ===
+# === FUNKCJE POMOCNICZE ===
+# =====================================================================================
+
+def wireguard_settings(config):
+    """
+    Returns the 'network.wireguard' settings completed with the defaults.
+
+    Zwraca ustawienia 'network.wireguard' uzupełnione wartościami domyślnymi.
+    """
+    settings = dict(DEFAULT_SETTINGS)
+    settings.update((config.get('network') or {}).get('wireguard') or {})
+    return settings
+
+
+def parse_peers(text):
+    """
+    Returns the [Peer] sections of a WireGuard configuration as a list of
+    {'public_key': ..., 'endpoint': ...} dictionaries.
+
+    Zwraca sekcje [Peer] konfiguracji WireGuard jako listę słowników
+    {'public_key': ..., 'endpoint': ...}.
+    """
+    peers = []
+    current = None
+    for line in text.splitlines():
+        line = line.split('#', 1)[0].strip()
+        if line.startswith('['):
+            current = {"public_key": None, "endpoint": None} if line.lower() == '[peer]' else None
+            if current is not None:
+                peers.append(current)
+        elif current is not None and '=' in line:
+            key, value = (part.strip() for part in line.split('=', 1))
+            if key.lower() == 'publickey':
+                current["public_key"] = value
+            elif key.lower() == 'endpoint':
+                current["endpoint"] = value
+    return peers
+
+
+def replace_endpoint_host(text, new_host):
+    """
+    Replaces the host of every 'Endpoint' line, keeping its port.
+
+    Zamienia host w każdej linii 'Endpoint', zachowując jej port.
+    """
+    host = f"[{new_host}]" if ':' in new_host else new_host
+    return _ENDPOINT_RE.sub(lambda match: f"{match.group(1)}{host}{match.group(3)}", text)
+
+
+def running_endpoints(session, interface):
+    """
+    Returns {public_key: endpoint} of the running interface, or None if it is down.
+
+    Zwraca {klucz_publiczny: endpoint} działającego interfejsu lub None, jeśli jest wyłączony.
+    """
+    result = session.exec(f"{WG_BIN} show {shlex.quote(interface)} endpoints", sudo=True, check=False)
+    if result.returncode != 0:
+        return None
+    endpoints = {}
+    for line in result.stdout.splitlines():
+        fields = line.split()
+        if len(fields) == 2:
+            endpoints[fields[0]] = None if fields[1] == "(none)" else fields[1]
+    return endpoints
+
+
+def write_root_file(session, path, content):
+    """
+    Replaces a root-owned file atomically (temporary file in the same directory, then mv).
+
+    Podmienia plik należący do roota atomowo (plik tymczasowy w tym samym katalogu, potem mv).
+    """
+    directory = shlex.quote(os.path.dirname(path) or ".")
+    session.exec(f"tmp=$(mktemp {directory}/.blox-wg.XXXXXX) && cat > \"$tmp\" && chmod 600 \"$tmp\" "
+                 f"&& mv \"$tmp\" {shlex.quote(path)}", sudo=True, input_data=content)
+
+
+# =====================================================================================
+# === MAIN SCRIPT LOGIC ===
+# === GŁÓWNA LOGIKA SKRYPTU ===
+# =====================================================================================
+
+def update_endpoint(session, conf_path, new_host, interface=None, sync_interface=None):
+    """
+    Points every Endpoint in a WireGuard configuration file at new_host and applies
+    the change without taking any tunnel down:
+    - the file is only rewritten when an Endpoint actually changed,
+    - with 'interface', only the peers whose running endpoint differs from the file
+      are changed with 'wg set' (an interface that is down is brought up),
+    - with 'sync_interface', that interface reloads its own configuration with
+      'wg syncconf' after the file changed.
+
+    Ustawia każdy Endpoint w pliku konfiguracyjnym WireGuard na new_host i stosuje
+    zmianę bez wyłączania żadnego tunelu:
+    - plik jest zapisywany tylko, gdy Endpoint faktycznie się zmienił,
+    - przy 'interface' tylko peery, których działający endpoint różni się od pliku,
+      są zmieniane przez 'wg set' (wyłączony interfejs jest włączany),
+    - przy 'sync_interface' ten interfejs wczytuje swoją konfigurację przez
+      'wg syncconf' po zmianie pliku.
+
+    Returns:
+        dict: file_changed, changed (peers changed in the file), applied (peers set live),
+              started (interface brought up), text (the resulting configuration).
+              file_changed, changed (peery zmienione w pliku), applied (peery ustawione na żywo),
+              started (włączony interfejs), text (wynikowa konfiguracja).
+
+    Raises:
+        subprocess.CalledProcessError: Reading, writing or applying failed.
+                                       Odczyt, zapis lub zastosowanie się nie powiodło.
+    """
+    original = session.exec(f"cat {shlex.quote(conf_path)}", sudo=True).stdout
+    updated = replace_endpoint_host(original, new_host)
+    old_peers = parse_peers(original)
+    new_peers = parse_peers(updated)
+    changed = [{"public_key": new["public_key"], "old": old["endpoint"], "new": new["endpoint"]}
+               for old, new in zip(old_peers, new_peers) if old["endpoint"] != new["endpoint"]]
+    report = {"file_changed": updated != original, "changed": changed, "applied": [], "started": False,
+              "text": updated}
+
+    if report["file_changed"]:
+        write_root_file(session, conf_path, updated)
+
+    if interface:
+        running = running_endpoints(session, interface)
+        if running is None:
+            session.exec(f"{WG_QUICK_BIN} up {shlex.quote(interface)}", sudo=True)
+            report["started"] = True
+        else:
+            commands = []
+            for peer in new_peers:
+                if peer["public_key"] and peer["endpoint"] and running.get(peer["public_key"]) != peer["endpoint"]:
+                    commands.append(f"{WG_BIN} set {shlex.quote(interface)} peer {shlex.quote(peer['public_key'])} "
+                                    f"endpoint {shlex.quote(peer['endpoint'])}")
+                    report["applied"].append(peer["public_key"])
+            if commands:
+                session.exec(" && ".join(commands), sudo=True)
+
+    if sync_interface and report["file_changed"]:
+        name = shlex.quote(sync_interface)
+        session.exec(f"{WG_BIN} syncconf {name} <({WG_QUICK_BIN} strip {name})", sudo=True)
+
+    return report
+
+
+def print_report(report, label):
+    """
+    Prints which peers were changed and how the change was applied.
+
+    Wypisuje, które peery zostały zmienione i jak zmiana została zastosowana.
+    """
+    progress("wireguard", config=label, file_changed=report["file_changed"], changed=report["changed"],
+             applied=report["applied"], started=report["started"])
+    if not report["file_changed"] and not report["applied"] and not report["started"]:
+        print(f"{label}: the endpoints are already current, nothing to do.")
+        print(f"{label}: endpointy są już aktualne, nic do zrobienia.")
+        return
+    for peer in report["changed"]:
+        print(f"{label}: peer {peer['public_key']}: {peer['old']} -> {peer['new']}")
+    if report["applied"]:
+        print(f"{label}: applied live to {len(report['applied'])} peer(s), no tunnel was restarted.")
+        print(f"{label}: zastosowano na żywo dla {len(report['applied'])} peer(ów), żaden tunel nie był restartowany.")
+    if report["started"]:
+        print(f"{label}: the interface was down and has been brought up.")
+        print(f"{label}: interfejs był wyłączony i został włączony.")
+
+
+def update_client(config, session=None):
+    """
+    Live update of this machine's client tunnel (update_wireguard_endpoint_MDC2.py).
+
+    Aktualizacja na żywo tunelu klienckiego tej maszyny (update_wireguard_endpoint_MDC2.py).
+    """
+    from remote_session import LocalSession
+
+    settings = wireguard_settings(config)
+    session = session or LocalSession(config['security']['sudo_pswd'])
+    report = update_endpoint(session, settings['client_config'], str(config['network']['external_ip']),
+                             interface=settings['client_interface'])
+    print_report(report, settings['client_config'])
+    return report
+
+
+def update_android(config, session=None, qr_destination=None):
+    """
+    Live update of the Android client configuration on the server
+    (update_wireguard_android_endpoint.sh). The file is only read by the phone (through
+    the QR code), so no interface is reloaded. The QR code encodes the private key: it
+    is not cached and its file is readable by the owner only.
+
+    Aktualizacja na żywo konfiguracji klienta Android na serwerze
+    (update_wireguard_android_endpoint.sh). Plik czyta tylko telefon (przez kod QR),
+    więc żaden interfejs nie jest przeładowywany. Kod QR zawiera klucz prywatny: nie
+    jest buforowany, a jego plik jest czytelny tylko dla właściciela.
+    """
+    from remote_session import open_session
+
+    settings = wireguard_settings(config)
+    if qr_destination is None:
+        qr_destination = f"{config['paths']['project_root']}android_wireguard_qr.png"
+    own_session = session is None
+    session = session or open_session(config)
+    try:
+        report = update_endpoint(session, settings['android_config'], str(config['network']['external_ip']))
+    finally:
+        if own_session:
+            session.close()
+    print_report(report, settings['android_config'])
+
+    image = subprocess.run(["qrencode", "-o", "-"], input=report["text"].encode("utf-8"),
+                           capture_output=True, check=True).stdout
+    if write_if_changed(qr_destination, image, mode=0o600):
+        print(f"QR code PNG image successfully saved to: {qr_destination}")
+        print(f"Obraz PNG z kodem QR został pomyślnie zapisany w: {qr_destination}")
+    return report
+
+
+# =====================================================================================
+# === SCRIPT ENTRY POINT ===
+# === PUNKT WEJŚCIA DO SKRYPTU ===
+# =====================================================================================
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+    from config_loader import load_config
+
+    parser = argparse.ArgumentParser(
+        description="Points the WireGuard endpoints at network.external_ip without restarting the tunnels.",
+        epilog="Example: BLOX_WG_BIN=./fake_wg python3 wg_live.py client"
+    )
+    parser.add_argument("target", choices=["client", "android"],
+                        help="Configuration to update. (Konfiguracja do aktualizacji)")
+    parser.add_argument("--config", default="config.yaml", help="Path to config.yaml. (Ścieżka do config.yaml)")
+    args = parser.parse_args()
+
+    config_data = load_config(args.config)
+    if not config_data:
+        exit(1)
+    try:
+        if args.target == "client":
+            update_client(config_data)
+        else:
+            update_android(config_data)
+    except subprocess.CalledProcessError as e:
+        print(f"ERROR: WireGuard update failed: {e.stderr or e}")
+        print(f"BŁĄD: Aktualizacja WireGuard nie powiodła się: {e.stderr or e}")
+        sys.exit(1)
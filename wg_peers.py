@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# =====================================================================================
+# === PER-USER WIREGUARD PEERS: KEYS, ADDRESSES, CLIENT CONFIGS AND QR CODES ===
+# === PEERY WIREGUARD DLA UŻYTKOWNIKÓW: KLUCZE, ADRESY, KONFIGURACJE I KODY QR ===
+# =====================================================================================
+
+import base64
+import datetime
+import io
+import ipaddress
+import re
+import shlex
+import sqlite3
+import threading
+
+from wg_live import WG_BIN, WG_QUICK_BIN, wireguard_settings, write_root_file
+
+DEFAULT_REGISTRY_PATH = "wg_peers.sqlite3"
+PACKAGE_SUBDIR = "wireguard"
+
+DEFAULT_PEER_SETTINGS = {
+    "enabled": False,
+    "server_config": "/etc/wireguard/wg0.conf",
+    "subnet": "10.0.0.0/24",
+    "server_address": "10.0.0.1",
+    "allowed_ips": "10.0.0.0/24",
+    "dns": "",
+    "keepalive": 25,
+    "registry": DEFAULT_REGISTRY_PATH,
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS peers (
+    client_name TEXT PRIMARY KEY,
+    public_key  TEXT NOT NULL,
+    address     TEXT NOT NULL UNIQUE,
+    updated_at  TEXT NOT NULL
+)
+"""
+
+# Marks the [Peer] blocks managed here in the server configuration
+# Oznacza bloki [Peer] zarządzane tutaj w konfiguracji serwera
+_PEER_MARKER = "# BLOX peer: "
+_PEER_BLOCK_RE = re.compile(r'^\[Peer\]\n' + re.escape(_PEER_MARKER) + r'(?P<name>[^\n]*)\n'
+                            r'(?:^(?!\[)[^\n]*\n)*(?:^(?!\[)[^\n]+$)?', re.MULTILINE)
+
+
+# =====================================================================================
+# === HELPER FUNCTIONS ===
+# === FUNKCJE POMOCNICZE ===
+# =====================================================================================
+
+def peer_settings(config):
+    """
+    Returns the 'network.wireguard.peers' settings completed with the defaults.
+
+    Zwraca ustawienia 'network.wireguard.peers' uzupełnione wartościami domyślnymi.
+    """
+    settings = dict(DEFAULT_PEER_SETTINGS)
+    settings.update(((config.get('network') or {}).get('wireguard') or {}).get('peers') or {})
+    return settings
+
+
+def generate_keypair():
+    """
+    Generates a WireGuard key pair in this process; returns (private, public) in base64.
+
+    Generuje parę kluczy WireGuard w tym procesie; zwraca (prywatny, publiczny) w base64.
+    """
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric.x25519 import X25519PrivateKey
+
+    key = X25519PrivateKey.generate()
+    private = key.private_bytes(serialization.Encoding.Raw, serialization.PrivateFormat.Raw,
+                                serialization.NoEncryption())
+    public = key.public_key().public_bytes(serialization.Encoding.Raw, serialization.PublicFormat.Raw)
+    return base64.b64encode(private).decode(), base64.b64encode(public).decode()
+
+
+def render_client_config(private_key, address, server_public_key, endpoint, allowed_ips, dns="", keepalive=25):
+    """
+    Returns the WireGuard configuration of one client.
+
+    Zwraca konfigurację WireGuard jednego klienta.
+    """
+    lines = ["[Interface]", f"PrivateKey = {private_key}", f"Address = {address}/32"]
+    if dns:
+        lines.append(f"DNS = {dns}")
+    lines += ["", "[Peer]", f"PublicKey = {server_public_key}", f"Endpoint = {endpoint}",
+              f"AllowedIPs = {allowed_ips}"]
+    if keepalive:
+        lines.append(f"PersistentKeepalive = {int(keepalive)}")
+    return "\n".join(lines) + "\n"
+
+
+def render_qr_png(text):
+    """
+    Returns a QR code PNG of the text, generated in this process (no qrencode).
+
+    Zwraca PNG z kodem QR tekstu, generowany w tym procesie (bez qrencode).
+    """
+    import qrcode
+
+    code = qrcode.QRCode(border=2)
+    code.add_data(text)
+    code.make(fit=True)
+    buffer = io.BytesIO()
+    code.make_image().save(buffer)
+    return buffer.getvalue()
+
+
+def package_files(client_name, client_config):
+    """
+    Returns the per-user files added to the package: the client configuration and its QR code.
+
+    Zwraca pliki użytkownika dodawane do paczki: konfigurację klienta i jej kod QR.
+    """
+    return {
+        f"{PACKAGE_SUBDIR}/{client_name}.conf": client_config.encode("utf-8"),
+        f"{PACKAGE_SUBDIR}/{client_name}.png": render_qr_png(client_config),
+    }
+
+
+def update_server_config(text, peers):
+    """
+    Replaces the managed [Peer] blocks of the given clients in the server configuration
+    (and adds the new ones). peers: {client_name: (public_key, address)}.
+
+    Podmienia zarządzane bloki [Peer] podanych klientów w konfiguracji serwera
+    (i dodaje nowe). peers: {nazwa_klienta: (klucz_publiczny, adres)}.
+    """
+    text = _PEER_BLOCK_RE.sub(lambda match: "" if match.group("name") in peers else match.group(0), text)
+    blocks = [f"[Peer]\n{_PEER_MARKER}{name}\nPublicKey = {public_key}\nAllowedIPs = {address}/32\n"
+              for name, (public_key, address) in peers.items()]
+    return text.rstrip("\n") + "\n\n" + "\n".join(blocks)
+
+
+# =====================================================================================
+# === PEER PROVISIONER CLASS ===
+# === KLASA PROVISIONINGU PEERÓW ===
+# =====================================================================================
+
+class PeerProvisioner:
+    """
+    Gives every user a WireGuard peer of their own: a key pair generated in this process,
+    an address from the pool (kept in a local SQLite registry) and a client configuration.
+    The server configuration is rewritten and applied with a single 'wg syncconf' per
+    batch, whatever the number of users, so no tunnel is restarted. The client private
+    keys are not stored: a user provisioned again gets a new key and keeps the address.
+
+    Daje każdemu użytkownikowi własnego peera WireGuard: parę kluczy generowaną w tym
+    procesie, adres z puli (przechowywany w lokalnym rejestrze SQLite) i konfigurację
+    klienta. Konfiguracja serwera jest zapisywana i stosowana jednym 'wg syncconf' na
+    paczkę, niezależnie od liczby użytkowników, więc żaden tunel nie jest restartowany.
+    Klucze prywatne klientów nie są przechowywane: ponownie obsłużony użytkownik dostaje
+    nowy klucz i zachowuje adres.
+    """
+
+    def __init__(self, config, session):
+        self.config = config
+        self.session = session
+        self.settings = peer_settings(config)
+        self.interface = wireguard_settings(config)['server_interface']
+        self.subnet = ipaddress.ip_network(self.settings['subnet'], strict=False)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.settings['registry'], check_same_thread=False)
+        with self._connection:
+            self._connection.execute(_SCHEMA)
+
+    def close(self):
+        self._connection.close()
+
+    def _allocate(self, client_names):
+        """
+        Returns {client_name: address}, keeping existing addresses and giving the new
+        clients the lowest free ones.
+
+        Zwraca {nazwa_klienta: adres}, zachowując istniejące adresy i przydzielając
+        nowym klientom najniższe wolne.
+        """
+        existing = dict(self._connection.execute("SELECT client_name, address FROM peers"))
+        used = set(existing.values()) | {str(self.settings['server_address'])}
+        free = (str(host) for host in self.subnet.hosts() if str(host) not in used)
+        addresses = {}
+        for name in client_names:
+            if name in existing:
+                addresses[name] = existing[name]
+                continue
+            address = next(free, None)
+            if address is None:
+                raise RuntimeError(f"the address pool {self.subnet} is exhausted")
+            addresses[name] = address
+        return addresses
+
+    def _server_identity(self):
+        result = self.session.exec(f"{WG_BIN} show {shlex.quote(self.interface)} public-key && "
+                                   f"{WG_BIN} show {shlex.quote(self.interface)} listen-port", sudo=True)
+        public_key, listen_port = result.stdout.split()[:2]
+        return public_key, listen_port
+
+    def provision(self, client_names):
+        """
+        Creates (or renews) the peers of all given clients with one server update.
+
+        Tworzy (lub odnawia) peery wszystkich podanych klientów jedną aktualizacją serwera.
+
+        Returns:
+            dict: {client_name: client configuration text}.
+                  {nazwa_klienta: treść konfiguracji klienta}.
+
+        Raises:
+            RuntimeError: The address pool is exhausted. / Pula adresów została wyczerpana.
+            subprocess.CalledProcessError: The server could not be read or updated.
+                                           Nie udało się odczytać lub zaktualizować serwera.
+        """
+        client_names = list(dict.fromkeys(str(name) for name in client_names))
+        if not client_names:
+            return {}
+        with self._lock:
+            server_public_key, listen_port = self._server_identity()
+            endpoint = f"{self.config['network']['external_ip']}:{listen_port}"
+            addresses = self._allocate(client_names)
+            keys = {name: generate_keypair() for name in client_names}
+
+            # One read, one write and one 'wg syncconf' for the whole batch
+            # Jeden odczyt, jeden zapis i jedno 'wg syncconf' dla całej paczki
+            server_config = self.settings['server_config']
+            current = self.session.exec(f"cat {shlex.quote(server_config)}", sudo=True).stdout
+            updated = update_server_config(current, {name: (keys[name][1], addresses[name]) for name in client_names})
+            write_root_file(self.session, server_config, updated)
+            name = shlex.quote(self.interface)
+            self.session.exec(f"{WG_BIN} syncconf {name} <({WG_QUICK_BIN} strip {name})", sudo=True)
+
+            now = datetime.datetime.now().isoformat(timespec='seconds')
+            with self._connection:
+                self._connection.executemany(
+                    "INSERT OR REPLACE INTO peers (client_name, public_key, address, updated_at) VALUES (?, ?, ?, ?)",
+                    [(name, keys[name][1], addresses[name], now) for name in client_names])
+
+        return {name: render_client_config(keys[name][0], addresses[name], server_public_key, endpoint,
+                                           self.settings['allowed_ips'], self.settings['dns'],
+                                           self.settings['keepalive'])
+                for name in client_names}
+
+    def peers(self):
+        """
+        Returns the registered peers as (client_name, public_key, address, updated_at) rows.
+
+        Zwraca zarejestrowane peery jako wiersze (nazwa_klienta, klucz_publiczny, adres, data).
+        """
+        return self._connection.execute(
+            "SELECT client_name, public_key, address, updated_at FROM peers ORDER BY client_name").fetchall()
+
+
+# =====================================================================================
+# === SCRIPT ENTRY POINT ===
+# === PUNKT WEJŚCIA DO SKRYPTU ===
+# =====================================================================================
+
+if __name__ == "__main__":
+    import argparse
+    import os
+    from config_loader import load_config
+
+    parser = argparse.ArgumentParser(
+        description="Creates per-user WireGuard peers (client config and QR code) or lists the registered ones.",
+        epilog="Example: python3 wg_peers.py add user1 user2 --output ./wg"
+    )
+    parser.add_argument("action", choices=["add", "list"], help="Action to perform. (Akcja do wykonania)")
+    parser.add_argument("client_names", nargs="*", help="Client names. (Nazwy klientów)")
+    parser.add_argument("--output", default=".", help="Directory for the .conf and .png files. (Katalog na pliki)")
+    parser.add_argument("--config", default="config.yaml", help="Path to config.yaml. (Ścieżka do config.yaml)")
+    args = parser.parse_args()
+
+    config_data = load_config(args.config)
+    if not config_data:
+        exit(1)
+
+    if args.action == "list":
+        provisioner = PeerProvisioner(config_data, None)
+        for row in provisioner.peers():
+            print("  ".join(row))
+        provisioner.close()
+        exit(0)
+
+    from remote_session import open_session
+    with open_session(config_data) as session:
+        provisioner = PeerProvisioner(config_data, session)
+        configs = provisioner.provision(args.client_names)
+        provisioner.close()
+    for client, client_config in configs.items():
+        for filename, data in package_files(client, client_config).items():
+            path = os.path.join(args.output, os.path.basename(filename))
+            with open(path, 'wb') as f:
+                f.write(data)
+            os.chmod(path, 0o600)
+        print(f"Peer of {client} created: {args.output}/{client}.conf (.png)")
+        print(f"Peer użytkownika {client} utworzony: {args.output}/{client}.conf (.png)")